@@ -64,6 +64,24 @@ def _approx_tokens(s: str) -> int:
     return max(1, len(s) // 4)
 
 
+def _inline_local_defs(schema: dict) -> dict:
+    """`schema` with its local `$defs` written out at every `$ref` — the
+    fully inlined form the generator emitted before de-duplication."""
+    defs = schema.get("$defs", {})
+
+    def walk(node):
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str) and ref.startswith("#/$defs/"):
+                return walk(defs[ref[len("#/$defs/"):]])
+            return {k: walk(v) for k, v in node.items() if k != "$defs"}
+        if isinstance(node, list):
+            return [walk(v) for v in node]
+        return node
+
+    return walk(schema)
+
+
 async def main() -> None:
     import httpx
     import respx
@@ -105,6 +123,35 @@ async def main() -> None:
     print()
     print(f"**Total approx tokens for `tools/list`: {total_tokens}**")
     print()
+    print("## Output schemas")
+    print()
+    print("Also part of `tools/list`. *Inlined* is every `$ref` written out;")
+    print("*emitted* is what the server advertises, repeated subtrees moved to")
+    print("the schema's local `$defs`.")
+    print()
+    print("| Tool | Inlined chars | Emitted chars | Approx tokens (inlined → emitted) |")
+    print("|---|---:|---:|---:|")
+    out_rows: list[tuple[str, int, int]] = []
+    for name, tool in tools.items():
+        output_schema = getattr(tool, "output_schema", None)
+        if not output_schema:
+            continue
+        emitted = json.dumps(output_schema, separators=(",", ":"))
+        inlined = json.dumps(_inline_local_defs(output_schema), separators=(",", ":"))
+        out_rows.append((name, len(inlined), len(emitted)))
+    for name, before, after in sorted(out_rows, key=lambda r: (-r[2], r[0])):
+        print(
+            f"| `{name}` | {before} | {after} | "
+            f"{before // 4} → {after // 4} |"
+        )
+    before_total = sum(r[1] for r in out_rows)
+    after_total = sum(r[2] for r in out_rows)
+    print()
+    print(
+        f"**Output schemas: {before_total} → {after_total} chars, approx "
+        f"{before_total // 4} → {after_total // 4} tokens**"
+    )
+    print()
     print("> **Methodology**: token count is approximated as `len(chars) // 4`")
     print("> (per-tool description + JSON-serialized parameter schema). The actual")
     print("> tiktoken/Claude-tokenizer count for JSON-dense schemas is typically")
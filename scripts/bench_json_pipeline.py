@@ -0,0 +1,171 @@
+"""Benchmark the tool-response JSON pipeline: parse, scrub, serialize.
+
+Times the generated module's own `_format_response` (text tools) and the
+parse-and-scrub step the structured tools run, on a filings list page and a
+ten-year financials document, with orjson and with the stdlib fallback. The
+"before" row is the pipeline this replaced: `response.json()` and
+`json.dumps(indent=2)`.
+
+Usage:
+    python scripts/bench_json_pipeline.py [--rounds 200]
+
+Runs offline; the module import is stubbed the same way as
+`audit_token_budget.py`.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+# Importing the audit script sets the synthetic env the module needs.
+from scripts.audit_token_budget import _AUDIT_ISSUER, _OIDC_DOCUMENT  # noqa: E402
+
+
+def _list_page() -> dict:
+    return {
+        "count": 5000,
+        "next": "https://api.financialreports.eu/filings/?page=2",
+        "previous": None,
+        "results": [
+            {
+                "id": 900000 + i,
+                "title": f"Annual Report 2025 — Société Exemple {i} AG",
+                "release_datetime": "2026-03-14T07:00:00Z",
+                "added_to_platform": "2026-03-14T07:04:11Z",
+                "updated_date": "2026-03-14T07:04:11Z",
+                "language": {"code": "de", "name": "German"},
+                "company": {"id": 1000 + i, "name": f"Exemple {i} AG", "country_code": "DE"},
+                "filing_type": {
+                    "code": "AR",
+                    "name": "Annual Report",
+                    "category": {"name": "Financial Reporting", "sort_order": 1},
+                },
+                "viewer_url": f"https://financialreports.eu/filings/{900000 + i}/",
+                "document_url": f"https://cdn.financialreports.eu/{900000 + i}.pdf",
+                "markdown_url": f"https://api.financialreports.eu/filings/{900000 + i}/markdown/",
+            }
+            for i in range(100)
+        ],
+    }
+
+
+def _financials() -> dict:
+    return {
+        "company_id": 7,
+        "currency": {"code": "EUR"},
+        "periods": [
+            {
+                "fiscal_year": year,
+                "fiscal_period": "FY",
+                "period_end_date": f"{year}-12-31",
+                "statements": [
+                    {
+                        "statement_type": statement_type,
+                        "currency": {"code": "EUR"},
+                        "extraction": {
+                            "model": "internal",
+                            "prompt_version": "v9",
+                            "extracted_at": "2026-03-14T07:04:11Z",
+                            "notes": None,
+                        },
+                        "line_items": [
+                            {
+                                "code": f"{statement_type.lower()}_{n}",
+                                "name": f"Line item {n}",
+                                "sort_order": n,
+                                "value": f"{(n + 1) * 1234567.89:.2f}",
+                            }
+                            for n in range(60)
+                        ],
+                    }
+                    for statement_type in ("BS", "IS", "CF")
+                ],
+            }
+            for year in range(2016, 2026)
+        ],
+    }
+
+
+def _time(fn, rounds: int) -> float:
+    """Median microseconds per call over `rounds`."""
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1e6
+
+
+def _bench(m, name: str, doc: dict, rounds: int) -> list[str]:
+    import httpx
+
+    body = json.dumps(doc).encode()
+    request = httpx.Request("GET", "https://api.financialreports.eu/")
+
+    def fresh() -> httpx.Response:
+        return httpx.Response(200, content=body, request=request)
+
+    def before_text() -> None:
+        data = m._scrub_response(fresh().json())
+        json.dumps(data, indent=2, ensure_ascii=False)
+
+    def before_structured() -> None:
+        m._scrub_response(fresh().json())
+
+    def after_text() -> None:
+        m._format_response(fresh())
+
+    def after_structured() -> None:
+        m._scrub_response(m._json_loads(fresh().content))
+
+    rows = [
+        f"| {name} | before | {_time(before_text, rounds):,.0f} | "
+        f"{_time(before_structured, rounds):,.0f} |"
+    ]
+    orjson = m._orjson
+    for label, backend in (("stdlib", None), ("orjson", orjson)):
+        if label == "orjson" and backend is None:
+            rows.append(f"| {name} | orjson | not installed | |")
+            continue
+        m._orjson = backend
+        rows.append(
+            f"| {name} | {label} | {_time(after_text, rounds):,.0f} | "
+            f"{_time(after_structured, rounds):,.0f} |"
+        )
+    m._orjson = orjson
+    return rows
+
+
+async def main(rounds: int) -> None:
+    import httpx
+    import respx
+
+    with respx.mock(assert_all_called=False, assert_all_mocked=False) as router:
+        router.get(f"{_AUDIT_ISSUER}/.well-known/openid-configuration").mock(
+            return_value=httpx.Response(200, json=_OIDC_DOCUMENT)
+        )
+        router.get(f"{_AUDIT_ISSUER}/.well-known/jwks.json").mock(
+            return_value=httpx.Response(200, json={"keys": []})
+        )
+        import src.financial_reports_mcp as m
+
+    print(f"Median µs per call over {rounds} rounds.\n")
+    print("| fixture | pipeline | text tool | structured tool |")
+    print("|---|---|---:|---:|")
+    for name, doc in (("filings list (100 rows)", _list_page()), ("financials (10 years)", _financials())):
+        for row in _bench(m, name, doc, rounds):
+            print(row)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    asyncio.run(main(parser.parse_args().rounds))
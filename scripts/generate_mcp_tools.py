@@ -21,6 +21,7 @@ This script is invoked at Docker build time (see Dockerfile).
 """
 
 import copy
+import json
 import os
 import re
 import sys
@@ -30,6 +31,7 @@ from typing import Any
 
 import httpx
 import jinja2
+import jsonschema
 import yaml
 
 # Single source of truth for fields the runtime scrubber removes from every
@@ -126,8 +128,10 @@ import os
 import random
 import re
 import socket
+import statistics
 import time
 import uuid
+from collections import defaultdict, deque
 from contextlib import asynccontextmanager
 from contextvars import ContextVar
 from functools import wraps
@@ -135,30 +139,39 @@ from typing import Any, AsyncIterator, Awaitable, Callable, Literal, Optional
 from urllib.parse import quote, urlsplit
 
 import httpx
+import jsonschema
 import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response
 from fastmcp import FastMCP
+from fastmcp.exceptions import ToolError
 import fastmcp.server.auth.handlers.authorize as _fastmcp_authorize_handlers
 from fastmcp.server.auth.providers.aws import (
     AWSCognitoProvider,
     AWSCognitoTokenVerifier,
 )
 from fastmcp.server.auth.oauth_proxy import OAuthProxy, ProxyDCRClient
-from fastmcp.server.dependencies import get_access_token
+from fastmcp.server.dependencies import get_access_token, get_http_headers
 from fastmcp.server.middleware import Middleware
-from mcp.types import Icon, ToolAnnotations
+from mcp.types import Icon, TextContent, ToolAnnotations
 from starlette.middleware.base import BaseHTTPMiddleware
 
 from src.usage_analytics import (
     UsageAnalyticsMiddleware,
     build_emitter_from_env,
     current_call_id,
+    current_client_info,
     record_tool_error,
     sanitize_error_detail,
 )
 
+try:
+    # Optional fast JSON backend for tool responses; see "JSON pipeline" below.
+    import orjson as _orjson
+except ImportError:  # pragma: no cover - depends on the image
+    _orjson = None
+
 # ---------------------------------------------------------------------------
 # Logging
 # ---------------------------------------------------------------------------
@@ -1427,6 +1440,8 @@ mcp.add_middleware(_RecencyMiddleware())
 # Per-request context (token + user info), set by @auth_required
 # ---------------------------------------------------------------------------
 _current_token: ContextVar[str] = ContextVar("_current_token", default="")
+# Cognito `sub` of the caller — the key for per-user server-side state.
+_current_sub: ContextVar[str] = ContextVar("_current_sub", default="")
 
 
 _MAX_JOSE_HEADER_B64 = 4096
@@ -1557,15 +1572,147 @@ _API_LIMITS = httpx.Limits(
 # httpcore.AsyncConnectionPool.handle_async_request, which is the method that
 # *contains* httpcore's retry loop, so a mocked ConnectError is seen exactly
 # once. Prod-only hardening by construction — do not add a test asserting it.
-_api_transport = httpx.AsyncHTTPTransport(
-    retries=2,
-    http2=True,
-    limits=_API_LIMITS,
+#
+# The upstream transport is a small set of independent HTTP/2 pools rather than
+# one. With http2=True a single pool multiplexes every concurrent call onto ONE
+# connection, so a 10 MB markdown stream and a 2 KB lookup share a TCP window
+# and the server's max-concurrent-streams cap, and a fan-out stalls head-of-line
+# behind whichever stream is slowest. `_BalancedHTTP2Transport` places each new
+# stream on the member with the fewest active streams, breaking ties by the most
+# connection-level flow-control headroom. MCP_UPSTREAM_HTTP2_CONNECTIONS sets N;
+# _API_LIMITS is split across the members so the process-wide bounds above hold.
+_UPSTREAM_HTTP2_CONNECTIONS = max(
+    1, int(os.environ.get("MCP_UPSTREAM_HTTP2_CONNECTIONS", "2"))
 )
+# A fresh HTTP/2 connection's receive window: the 65_535-byte protocol default
+# plus the 2**24 httpcore grants at connection start. Used as the headroom of a
+# member that has not connected yet, so an idle member ranks as fully open.
+_H2_FRESH_WINDOW = 65_535 + 2**24
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body wrapper that reports stream completion exactly once.
+
+    httpx closes every response — after `aread()` for a plain request, on
+    leaving `client.stream(...)` for a streamed one — so `aclose` is the one
+    reliable end-of-stream signal for the balancer's active-stream count.
+    """
+
+    def __init__(self, stream: Any, release: Callable[[], None]) -> None:
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+
+class _BalancedHTTP2Transport(httpx.AsyncBaseTransport):
+    """N independent HTTP/2 pools behind one transport, balanced per stream.
+
+    Each member is a plain AsyncHTTPTransport — http2 and its share of the
+    limits repassed explicitly, per the warning above — so connection setup,
+    connect retries and pooling are untouched httpx/httpcore behaviour; this
+    class only chooses which member a request goes to and counts streams.
+    """
+
+    def __init__(self, size: int, limits: httpx.Limits, retries: int = 2) -> None:
+        member_limits = httpx.Limits(
+            max_connections=max(1, (limits.max_connections or 100) // size),
+            max_keepalive_connections=max(1, (limits.max_keepalive_connections or 20) // size),
+            keepalive_expiry=limits.keepalive_expiry,
+        )
+        self.members = [
+            httpx.AsyncHTTPTransport(retries=retries, http2=True, limits=member_limits)
+            for _ in range(size)
+        ]
+        self._active = [0] * size
+        self._opened = [0] * size
+
+    @staticmethod
+    def _h2_states(member: httpx.AsyncHTTPTransport) -> list[Any]:
+        # httpcore keeps the h2 state machine two private hops down; read it
+        # defensively so an httpcore refactor degrades to stream-count-only
+        # balancing instead of breaking every request.
+        states = []
+        for conn in member._pool.connections:
+            state = getattr(getattr(conn, "_connection", None), "_h2_state", None)
+            if state is not None and not conn.is_closed():
+                states.append(state)
+        return states
+
+    def _headroom(self, index: int) -> int:
+        try:
+            windows = [s.inbound_flow_control_window for s in self._h2_states(self.members[index])]
+        except Exception:
+            return _H2_FRESH_WINDOW
+        return max(windows, default=_H2_FRESH_WINDOW)
+
+    def _pick(self) -> int:
+        return min(
+            range(len(self.members)),
+            key=lambda i: (self._active[i], -self._headroom(i), i),
+        )
+
+    def _release(self, index: int) -> None:
+        self._active[index] -= 1
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        index = self._pick()
+        self._active[index] += 1
+        self._opened[index] += 1
+        try:
+            response = await self.members[index].handle_async_request(request)
+        except BaseException:
+            self._release(index)
+            raise
+        response.stream = _ReleasingStream(response.stream, lambda: self._release(index))
+        return response
+
+    async def aclose(self) -> None:
+        for member in self.members:
+            await member.aclose()
+
+    def stats(self) -> list[dict[str, Any]]:
+        """Per-connection stream counts and h2 state, for /health and logs."""
+        out = []
+        for index, member in enumerate(self.members):
+            states = []
+            try:
+                states = self._h2_states(member)
+            except Exception:
+                pass
+            out.append(
+                {
+                    "connection": index,
+                    "active_streams": self._active[index],
+                    "streams_opened": self._opened[index],
+                    "open": bool(states),
+                    "inbound_window": self._headroom(index),
+                    "max_concurrent_streams": max(
+                        (s.remote_settings.max_concurrent_streams for s in states),
+                        default=None,
+                    ),
+                }
+            )
+        return out
+
+
+_api_transport = _BalancedHTTP2Transport(_UPSTREAM_HTTP2_CONNECTIONS, _API_LIMITS)
 
 # A single AsyncClient per process. Connection pool + HTTP keep-alive are
 # reused across all tool calls. Closed on shutdown via the FastAPI lifespan
-# below. HTTP/2 multiplexes parallel calls over a single connection.
+# below. HTTP/2 multiplexes parallel calls over the transport's member
+# connections.
 #
 # The timeout is split rather than flat: a single 60 s budget meant an
 # unreachable upstream burned the full 60 s per call before failing, while the
@@ -1584,6 +1731,358 @@ _api_client = httpx.AsyncClient(
     },
 )
 
+# ---------------------------------------------------------------------------
+# Priority lanes — bulk downloads vs interactive lookups
+# ---------------------------------------------------------------------------
+# Filing markdown downloads (up to _MAX_FILING_BYTES each) and 2 KB metadata
+# lookups used to share `_api_client`'s pool. Under load the downloads held the
+# pool slots and the connections' bandwidth, and a quick `companies_retrieve`
+# queued behind them until the 10 s pool timeout. So bulk transfers get their
+# own lane: a separate client whose pool, limits and timeouts are sized for
+# large bodies, and whose HTTP/2 connection has its own connection-level flow
+# control window, so a slow-draining download can no longer exhaust the window
+# that lookups share. (httpcore fixes the window size itself; the separate
+# connection is the lever we have.)
+#
+# The lane is picked by the generator per tool class — the markdown templates
+# stream on "bulk", every other GET template uses "interactive" — and bulk
+# requests additionally take a slot from `_bulk_semaphore`, so concurrent
+# downloads are capped per process and cannot starve interactive calls of CPU
+# or egress. A call waiting for a slot waits at most its remaining deadline.
+_API_BULK_LIMITS = httpx.Limits(
+    max_connections=20,
+    max_keepalive_connections=4,
+    keepalive_expiry=30.0,
+)
+_BULK_CONCURRENCY = max(1, int(os.environ.get("MCP_BULK_DOWNLOAD_CONCURRENCY", "8")))
+_bulk_semaphore = asyncio.Semaphore(_BULK_CONCURRENCY)
+
+# http2=/limits= repassed for the reason spelled out above `_api_transport`.
+_api_bulk_transport = httpx.AsyncHTTPTransport(
+    retries=2,
+    http2=True,
+    limits=_API_BULK_LIMITS,
+)
+# Same read budget as the interactive lane — a large body genuinely needs it —
+# but a longer pool wait: the semaphore already bounds how many downloads
+# compete, so a pool wait here means a connection is being set up, not that
+# the lane is saturated.
+_api_bulk_client = httpx.AsyncClient(
+    base_url=API_BASE_URL,
+    timeout=httpx.Timeout(connect=5.0, read=60.0, write=10.0, pool=30.0),
+    limits=_API_BULK_LIMITS,
+    http2=True,
+    transport=_api_bulk_transport,
+    event_hooks={"request": [_inject_auth, _inject_correlation]},
+    headers=_api_client.headers,
+)
+
+_LANE_CLIENTS: dict[str, httpx.AsyncClient] = {
+    "interactive": _api_client,
+    "bulk": _api_bulk_client,
+}
+
+
+@asynccontextmanager
+async def _lane_slot(lane: str) -> AsyncIterator[None]:
+    """Hold a bulk-download slot for the duration of the block; a no-op for
+    the interactive lane. The wait is bounded by the call's deadline."""
+    if lane != "bulk":
+        yield
+        return
+    try:
+        async with asyncio.timeout(_deadline_remaining()):
+            await _bulk_semaphore.acquire()
+    except TimeoutError as exc:
+        raise _deadline_exceeded() from exc
+    try:
+        yield
+    finally:
+        _bulk_semaphore.release()
+
+
+# ---------------------------------------------------------------------------
+# Hedged GETs — opt-in tail-latency cut for idempotent reads
+# ---------------------------------------------------------------------------
+# Every GET tool is annotated idempotentHint=True, so firing a duplicate at a
+# straggler is safe: if the first attempt is still outstanding after the
+# endpoint's rolling p95, a second one goes out and whichever answers first wins.
+# The loser is cancelled, which on HTTP/2 resets its stream instead of tearing
+# the connection down.
+#
+# Off unless MCP_HEDGE_REQUESTS=1. The hedge budget is a token bucket: every
+# primary request earns _HEDGE_BUDGET tokens and every hedge spends one, so over
+# any window hedges stay at or below that fraction of the request volume (5 %
+# by default) no matter how slow the upstream gets. A brown-out drains the
+# bucket within a few calls and hedging switches itself off — duplicating
+# requests into an overloaded upstream is the one thing it must never do.
+#
+# Streaming downloads (`_api_stream_get`) are never hedged: a duplicate there
+# re-downloads up to _MAX_FILING_BYTES for a latency win nobody can see.
+_HEDGE_ENABLED = os.environ.get("MCP_HEDGE_REQUESTS", "0").strip() == "1"
+_HEDGE_BUDGET = float(os.environ.get("MCP_HEDGE_BUDGET", "0.05"))
+# Caps the bucket so a long quiet period cannot bank a burst of hedges.
+_HEDGE_BURST = 5.0
+# Latency samples kept per endpoint family, and the minimum before any p95 is
+# trusted. Below the floor a cold endpoint never hedges — a p95 over a handful
+# of samples is mostly noise.
+_HEDGE_WINDOW = 200
+_HEDGE_MIN_SAMPLES = 20
+# Never hedge sooner than this, however fast the endpoint usually is: below it
+# the duplicate mostly races connection setup, not a slow upstream.
+_HEDGE_MIN_DELAY = 0.05
+
+# A request's endpoint family is the spec path template it was built from, so
+# `/companies/1/` and `/companies/2/` share one latency window (and, later, one
+# retry budget) and so does every free-text `/isins/{code}/`. The templates are
+# the spec's, emitted at generation time, literal segments first so
+# `/companies/merges/` is not taken for `/companies/{id}/`; anything else is
+# "other". Keys are therefore a closed set: the per-family maps cannot grow
+# with the ids callers send, and /health (unauthenticated) never echoes one.
+_ENDPOINT_TEMPLATES: list[str] = __ENDPOINT_TEMPLATES_REPR__
+_ENDPOINT_OTHER = "other"
+
+
+def _endpoint_template_re(template: str) -> re.Pattern[str]:
+    return re.compile(
+        "/".join(
+            "[^/]+" if segment.startswith("{") else re.escape(segment)
+            for segment in template.split("/")
+        )
+    )
+
+
+_ENDPOINT_TEMPLATE_RES = [(_endpoint_template_re(t), t) for t in _ENDPOINT_TEMPLATES]
+_API_BASE_PATH = urlsplit(API_BASE_URL).path.rstrip("/")
+
+
+def _endpoint_family(url: str) -> str:
+    """`/companies/123/financials/` -> `/companies/{id}/financials/`."""
+    path = urlsplit(url).path
+    if _API_BASE_PATH and path.startswith(_API_BASE_PATH + "/"):
+        path = path[len(_API_BASE_PATH) :]
+    for pattern, template in _ENDPOINT_TEMPLATE_RES:
+        if pattern.fullmatch(path):
+            return template
+    return _ENDPOINT_OTHER
+
+
+class _LatencyWindow:
+    """Rolling sample of recent request latencies for one endpoint family."""
+
+    def __init__(self, size: int = _HEDGE_WINDOW) -> None:
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if len(self._samples) < _HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _RatioBudget:
+    """Token bucket bounding extra requests to a fraction of primary requests.
+
+    Every primary request earns `ratio` tokens, every extra one (a hedge, a
+    retry) spends a whole token, and the balance is capped at `burst`.
+    """
+
+    def __init__(self, ratio: float, burst: float = _HEDGE_BURST, initial: float = 0.0) -> None:
+        self._ratio = ratio
+        self._burst = burst
+        self._tokens = initial
+
+    def earn(self) -> None:
+        self._tokens = min(self._burst, self._tokens + self._ratio)
+
+    def spend(self) -> bool:
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+
+# Keyed by `_endpoint_family`, so at most one window per spec path (+ "other").
+_hedge_latency: defaultdict[str, _LatencyWindow] = defaultdict(_LatencyWindow)
+_hedge_budget = _RatioBudget(_HEDGE_BUDGET)
+
+# The hedge goes out on its own pool. A second request on the primary client
+# could be multiplexed onto the very connection that is stalling — the
+# balancer only sees stream counts, not which stream is slow — which would
+# defeat the point. Same auth/correlation hooks, headers and
+# timeouts as `_api_client`, so a hedge is indistinguishable upstream.
+_api_hedge_transport = httpx.AsyncHTTPTransport(
+    retries=2,
+    http2=True,
+    limits=_API_LIMITS,
+)
+_api_hedge_client = httpx.AsyncClient(
+    base_url=API_BASE_URL,
+    timeout=_api_client.timeout,
+    limits=_API_LIMITS,
+    http2=True,
+    transport=_api_hedge_transport,
+    event_hooks={"request": [_inject_auth, _inject_correlation]},
+    headers=_api_client.headers,
+)
+
+
+async def _timed_get(
+    client: httpx.AsyncClient, window: _LatencyWindow, url: str, **kwargs: Any
+) -> httpx.Response:
+    started = time.monotonic()
+    response = await client.get(url, **kwargs)
+    window.record(time.monotonic() - started)
+    return response
+
+
+async def _hedged_get(url: str, lane: str = "interactive", **kwargs: Any) -> httpx.Response:
+    """One upstream GET attempt, hedged when enabled and the budget allows.
+
+    Only the interactive lane is hedged — the bulk lane trades latency for
+    throughput by design. Both attempts run as tasks that inherit this
+    context, so `_inject_auth` sees the caller's `_current_token` on the hedge
+    too. A transport error on the first finisher does not win the race — the
+    other attempt is awaited, and its error is only raised if both fail.
+    """
+    if lane != "interactive":
+        return await _LANE_CLIENTS[lane].get(url, **kwargs)
+    if not _HEDGE_ENABLED:
+        return await _api_client.get(url, **kwargs)
+
+    window = _hedge_latency[_endpoint_family(url)]
+    _hedge_budget.earn()
+    primary = asyncio.ensure_future(_timed_get(_api_client, window, url, **kwargs))
+    tasks = {primary}
+    try:
+        p95 = window.quantile(0.95)
+        if p95 is not None:
+            done, _ = await asyncio.wait(tasks, timeout=max(p95, _HEDGE_MIN_DELAY))
+            if not done and _hedge_budget.spend():
+                logger.info(
+                    "hedging upstream GET %s after %.3fs",
+                    _endpoint_family(url),
+                    max(p95, _HEDGE_MIN_DELAY),
+                )
+                tasks.add(
+                    asyncio.ensure_future(
+                        _timed_get(_api_hedge_client, window, url, **kwargs)
+                    )
+                )
+        first_error: Optional[BaseException] = None
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                first_error = first_error or task.exception()
+        raise first_error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # mark retrieved: a losing error is not news
+
+# ---------------------------------------------------------------------------
+# Per-call deadline — stop working once the host has stopped waiting
+# ---------------------------------------------------------------------------
+# The split client timeout (5 s connect, 60 s read) plus one retry lets a single
+# tool call run past two minutes, while the MCP SDKs abandon a request after
+# 60 s by default. Everything done past that point is work nobody reads — and
+# upstream load during exactly the kind of slowdown that caused it.
+#
+# So each tool call carries a monotonic deadline in `_call_deadline`, set by
+# `_DeadlineMiddleware` further down. `_api_get` and `_api_stream_get` clamp
+# every phase timeout to the time left, a retry whose backoff would not leave
+# room for the retry itself is skipped, and the middleware cancels the call
+# outright once the deadline passes — which also bounds every other await in
+# the call (token re-swap, store reads).
+#
+# The budget is MCP_TOOL_DEADLINE seconds (default 55: the SDK default minus
+# headroom for our answer to make it back). MCP_TOOL_DEADLINE_BY_HOST overrides
+# it per clientInfo name ("claude-ai=110,cursor=55"), and a client that states
+# its own timeout in the request's `_meta.timeoutMs` gets the smaller of the
+# two. MCP_TOOL_DEADLINE=0 switches deadlines off.
+_DEADLINE_DEFAULT = float(os.environ.get("MCP_TOOL_DEADLINE", "55"))
+# A retry needs at least this much budget left after its backoff to be worth
+# sending; below it the second request would be cut off mid-flight anyway.
+_DEADLINE_RETRY_FLOOR = 1.0
+
+
+def _parse_host_deadlines(raw: str) -> dict[str, float]:
+    """`"claude-ai=110, cursor=55"` -> {"claude-ai": 110.0, "cursor": 55.0}.
+
+    Malformed entries are logged and skipped rather than failing the boot — a
+    typo here should cost one host its override, not the whole service.
+    """
+    out: dict[str, float] = {}
+    for item in raw.split(","):
+        if not item.strip():
+            continue
+        name, _, value = item.partition("=")
+        try:
+            out[name.strip().lower()] = float(value)
+        except ValueError:
+            logger.warning("ignoring malformed MCP_TOOL_DEADLINE_BY_HOST entry %r", item)
+    return out
+
+
+_DEADLINE_BY_HOST = _parse_host_deadlines(os.environ.get("MCP_TOOL_DEADLINE_BY_HOST", ""))
+
+_call_deadline: ContextVar[Optional[float]] = ContextVar("_call_deadline", default=None)
+
+
+def _deadline_remaining() -> Optional[float]:
+    """Seconds left in this tool call's budget, or None when no deadline is set."""
+    deadline = _call_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def _deadline_allows(wait: float) -> bool:
+    """True unless waiting `wait` seconds would leave no room for one more request."""
+    remaining = _deadline_remaining()
+    return remaining is None or remaining - wait >= _DEADLINE_RETRY_FLOOR
+
+
+def _deadline_exceeded() -> "UpstreamHTTPError":
+    return UpstreamHTTPError(
+        "The tool call ran out of time before the FinancialReports API answered. "
+        "Retry, or narrow the request (a smaller page_size or fewer fiscal years).",
+        error_kind="deadline_exceeded",
+    )
+
+
+def _clamp_to_deadline(kwargs: dict[str, Any], base: httpx.Timeout) -> dict[str, Any]:
+    """Request kwargs with every timeout phase capped at the budget left.
+
+    Raises the deadline error outright when nothing is left, so an exhausted
+    call never puts another request on the wire.
+    """
+    remaining = _deadline_remaining()
+    if remaining is None:
+        return kwargs
+    if remaining <= 0:
+        raise _deadline_exceeded()
+    return {
+        **kwargs,
+        "timeout": httpx.Timeout(
+            connect=min(base.connect, remaining),
+            read=min(base.read, remaining),
+            write=min(base.write, remaining),
+            pool=min(base.pool, remaining),
+        ),
+    }
+
+
 # ---------------------------------------------------------------------------
 # Retrying transient upstream failures — GET only
 # ---------------------------------------------------------------------------
@@ -1599,6 +2098,70 @@ _RETRY_JITTER = 0.25
 # clamping would guarantee a second request the upstream has already refused.
 _RETRY_AFTER_MAX = 2.0
 
+# Retry budget. An unconditional retry doubles the request volume during an
+# upstream brown-out — exactly when the upstream can least take it. Retries are
+# instead bounded per endpoint family (see `_endpoint_family`) by a token
+# bucket: every first attempt earns _RETRY_BUDGET_RATIO tokens and every retry
+# spends one, so over any window retries stay at or below that fraction of the
+# family's traffic (10 % by default). The bucket starts full at
+# _RETRY_BUDGET_BURST, so an isolated blip on a quiet replica still gets its
+# retry; a sustained brown-out drains it within a few calls. A denied retry
+# fails fast with the same response — and so the same hint text — the caller
+# would have seen had the retry failed too. Counters go out on /health.
+_RETRY_BUDGET_RATIO = float(os.environ.get("MCP_RETRY_BUDGET", "0.1"))
+_RETRY_BUDGET_BURST = float(os.environ.get("MCP_RETRY_BUDGET_BURST", "10"))
+
+
+class _RetryBudget(_RatioBudget):
+    """One endpoint family's retry bucket, plus its attempt/retry counters."""
+
+    def __init__(self, family: str) -> None:
+        super().__init__(_RETRY_BUDGET_RATIO, _RETRY_BUDGET_BURST, initial=_RETRY_BUDGET_BURST)
+        self.family = family
+        self.attempts = 0
+        self.retries = 0
+        self.denied = 0
+
+    def first_attempt(self) -> None:
+        self.attempts += 1
+        self.earn()
+
+    def allow_retry(self, reason: str) -> bool:
+        if not self.spend():
+            self.denied += 1
+            logger.warning(
+                "retry budget for %s exhausted, failing fast on %s", self.family, reason
+            )
+            return False
+        self.attempts += 1
+        self.retries += 1
+        return True
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "retries_denied": self.denied,
+            "tokens": round(self._tokens, 2),
+        }
+
+
+# Keyed by `_endpoint_family`, so at most one bucket per spec path (+ "other").
+_retry_budgets: dict[str, _RetryBudget] = {}
+
+
+def _retry_budget(url: str) -> _RetryBudget:
+    family = _endpoint_family(url)
+    budget = _retry_budgets.get(family)
+    if budget is None:
+        budget = _retry_budgets[family] = _RetryBudget(family)
+    return budget
+
+
+def _retry_budget_stats() -> dict[str, dict[str, Any]]:
+    """Per-family retry counters for /health."""
+    return {family: _retry_budgets[family].stats() for family in sorted(_retry_budgets)}
+
 
 async def _retry_sleep(seconds: float) -> None:
     """Backoff sleep. A seam so tests can neutralise it without real delays."""
@@ -1630,38 +2193,129 @@ def _retry_delay(status: int, body_text: str, retry_after: str) -> Optional[floa
     return _RETRY_BACKOFF + random.uniform(0.0, _RETRY_JITTER)
 
 
-async def _api_get(url: str, **kwargs: Any) -> httpx.Response:
+# ---------------------------------------------------------------------------
+# Negative cache — upstream 404s on id lookups
+# ---------------------------------------------------------------------------
+# Models retry a hallucinated or stale id: the same `filings_retrieve(id=…)`
+# three or four times in one conversation, each a full upstream round trip for
+# the same 404. A 404 on a filing or company id lookup is remembered for
+# _NOT_FOUND_TTL seconds and replayed as a synthesized response carrying the
+# original status, headers and body, so every caller — `_raise_upstream_error`,
+# `_upstream_error_text`, `_format_response` — produces exactly the text it
+# would have. Existence is not personalized, so entries are shared across
+# users; they are per replica, because a Redis round trip would cost about
+# what it saves. Keyed by path alone: the id is in the path, and the query
+# parameters these endpoints take do not change whether the id exists.
+_NOT_FOUND_TTL = float(os.environ.get("MCP_NOT_FOUND_CACHE_TTL", "60"))
+_NOT_FOUND_MAX_ENTRIES = 2048
+_NOT_FOUND_PATH_RE = re.compile(r"^/(?:filings|companies)/\\d+/(?:markdown/)?$")
+# Replay needs the request id and content type, not the hop-by-hop framing
+# httpx recomputes for the synthesized body.
+_NOT_FOUND_DROP_HEADERS = frozenset({"content-length", "content-encoding", "transfer-encoding"})
+_not_found: dict[str, tuple[float, bytes, list[tuple[str, str]]]] = {}
+_not_found_hits = 0
+
+
+def _not_found_replay(url: str) -> Optional[httpx.Response]:
+    """A fresh copy of the remembered 404 for `url`, or None."""
+    global _not_found_hits
+    entry = _not_found.get(url)
+    if entry is None:
+        return None
+    expires, body, headers = entry
+    if expires <= time.monotonic():
+        del _not_found[url]
+        return None
+    _not_found_hits += 1
+    return httpx.Response(
+        404, headers=headers, content=body, request=httpx.Request("GET", API_BASE_URL + url)
+    )
+
+
+def _remember_not_found(url: str, response: httpx.Response, body: bytes) -> None:
+    if response.status_code != 404 or _NOT_FOUND_TTL <= 0 or not _NOT_FOUND_PATH_RE.match(url):
+        return
+    if url not in _not_found and len(_not_found) >= _NOT_FOUND_MAX_ENTRIES:
+        _not_found.clear()  # cheap bound; a 404 storm repopulates what matters
+    headers = [
+        (name, value)
+        for name, value in response.headers.items()
+        if name.lower() not in _NOT_FOUND_DROP_HEADERS
+    ]
+    _not_found[url] = (time.monotonic() + _NOT_FOUND_TTL, body[:4096], headers)
+
+
+def _not_found_stats() -> dict[str, int]:
+    """Negative-cache counters for /health."""
+    return {"entries": len(_not_found), "hits": _not_found_hits}
+
+
+async def _api_get(url: str, lane: str = "interactive", **kwargs: Any) -> httpx.Response:
+    """GET the upstream — or replay a remembered 404 or quota 429 locally."""
+    replay = _not_found_replay(url) or await _quota_replay(url)
+    if replay is not None:
+        return replay
+    response = await _api_get_with_retry(url, lane, **kwargs)
+    if response.status_code == 404:
+        _remember_not_found(url, response, response.content)
+    await _note_quota_state(response)
+    return response
+
+
+async def _api_get_with_retry(url: str, lane: str = "interactive", **kwargs: Any) -> httpx.Response:
     """GET the upstream, retrying once on a transient failure.
 
     Retries by re-calling `.get()`, never by re-sending the same Request object.
     That matters: `_inject_auth` is a per-Request event hook, so a fresh Request
     re-runs the fail-closed credential guard with the current `_current_token`.
     Re-sending a built Request would skip the hook entirely.
+
+    Each attempt goes through `_hedged_get`, a plain `.get()` on the lane's
+    client unless hedging is switched on. The retry is drawn from the endpoint
+    family's `_RetryBudget`; when that is spent the failure surfaces as is.
     """
-    try:
-        response = await _api_client.get(url, **kwargs)
-    except (httpx.TimeoutException, httpx.NetworkError) as exc:
+    base = _LANE_CLIENTS[lane].timeout
+    budget = _retry_budget(url)
+    async with _lane_slot(lane):
+        budget.first_attempt()
+        try:
+            response = await _hedged_get(url, lane, **_clamp_to_deadline(kwargs, base))
+        except (httpx.TimeoutException, httpx.NetworkError) as exc:
+            delay = _RETRY_BACKOFF + random.uniform(0.0, _RETRY_JITTER)
+            if not _deadline_allows(delay):
+                raise _deadline_exceeded() from exc
+            if not budget.allow_retry(exc.__class__.__name__):
+                raise
+            logger.warning(
+                "upstream GET transport error, retrying once: %s",
+                exc.__class__.__name__,
+            )
+            await _retry_sleep(delay)
+            return await _hedged_get(url, lane, **_clamp_to_deadline(kwargs, base))
+
+        # Only a 429 body is read for the retry decision; decoding every
+        # successful body to text here was pure overhead.
+        body_text = response.text if response.status_code == 429 else ""
+        delay = _retry_delay(response.status_code, body_text, _retry_after_seconds(response))
+        if (
+            delay is None
+            or not _deadline_allows(delay)
+            or not budget.allow_retry(str(response.status_code))
+        ):
+            return response
         logger.warning(
-            "upstream GET transport error, retrying once: %s",
-            exc.__class__.__name__,
+            "upstream GET returned %s, retrying once after %.2fs",
+            response.status_code,
+            delay,
         )
-        await _retry_sleep(_RETRY_BACKOFF + random.uniform(0.0, _RETRY_JITTER))
-        return await _api_client.get(url, **kwargs)
-
-    delay = _retry_delay(response.status_code, response.text, _retry_after_seconds(response))
-    if delay is None:
-        return response
-    logger.warning(
-        "upstream GET returned %s, retrying once after %.2fs",
-        response.status_code,
-        delay,
-    )
-    await _retry_sleep(delay)
-    return await _api_client.get(url, **kwargs)
+        await _retry_sleep(delay)
+        return await _hedged_get(url, lane, **_clamp_to_deadline(kwargs, base))
 
 
 @asynccontextmanager
-async def _api_stream_get(url: str, **kwargs: Any) -> AsyncIterator[httpx.Response]:
+async def _api_stream_get(
+    url: str, lane: str = "bulk", **kwargs: Any
+) -> AsyncIterator[httpx.Response]:
     """Streaming GET, retrying once on a transient failure.
 
     The retry decision is made on the status line, before any body byte is
@@ -1673,38 +2327,73 @@ async def _api_stream_get(url: str, **kwargs: Any) -> AsyncIterator[httpx.Respon
 
     Classifying a 429 needs the body, so it is read here. httpx caches after
     `aread()`, so the caller's own `aread()` still works.
+
+    Streams on the bulk lane by default and holds its slot until the caller
+    leaves the block, i.e. for the whole body. Retries share the endpoint
+    family's `_RetryBudget` with `_api_get`.
     """
-    delay: Optional[float] = None
-    handed_off = False
-    try:
-        async with _api_client.stream("GET", url, **kwargs) as response:
-            body_text = ""
-            if response.status_code == 429:
-                body_text = (await response.aread()).decode("utf-8", errors="replace")
-            delay = _retry_delay(
-                response.status_code, body_text, _retry_after_seconds(response)
-            )
-            if delay is None:
-                handed_off = True
-                yield response
-                return
+    replay = _not_found_replay(url) or await _quota_replay(url)
+    if replay is not None:
+        yield replay
+        return
+    client = _LANE_CLIENTS[lane]
+    budget = _retry_budget(url)
+    async with _lane_slot(lane):
+        budget.first_attempt()
+        delay: Optional[float] = None
+        handed_off = False
+        try:
+            async with client.stream(
+                "GET", url, **_clamp_to_deadline(kwargs, client.timeout)
+            ) as response:
+                body_text = ""
+                if response.status_code == 429:
+                    body_text = (await response.aread()).decode("utf-8", errors="replace")
+                elif response.status_code == 404:
+                    # A 404 body is a short error document; read it so the next
+                    # lookup of this id can be answered locally.
+                    _remember_not_found(url, response, await response.aread())
+                await _note_quota_state(response)
+                delay = _retry_delay(
+                    response.status_code, body_text, _retry_after_seconds(response)
+                )
+                if (
+                    delay is None
+                    or not _deadline_allows(delay)
+                    or not budget.allow_retry(str(response.status_code))
+                ):
+                    handed_off = True
+                    yield response
+                    return
+                logger.warning(
+                    "upstream stream returned %s, retrying once after %.2fs",
+                    response.status_code,
+                    delay,
+                )
+        except (httpx.TimeoutException, httpx.NetworkError) as exc:
+            if handed_off:
+                raise
+            delay = _RETRY_BACKOFF + random.uniform(0.0, _RETRY_JITTER)
+            if not _deadline_allows(delay):
+                raise _deadline_exceeded() from exc
+            if not budget.allow_retry(exc.__class__.__name__):
+                raise
             logger.warning(
-                "upstream stream returned %s, retrying once after %.2fs",
-                response.status_code,
-                delay,
+                "upstream stream transport error, retrying once: %s",
+                exc.__class__.__name__,
             )
-    except (httpx.TimeoutException, httpx.NetworkError) as exc:
-        if handed_off:
-            raise
-        logger.warning(
-            "upstream stream transport error, retrying once: %s",
-            exc.__class__.__name__,
-        )
-        delay = _RETRY_BACKOFF + random.uniform(0.0, _RETRY_JITTER)
 
-    await _retry_sleep(delay)
-    async with _api_client.stream("GET", url, **kwargs) as response:
-        yield response
+        await _retry_sleep(delay)
+        async with client.stream(
+            "GET", url, **_clamp_to_deadline(kwargs, client.timeout)
+        ) as response:
+            # Same as the first attempt: `_note_quota_state` reads a 429's text.
+            if response.status_code == 429:
+                await response.aread()
+            elif response.status_code == 404:
+                _remember_not_found(url, response, await response.aread())
+            await _note_quota_state(response)
+            yield response
 
 
 def _auth_error(msg: str) -> str:
@@ -1786,9 +2475,11 @@ def subscription_required(
         # active in production.
         if DEV_MODE_API_KEY:
             token_reset = _current_token.set(DEV_MODE_API_KEY)
+            sub_reset = _current_sub.set("dev")
             try:
                 return await func(*args, **kwargs)
             finally:
+                _current_sub.reset(sub_reset)
                 _current_token.reset(token_reset)
 
         try:
@@ -1860,9 +2551,11 @@ def subscription_required(
                 return _auth_error("Invalid audience.")
 
         token_reset = _current_token.set(raw_token)
+        sub_reset = _current_sub.set(sub)
         try:
             return await func(*args, **kwargs)
         finally:
+            _current_sub.reset(sub_reset)
             _current_token.reset(token_reset)
 
     return wrapper
@@ -1909,6 +2602,7 @@ class UpstreamHTTPError(RuntimeError):
         #   "burst_limit"           — 429, too many requests per minute
         #   "rate_limited"          — 429 we could not classify (retry advice)
         #   "transient"             — HTTP 5xx
+        #   "deadline_exceeded"     — the per-call time budget ran out first
         #   "unknown"               — anything else
         self.error_kind = error_kind
 
@@ -2195,7 +2889,7 @@ async def _authorize_or_raise() -> tuple[Any, ...]:
     # active in production.
     if DEV_MODE_API_KEY:
         token_reset = _current_token.set(DEV_MODE_API_KEY)
-        return (token_reset,)
+        return (token_reset, _current_sub.set("dev"))
 
     try:
         access_token = get_access_token()
@@ -2249,12 +2943,51 @@ async def _authorize_or_raise() -> tuple[Any, ...]:
             raise AuthenticationError("Invalid audience.")
 
     token_reset = _current_token.set(raw_token)
-    return (token_reset,)
+    return (token_reset, _current_sub.set(sub))
 
 
 def _release_auth_context(resets: tuple[Any, ...]) -> None:
-    for reset in resets:
-        _current_token.reset(reset)
+    for reset in reversed(resets):
+        reset.var.reset(reset)
+
+
+# ---------------------------------------------------------------------------
+# JSON pipeline — bytes in, one serialization out
+# ---------------------------------------------------------------------------
+# Tool responses are parsed straight from the buffered body bytes (no
+# `response.text` decode), scrubbed in place, and serialized once. orjson does
+# both several times faster than the stdlib and is used when installed; it is
+# optional because the stdlib path yields an equivalent document. Anything
+# orjson refuses — an integer past 64 bits — falls back to the stdlib rather
+# than failing the call. `scripts/bench_json_pipeline.py` measures both.
+def _json_loads(body: bytes | str) -> Any:
+    """Parse an upstream JSON body. Raises ValueError on malformed input."""
+    if _orjson is not None:
+        try:
+            return _orjson.loads(body)
+        except _orjson.JSONDecodeError:
+            pass
+    return _json.loads(body)
+
+
+def _json_dumps_pretty(obj: Any) -> str:
+    """Two-space indented JSON, non-ASCII kept as is — the text tools' format."""
+    if _orjson is not None:
+        try:
+            return _orjson.dumps(obj, option=_orjson.OPT_INDENT_2).decode()
+        except TypeError:
+            pass
+    return _json.dumps(obj, indent=2, ensure_ascii=False)
+
+
+def _json_size(obj: Any) -> int:
+    """Compact UTF-8 encoded size of `obj`, in bytes."""
+    if _orjson is not None:
+        try:
+            return len(_orjson.dumps(obj, default=str))
+        except TypeError:
+            pass
+    return len(_json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str).encode())
 
 
 # Fields removed from every tool response before it reaches the client.
@@ -2266,6 +2999,16 @@ def _release_auth_context(resets: tuple[Any, ...]) -> None:
 _CLIENT_HIDDEN_FIELDS = __CLIENT_HIDDEN_FIELDS_REPR__
 
 
+def _scrub_object(obj: dict) -> None:
+    """`_scrub_response` for one object, without descending into its values."""
+    _ext = obj.get("extraction")
+    if isinstance(_ext, dict):
+        _ext.pop("model", None)
+        _ext.pop("prompt_version", None)
+    for _hidden in _CLIENT_HIDDEN_FIELDS:
+        obj.pop(_hidden, None)
+
+
 def _scrub_response(obj):
     """Strip data that must not reach the client from any tool response.
 
@@ -2284,12 +3027,7 @@ def _scrub_response(obj):
     Recursive, mutates in place, returns obj; a no-op when neither shape is
     present (e.g. reference-data tools)."""
     if isinstance(obj, dict):
-        _ext = obj.get("extraction")
-        if isinstance(_ext, dict):
-            _ext.pop("model", None)
-            _ext.pop("prompt_version", None)
-        for _hidden in _CLIENT_HIDDEN_FIELDS:
-            obj.pop(_hidden, None)
+        _scrub_object(obj)
         for _v in obj.values():
             _scrub_response(_v)
     elif isinstance(obj, list):
@@ -2298,15 +3036,69 @@ def _scrub_response(obj):
     return obj
 
 
-def _format_response(response: httpx.Response) -> str:
+# Per-tool scrub plans, compiled by the generator from each operation's
+# response schema. `_scrub_response` visits every dict and list in a response,
+# scalars included; a plan visits only the objects the schema says are there
+# and skips every scalar field. Each object visited gets `_scrub_object` — the
+# hidden keys and `extraction` provenance are dropped from *every* object, not
+# only where the schema declares them, because the schema undersells the
+# payload (`filings_list` rows carry `markdown_url` though FilingSummary does
+# not list it, and `view=full` returns whole Filings).
+#
+# A plan node is one object: `keys` maps the fields that can hold objects to
+# their nodes, `each` is the node for every value of a map, and `walk` runs the
+# full `_scrub_response` below a point the schema leaves untyped. Lists are
+# transparent: a node applies to each item. A tool without a plan (POST tools,
+# responses with no JSON schema) gets the full walk.
+_SCRUB_PLANS: dict[str, dict[str, Any]] = {}
+
+
+def _run_scrub_plan(value: Any, plan: dict[str, Any]) -> None:
+    if isinstance(value, list):
+        for item in value:
+            _run_scrub_plan(item, plan)
+        return
+    if not isinstance(value, dict):
+        return
+    if plan.get("walk"):
+        _scrub_response(value)
+        return
+    _scrub_object(value)
+    for key, sub in plan.get("keys", {}).items():
+        child = value.get(key)
+        if child is not None:
+            _run_scrub_plan(child, sub)
+    each = plan.get("each")
+    if each is not None:
+        for child in value.values():
+            _run_scrub_plan(child, each)
+
+
+def _scrub_for(tool: str, data: Any) -> Any:
+    """Scrub a response of `tool` with its compiled plan, or the full walk."""
+    plan = _SCRUB_PLANS.get(tool)
+    if plan is None:
+        return _scrub_response(data)
+    _run_scrub_plan(data, plan)
+    return data
+
+
+def _format_response(
+    response: httpx.Response,
+    fields: Optional[dict[str, Any]] = None,
+    on_results: bool = False,
+    tool: str = "",
+) -> str:
     """Format an httpx.Response as a JSON code block for the LLM.
 
     Sync — no I/O happens here, the response body is already buffered by httpx.
+    `fields` / `on_results` are a `_parse_fields` projection and where it applies;
+    `tool` picks the compiled scrub plan.
     """
     try:
         response.raise_for_status()
-        data = _scrub_response(response.json())
-        return f"```json\\n{_json.dumps(data, indent=2, ensure_ascii=False)}\\n```"
+        data = _apply_fields(_scrub_for(tool, _json_loads(response.content)), fields, on_results)
+        return f"```json\\n{_json_dumps_pretty(data)}\\n```"
     except httpx.HTTPStatusError as exc:
         # Text tools are ~9 of 15 and used to return the raw upstream body here,
         # unsanitized — both a leak risk and the reason they never got the
@@ -2319,43 +3111,565 @@ def _format_response(response: httpx.Response) -> str:
 
 
 # ---------------------------------------------------------------------------
-# Tool-input validation
+# Compact table rendering — opt-in `output_format="table"` on text list tools
 # ---------------------------------------------------------------------------
-class ToolInputError(ValueError):
-    """Raised when a tool argument fails server-side validation.
-
-    Caught at tool boundaries and turned into a user-visible error string
-    rather than letting the request reach the upstream API with an unsafe
-    or malformed value.
-    """
+# A DRF page rendered as indented JSON repeats every key on every row and
+# spends most of its bytes on whitespace. With `output_format="table"` a text
+# list tool renders `results` as one pipe table: the header once, one line per
+# row, nested objects flattened to the columns the generator chose from the
+# response schema (their id / code / name), arrays of scalars joined in one
+# cell. Pagination collapses to a single line above it. Anything that is not a
+# `results` page — an error, an unexpected shape — renders as before.
+def _table_page_number(url: Any, default: str) -> str:
+    if not url:
+        return "none"
+    return httpx.URL(url).params.get("page") or default
+
+
+def _table_cell(row: Any, column: str) -> str:
+    value = row
+    for part in column.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, list) and not any(isinstance(v, (dict, list)) for v in value):
+        value = ", ".join("" if v is None else str(v) for v in value)
+    elif isinstance(value, (dict, list)):
+        value = _json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+    return str(value).replace("|", "\\\\|").replace("\\r", " ").replace("\\n", " ")
 
 
-# Regulator-compliant ISIN: 2 country letters + 9 alphanumerics + 1 check digit.
-_ISIN_RE = re.compile(r"^[A-Z]{2}[A-Z0-9]{9}[0-9]$")
-# Loose UUID match (any case, dash-separated). The FR backend accepts the
-# canonical form; we just want to refuse path traversal payloads here.
-_UUID_RE = re.compile(
-    r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
-)
-# Generic safety net for any string-typed path param the generator emits.
-# 128-char cap and a printable-ASCII allowlist that excludes "/", ".." path
-# components, query/fragment chars, and whitespace. Tools that need richer
-# inputs (e.g. UUIDs, ISINs) should be name-routed through the stricter
-# validators above.
-_GENERIC_PATH_RE = re.compile(r"^[A-Za-z0-9_.~:@!*'()+,;=$&%-]{1,128}$")
+def _format_table(response: httpx.Response, columns: tuple[str, ...], tool: str = "") -> str:
+    """Render a DRF page as a pagination line plus a pipe table."""
+    if not response.is_success:
+        return _format_response(response)
+    try:
+        data = _scrub_for(tool, _json_loads(response.content))
+    except ValueError:
+        return _format_response(response)
+    rows = data.get("results") if isinstance(data, dict) else None
+    if not isinstance(rows, list):
+        return _format_response(response)
+    lines = [
+        f"count={data.get('count')} rows={len(rows)} "
+        f"next_page={_table_page_number(data.get('next'), 'none')} "
+        f"previous_page={_table_page_number(data.get('previous'), '1')}",
+        "| " + " | ".join(columns) + " |",
+        "|" + "---|" * len(columns),
+    ]
+    lines.extend("| " + " | ".join(_table_cell(row, c) for c in columns) + " |" for row in rows)
+    return "\\n".join(lines)
 
 
-def _validate_path_param(name: str, value: Any) -> str:
-    """Coerce + validate a path-param value before URL interpolation.
+# ---------------------------------------------------------------------------
+# Auto-pagination — opt-in `max_items` on paginated structured list tools
+# ---------------------------------------------------------------------------
+# Gathering "all filings since X" used to cost one model turn per DRF page.
+# With `max_items` set, the tool reads `count` from the first page, fetches the
+# pages it still needs concurrently (at most _AUTO_PAGINATE_CONCURRENCY in
+# flight, each an ordinary `_api_get` with its retry budget and deadline) and
+# returns them merged in page order as one DRF-shaped page.
+#
+# Pages fetched concurrently from a live list can overlap when rows are
+# inserted mid-walk, so rows are de-duplicated by `id`. The merge stops at
+# `max_items` rows or _AUTO_PAGINATE_MAX_BYTES of serialized rows, whichever
+# comes first, and at the first page that failed; `next` then points at the
+# page holding the first row left out, so the model can resume with `page=`.
+_AUTO_PAGINATE_MAX_ITEMS = int(os.environ.get("MCP_AUTO_PAGINATE_MAX_ITEMS", "500"))
+_AUTO_PAGINATE_CONCURRENCY = max(1, int(os.environ.get("MCP_AUTO_PAGINATE_CONCURRENCY", "4")))
+_AUTO_PAGINATE_MAX_BYTES = int(os.environ.get("MCP_AUTO_PAGINATE_MAX_BYTES", "200000"))
+# page_size asked for when the caller leaves it unset — fewer, larger pages.
+# The upstream may clamp it; the first page's actual length is what counts.
+_AUTO_PAGINATE_PAGE_SIZE = 100
+
+
+def _row_key(row: Any) -> Any:
+    if isinstance(row, dict) and row.get("id") is not None:
+        return row["id"]
+    return _json.dumps(row, sort_keys=True, default=str)
+
+
+async def _auto_paginate(
+    fetch: Callable[[dict[str, Any]], Awaitable[dict[str, Any]]],
+    url: str,
+    params: dict[str, Any],
+    max_items: int,
+) -> dict[str, Any]:
+    """Fetch and merge pages until `max_items` rows; `fetch` GETs one page.
 
-    The generated tool wrappers build URLs as `template.format(**path_params)`.
-    Without validation, a string-typed parameter such as `code="../admin"`
-    silently rewrites the request path with the user's bearer attached.
+    The first page is fetched on its own — its errors surface exactly as a
+    plain call's would. Later pages that fail end the merge instead.
+    """
+    want = max(1, min(max_items, _AUTO_PAGINATE_MAX_ITEMS))
+    params = dict(params)
+    params.setdefault("page_size", min(want, _AUTO_PAGINATE_PAGE_SIZE))
+    start = int(params.get("page") or 1)
+
+    first = await fetch(params)
+    per_page = len(first.get("results") or [])
+    last = start
+    if per_page and first.get("next"):
+        available = max(0, int(first.get("count") or 0) - (start - 1) * per_page)
+        last = start + -(-min(want, available) // per_page) - 1
+
+    semaphore = asyncio.Semaphore(_AUTO_PAGINATE_CONCURRENCY)
+
+    async def _page(number: int) -> dict[str, Any]:
+        async with semaphore:
+            return await fetch({**params, "page": number})
+
+    rest = await asyncio.gather(
+        *(_page(n) for n in range(start + 1, last + 1)), return_exceptions=True
+    )
 
-    Pattern-routed by the *parameter name* the OpenAPI schema declared:
-      - `*_uuid`           → must be a canonical UUID
-      - `code`, `*_code`   → must be a valid ISIN
-      - everything else    → must match the generic-path allowlist
+    merged: list[Any] = []
+    seen: set[Any] = set()
+    size = 0
+    resume: Optional[int] = None
+    for number, page in enumerate([first, *rest], start):
+        if isinstance(page, BaseException):
+            logger.warning(
+                "auto-pagination stopped at page %d: %s", number, page.__class__.__name__
+            )
+            resume = number
+            break
+        for row in page.get("results") or []:
+            key = _row_key(row)
+            if key in seen:
+                continue
+            row_bytes = _json_size(row)
+            if len(merged) >= want or (merged and size + row_bytes > _AUTO_PAGINATE_MAX_BYTES):
+                resume = number
+                break
+            seen.add(key)
+            merged.append(row)
+            size += row_bytes
+        if resume is not None:
+            break
+    else:
+        if page.get("next"):
+            resume = last + 1
+
+    next_url = None
+    if resume is not None:
+        next_url = str(httpx.URL(API_BASE_URL + url, params={**params, "page": resume}))
+    return {
+        "count": first.get("count"),
+        "next": next_url,
+        "previous": first.get("previous"),
+        "results": merged,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Batch retrieves — the generated `*_retrieve_many` tools
+# ---------------------------------------------------------------------------
+# A peer comparison used to mean one `companies_financials_retrieve` per
+# company: an MCP round trip and an auth pass each. The `_many` companions take
+# a list of ids, authorize once for the whole batch, and fan the GETs out
+# concurrently — at most _BATCH_CONCURRENCY in flight, each an ordinary
+# `_api_get` sharing the caller's token, deadline and retry budget.
+#
+# One bad id must not sink the batch: a failed id comes back inline as
+# {"id", "error", "error_kind"} in its input position, with the same message
+# the single-id tool would have raised. Repeated ids are fetched once.
+_BATCH_MAX_IDS = 50
+_BATCH_CONCURRENCY = max(1, int(os.environ.get("MCP_BATCH_CONCURRENCY", "8")))
+
+
+async def _retrieve_many(
+    func_name: str,
+    path: str,
+    id_param: str,
+    ids: list[int],
+    params: dict[str, Any],
+    fields: Optional[dict[str, Any]] = None,
+) -> dict[str, Any]:
+    """GET `path` once per distinct id; results in input order, errors inline."""
+    if not ids:
+        raise ToolInputError("ids must list at least one id.")
+    if len(ids) > _BATCH_MAX_IDS:
+        raise ToolInputError(
+            f"ids lists {len(ids)} ids; at most {_BATCH_MAX_IDS} per call — split the batch."
+        )
+    urls = {i: path.format(**{id_param: _validate_path_param(id_param, i)}) for i in ids}
+    semaphore = asyncio.Semaphore(_BATCH_CONCURRENCY)
+
+    async def _one(item_id: int) -> dict[str, Any]:
+        async with semaphore:
+            try:
+                response = await _api_get(urls[item_id], lane="interactive", params=params)
+                if response.status_code != 200:
+                    _raise_upstream_error(func_name, response)
+                data = _scrub_for(func_name, _json_loads(response.content))
+                return {"id": item_id, "data": _project(data, fields)}
+            except httpx.HTTPError as exc:
+                # Type only — httpx messages can embed the request URL (see the
+                # structured template).
+                logger.warning(
+                    "upstream %s transport error: %s", func_name, exc.__class__.__name__
+                )
+                return {
+                    "id": item_id,
+                    "error": f"upstream {func_name} request failed "
+                    f"({exc.__class__.__name__}). The FinancialReports API was "
+                    "unreachable or timed out (already retried once).",
+                    "error_kind": "unknown",
+                }
+            except UpstreamHTTPError as exc:
+                return {"id": item_id, "error": str(exc), "error_kind": exc.error_kind}
+            except ValueError:
+                return {
+                    "id": item_id,
+                    "error": f"upstream {func_name} returned non-JSON body",
+                    "error_kind": "unknown",
+                }
+
+    distinct = list(dict.fromkeys(ids))
+    fetched = dict(zip(distinct, await asyncio.gather(*(_one(i) for i in distinct))))
+    return {"results": [fetched[i] for i in ids]}
+
+
+# ---------------------------------------------------------------------------
+# Shared per-user state — a local tier in front of the connector's Redis
+# ---------------------------------------------------------------------------
+# Small pieces of per-user state (feed cursors) must survive the next call
+# landing on a different replica, so they live in the Redis the OAuth proxy
+# already runs, under their own `mcp-<prefix>::` keys. A bounded in-process
+# dict sits in front of it: repeat reads on this replica skip the round trip,
+# and it is the whole store when MCP_REDIS_URL is unset (dev, tests).
+#
+# Redis must never cost a tool call its answer. Every round trip is bounded by
+# _SHARED_STATE_TIMEOUT — a `try/except` does not catch a HANG — and a failed
+# or slow one degrades to the local tier, as the analytics clientInfo lookup
+# does. Values carry their absolute expiry, so a copy pulled into another
+# replica's local tier expires when the original does.
+_SHARED_STATE_TIMEOUT = 0.25
+_SHARED_STATE_LOCAL_MAX = 4096
+
+
+class _SharedTTLStore:
+    """JSON values with a TTL: a local dict, backed by Redis when configured."""
+
+    def __init__(self, prefix: str, ttl: float, local_max: int = _SHARED_STATE_LOCAL_MAX) -> None:
+        self.prefix = prefix
+        self.ttl = ttl
+        self._local_max = local_max
+        self._local: dict[str, tuple[float, Any]] = {}
+
+    def _redis_key(self, key: str) -> str:
+        return f"mcp-{self.prefix}::{key}"
+
+    @staticmethod
+    def _redis() -> Any:
+        # Only bound when MCP_REDIS_URL is set; read per call so it is never
+        # captured before the client exists.
+        return globals().get("_redis_client")
+
+    def _remember(self, key: str, expires: float, value: Any) -> None:
+        if key not in self._local and len(self._local) >= self._local_max:
+            now = time.time()
+            for stale in [k for k, (exp, _) in self._local.items() if exp <= now]:
+                del self._local[stale]
+            if len(self._local) >= self._local_max:
+                self._local.clear()  # cheap bound; Redis still holds the entries
+        self._local[key] = (expires, value)
+
+    async def get(self, key: str) -> Any:
+        now = time.time()
+        hit = self._local.get(key)
+        if hit is not None:
+            if hit[0] > now:
+                return hit[1]
+            del self._local[key]
+        client = self._redis()
+        if client is None:
+            return None
+        try:
+            raw = await asyncio.wait_for(
+                client.get(self._redis_key(key)), timeout=_SHARED_STATE_TIMEOUT
+            )
+            if not raw:
+                return None
+            envelope = _json.loads(raw)
+            expires, value = float(envelope["exp"]), envelope["v"]
+        except Exception:
+            logger.debug("shared state read skipped prefix=%s", self.prefix, exc_info=True)
+            return None
+        if expires <= now:
+            return None
+        self._remember(key, expires, value)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.time() + ttl
+        self._remember(key, expires, value)
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            await asyncio.wait_for(
+                client.set(
+                    self._redis_key(key),
+                    _json.dumps({"v": value, "exp": expires}, separators=(",", ":")),
+                    ex=max(1, int(ttl) + 1),
+                ),
+                timeout=_SHARED_STATE_TIMEOUT,
+            )
+        except Exception:
+            logger.warning(
+                "shared state write failed prefix=%s — held on this replica only",
+                self.prefix,
+            )
+
+    async def delete(self, key: str) -> None:
+        self._local.pop(key, None)
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            await asyncio.wait_for(
+                client.delete(self._redis_key(key)), timeout=_SHARED_STATE_TIMEOUT
+            )
+        except Exception:
+            logger.debug("shared state delete skipped prefix=%s", self.prefix, exc_info=True)
+
+    def held_locally(self, key: str) -> bool:
+        """Whether this replica holds a live `key` — answered without Redis."""
+        hit = self._local.get(key)
+        return hit is not None and hit[0] > time.time()
+
+    def local_count(self) -> int:
+        return len(self._local)
+
+
+# ---------------------------------------------------------------------------
+# Quota-state short circuit — non-retryable 429s per user
+# ---------------------------------------------------------------------------
+# A `quota_exhausted` / `spend_cap_daily` / `spend_ceiling_monthly` 429 does not
+# clear for hours to days, yet every later call from that user went upstream
+# just to be told the same thing. The classified 429 is remembered per `sub`
+# in a _SharedTTLStore and replayed as a synthesized response — original body
+# and headers, Retry-After counted down to the upstream reset — so
+# `_raise_upstream_error` and `_upstream_error_text` render the same
+# `_upstream_429_copy` upsell they would have.
+#
+# The state is held for at most _QUOTA_STATE_TTL seconds, not until the reset:
+# a user who buys credits or raises a cap must not be locked out for two
+# weeks. When it lapses, one call probes upstream and either re-records the
+# state or clears it. A success clears it at once on this replica and in
+# Redis; another replica's local copy ages out within the same bound.
+#
+# After a Redis miss the user is presumed clear on this replica for
+# _QUOTA_RECHECK_SECONDS, so a fan-out (`*_many`, auto-pagination) costs one
+# Redis read, not one per upstream GET. Missing a state another replica just
+# recorded costs one upstream 429, which records it here too.
+_QUOTA_STATE_TTL = float(os.environ.get("MCP_QUOTA_STATE_TTL", "300"))
+_QUOTA_RECHECK_SECONDS = 5.0
+_quota_states = _SharedTTLStore("quota-state", ttl=_QUOTA_STATE_TTL)
+_quota_clear_until: dict[str, float] = {}
+_quota_replays = 0
+
+
+async def _quota_replay(url: str) -> Optional[httpx.Response]:
+    """The current user's remembered quota 429, or None to go upstream."""
+    global _quota_replays
+    sub = _current_sub.get()
+    if not sub or _QUOTA_STATE_TTL <= 0:
+        return None
+    now = time.monotonic()
+    if _quota_clear_until.get(sub, 0.0) > now:
+        return None
+    state = await _quota_states.get(sub)
+    if state is None:
+        if len(_quota_clear_until) >= _SHARED_STATE_LOCAL_MAX:
+            _quota_clear_until.clear()
+        _quota_clear_until[sub] = now + _QUOTA_RECHECK_SECONDS
+        return None
+    headers = [(name, value) for name, value in state["headers"] if name.lower() != "retry-after"]
+    if state["reset"] is not None:
+        headers.append(("retry-after", str(max(1, int(state["reset"] - time.time())))))
+    _quota_replays += 1
+    return httpx.Response(
+        429,
+        headers=headers,
+        content=state["body"].encode(),
+        request=httpx.Request("GET", API_BASE_URL + url),
+    )
+
+
+async def _note_quota_state(response: httpx.Response) -> None:
+    """Record a non-retryable 429 for the current user; clear it on success."""
+    sub = _current_sub.get()
+    if not sub or _QUOTA_STATE_TTL <= 0:
+        return
+    if response.is_success:
+        if _quota_states.held_locally(sub):
+            await _quota_states.delete(sub)
+        return
+    if response.status_code != 429:
+        return
+    body_text = response.text[:4096]
+    if _classify_upstream_429(body_text) not in _NON_RETRYABLE_429:
+        return
+    retry_after = _retry_after_seconds(response)
+    reset = time.time() + int(retry_after) if retry_after else None
+    headers = [
+        [name, value]
+        for name, value in response.headers.items()
+        if name.lower() not in _NOT_FOUND_DROP_HEADERS
+    ]
+    ttl = min(_QUOTA_STATE_TTL, int(retry_after)) if retry_after else _QUOTA_STATE_TTL
+    _quota_clear_until.pop(sub, None)
+    await _quota_states.set(sub, {"reset": reset, "body": body_text, "headers": headers}, ttl=ttl)
+
+
+def _quota_state_stats() -> dict[str, int]:
+    """Quota short-circuit counters for /health."""
+    return {"entries": _quota_states.local_count(), "replays": _quota_replays}
+
+
+# ---------------------------------------------------------------------------
+# Result-size budget for structured tools
+# ---------------------------------------------------------------------------
+# Hosts cap a tool result (Claude Code at 25k tokens by default) and cut what
+# is past the cap without telling the model: a big `filings_list` page or ten
+# years of financials arrived with half a row at the end and the rest of the
+# bytes wasted. A structured result larger than its tool's budget now returns
+# the leading rows plus a `continuation` token; the remainder is held per
+# user in a _SharedTTLStore and a follow-up call with the token is served from
+# it without going upstream. The remainder is split again if it still does
+# not fit, so a page is read in as many calls as it needs.
+#
+# Tokens are not consumed: these tools are annotated idempotent and a host
+# that retries a call must get the same answer. The local tier holds at most
+# _CONTINUATION_LOCAL_MAX remainders — each can be a large page — and Redis,
+# when configured, holds the rest until the TTL.
+_RESULT_MAX_BYTES = int(os.environ.get("MCP_RESULT_MAX_BYTES", "80000"))
+_CONTINUATION_TTL = float(os.environ.get("MCP_CONTINUATION_TTL", "600"))
+_CONTINUATION_LOCAL_MAX = 256
+
+
+def _parse_tool_budgets(raw: str) -> dict[str, int]:
+    """`"filings_list=60000, companies_financials_retrieve=120000"` -> {tool: bytes}.
+
+    Malformed entries are logged and skipped, as for MCP_TOOL_DEADLINE_BY_HOST.
+    """
+    out: dict[str, int] = {}
+    for item in raw.split(","):
+        if not item.strip():
+            continue
+        name, _, value = item.partition("=")
+        try:
+            out[name.strip()] = int(value)
+        except ValueError:
+            logger.warning("ignoring malformed MCP_RESULT_MAX_BYTES_BY_TOOL entry %r", item)
+    return out
+
+
+_RESULT_BUDGETS = _parse_tool_budgets(os.environ.get("MCP_RESULT_MAX_BYTES_BY_TOOL", ""))
+_continuations = _SharedTTLStore(
+    "continuation", ttl=_CONTINUATION_TTL, local_max=_CONTINUATION_LOCAL_MAX
+)
+_continuations_issued = 0
+_continuations_resumed = 0
+
+
+def _rows_within_budget(result: dict[str, Any], key: str, budget: int) -> Optional[int]:
+    """How many of `result[key]` fit in `budget` bytes, or None if all of it does.
+
+    Always at least one row, so every continuation makes progress.
+    """
+    rows = result.get(key)
+    if not isinstance(rows, list) or len(rows) < 2:
+        return None
+    # The envelope, the `"continuation":"<32 hex>"` member and a comma per row.
+    size = _json_size({**result, key: []}) + 50
+    for n, row in enumerate(rows):
+        size += _json_size(row) + 1
+        if n and size > budget:
+            return n
+    return None
+
+
+async def _budget_result(tool: str, result: dict[str, Any], key: str) -> dict[str, Any]:
+    """`result`, or its leading `key` rows and a `continuation` for the rest."""
+    global _continuations_issued
+    budget = _RESULT_BUDGETS.get(tool, _RESULT_MAX_BYTES)
+    n = _rows_within_budget(result, key, budget) if budget > 0 else None
+    if n is None:
+        return result
+    token = uuid.uuid4().hex
+    rows = result[key]
+    await _continuations.set(
+        f"{_current_sub.get()}:{token}", {"tool": tool, "result": {**result, key: rows[n:]}}
+    )
+    _continuations_issued += 1
+    return {**result, key: rows[:n], "continuation": token}
+
+
+async def _resume_result(tool: str, token: str, key: str) -> dict[str, Any]:
+    """The rows held back under `token`, budgeted again."""
+    global _continuations_resumed
+    state = await _continuations.get(f"{_current_sub.get()}:{token}")
+    if state is None or state.get("tool") != tool:
+        raise ToolInputError(
+            "Unknown or expired continuation. Call again without it to re-run the query."
+        )
+    _continuations_resumed += 1
+    return await _budget_result(tool, state["result"], key)
+
+
+def _continuation_stats() -> dict[str, int]:
+    """Result-budget counters for /health."""
+    return {
+        "entries": _continuations.local_count(),
+        "issued": _continuations_issued,
+        "resumed": _continuations_resumed,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Tool-input validation
+# ---------------------------------------------------------------------------
+class ToolInputError(ValueError):
+    """Raised when a tool argument fails server-side validation.
+
+    Caught at tool boundaries and turned into a user-visible error string
+    rather than letting the request reach the upstream API with an unsafe
+    or malformed value.
+    """
+
+
+# Regulator-compliant ISIN: 2 country letters + 9 alphanumerics + 1 check digit.
+_ISIN_RE = re.compile(r"^[A-Z]{2}[A-Z0-9]{9}[0-9]$")
+# Loose UUID match (any case, dash-separated). The FR backend accepts the
+# canonical form; we just want to refuse path traversal payloads here.
+_UUID_RE = re.compile(
+    r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
+)
+# Generic safety net for any string-typed path param the generator emits.
+# 128-char cap and a printable-ASCII allowlist that excludes "/", ".." path
+# components, query/fragment chars, and whitespace. Tools that need richer
+# inputs (e.g. UUIDs, ISINs) should be name-routed through the stricter
+# validators above.
+_GENERIC_PATH_RE = re.compile(r"^[A-Za-z0-9_.~:@!*'()+,;=$&%-]{1,128}$")
+
+
+def _validate_path_param(name: str, value: Any) -> str:
+    """Coerce + validate a path-param value before URL interpolation.
+
+    The generated tool wrappers build URLs as `template.format(**path_params)`.
+    Without validation, a string-typed parameter such as `code="../admin"`
+    silently rewrites the request path with the user's bearer attached.
+
+    Pattern-routed by the *parameter name* the OpenAPI schema declared:
+      - `*_uuid`           → must be a canonical UUID
+      - `code`, `*_code`   → must be a valid ISIN
+      - everything else    → must match the generic-path allowlist
 
     Integers go through unchanged (path-traversal is impossible).
     Returns the URL-quoted string ready to slot into the path.
@@ -2391,6 +3705,183 @@ def _validate_path_param(name: str, value: Any) -> str:
     return quote(s, safe="")
 
 
+# Query-argument rules compiled from the OpenAPI snapshot. For each
+# schema-derived GET tool the generator emits `_PARAM_RULES[<tool>] =
+# _compile_param_rules({...})` — enums, date/date-time formats, patterns,
+# ranges, and the `ordering` fields the endpoint's description lists — and the
+# tool checks its arguments against them before any upstream call. A bad enum
+# value, a malformed date or an unknown ordering field then costs microseconds
+# and a precise message instead of a round trip and an upstream 400. The
+# upstream stays authoritative: a rule only rejects what it would reject too.
+#
+# Rejections raise ToolArgumentError, whose `error_kind` lands in the analytics
+# event next to the message (which names the parameter and the rule, never the
+# value), so the common mistakes can be counted per tool.
+class ToolArgumentError(ToolInputError):
+    """A tool argument broke a rule compiled from the API schema."""
+
+    error_kind = "invalid_argument"
+
+
+_PARAM_RULES: dict[str, dict[str, Callable[[Any], Optional[str]]]] = {}
+
+
+def _compile_param_rule(name: str, rule: dict[str, Any]) -> Callable[[Any], Optional[str]]:
+    """One parameter's checks as a function: the first problem, or None."""
+    checks: list[Callable[[Any], Optional[str]]] = []
+    if "enum" in rule:
+        allowed = frozenset(rule["enum"])
+        listed = ", ".join(str(v) for v in rule["enum"])
+        checks.append(lambda v: None if v in allowed else f"{name!r} must be one of: {listed}.")
+    if rule.get("format") in ("date", "date-time"):
+        if rule["format"] == "date":
+            parse: Callable[[str], Any] = _dt.date.fromisoformat
+            example = "2026-01-31"
+        else:
+            parse = _dt.datetime.fromisoformat
+            example = "2026-01-31T00:00:00Z"
+
+        def _format(v: Any) -> Optional[str]:
+            try:
+                parse(v)
+            except (TypeError, ValueError):
+                return f"{name!r} must be an ISO 8601 {rule['format']}, e.g. '{example}'."
+            return None
+
+        checks.append(_format)
+    if "pattern" in rule:
+        pattern = re.compile(rule["pattern"])
+        checks.append(
+            lambda v: None
+            if pattern.search(str(v))
+            else f"{name!r} must match the pattern {rule['pattern']}."
+        )
+    if "minimum" in rule:
+        low = rule["minimum"]
+        checks.append(lambda v: None if v >= low else f"{name!r} must be at least {low}.")
+    if "maximum" in rule:
+        high = rule["maximum"]
+        checks.append(lambda v: None if v <= high else f"{name!r} must be at most {high}.")
+    if "minLength" in rule or "maxLength" in rule:
+        shortest, longest = rule.get("minLength", 0), rule.get("maxLength")
+
+        def _length(v: Any) -> Optional[str]:
+            if len(str(v)) < shortest or (longest is not None and len(str(v)) > longest):
+                bound = f"{shortest}-{longest}" if longest is not None else f"at least {shortest}"
+                return f"{name!r} must be {bound} characters long."
+            return None
+
+        checks.append(_length)
+    if "ordering" in rule:
+        fields = frozenset(rule["ordering"])
+        listed = ", ".join(rule["ordering"])
+
+        def _ordering(v: Any) -> Optional[str]:
+            terms = [t.strip() for t in str(v).split(",")]
+            if all(t and t.lstrip("-") in fields for t in terms):
+                return None
+            return f"{name!r} accepts: {listed} (prefix '-' for descending, comma-separate several)."
+
+        checks.append(_ordering)
+
+    def _check(value: Any) -> Optional[str]:
+        for check in checks:
+            try:
+                problem = check(value)
+            except TypeError:
+                problem = f"{name!r} has the wrong type."
+            if problem:
+                return problem
+        return None
+
+    return _check
+
+
+def _compile_param_rules(spec: dict[str, dict[str, Any]]) -> dict[str, Callable[[Any], Optional[str]]]:
+    return {name: _compile_param_rule(name, rule) for name, rule in spec.items()}
+
+
+def _check_query_params(func_name: str, query_params: dict[str, Any]) -> None:
+    """Raise ToolArgumentError on the first argument that breaks its rule."""
+    rules = _PARAM_RULES.get(func_name)
+    if not rules:
+        return
+    for name, value in query_params.items():
+        check = rules.get(name)
+        if check is not None and value is not None:
+            problem = check(value)
+            if problem:
+                raise ToolArgumentError(problem)
+
+
+# ---------------------------------------------------------------------------
+# Field projection — the optional `fields` parameter
+# ---------------------------------------------------------------------------
+# Most questions need three to five fields of a Company that has dozens,
+# listings and merge history included. `fields="id,name,listings.mic"` keeps
+# only those (dotted paths reach into nested objects and through lists) before
+# anything is serialized; on a page it applies to each row of `results`. The
+# API takes no projection parameter, so this runs in-process; an operation
+# whose schema declares its own `fields` is passed through untouched instead.
+#
+# Top-level names are checked against the schema's, which the generator emits
+# into _FIELD_NAMES, so a typo fails loudly instead of returning empty rows.
+_FIELD_NAMES: dict[str, tuple[str, ...]] = {}
+_FIELD_PATH_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(?:\\.[A-Za-z_][A-Za-z0-9_]*)*$")
+
+
+def _field_columns(fields: Optional[str]) -> tuple[str, ...]:
+    return tuple(p.strip() for p in (fields or "").split(",") if p.strip())
+
+
+def _parse_fields(func_name: str, fields: Optional[str]) -> Optional[dict[str, Any]]:
+    """`fields` as a projection tree (None = keep the whole value), or None."""
+    if fields is None:
+        return None
+    paths = _field_columns(fields)
+    if not paths:
+        raise ToolArgumentError("'fields' must name at least one field.")
+    known = _FIELD_NAMES.get(func_name, ())
+    tree: dict[str, Any] = {}
+    for path in paths:
+        if not _FIELD_PATH_RE.match(path):
+            raise ToolArgumentError(f"'fields' entry {path!r} is not a dotted field path.")
+        parts = path.split(".")
+        if known and parts[0] not in known:
+            raise ToolArgumentError(
+                f"'fields' names unknown field {parts[0]!r}; known: {', '.join(known)}."
+            )
+        node = tree
+        for part in parts[:-1]:
+            if node.get(part, {}) is None:
+                break  # the whole parent is already selected
+            node = node.setdefault(part, {})
+        else:
+            node[parts[-1]] = None
+    return tree
+
+
+def _project(value: Any, tree: Optional[dict[str, Any]]) -> Any:
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [_project(v, tree) for v in value]
+    if not isinstance(value, dict):
+        return value
+    return {key: _project(value[key], sub) for key, sub in tree.items() if key in value}
+
+
+def _apply_fields(data: Any, tree: Optional[dict[str, Any]], on_results: bool) -> Any:
+    """Project a tool result: each row of a page's `results`, or the object."""
+    if tree is None:
+        return data
+    if on_results:
+        if isinstance(data, dict) and isinstance(data.get("results"), list):
+            data["results"] = [_project(row, tree) for row in data["results"]]
+        return data
+    return _project(data, tree)
+
+
 def _validate_webhook_url(value: Any) -> str:
     """Block obvious SSRF amplification targets at the MCP boundary.
 
@@ -2442,6 +3933,7 @@ def _safe_error(func_name: str, exc: BaseException) -> str:
         str(exc),
         upstream_status=getattr(exc, "upstream_status", None),
         request_id=getattr(exc, "request_id", None),
+        error_kind=getattr(exc, "error_kind", "") or "",
     )
     if isinstance(exc, ToolInputError):
         return f"Invalid argument: {exc}"
@@ -2477,6 +3969,205 @@ mcp.add_middleware(UsageAnalyticsMiddleware(
     client_info_store=globals().get("_redis_client"),
 ))
 
+
+def _call_budget(context: Any) -> Optional[float]:
+    """Deadline budget in seconds for this tool call, or None for no deadline."""
+    host, _ = current_client_info(context)
+    budget = _DEADLINE_BY_HOST.get(host.lower(), _DEADLINE_DEFAULT)
+    if budget <= 0:
+        return None
+    try:
+        meta = getattr(getattr(context, "message", None), "meta", None)
+        stated = (getattr(meta, "model_extra", None) or {}).get("timeoutMs")
+        if isinstance(stated, (int, float)) and not isinstance(stated, bool) and stated > 0:
+            budget = min(budget, stated / 1000.0)
+    except Exception:
+        logger.debug("deadline: request _meta unreadable", exc_info=True)
+    return budget
+
+
+class _DeadlineMiddleware(Middleware):
+    """Carry the per-call deadline and cancel the call once it passes.
+
+    Registered after the analytics middleware, so it runs INSIDE it: the host
+    name `_call_budget` keys on has already been resolved for this call, and a
+    call cancelled here still reaches analytics as one error event with
+    error_kind="deadline_exceeded".
+    """
+
+    async def on_call_tool(self, context, call_next):
+        budget = _call_budget(context)
+        if budget is None:
+            return await call_next(context)
+        reset = _call_deadline.set(time.monotonic() + budget)
+        scope = asyncio.timeout(budget)
+        try:
+            async with scope:
+                return await call_next(context)
+        except TimeoutError as exc:
+            if not scope.expired():
+                raise  # a timeout from inside the tool, not our deadline
+            logger.warning(
+                "tool %s cancelled at its %.1fs deadline",
+                getattr(getattr(context, "message", None), "name", "?"),
+                budget,
+            )
+            raise _deadline_exceeded() from exc
+        finally:
+            _call_deadline.reset(reset)
+
+
+mcp.add_middleware(_DeadlineMiddleware())
+
+
+# Output-schema validation. The MCP SDK checks every structured result against
+# the tool's outputSchema with `jsonschema.validate`, which re-checks the
+# schema and builds a new validator on every call — for a 50-row filings_list
+# and its deeply inlined schema that was the largest CPU cost after parsing.
+# Validators are compiled once per tool (`_compile_output_validators`, run at
+# the end of the module; the generator already checked each schema against
+# its metaschema, the slow part) and this middleware validates with them; it then
+# hands the SDK a finished CallToolResult (`meta` set), which the SDK returns
+# as is instead of validating again. A tool without a compiled validator
+# (registered later) is left to the SDK.
+#
+# The schemas are generated from the same OpenAPI document as the requests,
+# so a mismatch means upstream drift, not a per-call accident: production
+# validates every _OUTPUT_VALIDATION_SAMPLE-th result per tool (the first one
+# always), the tests every one. 0 turns validation off. /health reports counts
+# and timings per tool under `output_validation`. The middleware is registered
+# innermost, after `_StructuredResultMiddleware` below.
+_OUTPUT_VALIDATION_SAMPLE = int(os.environ.get("MCP_OUTPUT_VALIDATION_SAMPLE", "10"))
+_output_validators: dict[str, Any] = {}
+_output_validation_stats: dict[str, dict[str, float]] = defaultdict(
+    lambda: {"calls": 0, "validated": 0, "failed": 0, "total_ms": 0.0, "max_ms": 0.0}
+)
+
+
+def _compile_output_validators() -> None:
+    """Build one validator per registered tool with an output schema."""
+    for name, tool in mcp._tool_manager._tools.items():
+        schema = getattr(tool, "output_schema", None)
+        if schema is None or name in _output_validators:
+            continue
+        _output_validators[name] = jsonschema.validators.validator_for(schema)(schema)
+
+
+class _OutputValidationMiddleware(Middleware):
+    """Validate structured results with the precompiled validators, sampled."""
+
+    async def on_call_tool(self, context, call_next):
+        result = await call_next(context)
+        name = getattr(getattr(context, "message", None), "name", "")
+        validator = _output_validators.get(name)
+        structured = getattr(result, "structured_content", None)
+        if validator is None or structured is None:
+            return result  # the SDK validates (or reports the missing output)
+        stats = _output_validation_stats[name]
+        stats["calls"] += 1
+        sample = _OUTPUT_VALIDATION_SAMPLE
+        if sample > 0 and (stats["calls"] - 1) % sample == 0:
+            started = time.perf_counter()
+            error = jsonschema.exceptions.best_match(validator.iter_errors(structured))
+            elapsed = (time.perf_counter() - started) * 1000
+            stats["validated"] += 1
+            stats["total_ms"] += elapsed
+            stats["max_ms"] = max(stats["max_ms"], elapsed)
+            if error is not None:
+                stats["failed"] += 1
+                logger.warning("tool %s output failed its schema: %s", name, error.message)
+                raise ToolError(f"Output validation error: {error.message}")
+        if result.meta is None:
+            result.meta = {}
+        return result
+
+
+def _output_validation_report() -> dict[str, dict[str, float]]:
+    """Per-tool validation counters and timings for /health."""
+    return {
+        name: {
+            "calls": int(s["calls"]),
+            "validated": int(s["validated"]),
+            "failed": int(s["failed"]),
+            "mean_ms": round(s["total_ms"] / s["validated"], 3) if s["validated"] else 0.0,
+            "max_ms": round(s["max_ms"], 3),
+        }
+        for name, s in sorted(_output_validation_stats.items())
+    }
+
+
+# Structured results: one serialization, optionally no duplicate. FastMCP
+# writes a structured result once, as the compact JSON text block it sends
+# next to `structuredContent`; the analytics middleware then measured the
+# result by serializing it again. This middleware records the text block's
+# length on the result (`serialized_chars`, read by `_result_metrics`).
+#
+# The text block is the whole result a second time. Clients that read
+# `structuredContent` (protocol 2025-06-18 and later) do not need it, so for
+# the hosts named in MCP_STRUCTURED_POINTER_HOSTS ("*" for all) it is
+# replaced with a one-line pointer. Off by default: the spec says a
+# structured result SHOULD carry its serialized copy for older clients, and
+# some hosts only show the model the text.
+_STRUCTURED_POINTER_HOSTS = frozenset(
+    h.strip().lower()
+    for h in os.environ.get("MCP_STRUCTURED_POINTER_HOSTS", "").split(",")
+    if h.strip()
+)
+_STRUCTURED_CONTENT_SINCE = "2025-06-18"
+
+
+def _sends_pointer(context: Any) -> bool:
+    """Whether this call's client gets a pointer instead of the text copy."""
+    if not _STRUCTURED_POINTER_HOSTS:
+        return False
+    host, _ = current_client_info(context)
+    if "*" not in _STRUCTURED_POINTER_HOSTS and host.lower() not in _STRUCTURED_POINTER_HOSTS:
+        return False
+    try:
+        version = (get_http_headers(include_all=True) or {}).get("mcp-protocol-version")
+    except Exception:
+        version = None
+    # No header: the transport spec says to assume 2025-03-26, which predates
+    # structuredContent.
+    return (version or "2025-03-26") >= _STRUCTURED_CONTENT_SINCE
+
+
+def _result_pointer(structured: dict[str, Any], chars: int) -> str:
+    rows = structured.get("results")
+    if isinstance(rows, list):
+        shape = f"{len(rows)} results"
+    else:
+        shape = "keys: " + ", ".join(list(structured)[:8])
+    note = "; more via `continuation`" if structured.get("continuation") else ""
+    return f"Result is in structuredContent ({shape}; {chars} chars of JSON{note})."
+
+
+class _StructuredResultMiddleware(Middleware):
+    """Record the size of a structured result's text copy; maybe replace it."""
+
+    async def on_call_tool(self, context, call_next):
+        result = await call_next(context)
+        structured = getattr(result, "structured_content", None)
+        content = getattr(result, "content", None) or []
+        if structured is None or len(content) != 1 or getattr(content[0], "text", None) is None:
+            return result
+        tool = mcp._tool_manager._tools.get(getattr(context.message, "name", ""))
+        if tool is None or (tool.output_schema or {}).get("x-fastmcp-wrap-result"):
+            return result  # a text tool: the text is the result, not a copy
+        chars = len(content[0].text)
+        result.serialized_chars = chars
+        if _sends_pointer(context):
+            result.content = [TextContent(type="text", text=_result_pointer(structured, chars))]
+        return result
+
+
+# FastMCP runs the last-registered middleware innermost, so the validator is
+# registered after this one and stays innermost: a failed validation reaches
+# the deadline and analytics layers as the call's error, its timing covers
+# validation alone, and only a validated result is measured or replaced here.
+mcp.add_middleware(_StructuredResultMiddleware())
+mcp.add_middleware(_OutputValidationMiddleware())
+
 # stateless_http=True — build a fresh transport per request instead of holding an
 # in-memory session table keyed by `Mcp-Session-Id`. This connector runs as a
 # horizontally-scaled Cloud Run service with NO load-balancer session affinity, so
@@ -2570,6 +4261,143 @@ async def _upstream_selfcheck() -> None:
     logger.info("upstream self-check ok (status=%s)", resp.status_code)
 
 
+# ---------------------------------------------------------------------------
+# Upstream pre-warm and keepalive
+# ---------------------------------------------------------------------------
+# After a scale-from-zero, or any lull longer than _API_LIMITS.keepalive_expiry,
+# the first tool call pays DNS + TCP + TLS + HTTP/2 setup to the upstream on the
+# user's critical path. So boot opens the upstream connections up front and a
+# background loop keeps them from idling out.
+#
+# Keepalive is a bodiless anonymous HEAD on each pool, not an HTTP/2 PING frame.
+# httpcore offers no way to send a PING outside a request, and its idle expiry
+# is a client-side timer that only a completed request resets — a PING would
+# keep the server side of the connection alive while httpcore still discarded
+# it. The HEAD does both jobs: it resets the timer and proves the connection
+# still answers. Any HTTP response counts, for the reason `_upstream_selfcheck`
+# gives: /health/ is behind the anonymous burst throttle.
+#
+# MCP_UPSTREAM_WARM_CONNECTIONS is how many upstream connections to hold warm
+# (0 switches all of this off; default: every interactive connection plus the
+# bulk lane's one). With HTTP/2 each member pool multiplexes onto a single
+# connection, so one warm connection per member is the unit, taken primary pool
+# first. On Cloud Run with request-based CPU allocation the loop only runs while
+# the instance has CPU: it keeps a busy instance's pools warm between calls, and
+# an always-on-CPU instance warm while idle as well.
+_WARM_CONNECTIONS = int(
+    os.environ.get("MCP_UPSTREAM_WARM_CONNECTIONS", str(_UPSTREAM_HTTP2_CONNECTIONS + 1))
+)
+# Comfortably inside keepalive_expiry=30 s so a connection is refreshed before
+# httpcore would expire it.
+_WARM_INTERVAL = float(os.environ.get("MCP_UPSTREAM_KEEPALIVE_INTERVAL", "20"))
+# Re-resolve the upstream host this often. Python keeps no DNS cache of its own,
+# so this keeps the platform resolver's cache hot for the next connection and
+# logs a resolution failure before a tool call trips over it.
+_DNS_REFRESH_INTERVAL = float(os.environ.get("MCP_UPSTREAM_DNS_REFRESH", "60"))
+_WARM_TIMEOUT = 5.0
+
+
+def _upstream_pools() -> list[tuple[httpx.AsyncClient, httpx.AsyncHTTPTransport]]:
+    """Every (client, transport) pair holding upstream connections, primary first."""
+    pools = [(_api_client, _api_transport), (_api_bulk_client, _api_bulk_transport)]
+    if _HEDGE_ENABLED:
+        pools.append((_api_hedge_client, _api_hedge_transport))
+    return pools
+
+
+def _pool_width(transport: Any) -> int:
+    """Connections a transport holds when warm: one per HTTP/2 member pool."""
+    return len(getattr(transport, "members", (transport,)))
+
+
+def _warm_plan() -> list[tuple[httpx.AsyncClient, Any, int]]:
+    """(client, transport, connections to hold warm), primary pool first,
+    capped at _WARM_CONNECTIONS in total."""
+    plan, budget = [], max(0, _WARM_CONNECTIONS)
+    for client, transport in _upstream_pools():
+        count = min(budget, _pool_width(transport))
+        if count:
+            plan.append((client, transport, count))
+        budget -= count
+    return plan
+
+
+def _live_connections(transport: Any) -> int:
+    """Open (or opening) connections across a transport's pool(s)."""
+    return sum(
+        1
+        for member in getattr(transport, "members", (transport,))
+        for conn in member._pool.connections
+        if not conn.is_closed() and not conn.has_expired()
+    )
+
+
+def _warm_connection_count() -> int:
+    """Warm upstream connections across every pool — reported on /health."""
+    return sum(_live_connections(t) for _, t in _upstream_pools())
+
+
+async def _warm_pool(client: httpx.AsyncClient) -> None:
+    try:
+        await client.head(_SELFCHECK_PATH, timeout=_WARM_TIMEOUT)
+    except httpx.HTTPError as exc:
+        logger.info("upstream keepalive failed: %s", exc.__class__.__name__)
+
+
+async def _warm_round(cold_only: bool) -> None:
+    """One HEAD per connection to warm, fired concurrently.
+
+    Concurrency is what spreads them: `_BalancedHTTP2Transport` places each new
+    stream on its least-busy member, so N simultaneous HEADs land one per
+    member connection.
+    """
+    probes = []
+    for client, transport, count in _warm_plan():
+        if cold_only:
+            count -= _live_connections(transport)
+        probes.extend(_warm_pool(client) for _ in range(max(0, count)))
+    if probes:
+        await asyncio.gather(*probes)
+
+
+async def _prewarm_upstream() -> None:
+    """Open every warm connection that is not open yet.
+
+    The self-check has usually opened one on the primary pool already, so
+    this only adds the connections still missing.
+    """
+    await _warm_round(cold_only=True)
+    logger.info(
+        "upstream pre-warm: %d warm connection(s), target %d",
+        _warm_connection_count(),
+        _WARM_CONNECTIONS,
+    )
+
+
+async def _refresh_upstream_dns() -> None:
+    port = urlsplit(API_BASE_URL).port or 443
+    try:
+        await asyncio.get_running_loop().getaddrinfo(_API_HOST, port, type=socket.SOCK_STREAM)
+    except OSError as exc:
+        logger.warning("upstream DNS refresh for %s failed: %s", _API_HOST, exc)
+
+
+async def _keep_upstream_warm() -> None:
+    """Background loop: refresh every warm pool, re-resolve DNS periodically."""
+    next_dns = time.monotonic() + _DNS_REFRESH_INTERVAL
+    while True:
+        await asyncio.sleep(_WARM_INTERVAL)
+        try:
+            await _warm_round(cold_only=False)
+            if time.monotonic() >= next_dns:
+                next_dns = time.monotonic() + _DNS_REFRESH_INTERVAL
+                await _refresh_upstream_dns()
+        except Exception:
+            # The loop must outlive any single bad round; a dead keepalive
+            # task would silently put connection setup back on user calls.
+            logger.warning("upstream keepalive round failed", exc_info=True)
+
+
 @asynccontextmanager
 async def _lifespan(app: FastAPI) -> AsyncIterator[None]:
     """Compose our shutdown work with FastMCP's existing lifespan.
@@ -2577,7 +4405,8 @@ async def _lifespan(app: FastAPI) -> AsyncIterator[None]:
     Also performs an explicit Redis ping when MCP_REDIS_URL is configured,
     so a misconfigured Redis URL fails the revision at boot rather than
     silently falling back to broken OAuth at first user login, plus an
-    unauthenticated upstream reachability probe (see _upstream_selfcheck).
+    unauthenticated upstream reachability probe (see _upstream_selfcheck) and
+    the upstream pre-warm/keepalive loop.
     """
     if _oauth_storage is not None and MCP_REDIS_URL:
         try:
@@ -2595,13 +4424,22 @@ async def _lifespan(app: FastAPI) -> AsyncIterator[None]:
 
     await _upstream_selfcheck()
 
+    warm_task: Optional[asyncio.Task] = None
+    if _WARM_CONNECTIONS > 0:
+        await _prewarm_upstream()
+        warm_task = asyncio.create_task(_keep_upstream_warm())
+
     await _usage_emitter.start()
 
     try:
         async with mcp_app.lifespan(app):
             yield
     finally:
+        if warm_task is not None:
+            warm_task.cancel()
         await _api_client.aclose()
+        await _api_bulk_client.aclose()
+        await _api_hedge_client.aclose()
         await _usage_emitter.aclose()
         close = getattr(_oauth_storage, "aclose", None)
         if callable(close):
@@ -2837,11 +4675,18 @@ app.add_middleware(
 
 
 @app.api_route("/health", methods=["GET", "HEAD"])
-async def health() -> dict[str, str]:
+async def health() -> dict[str, Any]:
     return {
         "status": "ok",
         "service": "financial-reports-mcp",
         "version": MCP_VERSION,
+        "upstream_warm_connections": _warm_connection_count(),
+        "upstream_connections": _api_transport.stats(),
+        "upstream_retry_budget": _retry_budget_stats(),
+        "upstream_not_found_cache": _not_found_stats(),
+        "upstream_quota_states": _quota_state_stats(),
+        "result_continuations": _continuation_stats(),
+        "output_validation": _output_validation_report(),
     }
 
 
@@ -3493,7 +5338,16 @@ app.mount("/", mcp_app)
 # ---------------------------------------------------------------------------
 
 GET_TOOL_TEMPLATE = '''
-@mcp.tool(
+{% if param_rules %}
+_PARAM_RULES["{{ func_name }}"] = _compile_param_rules({{ param_rules }})
+
+{% endif %}{% if scrub_plan %}
+_SCRUB_PLANS["{{ func_name }}"] = {{ scrub_plan }}
+
+{% endif %}{% if field_names %}
+_FIELD_NAMES["{{ func_name }}"] = {{ field_names }}
+
+{% endif %}@mcp.tool(
     tags={{ tags }},
     annotations=ToolAnnotations(
         title="{{ title }}",
@@ -3508,6 +5362,12 @@ async def {{ func_name }}(
     {%- for param in params %}
     {{ param.name }}: {{ param.py_type }}{{ param.default_val }},
     {%- endfor %}
+    {%- if field_names %}
+    fields: str | None = None,
+    {%- endif %}
+    {%- if table_columns %}
+    output_format: Literal["json", "table"] = "json",
+    {%- endif %}
 ) -> str:
     """{{ description }}"""
     try:
@@ -3517,6 +5377,12 @@ async def {{ func_name }}(
             "{{ param.original_name }}": {{ param.name }},
             {%- endfor %}
         }
+        {%- if param_rules %}
+        _check_query_params("{{ func_name }}", query_params)
+        {%- endif %}
+        {%- if field_names %}
+        projection = _parse_fields("{{ func_name }}", fields)
+        {%- endif %}
         path_params: dict[str, str] = {}
         {%- for param in params if param.is_path %}
         if {{ param.name }} is not None:
@@ -3530,11 +5396,24 @@ async def {{ func_name }}(
 
         response = await _api_get(
             url,
+            lane="interactive",
             params={k: v for k, v in query_params.items() if v is not None},
         )
-        return _format_response(response)
-    except ToolInputError as exc:
-        return _safe_error("{{ func_name }}", exc)
+        {%- if table_columns %}
+        if output_format == "table":
+            return _format_table(
+                response,
+                {% if field_names %}_field_columns(fields) or {% endif %}{{ table_columns }},
+                tool="{{ func_name }}",
+            )
+        {%- endif %}
+        {%- if field_names %}
+        return _format_response(response, projection, {{ fields_on_results }}, tool="{{ func_name }}")
+        {%- else %}
+        return _format_response(response, tool="{{ func_name }}")
+        {%- endif %}
+    except ToolInputError as exc:
+        return _safe_error("{{ func_name }}", exc)
     except Exception as exc:
         logger.exception("{{ func_name }} failed")
         return _safe_error("{{ func_name }}", exc)
@@ -3633,7 +5512,7 @@ async def {{ func_name }}(
 
         # Stream so we never buffer more than _MAX_FILING_BYTES into memory,
         # even when the upstream body is much larger than the user's slice.
-        async with _api_stream_get(url) as response:
+        async with _api_stream_get(url, lane="bulk") as response:
             if response.status_code != 200:
                 body = await response.aread()
                 return _upstream_error_text(
@@ -3709,7 +5588,16 @@ async def {{ func_name }}(
 #     they surface as `isError: true` text content rather than as a
 #     schema-conformance failure.
 STRUCTURED_GET_TOOL_TEMPLATE = '''
-@mcp.tool(
+{% if param_rules %}
+_PARAM_RULES["{{ func_name }}"] = _compile_param_rules({{ param_rules }})
+
+{% endif %}{% if scrub_plan %}
+_SCRUB_PLANS["{{ func_name }}"] = {{ scrub_plan }}
+
+{% endif %}{% if field_names %}
+_FIELD_NAMES["{{ func_name }}"] = {{ field_names }}
+
+{% endif %}@mcp.tool(
     tags={{ tags }},
     annotations=ToolAnnotations(
         title="{{ title }}",
@@ -3724,15 +5612,34 @@ async def {{ func_name }}(
     {%- for param in params %}
     {{ param.name }}: {{ param.py_type }}{{ param.default_val }},
     {%- endfor %}
+    {%- if paginated %}
+    max_items: int | None = None,
+    {%- endif %}
+    {%- if field_names %}
+    fields: str | None = None,
+    {%- endif %}
+    {%- if budget_key %}
+    continuation: str | None = None,
+    {%- endif %}
 ) -> dict[str, Any]:
     """{{ description }}"""
     resets = await _authorize_or_raise()
     try:
+        {%- if budget_key %}
+        if continuation is not None:
+            return await _resume_result("{{ func_name }}", continuation, "{{ budget_key }}")
+        {%- endif %}
         query_params: dict[str, Any] = {
             {%- for param in params if param.is_query %}
             "{{ param.original_name }}": {{ param.name }},
             {%- endfor %}
         }
+        {%- if param_rules %}
+        _check_query_params("{{ func_name }}", query_params)
+        {%- endif %}
+        {%- if field_names %}
+        projection = _parse_fields("{{ func_name }}", fields)
+        {%- endif %}
         path_params: dict[str, str] = {}
         {%- for param in params if param.is_path %}
         if {{ param.name }} is not None:
@@ -3744,44 +5651,112 @@ async def {{ func_name }}(
         if path_params:
             url = url.format(**path_params)
 
-        try:
-            response = await _api_get(
-                url,
-                params={k: v for k, v in query_params.items() if v is not None},
-            )
-        except httpx.HTTPError as exc:
-            # Transport-level failure (timeout, connect error, pool limit).
-            # Only the exception *type* reaches the client — httpx messages
-            # can embed the full request URL.
-            #
-            # Use exc.__class__.__name__, never type(exc).__name__ (issue #80).
-            # Tool parameters are named by the upstream schema and some collide
-            # with builtins — filings_list has a query param literally called
-            # `type`. Inside the emitted body that parameter shadows the builtin,
-            # so type(exc) raised "'NoneType' object is not callable" and
-            # destroyed the real upstream error. Attribute access cannot be
-            # shadowed by a parameter name.
-            logger.warning(
-                "upstream {{ func_name }} transport error: %s",
-                exc.__class__.__name__,
-            )
-            raise UpstreamHTTPError(
-                f"upstream {{ func_name }} request failed ({exc.__class__.__name__}). "
-                "The FinancialReports API was unreachable or timed out "
-                "(already retried once)."
-            ) from exc
-        if response.status_code != 200:
-            _raise_upstream_error("{{ func_name }}", response)
-        try:
-            return _scrub_response(response.json())
-        except ValueError as exc:
-            raise RuntimeError(f"upstream {{ func_name }} returned non-JSON body") from exc
+        async def _fetch(page_params: dict[str, Any]) -> dict[str, Any]:
+            try:
+                response = await _api_get(url, lane="interactive", params=page_params)
+            except httpx.HTTPError as exc:
+                # Transport-level failure (timeout, connect error, pool limit).
+                # Only the exception *type* reaches the client — httpx messages
+                # can embed the full request URL.
+                #
+                # Use exc.__class__.__name__, never type(exc).__name__ (issue #80).
+                # Tool parameters are named by the upstream schema and some collide
+                # with builtins — filings_list has a query param literally called
+                # `type`. Inside the emitted body that parameter shadows the builtin,
+                # so type(exc) raised "'NoneType' object is not callable" and
+                # destroyed the real upstream error. Attribute access cannot be
+                # shadowed by a parameter name.
+                logger.warning(
+                    "upstream {{ func_name }} transport error: %s",
+                    exc.__class__.__name__,
+                )
+                raise UpstreamHTTPError(
+                    f"upstream {{ func_name }} request failed ({exc.__class__.__name__}). "
+                    "The FinancialReports API was unreachable or timed out "
+                    "(already retried once)."
+                ) from exc
+            if response.status_code != 200:
+                _raise_upstream_error("{{ func_name }}", response)
+            try:
+                return _scrub_for("{{ func_name }}", _json_loads(response.content))
+            except ValueError as exc:
+                raise RuntimeError(f"upstream {{ func_name }} returned non-JSON body") from exc
+
+        page_params = {k: v for k, v in query_params.items() if v is not None}
+        {%- if paginated %}
+        if max_items is not None:
+            result = await _auto_paginate(_fetch, url, page_params, max_items)
+        else:
+            result = await _fetch(page_params)
+        {%- else %}
+        result = await _fetch(page_params)
+        {%- endif %}
+        {%- if field_names %}
+        # Projected after auto-pagination, whose de-duplication keys on `id`.
+        result = _apply_fields(result, projection, {{ fields_on_results }})
+        {%- endif %}
+        {%- if budget_key %}
+        result = await _budget_result("{{ func_name }}", result, "{{ budget_key }}")
+        {%- endif %}
+        return result
+    finally:
+        _release_auth_context(resets)
+'''
+
+
+# Batch companion of a structured retrieve (`BATCH_RETRIEVE_TOOLS`): same query
+# params, the path id swapped for `ids`, one auth pass for the whole batch.
+BATCH_GET_TOOL_TEMPLATE = '''
+@mcp.tool(
+    tags={{ tags }},
+    annotations=ToolAnnotations(
+        title="{{ title }} (batch)",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+    output_schema={{ output_schema_repr }},
+)
+async def {{ func_name }}_many(
+    ids: list[int],
+    {%- for param in params if param.is_query %}
+    {{ param.name }}: {{ param.py_type }}{{ param.default_val }},
+    {%- endfor %}
+    {%- if field_names %}
+    fields: str | None = None,
+    {%- endif %}
+) -> dict[str, Any]:
+    """Batch form of `{{ func_name }}`: up to 50 ids in one call, fetched concurrently. `results` keeps the order of `ids`; an id that failed carries `error` instead of `data`, the rest still return. Other parameters{% if field_names %}, `fields` included,{% endif %} apply to every id."""
+    resets = await _authorize_or_raise()
+    try:
+        query_params: dict[str, Any] = {
+            {%- for param in params if param.is_query %}
+            "{{ param.original_name }}": {{ param.name }},
+            {%- endfor %}
+        }
+        {%- if param_rules %}
+        _check_query_params("{{ func_name }}", query_params)
+        {%- endif %}
+        return await _retrieve_many(
+            "{{ func_name }}",
+            "{{ path }}",
+            "{{ id_param }}",
+            ids,
+            {k: v for k, v in query_params.items() if v is not None},
+            {%- if field_names %}
+            _parse_fields("{{ func_name }}", fields),
+            {%- endif %}
+        )
     finally:
         _release_auth_context(resets)
 '''
 
 
 FILE_FOOTER = '''
+# Every tool is registered by now.
+_compile_output_validators()
+
 
 # ---------------------------------------------------------------------------
 # Local dev entrypoint
@@ -3922,8 +5897,9 @@ def _resource_industry() -> str:
         "| U | Households as employers |\\n"
         "| V | Extraterritorial organizations |\\n\\n"
         "## Peer / sector query recipe\\n\\n"
-        "There is **no aggregator endpoint** — compute peer statistics "
-        "manually:\\n\\n"
+        "For median / quartiles / mean of a line item across peers, call "
+        "`companies_peer_statistics` (an ISIC class or an id list) — one call, "
+        "grouped by currency, with sample sizes. To compute them by hand:\\n\\n"
         "1. Resolve target company → get its `isic_class` from "
         "`companies_retrieve`.\\n"
         "2. `companies_list?isic_class=<code>` → list of peers.\\n"
@@ -4062,7 +6038,7 @@ async def filings_markdown_search(
         if not query or not query.strip():
             raise ToolInputError("query must be a non-empty string")
         url = f"/filings/{filing_id}/markdown/"
-        async with _api_stream_get(url) as response:
+        async with _api_stream_get(url, lane="bulk") as response:
             if response.status_code != 200:
                 body = await response.aread()
                 return _upstream_error_text(
@@ -4120,6 +6096,858 @@ async def filings_markdown_search(
 '''
 
 
+# Synthetic financial-analysis tools (not OpenAPI-derived). They compose
+# `companies_list` and `companies_financials_retrieve` server-side, so a peer or
+# multi-period question costs the model one tool call instead of dozens, and the
+# arithmetic happens here rather than in the model's head.
+FINANCIAL_ANALYSIS_TOOLS_BLOCK = '''
+
+_FINANCIALS_PATH = "/companies/{id}/financials/"
+_FISCAL_PERIODS = ("FY", "H1", "H2", "Q1", "Q2", "Q3", "Q4", "9M")
+_MAX_LINE_ITEMS = 20
+_ISIC_CLASS_RE = re.compile(r"^[0-9]{4}$")
+
+
+def _parse_line_items(line_items: str) -> list[str]:
+    codes = list(dict.fromkeys(c.strip() for c in (line_items or "").split(",") if c.strip()))
+    if not codes:
+        raise ToolInputError("line_items must list at least one KPI code, e.g. 'revenue,ebitda'.")
+    if len(codes) > _MAX_LINE_ITEMS:
+        raise ToolInputError(f"line_items accepts at most {_MAX_LINE_ITEMS} codes per call.")
+    return codes
+
+
+def _number(raw: Any) -> Optional[float]:
+    """A line item's decimal string as a finite float, else None."""
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        return None
+    if value != value or value in (float("inf"), float("-inf")):
+        return None
+    return value
+
+
+def _currency_code(raw: Any) -> str:
+    """A currency as its code string, whether sent as `{code: ...}` or bare."""
+    if isinstance(raw, dict):
+        raw = raw.get("code")
+    return raw if isinstance(raw, str) else ""
+
+
+def _period_line_items(doc: dict[str, Any], fiscal_period: str) -> dict[int, dict[str, dict[str, Any]]]:
+    """`{fiscal_year: {code: item}}` from one financials document.
+
+    Only periods of `fiscal_period` count. Each item carries its `name`,
+    `value` (a float, or None when reported null or unparseable — never
+    guessed at), `currency`, `sort_order` and the period's `period_end_date`.
+    A line item's own currency wins over its statement's, which wins over the
+    company's.
+    """
+    company_currency = _currency_code(doc.get("currency"))
+    by_year: dict[int, dict[str, dict[str, Any]]] = {}
+    for period in doc.get("periods") or []:
+        year = period.get("fiscal_year")
+        if year is None or period.get("fiscal_period") != fiscal_period:
+            continue
+        items = by_year.setdefault(year, {})
+        for statement in period.get("statements") or []:
+            statement_currency = _currency_code(statement.get("currency")) or company_currency
+            for item in statement.get("line_items") or []:
+                code = item.get("code")
+                if not code or code in items:
+                    continue
+                items[code] = {
+                    "name": item.get("name") or code,
+                    "value": _number(item.get("value")),
+                    "currency": _currency_code(item.get("currency")) or statement_currency,
+                    "sort_order": item.get("sort_order"),
+                    "statement_type": statement.get("statement_type"),
+                    "period_end_date": period.get("period_end_date"),
+                }
+    return by_year
+
+
+def _line_item_order(code: str, item: dict[str, Any]) -> tuple[Any, ...]:
+    """Statement order: by statement type, then the upstream `sort_order`."""
+    order = item.get("sort_order")
+    return (item.get("statement_type") or "", order is None, order or 0, code)
+
+
+def _period_values(doc: dict[str, Any], fiscal_period: str) -> dict[int, dict[str, tuple[float, str]]]:
+    """`{fiscal_year: {code: (value, currency)}}`, non-null values only."""
+    return {
+        year: {
+            code: (item["value"], item["currency"])
+            for code, item in items.items()
+            if item["value"] is not None
+        }
+        for year, items in _period_line_items(doc, fiscal_period).items()
+    }
+
+
+def _describe(values: list[float]) -> dict[str, Any]:
+    """Median, quartiles, mean and range of one sample (n >= 1)."""
+    ordered = sorted(values)
+    if len(ordered) > 1:
+        p25, _, p75 = statistics.quantiles(ordered, n=4, method="inclusive")
+    else:
+        p25 = p75 = ordered[0]
+    return {
+        "n": len(ordered),
+        "median": statistics.median(ordered),
+        "p25": p25,
+        "p75": p75,
+        "mean": statistics.fmean(ordered),
+        "min": ordered[0],
+        "max": ordered[-1],
+    }
+
+
+async def _get_json(func_name: str, url: str, params: dict[str, Any]) -> Any:
+    """One upstream GET for a synthetic tool, failing like a structured tool."""
+    try:
+        response = await _api_get(url, lane="interactive", params=params)
+    except httpx.HTTPError as exc:
+        logger.warning("upstream %s transport error: %s", func_name, exc.__class__.__name__)
+        raise UpstreamHTTPError(
+            f"upstream {func_name} request failed ({exc.__class__.__name__}). "
+            "The FinancialReports API was unreachable or timed out "
+            "(already retried once)."
+        ) from exc
+    if response.status_code != 200:
+        _raise_upstream_error(func_name, response)
+    try:
+        return _scrub_for(func_name, _json_loads(response.content))
+    except ValueError as exc:
+        raise RuntimeError(f"upstream {func_name} returned non-JSON body") from exc
+
+
+async def _isic_peer_ids(isic_class: str, countries: Optional[str], limit: int) -> list[int]:
+    """Ids of up to `limit` companies tagged with ISIC class `isic_class`."""
+    code = (isic_class or "").strip()
+    if not _ISIC_CLASS_RE.match(code):
+        raise ToolInputError("isic_class must be a 4-digit ISIC class code, e.g. '2610'.")
+    params = {"sub_industry": code, "page_size": limit, "view": "summary"}
+    if countries:
+        params["countries"] = countries
+    page = await _get_json("companies_list", "/companies/", params)
+    return [row["id"] for row in page.get("results") or [] if isinstance(row.get("id"), int)]
+
+
+_PEER_STATS_OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "peer_count": {"type": "integer"},
+        "fiscal_period": {"type": "string"},
+        "fiscal_year": {"type": ["integer", "null"]},
+        "statistics": {
+            "type": "object",
+            "description": "line item code -> reporting currency -> summary",
+            "additionalProperties": {
+                "type": "object",
+                "additionalProperties": {
+                    "type": "object",
+                    "properties": {
+                        "n": {"type": "integer"},
+                        "median": {"type": "number"},
+                        "p25": {"type": "number"},
+                        "p75": {"type": "number"},
+                        "mean": {"type": "number"},
+                        "min": {"type": "number"},
+                        "max": {"type": "number"},
+                        "fiscal_years": {"type": "object"},
+                        "company_ids": {"type": "array", "items": {"type": "integer"}},
+                    },
+                },
+            },
+        },
+        "missing": {
+            "type": "object",
+            "description": "line item code -> peers with no value for it",
+            "additionalProperties": {"type": "array", "items": {"type": "integer"}},
+        },
+        "errors": {"type": "array", "items": {"type": "object"}},
+    },
+    "required": ["peer_count", "fiscal_period", "statistics", "missing", "errors"],
+}
+
+
+@mcp.tool(
+    tags={"Companies"},
+    annotations=ToolAnnotations(
+        title="Peer Statistics",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+    output_schema=_PEER_STATS_OUTPUT_SCHEMA,
+)
+async def companies_peer_statistics(
+    line_items: str,
+    isic_class: str | None = None,
+    ids: list[int] | None = None,
+    countries: str | None = None,
+    fiscal_year: int | None = None,
+    fiscal_period: Literal["FY", "H1", "H2", "Q1", "Q2", "Q3", "Q4", "9M"] = "FY",
+    max_peers: int = 30,
+) -> dict[str, Any]:
+    """Peer median, quartiles, mean, min/max and sample size for KPI `line_items` (comma-separated codes), computed server-side and grouped by reporting currency — never mixed. Peers are `ids`, or up to `max_peers` (max 50) companies in 4-digit ISIC class `isic_class`, optionally within `countries`. Each peer contributes its `fiscal_year` value, or its latest year with data; `missing` lists peers without a value. Quote `n` with every statistic."""
+    resets = await _authorize_or_raise()
+    try:
+        codes = _parse_line_items(line_items)
+        if (isic_class is None) == (ids is None):
+            raise ToolInputError("Pass exactly one of isic_class or ids.")
+        if ids is None:
+            limit = max(1, min(int(max_peers), _BATCH_MAX_IDS))
+            peer_ids = await _isic_peer_ids(isic_class, countries, limit)
+        else:
+            peer_ids = list(dict.fromkeys(ids))
+        params: dict[str, Any] = {"line_items": ",".join(codes), "fiscal_period": fiscal_period}
+        if fiscal_year is not None:
+            params["fiscal_year"] = fiscal_year
+
+        samples: dict[str, dict[str, list[tuple[int, int, float]]]] = {c: {} for c in codes}
+        missing: dict[str, list[int]] = {c: [] for c in codes}
+        errors: list[dict[str, Any]] = []
+        batch = (
+            await _retrieve_many(
+                "companies_financials_retrieve", _FINANCIALS_PATH, "id", peer_ids, params
+            )
+            if peer_ids
+            else {"results": []}
+        )
+        for entry in batch["results"]:
+            if "error" in entry:
+                errors.append(entry)
+                continue
+            by_year = _period_values(entry["data"], fiscal_period)
+            years = [y for y in by_year if by_year[y]]
+            if fiscal_year is not None:
+                years = [y for y in years if y == fiscal_year]
+            values = by_year[max(years)] if years else {}
+            for code in codes:
+                if code not in values:
+                    missing[code].append(entry["id"])
+                    continue
+                value, currency = values[code]
+                samples[code].setdefault(currency or "unknown", []).append(
+                    (entry["id"], max(years), value)
+                )
+
+        stats: dict[str, dict[str, Any]] = {}
+        for code, by_currency in samples.items():
+            stats[code] = {}
+            for currency, rows in sorted(by_currency.items()):
+                summary = _describe([value for _, _, value in rows])
+                year_counts: dict[str, int] = {}
+                for _, year, _ in rows:
+                    year_counts[str(year)] = year_counts.get(str(year), 0) + 1
+                summary["fiscal_years"] = year_counts
+                summary["company_ids"] = [company_id for company_id, _, _ in rows]
+                stats[code][currency] = summary
+        return {
+            "peer_count": len(peer_ids),
+            "fiscal_period": fiscal_period,
+            "fiscal_year": fiscal_year,
+            "statistics": stats,
+            "missing": missing,
+            "errors": errors,
+        }
+    finally:
+        _release_auth_context(resets)
+
+
+_YOY_COLUMNS = [
+    "code",
+    "name",
+    "prior",
+    "prior_currency",
+    "current",
+    "current_currency",
+    "abs_delta",
+    "pct_delta",
+    "flag",
+]
+
+
+def _yoy_row(
+    code: str, prior: Optional[dict[str, Any]], current: Optional[dict[str, Any]]
+) -> list[Any]:
+    """One aligned row; a delta only when both values exist in one currency."""
+    prior_value = prior["value"] if prior else None
+    current_value = current["value"] if current else None
+    prior_currency = prior["currency"] if prior else None
+    current_currency = current["currency"] if current else None
+    abs_delta = pct_delta = flag = None
+    if prior_value is None:
+        flag = "prior_null"
+    elif current_value is None:
+        flag = "current_null"
+    elif prior_currency != current_currency:
+        flag = "currency_changed"
+    else:
+        abs_delta = current_value - prior_value
+        if prior_value:
+            pct_delta = round(abs_delta / abs(prior_value) * 100, 2)
+        else:
+            flag = "prior_zero"
+    return [
+        code,
+        (current or prior)["name"],
+        prior_value,
+        prior_currency,
+        current_value,
+        current_currency,
+        abs_delta,
+        pct_delta,
+        flag,
+    ]
+
+
+_YOY_OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "company_id": {"type": "integer"},
+        "fiscal_period": {"type": "string"},
+        "current_fiscal_year": {"type": "integer"},
+        "prior_fiscal_year": {"type": "integer"},
+        "period_end_date": {"type": "object"},
+        "currency_changed": {"type": "boolean"},
+        "missing_years": {"type": "array", "items": {"type": "integer"}},
+        "columns": {"type": "array", "items": {"type": "string"}},
+        "rows": {"type": "array", "items": {"type": "array"}},
+        "row_count": {"type": "integer"},
+    },
+    "required": ["company_id", "columns", "rows", "currency_changed", "missing_years"],
+}
+
+
+@mcp.tool(
+    tags={"Companies"},
+    annotations=ToolAnnotations(
+        title="Year-over-Year Financials",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+    output_schema=_YOY_OUTPUT_SCHEMA,
+)
+async def companies_financials_yoy(
+    id: int,
+    current_fiscal_year: int,
+    prior_fiscal_year: int,
+    line_items: str | None = None,
+    statement_type: Literal["BS", "CFS", "IS"] | None = None,
+    fiscal_period: Literal["FY", "H1", "H2", "Q1", "Q2", "Q3", "Q4", "9M"] = "FY",
+    top: int | None = None,
+) -> dict[str, Any]:
+    """Year-over-year table of a company's reported line items, computed server-side: one row per line item (see `columns`) with both values and the absolute and percent delta, largest movers first. A row whose currency changed is flagged `currency_changed` with no delta; a value missing in one year is flagged `prior_null`/`current_null` — show it as n/a, never 0. `top` keeps the N largest movers."""
+    resets = await _authorize_or_raise()
+    try:
+        if current_fiscal_year == prior_fiscal_year:
+            raise ToolInputError("current_fiscal_year and prior_fiscal_year must differ.")
+        url = _FINANCIALS_PATH.format(id=_validate_path_param("id", id))
+        params: dict[str, Any] = {"fiscal_period": fiscal_period}
+        if line_items:
+            params["line_items"] = ",".join(_parse_line_items(line_items))
+        if statement_type:
+            params["statement_type"] = statement_type
+        current_doc, prior_doc = await asyncio.gather(
+            _get_json(
+                "companies_financials_retrieve", url, {**params, "fiscal_year": current_fiscal_year}
+            ),
+            _get_json(
+                "companies_financials_retrieve", url, {**params, "fiscal_year": prior_fiscal_year}
+            ),
+        )
+        current = _period_line_items(current_doc, fiscal_period).get(current_fiscal_year, {})
+        prior = _period_line_items(prior_doc, fiscal_period).get(prior_fiscal_year, {})
+
+        codes = sorted(
+            set(current) | set(prior),
+            key=lambda code: _line_item_order(code, current.get(code) or prior[code]),
+        )
+        all_rows = [_yoy_row(code, prior.get(code), current.get(code)) for code in codes]
+        # Largest absolute movers first; flagged rows keep statement order after them.
+        all_rows.sort(key=lambda row: (row[6] is None, -abs(row[6] or 0.0)))
+        rows = all_rows if top is None else all_rows[: max(0, int(top))]
+
+        def _end_date(items: dict[str, dict[str, Any]]) -> Optional[str]:
+            return next((i["period_end_date"] for i in items.values() if i["period_end_date"]), None)
+
+        return {
+            "company_id": id,
+            "fiscal_period": fiscal_period,
+            "current_fiscal_year": current_fiscal_year,
+            "prior_fiscal_year": prior_fiscal_year,
+            "period_end_date": {"current": _end_date(current), "prior": _end_date(prior)},
+            "currency_changed": any(row[8] == "currency_changed" for row in all_rows),
+            "missing_years": [
+                year
+                for year, items in ((current_fiscal_year, current), (prior_fiscal_year, prior))
+                if not items
+            ],
+            "columns": _YOY_COLUMNS,
+            "rows": rows,
+            "row_count": len(all_rows),
+        }
+    finally:
+        _release_auth_context(resets)
+
+
+_MATRIX_META_COLUMNS = ["code", "name", "statement_type"]
+
+
+_MATRIX_OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "company_id": {"type": "integer"},
+        "fiscal_period": {"type": "string"},
+        "fiscal_years": {"type": "array", "items": {"type": "integer"}},
+        "period_end_date": {"type": "array", "items": {"type": ["string", "null"]}},
+        "currency": {"type": "array", "items": {"type": ["string", "null"]}},
+        "columns": {"type": "array", "items": {"type": "string"}},
+        "rows": {"type": "array", "items": {"type": "array"}},
+        "currency_exceptions": {"type": "array", "items": {"type": "object"}},
+        "row_count": {"type": "integer"},
+    },
+    "required": ["company_id", "fiscal_years", "columns", "rows"],
+}
+
+
+@mcp.tool(
+    tags={"Companies"},
+    annotations=ToolAnnotations(
+        title="Financials Matrix",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+    output_schema=_MATRIX_OUTPUT_SCHEMA,
+)
+async def companies_financials_matrix(
+    id: int,
+    fiscal_year_from: int | None = None,
+    fiscal_year_to: int | None = None,
+    line_items: str | None = None,
+    statement_type: Literal["BS", "CFS", "IS"] | None = None,
+    fiscal_period: Literal["FY", "H1", "H2", "Q1", "Q2", "Q3", "Q4", "9M"] = "FY",
+) -> dict[str, Any]:
+    """A company's reported line items across fiscal years as one compact matrix — the multi-year trend view of `companies_financials_retrieve` at a fraction of its size. `fiscal_years`, `period_end_date` and `currency` are header rows aligned with the year columns of `columns`; each row is a line item followed by one value per year (null = not reported, never 0). A cell whose currency differs from its year's header is listed in `currency_exceptions`."""
+    resets = await _authorize_or_raise()
+    try:
+        if (
+            fiscal_year_from is not None
+            and fiscal_year_to is not None
+            and fiscal_year_from > fiscal_year_to
+        ):
+            raise ToolInputError("fiscal_year_from must not be after fiscal_year_to.")
+        url = _FINANCIALS_PATH.format(id=_validate_path_param("id", id))
+        params: dict[str, Any] = {"fiscal_period": fiscal_period}
+        if fiscal_year_from is not None:
+            params["fiscal_year_from"] = fiscal_year_from
+        if fiscal_year_to is not None:
+            params["fiscal_year_to"] = fiscal_year_to
+        if line_items:
+            params["line_items"] = ",".join(_parse_line_items(line_items))
+        if statement_type:
+            params["statement_type"] = statement_type
+        doc = await _get_json("companies_financials_retrieve", url, params)
+        by_year = {
+            year: items
+            for year, items in _period_line_items(doc, fiscal_period).items()
+            if items
+        }
+        years = sorted(by_year)
+
+        header_currency: list[Optional[str]] = []
+        end_dates: list[Optional[str]] = []
+        for year in years:
+            items = by_year[year].values()
+            # The year's currency is the one most of its line items report in.
+            counts: dict[str, int] = {}
+            for item in items:
+                if item["currency"]:
+                    counts[item["currency"]] = counts.get(item["currency"], 0) + 1
+            header_currency.append(max(counts, key=counts.get) if counts else None)
+            end_dates.append(next((i["period_end_date"] for i in items if i["period_end_date"]), None))
+
+        first_seen: dict[str, dict[str, Any]] = {}
+        for year in reversed(years):
+            for code, item in by_year[year].items():
+                first_seen.setdefault(code, item)
+        codes = sorted(first_seen, key=lambda code: _line_item_order(code, first_seen[code]))
+
+        rows: list[list[Any]] = []
+        exceptions: list[dict[str, Any]] = []
+        for code in codes:
+            item = first_seen[code]
+            row: list[Any] = [code, item["name"], item["statement_type"]]
+            for year, currency in zip(years, header_currency):
+                cell = by_year[year].get(code)
+                row.append(cell["value"] if cell else None)
+                if cell and cell["value"] is not None and cell["currency"] != currency:
+                    exceptions.append(
+                        {"code": code, "fiscal_year": year, "currency": cell["currency"]}
+                    )
+            rows.append(row)
+
+        return {
+            "company_id": id,
+            "fiscal_period": fiscal_period,
+            "fiscal_years": years,
+            "period_end_date": end_dates,
+            "currency": header_currency,
+            "columns": _MATRIX_META_COLUMNS + [str(year) for year in years],
+            "rows": rows,
+            "currency_exceptions": exceptions,
+            "row_count": len(rows),
+        }
+    finally:
+        _release_auth_context(resets)
+
+
+_DIGEST_COLUMNS = ["id", "date", "type", "title", "viewer_url"]
+_DIGEST_MAX_LOOKBACK_DAYS = 3650
+
+
+def _digest_row(filing: dict[str, Any]) -> list[Any]:
+    filing_type = filing.get("filing_type") or {}
+    return [
+        filing.get("id"),
+        (filing.get("release_datetime") or "")[:10] or None,
+        filing_type.get("name") or filing_type.get("code"),
+        filing.get("title"),
+        filing.get("viewer_url"),
+    ]
+
+
+_DIGEST_OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "company": {"type": "integer"},
+        "release_datetime_from": {"type": "string"},
+        "count": {"type": ["integer", "null"]},
+        "returned": {"type": "integer"},
+        "truncated": {"type": "boolean"},
+        "next": {"type": ["string", "null"]},
+        "columns": {"type": "array", "items": {"type": "string"}},
+        "categories": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "category": {"type": "string"},
+                    "count": {"type": "integer"},
+                    "rows": {"type": "array", "items": {"type": "array"}},
+                },
+            },
+        },
+        "history_window": {"type": ["object", "null"]},
+    },
+    "required": ["company", "count", "returned", "truncated", "columns", "categories"],
+}
+
+
+@mcp.tool(
+    tags={"Filings"},
+    annotations=ToolAnnotations(
+        title="Recent Filings Digest",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+    output_schema=_DIGEST_OUTPUT_SCHEMA,
+)
+async def filings_recent_digest(
+    company: int,
+    lookback_days: int = 90,
+) -> dict[str, Any]:
+    """Every filing a company released in the last `lookback_days`, newest first and grouped by filing category, in one call — all pages are fetched server-side. Each row is `columns` (id, date, type, title, viewer_url); each category carries its `count`. If `truncated`, `returned` of `count` filings fit; `next` resumes the walk via `filings_list`."""
+    resets = await _authorize_or_raise()
+    try:
+        days = int(lookback_days)
+        if not 1 <= days <= _DIGEST_MAX_LOOKBACK_DAYS:
+            raise ToolInputError(
+                f"lookback_days must be between 1 and {_DIGEST_MAX_LOOKBACK_DAYS}."
+            )
+        cutoff = (_dt.datetime.now(_dt.timezone.utc) - _dt.timedelta(days=days)).strftime(
+            "%Y-%m-%dT00:00:00Z"
+        )
+        params = {
+            "company": company,
+            "release_datetime_from": cutoff,
+            "ordering": "-release_datetime",
+            "view": "summary",
+        }
+        history_window: list[Any] = []
+
+        async def _fetch(page_params: dict[str, Any]) -> dict[str, Any]:
+            page = await _get_json("filings_list", "/filings/", page_params)
+            if not history_window:
+                history_window.append(page.get("history_window"))
+            return page
+
+        merged = await _auto_paginate(_fetch, "/filings/", params, _AUTO_PAGINATE_MAX_ITEMS)
+
+        groups: dict[str, dict[str, Any]] = {}
+        for filing in merged["results"]:
+            category = ((filing.get("filing_type") or {}).get("category") or {})
+            name = category.get("name") or "Uncategorized"
+            group = groups.setdefault(
+                name,
+                {"sort_order": category.get("sort_order"), "category": name, "rows": []},
+            )
+            group["rows"].append(_digest_row(filing))
+        ordered = sorted(
+            groups.values(),
+            key=lambda g: (g["sort_order"] is None, g["sort_order"] or 0, g["category"]),
+        )
+        return {
+            "company": company,
+            "release_datetime_from": cutoff,
+            "count": merged["count"],
+            "returned": len(merged["results"]),
+            "truncated": merged["next"] is not None,
+            "next": merged["next"],
+            "columns": _DIGEST_COLUMNS,
+            "categories": [
+                {"category": g["category"], "count": len(g["rows"]), "rows": g["rows"]}
+                for g in ordered
+            ],
+            "history_window": history_window[0] if history_window else None,
+        }
+    finally:
+        _release_auth_context(resets)
+
+
+# Feed cursors: an opaque token per poll, mapped per user to the window the
+# next poll starts from. Windows close _FEED_SETTLE_SECONDS in the past so a
+# write still in flight lands in the next window instead of between two.
+# The list endpoint has no id__gt filter and cannot order by updated_date, so
+# updated_date itself is the key a backlog is drained by. Each poll reads one
+# window with its updated_date_to frozen, all pages at once through
+# `_auto_paginate`, sized to hold about _AUTO_PAGINATE_MAX_ITEMS changes: the
+# cursor keeps the width the last window's density calls for, and the first
+# page's `count` checks it (a window that turns out fuller is cut in
+# proportion and re-checked). The next poll starts where the window ended; no
+# page number outlives a call, so a filing updated mid-drain moves past the
+# frozen bound into a later window instead of shifting unread rows onto a
+# page already returned. A window that still comes back short (the byte cap,
+# a failed page) is read again narrower. Only a single second holding more
+# changes than one window is paged to the end, within one call, and the next
+# poll starts after it.
+# Bounds are inclusive and to the second, so rows updated in a window's last
+# second come back in the next window; their (id, updated_date) pairs are the
+# cursor's `seen` list and are dropped there, while a later update of the same
+# filing carries a new updated_date and is returned again. A used cursor stays
+# valid, so a client that lost the response can repeat the poll, until the
+# cursor after it is used; then it is deleted.
+_FEED_CURSOR_TTL = float(os.environ.get("MCP_FEED_CURSOR_TTL_SECONDS", str(14 * 24 * 3600)))
+_FEED_SETTLE_SECONDS = 30
+_FEED_MAX_LOOKBACK_HOURS = 24 * 30
+_FEED_FILTERS = ("on_watchlist", "company", "countries", "categories", "types")
+_feed_cursors = _SharedTTLStore("filings-feed", _FEED_CURSOR_TTL)
+
+
+def _feed_timestamp(ts: float) -> str:
+    return _dt.datetime.fromtimestamp(ts, _dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _feed_epoch(stamp: str) -> int:
+    """An ISO-8601 timestamp, any offset (none means UTC), as whole UTC seconds."""
+    parsed = _dt.datetime.fromisoformat(stamp)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=_dt.timezone.utc)
+    return int(parsed.timestamp() // 1)
+
+
+def _feed_seen_key(filing: dict[str, Any]) -> str:
+    return f"{filing.get('id')}@{filing.get('updated_date')}"
+
+
+def _feed_key_epoch(key: str) -> Optional[int]:
+    try:
+        return _feed_epoch(key.partition("@")[2])
+    except ValueError:
+        return None
+
+
+def _feed_row(filing: dict[str, Any]) -> dict[str, Any]:
+    """What a feed poll keeps of a full filing row; small, so `_auto_paginate`'s
+    byte cap counts the rows returned, not the upstream's."""
+    return {"id": filing.get("id"), "key": _feed_seen_key(filing), "row": _digest_row(filing)}
+
+
+_FEED_OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "cursor": {"type": "string"},
+        "since": {"type": "string"},
+        "until": {"type": "string"},
+        "count": {"type": ["integer", "null"]},
+        "returned": {"type": "integer"},
+        "has_more": {"type": "boolean"},
+        "columns": {"type": "array", "items": {"type": "string"}},
+        "rows": {"type": "array", "items": {"type": "array"}},
+    },
+    "required": ["cursor", "since", "until", "returned", "has_more", "columns", "rows"],
+}
+
+
+@mcp.tool(
+    tags={"Filings"},
+    annotations=ToolAnnotations(
+        title="Filings Changes Feed",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=False,
+        openWorldHint=False,
+    ),
+    output_schema=_FEED_OUTPUT_SCHEMA,
+)
+async def filings_changes_since(
+    cursor: str | None = None,
+    on_watchlist: bool | None = None,
+    company: int | None = None,
+    countries: str | None = None,
+    categories: str | None = None,
+    types: str | None = None,
+    lookback_hours: int = 24,
+) -> dict[str, Any]:
+    """Filings added or updated since your last poll — for monitoring a watchlist or a screen without re-reading what you have seen. The first call (no `cursor`) returns the last `lookback_hours` of changes matching the filters; every response carries a new `cursor`, and passing it back returns only changes since. A cursor keeps the filters it started with. If `has_more`, poll again with the new cursor right away. Rows follow `columns`."""
+    resets = await _authorize_or_raise()
+    try:
+        filters = {
+            name: value
+            for name, value in zip(
+                _FEED_FILTERS, (on_watchlist, company, countries, categories, types)
+            )
+            if value is not None
+        }
+        owner = _current_sub.get()
+        if cursor is None:
+            hours = int(lookback_hours)
+            if not 1 <= hours <= _FEED_MAX_LOOKBACK_HOURS:
+                raise ToolInputError(
+                    f"lookback_hours must be between 1 and {_FEED_MAX_LOOKBACK_HOURS}."
+                )
+            state = {
+                "filters": filters,
+                "since": _feed_timestamp(time.time() - hours * 3600),
+                "until": None,
+                "seen": [],
+                "width": None,
+                "previous": None,
+            }
+        else:
+            state = await _feed_cursors.get(f"{owner}:{cursor}")
+            if state is None:
+                raise ToolInputError(
+                    "Unknown or expired cursor. Call without a cursor to start a new feed."
+                )
+            if filters and filters != state["filters"]:
+                raise ToolInputError(
+                    "A cursor keeps the filters it was started with; "
+                    "call without a cursor to change them."
+                )
+
+        end = state["until"] or _feed_timestamp(time.time() - _FEED_SETTLE_SECONDS)
+        params = {
+            **state["filters"],
+            "updated_date_from": state["since"],
+            "ordering": "id",
+            "view": "full",  # the summary view has no updated_date
+            "page": 1,
+            "page_size": _AUTO_PAGINATE_PAGE_SIZE,
+        }
+        probes: dict[str, dict[str, Any]] = {}
+
+        async def _fetch(page_params: dict[str, Any]) -> dict[str, Any]:
+            upper = page_params["updated_date_to"]
+            if int(page_params["page"]) == 1 and upper in probes:
+                return probes[upper]
+            doc = await _get_json("filings_list", "/filings/", page_params)
+            return {**doc, "results": [_feed_row(f) for f in doc.get("results") or []]}
+
+        low, high = _feed_epoch(state["since"]), _feed_epoch(end)
+        width = state.get("width")
+        top = high if width is None else min(high, low + width)
+        while True:
+            upper = _feed_timestamp(top)
+            probes[upper] = await _fetch({**params, "updated_date_to": upper})
+            count = int(probes[upper].get("count") or 0)
+            if count <= _AUTO_PAGINATE_MAX_ITEMS or top == low:
+                break
+            # Fuller than one window: cut in proportion, as if evenly spread.
+            top = low + min(top - low - 1, (top - low) * _AUTO_PAGINATE_MAX_ITEMS // count)
+
+        window = {**params, "updated_date_to": upper}
+        merged = await _auto_paginate(_fetch, "/filings/", window, _AUTO_PAGINATE_MAX_ITEMS)
+        results = list(merged["results"])
+        while merged["next"] and top == low:  # one second, more than a window
+            resume = int(httpx.URL(merged["next"]).params["page"])
+            merged = await _auto_paginate(
+                _fetch, "/filings/", {**window, "page": resume}, _AUTO_PAGINATE_MAX_ITEMS
+            )
+            results.extend(merged["results"])
+        complete = merged["next"] is None
+
+        seen = set(state["seen"])
+        rows = []
+        for result in results:
+            if result["key"] not in seen:
+                seen.add(result["key"])
+                rows.append(result["row"])
+
+        drained = complete and top == high
+        if not complete:
+            # Read again, narrower; what this poll returned is in `seen`.
+            next_since, width = state["since"], max(1, (top - low) // 2)
+        elif top == low and not drained:
+            # The window was its first second, read whole above; start past it
+            # or the next poll would size itself to it again.
+            next_since, width = _feed_timestamp(low + 1), 1
+        else:
+            # The next window is sized to this one's density, up or down; a new
+            # backlog (after a drain) starts from its whole window again.
+            next_since = upper
+            fitted = (top - low) * _AUTO_PAGINATE_MAX_ITEMS // max(count, 1)
+            width = None if drained else max(1, fitted)
+        floor = _feed_epoch(next_since)
+        carried = dict.fromkeys([*state["seen"], *(result["key"] for result in results)])
+        next_state = {
+            "filters": state["filters"],
+            "since": next_since,
+            "until": None if drained else end,
+            "seen": [key for key in carried if (_feed_key_epoch(key) or floor - 1) >= floor],
+            "width": width,
+            "previous": cursor,
+        }
+        next_cursor = uuid.uuid4().hex
+        await _feed_cursors.set(f"{owner}:{next_cursor}", next_state)
+        if state.get("previous"):
+            await _feed_cursors.delete(f"{owner}:{state['previous']}")
+        return {
+            "cursor": next_cursor,
+            "since": state["since"],
+            "until": upper,
+            "count": count,
+            "returned": len(rows),
+            "has_more": not drained,
+            "columns": _DIGEST_COLUMNS,
+            "rows": rows,
+        }
+    finally:
+        _release_auth_context(resets)
+'''
+
+
 # Guide TOOLS — the fr://guide/* resource content exposed ALSO as tools, for
 # tool-only MCP clients that can't read MCP resources. Emitted on the pruned
 # default surface (they stand in for the dropped ISIC/reference tools).
@@ -4179,7 +7007,7 @@ PROMPTS_BLOCK = '''
 # MCP Prompts — server-defined slash commands for recurring workflows.
 # Registered via @mcp.prompt(); surface in MCP clients as slash commands.
 # ---------------------------------------------------------------------------
-from mcp.types import PromptMessage, TextContent
+from mcp.types import PromptMessage
 
 
 @mcp.prompt(
@@ -4207,15 +7035,18 @@ async def compare_financials_yoy(
         "resolve the company. If multiple results, pick the one whose "
         "primary listing matches the user's intent; if ambiguous, ask "
         "the user.\\n"
-        "2. Call `companies_financials_retrieve` twice — once with "
-        f"fiscal_year={current_fiscal_year} and once with "
-        f"fiscal_year={prior_fiscal_year}.\\n"
-        "3. Summarize the top 8 line items by absolute change. For each, "
-        "report: absolute delta, percent change, and the reporting "
-        "currency. Never aggregate across currencies. If the reporting "
-        "currency changed between the two years, surface both currencies "
-        "side-by-side and STOP — do not compute a delta. If a line item "
-        "is null in one year, render it as 'n/a' (not 0).\\n"
+        "2. Call `companies_financials_yoy` with id=<id>, "
+        f"current_fiscal_year={current_fiscal_year}, "
+        f"prior_fiscal_year={prior_fiscal_year}, top=8. It fetches both "
+        "years and returns the aligned table with deltas already computed. "
+        "(Only if that tool is unavailable: call "
+        "`companies_financials_retrieve` once per fiscal year and compute "
+        "the same table by hand.)\\n"
+        "3. Present the rows: value in each year, absolute delta, percent "
+        "change, and the reporting currency. Never aggregate across "
+        "currencies. A row flagged `currency_changed` has no delta — show "
+        "both currencies side-by-side and STOP; do not compute one. A row "
+        "flagged `prior_null` / `current_null` renders as 'n/a' (not 0).\\n"
         "4. Cite filing type and period_end_date for each value used."
     )
     return [
@@ -4300,16 +7131,16 @@ async def summarize_recent_filings(
         f"{lookback_days} days (released on or after {cutoff}).\\n\\n"
         "Steps:\\n"
         f"1. `companies_list` with search=\\"{ticker_or_name}\\".\\n"
-        f"2. `filings_list` with company=<id>, "
-        f"release_datetime_from='{cutoff}', "
-        "ordering=-publication_datetime, limit=50. The server-side "
-        "release_datetime_from filter avoids the silent-truncation bug "
-        "you get from in-memory filtering on a small page. If "
-        "response.count > 50, tell the user how many were elided.\\n"
+        f"2. `filings_recent_digest` with company=<id>, "
+        f"lookback_days={lookback_days}. It walks every page server-side "
+        "and returns the filings already grouped by category. If "
+        "`truncated` is true, tell the user how many of `count` were "
+        "left out. (Without that tool: `filings_list` with company=<id>, "
+        f"release_datetime_from='{cutoff}', ordering=-release_datetime, "
+        "max_items=500.)\\n"
         "3. Produce a briefing: one bullet per filing with type, "
-        "publication_datetime, and a one-line significance assessment. "
-        "Group by filing category (annual / interim / ad-hoc / "
-        "insider).\\n"
+        "date, and a one-line significance assessment, under the "
+        "digest's category headings.\\n"
         "4. Highlight anything that looks material (guidance changes, "
         "M&A language, going-concern flags) and call it out in a "
         "'Watch items' section. Do NOT fetch markdown bodies unless the "
@@ -4355,6 +7186,221 @@ STRUCTURED_OUTPUT_TOOLS = {
     "isins_list",
 }
 
+# Structured list tools that take DRF `page`/`page_size` also get an opt-in
+# `max_items` (see `_auto_paginate` in the emitted module). One sentence of
+# description, appended only where the parameter exists. It names no limit:
+# the cap is MCP_AUTO_PAGINATE_MAX_ITEMS, set per deployment at runtime.
+AUTO_PAGINATE_NOTE = (
+    "\n\n**Many rows:** `max_items` merges pages into one call; "
+    "values above the server's cap are clamped."
+)
+
+
+# List operations with a `view` enum default to its most compact value,
+# whatever the upstream default: a model that omits `view` (most calls) gets
+# the small rows, and the description says how to ask for the detailed ones.
+# The output_schema is the 200-response schema, which for these operations is
+# the compact row (PaginatedCompanyMinimalList, FilingSummary). `view="full"`
+# rows are a different field set, not a superset -- a full Filing has
+# `document` where the summary has `document_url`, a full Company
+# `sub_industry` for `sub_industry_code` -- and pass that schema only because
+# it lists no required keys (see `_drop_required`) and allows extra ones.
+COMPACT_VIEWS = ("minimal", "compact", "summary")
+
+
+def compact_view(operation: dict, params: list) -> str:
+    """Default the `view` param to its most compact value; the hint to append."""
+    view = next(
+        (p for p in operation.get("parameters") or [] if p.get("in") == "query" and p.get("name") == "view"),
+        None,
+    )
+    values = (view or {}).get("schema", {}).get("enum") or []
+    compact = next((v for v in COMPACT_VIEWS if v in values), None)
+    if compact is None:
+        return ""
+    for param in params:
+        if param["original_name"] == "view":
+            param["default_val"] = f' = "{compact}"'
+    richer = [v for v in values if v != compact]
+    upgrade = (
+        f'; `view="{richer[-1]}"` returns the detailed representation (different field set)'
+        if richer
+        else ""
+    )
+    return f'\n\n**Detail:** rows are the compact `view="{compact}"`{upgrade}.'
+
+
+# Unstructured list tools returning a DRF `results` page also get an opt-in
+# `output_format="table"` (see `_format_table` in the emitted module).
+TABLE_OUTPUT_NOTE = (
+    "\n\n**Compact:** `output_format=\"table\"` returns one row per item under one header."
+)
+
+# Keys a nested object contributes to the table, when it has them.
+_TABLE_NESTED_KEYS = ("id", "code", "name")
+
+
+def _object_branch(node: dict) -> dict | None:
+    """The object schema in `node`, looking through allOf/oneOf/anyOf."""
+    if not isinstance(node, dict):
+        return None
+    if isinstance(node.get("properties"), dict):
+        return node
+    for key in ("allOf", "oneOf", "anyOf"):
+        for branch in node.get(key) or []:
+            if isinstance(branch, dict) and isinstance(branch.get("properties"), dict):
+                return branch
+    return None
+
+
+def table_columns(response_schema: dict | None) -> tuple[str, ...]:
+    """Table columns for a DRF page response, or () if it is not one.
+
+    Scalar and array fields are columns as they are; a nested object becomes
+    `field.id` / `field.code` / `field.name` for whichever it has, or one
+    JSON cell if it has none. Hidden fields are left out.
+    """
+    page = _object_branch(response_schema or {})
+    if page is None or "results" not in page["properties"]:
+        return ()
+    item = _object_branch(page["properties"]["results"].get("items") or {})
+    if item is None:
+        return ()
+    columns: list[str] = []
+    for name, prop in item["properties"].items():
+        if name in CLIENT_HIDDEN_FIELDS:
+            continue
+        nested = _object_branch(prop)
+        keys = [k for k in _TABLE_NESTED_KEYS if nested and k in nested["properties"]]
+        if keys:
+            columns.extend(f"{name}.{k}" for k in keys)
+        else:
+            columns.append(name)
+    return tuple(columns)
+
+
+# GET tools returning JSON objects also get an optional `fields` projection (see
+# `_parse_fields` in the emitted module), unless the operation has its own.
+FIELDS_NOTE = (
+    "\n\n**Fewer fields:** `fields=\"id,name\"` (dotted for nested) returns only those."
+)
+
+
+def projection_target(response_schema: dict | None) -> tuple[dict | None, bool]:
+    """The object schema `fields` selects from, and whether it is a page row."""
+    root = _object_branch(response_schema or {})
+    if root is None:
+        return None, False
+    results = root["properties"].get("results")
+    if isinstance(results, dict):
+        return _object_branch(results.get("items") or {}), True
+    return root, False
+
+
+def field_projection(operation: dict, response_schema: dict | None) -> tuple[tuple[str, ...], bool]:
+    """Top-level field names for `fields`, and whether they apply to page rows.
+
+    Empty when the response has no object to project or the operation already
+    takes a `fields` query parameter (which then goes upstream as is).
+    """
+    if any(p.get("name") == "fields" for p in operation.get("parameters") or []):
+        return (), False
+    target, on_results = projection_target(response_schema)
+    if target is None:
+        return (), False
+    names = tuple(n for n in target["properties"] if n not in CLIENT_HIDDEN_FIELDS)
+    return names, on_results
+
+
+# Structured tools whose results are split to the result-size budget (see
+# `_budget_result` in the emitted module), beyond pages, which split on
+# `results`: the key holding the rows to split on.
+RESULT_BUDGET_KEYS = {
+    "companies_financials_retrieve": "periods",
+}
+
+CONTINUATION_NOTE = (
+    "\n\n**Large results:** if `continuation` is set, the rest did not fit; "
+    "call again with it for the next part."
+)
+
+
+def budget_key(func_name: str, response_schema: dict | None) -> str:
+    """The list a structured result is split on when over budget, or ""."""
+    root = _object_branch(response_schema or {})
+    if root is None:
+        return ""
+    key = RESULT_BUDGET_KEYS.get(func_name, "results")
+    return key if key in root["properties"] else ""
+
+
+def endpoint_templates(paths: dict) -> list[str]:
+    """Spec path templates in match order for `_endpoint_family`: fewest
+    parameters first, so a literal segment wins over a `{param}` one."""
+    return sorted(paths, key=lambda path: (path.count("{"), path))
+
+
+def checked_schema_repr(output_schema: dict) -> str:
+    """`repr` of an output schema, after checking it against its metaschema.
+
+    Done here, once per build, so the emitted module only has to construct
+    its validators (see `_compile_output_validators`); a bad schema fails the
+    build instead of every call.
+    """
+    jsonschema.validators.validator_for(output_schema).check_schema(output_schema)
+    return repr(output_schema)
+
+
+def _drop_required(node: Any) -> Any:
+    """Remove every `required` list below `node`: a projection may omit any field."""
+    if isinstance(node, dict):
+        if isinstance(node.get("required"), list):
+            node.pop("required")
+        for v in node.values():
+            _drop_required(v)
+    elif isinstance(node, list):
+        for v in node:
+            _drop_required(v)
+    return node
+
+
+# Retrieves that also get a `<name>_many(ids)` batch companion, mapped to the
+# path parameter the ids fill. Chosen for peer comparisons, which otherwise
+# cost one round trip per company.
+BATCH_RETRIEVE_TOOLS = {
+    "companies_retrieve": "id",
+    "companies_financials_retrieve": "id",
+}
+
+
+def batch_output_schema(item_schema: dict) -> dict:
+    """Output schema of a `_many` tool: per-id `data` (the single-id schema) or `error`."""
+    return {
+        "type": "object",
+        "properties": {
+            "results": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "integer"},
+                        "data": item_schema,
+                        "error": {"type": "string"},
+                        "error_kind": {"type": "string"},
+                    },
+                    "required": ["id"],
+                },
+            },
+        },
+        "required": ["results"],
+    }
+
+
+def is_paginated(params: list[dict]) -> bool:
+    """True when an operation's query params include DRF page + page_size."""
+    names = {p["original_name"] for p in params if p["is_query"]}
+    return {"page", "page_size"} <= names
+
 
 def deeply_inline_refs(node: Any, full_schema: dict, _seen: tuple[str, ...] = ()) -> Any:
     """Walk a JSON-Schema fragment and substitute any `$ref` with the
@@ -4391,6 +7437,73 @@ def deeply_inline_refs(node: Any, full_schema: dict, _seen: tuple[str, ...] = ()
     return node
 
 
+# `deeply_inline_refs` writes a shared component out at every place it is used:
+# companies_retrieve carried the sector block four times and the industry
+# group three (each level of the ISIC hierarchy repeats the ones above it).
+# As the last step before emitting, repeated object subtrees move to the
+# schema's own `$defs` and are referenced from there — still one self-contained
+# schema per tool, root `type: object`, nullable fixes untouched; a client
+# resolves `#/$defs/...` within the schema it was given. Subtrees below
+# _DEFS_MIN_BYTES stay inline: a `$ref` plus its `$defs` entry costs about as
+# much as a small object written out twice.
+_DEFS_MIN_BYTES = 120
+
+
+def _schema_slots(node: dict, hint: str):
+    """(container, key, name hint) for each subschema of `node`, recursively."""
+    for key in ("items", "additionalProperties", "not"):
+        if isinstance(node.get(key), dict):
+            yield node, key, hint
+            yield from _schema_slots(node[key], hint)
+    for key in ("properties", "$defs"):
+        members = node.get(key)
+        if isinstance(members, dict):
+            for name, sub in members.items():
+                if isinstance(sub, dict):
+                    yield members, name, name
+                    yield from _schema_slots(sub, name)
+    for key in ("allOf", "anyOf", "oneOf"):
+        for i, sub in enumerate(node.get(key) or []):
+            if isinstance(sub, dict):
+                yield node[key], i, hint
+                yield from _schema_slots(sub, hint)
+
+
+def dedupe_schema(schema: dict) -> dict:
+    """A copy of `schema` with repeated object subtrees moved to local `$defs`.
+
+    Greedy: the subtree whose extraction saves the most bytes goes first,
+    then the counts are taken again (its copies may have hidden smaller
+    repeats, which now live once inside its definition).
+    """
+    schema = copy.deepcopy(schema)
+    defs: dict[str, Any] = {}
+    schema["$defs"] = defs
+    while True:
+        groups: dict[str, list] = {}
+        for container, key, hint in _schema_slots(schema, "root"):
+            node = container[key]
+            if "properties" not in node:
+                continue
+            canon = json.dumps(node, sort_keys=True, separators=(",", ":"))
+            if len(canon) >= _DEFS_MIN_BYTES:
+                groups.setdefault(canon, []).append((container, key, hint))
+        repeated = [(len(c) * (len(g) - 1), g) for c, g in groups.items() if len(g) > 1]
+        if not repeated:
+            break
+        group = max(repeated, key=lambda r: r[0])[1]
+        container, key, hint = group[0]
+        name, n = hint, 2
+        while name in defs:
+            name, n = f"{hint}_{n}", n + 1
+        defs[name] = container[key]
+        for container, key, _ in group:
+            container[key] = {"$ref": f"#/$defs/{name}"}
+    if not defs:
+        del schema["$defs"]
+    return schema
+
+
 def _fix_nullable(node: Any) -> Any:
     """Convert OpenAPI 3.0 ``nullable: true`` to JSON Schema ``type: [T, 'null']``.
 
@@ -4497,6 +7610,73 @@ def _make_fields_nullable(node: Any) -> Any:
     return node
 
 
+# Deeper than any real response; past it the plan falls back to the full walk.
+_SCRUB_PLAN_MAX_DEPTH = 32
+_WALK = {"walk": True}
+
+
+def _merge_scrub_plans(a: dict | None, b: dict | None) -> dict | None:
+    if a is None or b is None:
+        return a if b is None else b
+    if a.get("walk") or b.get("walk"):
+        return dict(_WALK)
+    merged: dict[str, Any] = {}
+    keys = dict(a.get("keys", {}))
+    for name, sub in b.get("keys", {}).items():
+        keys[name] = _merge_scrub_plans(keys.get(name), sub)
+    if keys:
+        merged["keys"] = keys
+    each = _merge_scrub_plans(a.get("each"), b.get("each"))
+    if each is not None:
+        merged["each"] = each
+    return merged
+
+
+def _scrub_plan_node(schema: Any, depth: int) -> dict | None:
+    """The plan node for values matching `schema`; None if they hold no object."""
+    if not isinstance(schema, dict) or depth > _SCRUB_PLAN_MAX_DEPTH:
+        return dict(_WALK)
+    plan: dict | None = None
+    branches = [b for key in ("allOf", "oneOf", "anyOf") for b in schema.get(key) or []]
+    for branch in branches:
+        plan = _merge_scrub_plans(plan, _scrub_plan_node(branch, depth + 1))
+    raw_type = schema.get("type")
+    types = set(raw_type) if isinstance(raw_type, list) else {raw_type} if raw_type else set()
+    props = schema.get("properties")
+    extra = schema.get("additionalProperties")
+    if not (branches or types or isinstance(props, dict) or "items" in schema or extra is not None):
+        return dict(_WALK)  # untyped: anything can be in there
+    if isinstance(props, dict) or isinstance(extra, dict):
+        node: dict[str, Any] = {}
+        keys = {}
+        for name, sub in (props or {}).items():
+            child = _scrub_plan_node(sub, depth + 1)
+            if child is not None:
+                keys[name] = child
+        if keys:
+            node["keys"] = keys
+        if isinstance(extra, dict):
+            each = _scrub_plan_node(extra, depth + 1)
+            if each is not None:
+                node["each"] = each
+        plan = _merge_scrub_plans(plan, node)
+    elif "object" in types or extra is True:
+        plan = _merge_scrub_plans(plan, dict(_WALK))
+    if "array" in types or "items" in schema:
+        plan = _merge_scrub_plans(plan, _scrub_plan_node(schema.get("items"), depth + 1))
+    return plan
+
+
+def compile_scrub_plan(response_schema: dict) -> dict:
+    """The objects a response can contain, as a scrub plan.
+
+    See `_SCRUB_PLANS` in the emitted module for the node format. Compiled
+    from the raw response schema; a response that is not an object at all
+    gets the full walk.
+    """
+    return _scrub_plan_node(response_schema, 0) or dict(_WALK)
+
+
 def _strip_hidden_from_schema(node):
     """Remove every `CLIENT_HIDDEN_FIELDS` key from any `properties` map in a
     JSON-Schema dict (and from any sibling `required` list), recursively.
@@ -4754,6 +7934,39 @@ def extract_query_params(operation: dict) -> list:
     return params
 
 
+# `ordering` descriptions list the accepted fields: "Available fields: `id`, `name`."
+_ORDERING_FIELDS_RE = re.compile(r"Available fields:\s*((?:`[^`]+`(?:,\s*)?)+)")
+_PARAM_RULE_KEYWORDS = ("enum", "pattern", "minimum", "maximum", "minLength", "maxLength")
+
+
+def compile_param_rules(operation: dict) -> dict:
+    """Validation rules for an operation's query parameters, from the schema.
+
+    Emitted into the generated tool as `_PARAM_RULES[...]` so bad arguments
+    are rejected before the upstream call. Only what the schema states: JSON
+    Schema keywords, date/date-time formats, the `ordering` fields its
+    description lists, and DRF's 1-based `page`.
+    """
+    rules = {}
+    for param in operation.get("parameters", []):
+        if param.get("in") != "query":
+            continue
+        name = param["name"]
+        param_schema = param.get("schema", {})
+        rule = {k: param_schema[k] for k in _PARAM_RULE_KEYWORDS if k in param_schema}
+        if param_schema.get("format") in ("date", "date-time"):
+            rule["format"] = param_schema["format"]
+        if name == "ordering":
+            match = _ORDERING_FIELDS_RE.search(param.get("description") or "")
+            if match:
+                rule["ordering"] = re.findall(r"`([^`]+)`", match.group(1))
+        if name == "page" and param_schema.get("type") == "integer":
+            rule.setdefault("minimum", 1)
+        if rule:
+            rules[name] = rule
+    return rules
+
+
 def compute_post_annotations(func_name: str, path: str) -> str:
     """Compute extra ToolAnnotations kwargs for a POST tool.
 
@@ -4912,6 +8125,7 @@ def main() -> None:
     env = jinja2.Environment(trim_blocks=False, lstrip_blocks=False)
     get_template = env.from_string(GET_TOOL_TEMPLATE)
     structured_get_template = env.from_string(STRUCTURED_GET_TOOL_TEMPLATE)
+    batch_get_template = env.from_string(BATCH_GET_TOOL_TEMPLATE)
     post_template = env.from_string(POST_TOOL_TEMPLATE)
     markdown_template = env.from_string(MARKDOWN_TOOL_TEMPLATE)
     structured_count = 0
@@ -4922,6 +8136,8 @@ def main() -> None:
     generated_code = [
         FILE_HEADER_TEMPLATE.replace(
             "__CLIENT_HIDDEN_FIELDS_REPR__", repr(CLIENT_HIDDEN_FIELDS)
+        ).replace(
+            "__ENDPOINT_TEMPLATES_REPR__", repr(endpoint_templates(schema.get("paths", {})))
         )
     ]
     generated_tools: list[dict] = []
@@ -4984,6 +8200,7 @@ def main() -> None:
                     continue
 
                 params = extract_path_params(operation) + extract_query_params(operation)
+                description += compact_view(operation, params)
                 # Required params first (no default), then optional
                 params.sort(key=lambda p: p["default_val"] != "")
 
@@ -4998,12 +8215,30 @@ def main() -> None:
                         missing_response_schema.append(func_name)
                         # Fall through to the unstructured template.
                     else:
+                        scrub_plan = compile_scrub_plan(response_schema)
                         # Drop runtime-scrubbed fields from the advertised
                         # output_schema too (deep-copy first — the inlined
                         # schema may share sub-dicts across operations).
                         response_schema = _strip_hidden_from_schema(
                             copy.deepcopy(response_schema)
                         )
+                        paginated = is_paginated(params)
+                        if paginated:
+                            description += AUTO_PAGINATE_NOTE
+                        field_names, fields_on_results = field_projection(
+                            operation, response_schema
+                        )
+                        if field_names:
+                            description += FIELDS_NOTE
+                            # Advertise what a projected result may look like.
+                            _drop_required(projection_target(response_schema)[0])
+                        split_on = budget_key(func_name, response_schema)
+                        if split_on:
+                            description += CONTINUATION_NOTE
+                            _object_branch(response_schema)["properties"]["continuation"] = {
+                                "type": "string",
+                                "description": "Pass back to get the rows that did not fit.",
+                            }
                         generated_code.append(
                             structured_get_template.render(
                                 func_name=func_name,
@@ -5012,7 +8247,13 @@ def main() -> None:
                                 path=path,
                                 tags=tags,
                                 title=title,
-                                output_schema_repr=repr(response_schema),
+                                output_schema_repr=checked_schema_repr(dedupe_schema(response_schema)),
+                                paginated=paginated,
+                                param_rules=compile_param_rules(operation),
+                                field_names=repr(field_names) if field_names else "",
+                                fields_on_results=fields_on_results,
+                                scrub_plan=repr(scrub_plan),
+                                budget_key=split_on,
                             )
                         )
                         tool_count += 1
@@ -5024,8 +8265,39 @@ def main() -> None:
                                 "tags": tags_value,
                             }
                         )
+                        if func_name in BATCH_RETRIEVE_TOOLS:
+                            generated_code.append(
+                                batch_get_template.render(
+                                    func_name=func_name,
+                                    params=params,
+                                    path=path,
+                                    id_param=BATCH_RETRIEVE_TOOLS[func_name],
+                                    tags=tags,
+                                    title=title,
+                                    output_schema_repr=checked_schema_repr(
+                                        dedupe_schema(batch_output_schema(response_schema))
+                                    ),
+                                    param_rules=compile_param_rules(operation),
+                                    field_names=repr(field_names) if field_names else "",
+                                )
+                            )
+                            tool_count += 1
+                            generated_tools.append(
+                                {
+                                    "func_name": f"{func_name}_many",
+                                    "title": f"{title_raw} (batch)",
+                                    "tags": tags_value,
+                                }
+                            )
                         continue
 
+                text_schema = extract_response_schema(operation, schema)
+                columns = table_columns(text_schema)
+                if columns:
+                    description += TABLE_OUTPUT_NOTE
+                field_names, fields_on_results = field_projection(operation, text_schema)
+                if field_names:
+                    description += FIELDS_NOTE
                 generated_code.append(
                     get_template.render(
                         func_name=func_name,
@@ -5034,6 +8306,11 @@ def main() -> None:
                         path=path,
                         tags=tags,
                         title=title,
+                        param_rules=compile_param_rules(operation),
+                        table_columns=repr(columns) if columns else "",
+                        field_names=repr(field_names) if field_names else "",
+                        fields_on_results=fields_on_results,
+                        scrub_plan=repr(compile_scrub_plan(text_schema)) if text_schema else "",
                     )
                 )
                 tool_count += 1
@@ -5081,6 +8358,7 @@ def main() -> None:
     # Huge-filing search tool (synthetic) — emitted on every surface; pairs with
     # the in-result pointer filings_markdown_retrieve adds on big (>120k) filings.
     generated_code.append(MARKDOWN_SEARCH_TOOL_BLOCK)
+    generated_code.append(FINANCIAL_ANALYSIS_TOOLS_BLOCK)
     generated_code.append(PROMPTS_BLOCK)
     generated_code.append(FILE_FOOTER)
 
@@ -0,0 +1,7737 @@
+"""
+AUTO-GENERATED by scripts/generate_mcp_tools.py — DO NOT EDIT MANUALLY.
+
+Architecture:
+  - FastAPI host serves /health, /favicon.ico, /icon.png, and a browser
+    landing page.
+  - FastMCP server (mounted at /mcp) is protected by AWSCognitoProvider (or an
+    OAuthProxy fronting a custom OAuth AS when MCP_UPSTREAM_AUTH_BASE is set —
+    flag-gated, zero-regression when unset), which
+    handles the entire OAuth proxy: /authorize, /token, /register,
+    /auth/callback, /.well-known/oauth-protected-resource,
+    /.well-known/oauth-authorization-server, plus JWKS-based JWT validation.
+  - Every tool is decorated with @subscription_required, which validates
+    the Cognito JWT (client_id + audience binding) and sets the per-request
+    auth context. Any authenticated FinancialReports account has full
+    access — no subscription verification or backend check.
+"""
+import asyncio
+import base64
+import ipaddress
+import json as _json
+import logging
+import os
+import random
+import re
+import socket
+import statistics
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, AsyncIterator, Awaitable, Callable, Literal, Optional
+from urllib.parse import quote, urlsplit
+
+import httpx
+import jsonschema
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response
+from fastmcp import FastMCP
+from fastmcp.exceptions import ToolError
+import fastmcp.server.auth.handlers.authorize as _fastmcp_authorize_handlers
+from fastmcp.server.auth.providers.aws import (
+    AWSCognitoProvider,
+    AWSCognitoTokenVerifier,
+)
+from fastmcp.server.auth.oauth_proxy import OAuthProxy, ProxyDCRClient
+from fastmcp.server.dependencies import get_access_token, get_http_headers
+from fastmcp.server.middleware import Middleware
+from mcp.types import Icon, TextContent, ToolAnnotations
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from src.usage_analytics import (
+    UsageAnalyticsMiddleware,
+    build_emitter_from_env,
+    current_call_id,
+    current_client_info,
+    record_tool_error,
+    sanitize_error_detail,
+)
+
+try:
+    # Optional fast JSON backend for tool responses; see "JSON pipeline" below.
+    import orjson as _orjson
+except ImportError:  # pragma: no cover - depends on the image
+    _orjson = None
+
+# ---------------------------------------------------------------------------
+# Logging
+# ---------------------------------------------------------------------------
+class _StructuredLogFormatter(logging.Formatter):
+    """Single-line JSON so Cloud Logging groups a traceback as ONE entry.
+
+    This is the whole trick, and nothing in Google's Cloud Run docs says it
+    outright: Cloud Logging splits multi-line stdout into separate one-line
+    entries. So a plain `logger.exception()` traceback becomes N unrelated
+    textPayload rows, and Error Reporting gets neither grouping nor a stack
+    trace. Emitting the entire traceback as the `message` STRING value of a
+    one-line JSON object keeps it intact — the embedded newlines are escaped
+    inside the JSON string, so there is exactly one line of output.
+
+    `severity` is the field Cloud Logging reads for log level; the default
+    `levelname` is ignored. A real traceback in `message` is sufficient for
+    Error Reporting to pick the entry up — the @type ReportedErrorEvent marker
+    is not required.
+
+    Off GCP this is just structured logging, which is a defensible default for
+    self-hosters rather than a regression. Enabled when Cloud Run's K_SERVICE is
+    present, or forced with LOG_FORMAT=json.
+    """
+
+    # Cloud Logging's severity vocabulary differs from Python's for one level.
+    _SEVERITY = {"WARNING": "WARNING", "CRITICAL": "CRITICAL"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "severity": self._SEVERITY.get(record.levelname, record.levelname),
+            "message": super().format(record),
+            "logging.googleapis.com/sourceLocation": {
+                "file": record.pathname,
+                "line": str(record.lineno),
+                "function": record.funcName,
+            },
+            "logging.googleapis.com/labels": {
+                "logger": record.name,
+                # Looked up lazily: both are defined further down this module, so
+                # a log line emitted during import would NameError on a direct
+                # reference. Empty string is the right answer that early anyway.
+                "instance": globals().get("INSTANCE_ID", ""),
+                "version": globals().get("MCP_VERSION", ""),
+            },
+        }
+        return _json.dumps(payload, default=str)
+
+
+def _configure_logging() -> None:
+    """Plain text locally, single-line JSON on Cloud Run."""
+    level = os.environ.get("LOG_LEVEL", "INFO")
+    want_json = os.environ.get(
+        "LOG_FORMAT", "json" if os.environ.get("K_SERVICE") else "text"
+    ).strip().lower() == "json"
+
+    logging.basicConfig(
+        level=level,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+        force=True,
+    )
+    if want_json:
+        formatter = _StructuredLogFormatter("%(name)s: %(message)s")
+        for handler in logging.getLogger().handlers:
+            handler.setFormatter(formatter)
+
+
+_configure_logging()
+# httpx logs every request line at INFO. At production traffic volume this
+# is the dominant log line and serves no operational purpose — silence it.
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logger = logging.getLogger("financial-reports-mcp")
+
+
+# ---------------------------------------------------------------------------
+# Instance identity (for diagnosing multi-replica OAuth-state misrouting)
+# ---------------------------------------------------------------------------
+# DCR registers a client_id on ONE replica's OAuth store; a later /authorize or
+# /token can be routed to a DIFFERENT replica. With a per-replica DiskStore that
+# replica has never seen the client_id -> invalid_client -> "reconnect the
+# connector". Stamping every OAuth-state log line with the replica id makes that
+# cross-replica split visible (registration on A, lookup-miss on B).
+#
+# Cloud Run injects NO per-instance variable. The only platform-provided env vars
+# are K_SERVICE / K_REVISION / K_CONFIGURATION / PORT, and all four are identical
+# on every instance of a revision; socket.gethostname() returns "localhost"
+# in-container. The previous implementation read CONTAINER_APP_REPLICA_NAME (which
+# only Azure Container Apps ever set) and fell through to gethostname(), so since
+# the migration every one of these log lines read `instance=localhost` and the
+# cross-instance signal above was silently dead.
+#
+# So: anchor on K_REVISION for a human-readable, greppable prefix, then append a
+# per-process random suffix. The suffix is what actually distinguishes instances —
+# K_REVISION alone would collide across every instance of one revision, which is
+# the bug being fixed. Resolved once at import, so it is stable for the process
+# lifetime. An instance label, never a secret.
+def _instance_id() -> str:
+    base = os.environ.get("K_REVISION", "").strip()
+    if not base:
+        try:
+            base = socket.gethostname() or "unknown"
+        except OSError:
+            base = "unknown"
+    return f"{base}-{uuid.uuid4().hex[:8]}"
+
+
+INSTANCE_ID = _instance_id()
+
+# ---------------------------------------------------------------------------
+# Configuration (env-driven, no hardcoded secrets)
+# ---------------------------------------------------------------------------
+# Cognito env vars are REQUIRED in production but OPTIONAL when
+# DEV_MODE_API_KEY is set. The dev-mode bypass skips OAuth entirely
+# (AWSCognitoProvider is never constructed), so requiring its creds
+# would defeat the purpose. We do the DEV_MODE check up here, before
+# the requirement check, even though DEV_MODE_API_KEY is also re-read
+# below — the duplicate read is intentional so the audit and prod-
+# hostname guard further down stay self-contained.
+_DEV_MODE_EARLY = os.environ.get("DEV_MODE_API_KEY", "").strip() or None
+# Early read mirrors the auth_provider branch further down. When the OAuth-proxy
+# repoint is active (MCP_UPSTREAM_AUTH_BASE set), COGNITO_CLIENT_SECRET is NOT
+# used — the proxy authenticates with the dedicated MCP_OAUTH_CLIENT_* creds, so
+# requiring the Cognito secret would force operators to provision a value the
+# server never reads. COGNITO_USER_POOL_ID + COGNITO_CLIENT_ID are still needed
+# on that path (JWKS/issuer for the token verifier + downstream aud binding).
+_OAUTH_PROXY_EARLY = os.environ.get("MCP_UPSTREAM_AUTH_BASE", "").strip().rstrip("/")
+if _DEV_MODE_EARLY:
+    _REQUIRED_ENV = ()
+elif _OAUTH_PROXY_EARLY:
+    _REQUIRED_ENV = ("COGNITO_USER_POOL_ID", "COGNITO_CLIENT_ID")
+else:
+    _REQUIRED_ENV = ("COGNITO_USER_POOL_ID", "COGNITO_CLIENT_ID", "COGNITO_CLIENT_SECRET")
+_missing_env = [k for k in _REQUIRED_ENV if not os.environ.get(k)]
+if _missing_env:
+    raise SystemExit(
+        "[financial-reports-mcp] Missing required environment variable(s): "
+        + ", ".join(_missing_env)
+        + ". Copy .env.example to .env and fill in the Cognito values "
+        "(see docs/SELF-HOSTING.md), then export them before starting "
+        "the server. (Or set DEV_MODE_API_KEY for a local-dev bypass — "
+        "see the README.)"
+    )
+COGNITO_USER_POOL_ID = os.environ.get("COGNITO_USER_POOL_ID", "")
+COGNITO_CLIENT_ID = os.environ.get("COGNITO_CLIENT_ID", "")
+COGNITO_CLIENT_SECRET = os.environ.get("COGNITO_CLIENT_SECRET", "")
+COGNITO_REGION = os.environ.get("COGNITO_REGION", "eu-central-1")
+
+# WAF-fix OAuth-proxy repoint (flag-gated; all unset -> AWSCognitoProvider, zero
+# regression). The custom-login proxy's token exchange is bot-WAF-blocked on
+# financialfilings.com (the WAF 403s the server-to-server httpx POST), so the
+# authorize and token endpoints use a SPLIT upstream base:
+#   - authorize -> MCP_UPSTREAM_AUTH_BASE  (browser-facing host; a real browser
+#     clears the WAF)
+#   - token     -> MCP_UPSTREAM_TOKEN_BASE (WAF-free api.* gateway; web #654
+#     mounts the token view at /api/oauth/token, so TOKEN_BASE MUST include
+#     the /api segment — e.g. https://api.financialreports.eu/api. The gateway
+#     does NOT auto-prepend /api; omitting it makes the proxy POST to
+#     /oauth/token and get a 404 HTML page on every token exchange.)
+# TOKEN_BASE falls back to AUTH_BASE when unset (single-host deploys). The
+# OAuth-proxy path uses DEDICATED connector creds (MCP_OAUTH_CLIENT_*), never
+# the Cognito app-client secret.
+MCP_UPSTREAM_AUTH_BASE = os.environ.get("MCP_UPSTREAM_AUTH_BASE", "").strip().rstrip("/")
+MCP_UPSTREAM_TOKEN_BASE = (
+    os.environ.get("MCP_UPSTREAM_TOKEN_BASE", "").strip().rstrip("/")
+    or MCP_UPSTREAM_AUTH_BASE
+)
+MCP_OAUTH_CLIENT_ID = os.environ.get("MCP_OAUTH_CLIENT_ID", "").strip()
+MCP_OAUTH_CLIENT_SECRET = os.environ.get("MCP_OAUTH_CLIENT_SECRET", "").strip()
+MCP_OAUTH_REDIRECT_PATH = os.environ.get("MCP_OAUTH_REDIRECT_PATH", "/auth/callback").strip()
+
+MCP_BASE_URL = os.environ.get("MCP_BASE_URL", "https://mcp.financialfilings.com")
+API_BASE_URL = os.environ.get("API_BASE_URL", "https://api.financialreports.eu")
+# Parse the upstream host ONCE at boot. `_inject_auth` scopes the forwarded caller
+# credential to this host on every outbound request; computing it per-request via
+# httpx.URL(API_BASE_URL) raises httpx.InvalidURL (NOT a falsy return) on an empty or
+# malformed API_BASE_URL, which would kill every tool call with an unhandled exception.
+# Fail fast here instead. urlsplit("").hostname is None, so an empty value is caught.
+_API_HOST = urlsplit(API_BASE_URL).hostname
+if not _API_HOST:
+    raise RuntimeError(
+        f"API_BASE_URL must be an absolute URL with a host; got {API_BASE_URL!r}. "
+        "Refusing to start."
+    )
+LANDING_URL = os.environ.get(
+    "LANDING_URL",
+    "https://financialreports.eu/integrations/claude/",
+)
+# Public legal pages — surfaced as a footer on the connector landing
+# page so users (and Anthropic reviewers) can find Privacy / Terms /
+# Imprint without leaving the MCP server origin.
+PRIVACY_URL = os.environ.get(
+    "PRIVACY_URL", "https://financialreports.eu/data-privacy/"
+)
+TERMS_URL = os.environ.get(
+    "TERMS_URL", "https://financialreports.eu/terms/"
+)
+IMPRINT_URL = os.environ.get(
+    "IMPRINT_URL", "https://financialreports.eu/imprint/"
+)
+SUPPORT_URL = os.environ.get(
+    "SUPPORT_URL", "https://financialreports.eu/contact/"
+)
+# Optional. When set, FastMCP's OAuth proxy stores client registrations,
+# transactions, codes, and refresh tokens in Redis (shared across replicas,
+# survives container restarts). When unset, FastMCP falls back to an
+# encrypted DiskStore on the container's local disk — fine for dev, but on
+# Cloud Run the disk is ephemeral, so every deploy or instance rotation
+# forces every user to re-authenticate.
+#
+# Format: standard Redis URL, e.g.
+#   rediss://:<auth-token>@<endpoint>:<port>/3?ssl_cert_reqs=required
+# Use a dedicated DB number that does not collide with Celery (0) or the
+# Django cache (1).
+MCP_REDIS_URL = os.environ.get("MCP_REDIS_URL")
+
+# --- DEV-ONLY: personal API-key auth bypass --------------------------------
+# When DEV_MODE_API_KEY is set, the OAuth+JWT validation in
+# `subscription_required` (and `_authorize_or_raise` for structured tools)
+# is skipped and the key is forwarded as `X-API-Key` to upstream API calls
+# (not as a Bearer token).
+#
+# Refuses to activate against the production hostname so it CANNOT silently
+# ship to prod even if the env var leaks into a prod environment.
+DEV_MODE_API_KEY = os.environ.get("DEV_MODE_API_KEY", "").strip() or None
+_PROD_HOSTS = {"mcp.financialfilings.com"}
+# Fail CLOSED: the dev bypass (single shared key, no JWT validation) may ONLY run
+# against an explicit local/dev base URL. The old guard checked only for the prod
+# hostname, so an EMPTY or platform-default MCP_BASE_URL slipped through and silently
+# left the bypass active. Require an allow-listed dev marker instead.
+_DEV_HOSTS = {"localhost", "127.0.0.1", "0.0.0.0", "host.docker.internal"}
+# Parse the hostname and match it EXACTLY. A substring check (`"localhost" in url`)
+# is bypassable: URLs like https://evil-localhost.example.com or https://not-a-
+# localhost.com contain a marker as a substring and would re-open the single-shared-
+# key bypass in prod. urlsplit("").hostname is None (no throw), so an empty URL fails
+# closed too.
+_dev_host = urlsplit(MCP_BASE_URL).hostname
+if DEV_MODE_API_KEY and _dev_host not in _DEV_HOSTS:
+    raise RuntimeError(
+        "DEV_MODE_API_KEY is set but MCP_BASE_URL host is not a recognised local/dev "
+        f"host ({MCP_BASE_URL!r} -> host {_dev_host!r}). Refusing to start — the dev "
+        "key bypass must never be active outside local development (an empty, "
+        "production, or platform-default MCP_BASE_URL is exactly the case this guards)."
+    )
+if DEV_MODE_API_KEY:
+    logging.getLogger("financial-reports-mcp").warning(
+        "DEV_MODE_API_KEY active — JWT validation is BYPASSED. "
+        "Personal API key will be forwarded to %s. Never enable in prod.",
+        API_BASE_URL,
+    )
+
+# Hard cap on the upstream Markdown body that filings_markdown_retrieve will
+# buffer into memory before slicing. ESEF packages can run into the hundreds
+# of MB; pulling that into a single Python string blocks the event loop and
+# balloons replica memory. The user-facing `limit` is far below this; this
+# is a defence-in-depth cap against runaway/malformed upstream responses.
+_MAX_FILING_BYTES = 10_000_000
+
+_CDN_BASE = (
+    "https://cdn.financialreports.eu/financialreports/static/"
+    "assets/favicon/new"
+)
+FAVICON_URL = f"{_CDN_BASE}/favicon.ico"
+# PNG variants advertised in MCP server metadata. Connector UIs (Claude,
+# ChatGPT, Cursor) reliably render PNG/SVG icons; ICO is silently dropped
+# by some clients, which is why /favicon.ico alone is not enough. The MCP
+# 2025-11-25 spec uses an `icons` array with `src` / `mimeType` / `sizes`
+# entries; multiple sizes let renderers pick the right resolution
+# (Claude.ai prefers ≥48×48; the connector directory thumbnail wants ≥256).
+ICON_URL = f"{_CDN_BASE}/favicon-32x32.png"
+ICON_URL_192 = f"{_CDN_BASE}/android-chrome-192x192.png"
+ICON_URL_512 = f"{_CDN_BASE}/android-chrome-512x512.png"
+APPLE_TOUCH_URL = f"{_CDN_BASE}/apple-touch-icon.png"
+
+# Public-facing landing for connector users (linked from / and from MCP
+# `serverInfo.websiteUrl`).
+WEBSITE_URL = LANDING_URL
+
+# Allowed `Origin` values on the /mcp Streamable HTTP endpoint. The MCP
+# 2025-11-25 spec REQUIRES servers to validate Origin to prevent
+# DNS-rebinding attacks (Transports §Security Warning); FastMCP doesn't
+# enforce this on its own. Anything not on this list is rejected with
+# HTTP 403.
+#
+# Notes:
+#   - Requests from server-side clients (Claude.ai server, Cursor agent
+#     workers, ChatGPT) typically don't send Origin, so the middleware
+#     only acts when Origin is present.
+#   - We accept exact hosts and any subdomain of *.anthropic.com. Add
+#     entries here if a new connector host appears.
+ALLOWED_MCP_ORIGINS = {
+    "https://claude.ai",
+    "https://claude.com",
+    "https://chatgpt.com",
+    "https://chat.openai.com",
+    "https://www.cursor.com",
+    "https://cursor.sh",
+    # Local dev — strip if you ever proxy a real client through here.
+    "http://localhost",
+    "http://127.0.0.1",
+}
+ALLOWED_MCP_ORIGIN_SUFFIXES = (
+    ".anthropic.com",
+    ".claude.ai",
+    ".claude.com",
+)
+
+# Supported MCP protocol versions. The latest spec (2025-11-25) requires
+# the server to 400 on requests carrying an MCP-Protocol-Version header
+# whose value isn't supported, and to echo the negotiated version on
+# every response after init.
+SUPPORTED_MCP_PROTOCOL_VERSIONS = frozenset(
+    {
+        "2024-11-05",
+        "2025-03-26",
+        "2025-06-18",
+        "2025-11-25",
+    }
+)
+DEFAULT_MCP_PROTOCOL_VERSION = "2025-11-25"
+
+MCP_VERSION = os.environ.get("MCP_VERSION", "dev")
+
+# Google Search Console site-verification token. Set on the Cloud Run service as
+# `GOOGLE_SITE_VERIFICATION` (the bare content value Search Console gives you).
+# When set, the landing page emits a <meta name="google-site-verification" ...>
+# tag. When unset (default in tests / local dev), no tag is emitted — keeping
+# the rendered HTML byte-stable.
+GOOGLE_SITE_VERIFICATION = os.environ.get("GOOGLE_SITE_VERIFICATION", "").strip()
+
+# OpenAI ChatGPT Apps Directory domain-verification token, served at
+# /.well-known/openai-apps-challenge. Set on the Cloud Run service as
+# `OPENAI_APPS_CHALLENGE`; defaults to the current submission token so the route
+# works without extra config. OpenAI rotates this per submission attempt — to
+# update, change the env var (no code change/redeploy of source needed).
+OPENAI_APPS_CHALLENGE = os.environ.get(
+    "OPENAI_APPS_CHALLENGE", "2hSqI97iz131dkKbKiunVP7AvoG6CCcY6PcXfANLrRY"
+).strip()
+
+def _redact_redis_url(url: str) -> str:
+    """Return host:port for a Redis URL, dropping any embedded credentials.
+
+    str.split("@") leaks token suffix if the password literally contains "@".
+    urlsplit handles RFC 3986 URLs correctly (rediss://:tok@host:6380/3 →
+    "host:6380"). Falls back to "redis-store" if the URL is unparseable.
+    """
+    try:
+        parsed = urlsplit(url)
+    except ValueError:
+        return "redis-store"
+    host = parsed.hostname or "redis-store"
+    return f"{host}:{parsed.port}" if parsed.port else host
+
+
+def _redis_db_number(url: str) -> str:
+    """Return the Redis DB number from the URL path (e.g. rediss://h:6380/3 → "3").
+
+    The DB number is operationally important (we deliberately use a dedicated DB
+    that does not collide with Celery/Django) and carries no secret. Returns "?"
+    if the URL is unparseable or no DB segment is present.
+    """
+    try:
+        path = (urlsplit(url).path or "").lstrip("/")
+    except ValueError:
+        return "?"
+    return path if path.isdigit() else "?"
+
+
+def _disk_store_path() -> str:
+    """Best-effort path of FastMCP's default encrypted DiskStore for OAuth state.
+
+    When client_storage is None, FastMCP builds a DiskStore at
+    ``<fastmcp-data-home>/oauth-proxy`` (see OAuthProxy.__init__). Resolving the
+    same path here lets the startup line name the exact ephemeral location.
+    Falls back to a descriptive label if the FastMCP settings shape changes. The
+    path is a directory location, never a secret.
+    """
+    try:
+        # Same import OAuthProxy.__init__ uses to build the default DiskStore,
+        # so the logged path matches the real on-disk location exactly.
+        from fastmcp import settings as _fastmcp_settings
+
+        return str(_fastmcp_settings.home / "oauth-proxy")
+    except Exception:  # pragma: no cover - defensive, never blocks startup
+        return "<fastmcp-data-home>/oauth-proxy"
+
+
+# ---------------------------------------------------------------------------
+# Durable client registrations
+# ---------------------------------------------------------------------------
+# OAuthProxy keeps ALL its state in one `client_storage`, partitioned by
+# collection. Those collections are NOT equally recoverable:
+#
+#   mcp-upstream-tokens / mcp-refresh-tokens / mcp-authorization-codes /
+#   mcp-oauth-transactions / mcp-jti-mappings
+#       -> losing these costs the user a re-login. Annoying, but self-healing.
+#
+#   mcp-oauth-proxy-clients (DCR registrations)
+#       -> losing these is PERMANENT. A hosted connector caches its client_id on
+#          the vendor's servers and replays it forever; it never re-registers on
+#          invalid_client, because a browser-delegated flow never tells it the
+#          sign-in failed. The connector is dead until a human removes and
+#          re-adds it — and in the OpenAI platform app editor there is no such
+#          control at all.
+#
+# On 2026-07-14 the then-managed cache (pre-GCP-migration Azure Cache, Standard
+# SKU = no persistence) was wiped: 2,846 keys -> 20 in one hour, evictions 0, no
+# admin action. Every registration died. So
+# registrations get mirrored to a durable tier while Redis stays the hot path.
+OAUTH_CLIENTS_COLLECTION = "mcp-oauth-proxy-clients"
+
+MCP_CLIENT_STORE_URL = os.environ.get("MCP_CLIENT_STORE_URL", "").strip()
+
+
+class HttpBackingStore:
+    """Durable tier for DCR registrations: Postgres, via the main app.
+
+    The MCP server has no database access, so it reaches Postgres over the same
+    shared-secret internal channel the analytics emitter already uses. Keyed by
+    client_id; the stored payload is opaque to this class.
+    """
+
+    def __init__(self, base_url: str, secret: str, timeout: float = 5.0) -> None:
+        self._base = base_url.rstrip("/")
+        self._secret = secret
+        self._timeout = timeout
+
+    def _url(self, client_id: str) -> str:
+        from urllib.parse import quote
+
+        return f"{self._base}/{quote(client_id, safe='')}/"
+
+    @property
+    def _headers(self) -> dict[str, str]:
+        return {"X-Internal-Token": self._secret}
+
+    async def get(self, client_id: str) -> dict[str, Any] | None:
+        async with httpx.AsyncClient(timeout=self._timeout) as client:
+            resp = await client.get(self._url(client_id), headers=self._headers)
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        payload = resp.json().get("payload")
+        return payload if isinstance(payload, dict) else None
+
+    async def put(self, client_id: str, payload: dict[str, Any]) -> None:
+        async with httpx.AsyncClient(timeout=self._timeout) as client:
+            resp = await client.put(
+                self._url(client_id),
+                json={"payload": dict(payload)},
+                headers=self._headers,
+            )
+        resp.raise_for_status()
+
+    async def delete(self, client_id: str) -> bool:
+        async with httpx.AsyncClient(timeout=self._timeout) as client:
+            resp = await client.delete(self._url(client_id), headers=self._headers)
+        if resp.status_code == 404:
+            return False
+        resp.raise_for_status()
+        return True
+
+
+class DurableMirrorStore:
+    """Redis hot path, durable mirror behind it. Restores on a cache miss.
+
+    put -> cache, then mirror. get -> cache; on MISS, restore from the mirror and
+    RE-HYDRATE the cache so the next lookup is a plain hit. That re-hydrate is
+    what turns a cache wipe from "every client permanently dead" into "one slow
+    lookup, then normal".
+
+    Durability must never cost availability: a mirror failure is logged and
+    swallowed. Registration still succeeds (without durability) and lookups still
+    serve Redis. Never log the payload — a registration can carry a secret.
+    """
+
+    def __init__(self, *, cache: Any, backing: Any) -> None:
+        self._cache = cache
+        self._backing = backing
+
+    async def get(self, key: str, *, collection: str | None = None):
+        cached = await self._cache.get(key, collection=collection)
+        if cached is not None:
+            return cached
+
+        try:
+            restored = await self._backing.get(key)
+        except Exception:
+            logger.warning(
+                "durable client store unreachable on read client_id=%s instance=%s "
+                "— serving cache miss",
+                key,
+                INSTANCE_ID,
+            )
+            return None
+
+        if restored is None:
+            return None
+
+        try:
+            await self._cache.put(key, restored, collection=collection)
+        except Exception:
+            logger.warning(
+                "restored client_id=%s from durable store but could not re-hydrate "
+                "the cache instance=%s",
+                key,
+                INSTANCE_ID,
+            )
+        logger.info(
+            "restored client registration from durable store client_id=%s "
+            "instance=%s — the cache had lost it",
+            key,
+            INSTANCE_ID,
+        )
+        return restored
+
+    async def put(
+        self,
+        key: str,
+        value: dict[str, Any],
+        *,
+        collection: str | None = None,
+        ttl: Any = None,
+    ) -> None:
+        await self._cache.put(key, value, collection=collection, ttl=ttl)
+        try:
+            await self._backing.put(key, value)
+        except Exception:
+            logger.warning(
+                "durable mirror write FAILED client_id=%s instance=%s — the "
+                "registration is live but NOT durable; it will not survive a "
+                "cache wipe",
+                key,
+                INSTANCE_ID,
+            )
+
+    async def delete(self, key: str, *, collection: str | None = None) -> bool:
+        removed = await self._cache.delete(key, collection=collection)
+        try:
+            await self._backing.delete(key)
+        except Exception:
+            logger.warning(
+                "durable mirror delete FAILED client_id=%s instance=%s — the "
+                "registration may be restored from the durable tier on next miss",
+                key,
+                INSTANCE_ID,
+            )
+        return removed
+
+    async def ttl(self, key: str, *, collection: str | None = None):
+        return await self._cache.ttl(key, collection=collection)
+
+    async def get_many(self, keys, *, collection: str | None = None):
+        return [await self.get(k, collection=collection) for k in keys]
+
+    async def put_many(self, keys, values, *, collection=None, ttl=None) -> None:
+        for key, value in zip(keys, values):
+            await self.put(key, value, collection=collection, ttl=ttl)
+
+    async def delete_many(self, keys, *, collection: str | None = None) -> int:
+        return sum([await self.delete(k, collection=collection) for k in keys])
+
+    async def ttl_many(self, keys, *, collection: str | None = None):
+        return [await self.ttl(k, collection=collection) for k in keys]
+
+
+class CollectionRoutingStore:
+    """Dispatch by collection: only the named ones get the durable treatment.
+
+    Everything else — auth codes, transactions, jti mappings, tokens — keeps
+    hitting Redis exactly as before. Short-lived state has no business in
+    Postgres, and the auth hot path stays off the network.
+    """
+
+    def __init__(self, *, cache: Any, durable: Any, durable_collections) -> None:
+        self._cache = cache
+        self._durable = durable
+        self._durable_collections = frozenset(durable_collections)
+
+    def _store_for(self, collection: str | None) -> Any:
+        if collection is not None and collection in self._durable_collections:
+            return self._durable
+        return self._cache
+
+    async def get(self, key: str, *, collection: str | None = None):
+        return await self._store_for(collection).get(key, collection=collection)
+
+    async def put(self, key, value, *, collection=None, ttl=None) -> None:
+        await self._store_for(collection).put(
+            key, value, collection=collection, ttl=ttl
+        )
+
+    async def delete(self, key: str, *, collection: str | None = None) -> bool:
+        return await self._store_for(collection).delete(key, collection=collection)
+
+    async def ttl(self, key: str, *, collection: str | None = None):
+        return await self._store_for(collection).ttl(key, collection=collection)
+
+    async def get_many(self, keys, *, collection: str | None = None):
+        return await self._store_for(collection).get_many(keys, collection=collection)
+
+    async def put_many(self, keys, values, *, collection=None, ttl=None):
+        return await self._store_for(collection).put_many(
+            keys, values, collection=collection, ttl=ttl
+        )
+
+    async def delete_many(self, keys, *, collection: str | None = None) -> int:
+        return await self._store_for(collection).delete_many(
+            keys, collection=collection
+        )
+
+    async def ttl_many(self, keys, *, collection: str | None = None):
+        return await self._store_for(collection).ttl_many(keys, collection=collection)
+
+
+def _build_oauth_storage(cache: Any, client_store_url: str, secret: str) -> Any:
+    """Wrap `cache` so registrations are mirrored — or return it untouched.
+
+    Inert unless BOTH the URL and the shared secret are present, so this ships
+    dark and rolls back by unsetting one env var. Disk mode (no Redis: dev,
+    tests) is left alone — there is no cache worth mirroring.
+    """
+    if cache is None or not client_store_url or not secret:
+        return cache
+
+    return CollectionRoutingStore(
+        cache=cache,
+        durable=DurableMirrorStore(
+            cache=cache,
+            backing=HttpBackingStore(client_store_url, secret),
+        ),
+        durable_collections=frozenset({OAUTH_CLIENTS_COLLECTION}),
+    )
+
+
+# ---------------------------------------------------------------------------
+# FastMCP server with AWS Cognito OAuth proxy
+# ---------------------------------------------------------------------------
+# Build OAuth state storage. Redis if MCP_REDIS_URL is set, otherwise None
+# (FastMCP defaults to an encrypted DiskStore in `~/.local/share/fastmcp/`).
+_oauth_storage: Any = None
+if MCP_REDIS_URL:
+    # Imported lazily so the redis client isn't required when running in
+    # disk mode (dev, smoke tests).
+    from key_value.aio.stores.redis import RedisStore
+    from redis.asyncio import Redis
+    from redis.backoff import ExponentialBackoff
+    from redis.exceptions import ConnectionError as RedisConnectionError
+    from redis.exceptions import TimeoutError as RedisTimeoutError
+    from redis.retry import Retry
+
+    # Build the async Redis client with explicit retry on transient connection
+    # errors. Managed Redis recycles idle TLS connections on maintenance /
+    # idle-timeout events — first observed on Azure Cache for Redis (Standard
+    # SKU) pre-GCP-migration, and Memorystore has the same class of behaviour.
+    # When that happens, the async client
+    # gets a `(104, 'Connection reset by peer')` on the next AUTH read and, by
+    # default, surfaces that all the way to the OAuth handler — which then hangs
+    # every /register and /authorize request indefinitely. The Retry +
+    # retry_on_error config tells redis-py to discard the dead connection, open
+    # a fresh one, and retry the command transparently.
+    #
+    # The URL-level params (health_check_interval, socket_keepalive,
+    # socket_timeout) add a second layer of safety: idle pings detect dead
+    # connections proactively, and a bounded read timeout ensures a single bad
+    # connection cannot hang the handler for minutes.
+    _redis_client = Redis.from_url(
+        MCP_REDIS_URL,
+        retry=Retry(ExponentialBackoff(cap=10, base=1), retries=3),
+        retry_on_error=[RedisConnectionError, RedisTimeoutError],
+        health_check_interval=30,
+        socket_keepalive=True,
+        socket_timeout=10,
+        socket_connect_timeout=10,
+        # REQUIRED: key_value.aio.stores.redis.RedisStore._get_managed_entry
+        # does `if not isinstance(redis_response, str): return None` — so a
+        # client that returns bytes (the redis-py default) makes every read
+        # silently fail with "client not registered", even though writes
+        # succeed. The library's own url= path sets this flag implicitly; we
+        # must set it explicitly when constructing the client ourselves.
+        decode_responses=True,
+    )
+    _oauth_storage = RedisStore(
+        client=_redis_client,
+        default_collection="financial-reports-mcp-oauth",
+    )
+    logger.info(
+        "OAuth state backend=RedisStore (durable, shared across replicas) "
+        "redis=%s db=%s instance=%s",
+        _redact_redis_url(MCP_REDIS_URL),
+        _redis_db_number(MCP_REDIS_URL),
+        INSTANCE_ID,
+    )
+else:
+    logger.warning(
+        "OAuth state backend=DiskStore (EPHEMERAL, per-replica) path=%s "
+        "instance=%s — MCP_REDIS_URL not set. Client registrations + refresh "
+        "tokens will NOT persist across container restarts or be shared across "
+        "replicas; downstream clients will hit invalid_client and be forced to "
+        "re-auth on every deploy or replica rotation.",
+        _disk_store_path(),
+        INSTANCE_ID,
+    )
+
+# Mirror DCR registrations to the durable tier, if configured. Wraps the store
+# built above; everything except `mcp-oauth-proxy-clients` keeps hitting Redis
+# directly, so the auth hot path is unchanged.
+_durable_client_store_secret = os.environ.get("MCP_INGEST_SHARED_SECRET", "").strip()
+if _oauth_storage is not None and MCP_CLIENT_STORE_URL:
+    if not _durable_client_store_secret:
+        logger.warning(
+            "MCP_CLIENT_STORE_URL is set but MCP_INGEST_SHARED_SECRET is not — "
+            "client registrations are NOT durable and will not survive a cache "
+            "wipe. instance=%s",
+            INSTANCE_ID,
+        )
+    else:
+        _oauth_storage = _build_oauth_storage(
+            _oauth_storage, MCP_CLIENT_STORE_URL, _durable_client_store_secret
+        )
+        logger.info(
+            "OAuth client registrations mirrored to durable store url=%s "
+            "collection=%s instance=%s — a cache wipe now self-heals on lookup",
+            MCP_CLIENT_STORE_URL,
+            OAUTH_CLIENTS_COLLECTION,
+            INSTANCE_ID,
+        )
+
+# Explicit allowlist of redirect URIs MCP clients (Claude, ChatGPT,
+# Cursor, etc.) may register via Dynamic Client Registration. Passing an
+# explicit list makes the policy auditable for Anthropic's connector
+# review and prevents accidental regression if FastMCP's default ever
+# flips back to localhost-only.
+ALLOWED_CLIENT_REDIRECT_URI_PATTERNS = [
+    # Anthropic — current and legacy hostnames.
+    "https://claude.ai/api/mcp/auth_callback",
+    "https://claude.com/api/mcp/auth_callback",
+    "https://*.claude.ai/*",
+    "https://*.claude.com/*",
+    "https://*.anthropic.com/*",
+    # OpenAI / ChatGPT MCP integrations.
+    "https://chatgpt.com/*",
+    "https://chat.openai.com/*",
+    # Cursor.
+    "https://cursor.sh/*",
+    "https://www.cursor.com/*",
+    "https://*.cursor.com/*",
+    "cursor://*",
+    # Local development (mcp-inspector, dev tools).
+    "http://localhost:*",
+    "http://127.0.0.1:*",
+    "http://[::1]:*",
+]
+
+# OAuth upstream bases must be https:// — a typo'd http:// to a real host would
+# send the proxy's client_secret + authorization code over plaintext. http:// is
+# tolerated ONLY for local-dev hosts (mirrors the DEV_MODE host guard above), so
+# the lab-tunnel / local flow keeps working.
+_LOCAL_HTTP_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+
+def _require_secure_upstream(name, url):
+    parts = urlsplit(url)
+    if parts.scheme == "https":
+        return
+    if parts.scheme == "http" and parts.hostname in _LOCAL_HTTP_HOSTS:
+        return
+    raise RuntimeError(
+        f"{name}={url!r} must be an absolute https:// URL (http:// is allowed only "
+        f"for local-dev hosts {sorted(_LOCAL_HTTP_HOSTS)}). Refusing to start: a "
+        "plaintext OAuth upstream would leak the client secret and authorization code."
+    )
+
+
+# ---------------------------------------------------------------------------
+# OAuth client-lookup HIT/MISS observability
+# ---------------------------------------------------------------------------
+# `OAuthProxy.get_client(client_id)` is the single lookup the MCP SDK calls on
+# BOTH /authorize and /token to resolve a downstream-registered client out of
+# the OAuth-state store. It returns None for an unknown client_id — which is the
+# exact path that surfaces to the user as 400/invalid_client ("reconnect the
+# connector"). That happens when the presented client_id was evicted (Redis
+# memory pressure) or never existed on THIS replica (per-replica DiskStore wiped
+# on redeploy, or a registration that landed on a different replica).
+#
+# This mixin logs a structured HIT/MISS for every lookup so the failure mode is
+# self-diagnosing in logs, then delegates to the real implementation unchanged.
+# It is logging-only: it returns exactly what super().get_client() returns and
+# alters no control flow or response. AWSCognitoProvider -> OIDCProxy ->
+# OAuthProxy, so the same override instruments both production auth paths.
+#
+# SECURITY: logs ONLY the client_id (a public DCR identifier, not a secret), a
+# boolean hit/miss, and the replica id. It NEVER logs the returned client object,
+# client_secret, tokens, authorization codes, or PKCE verifiers.
+class _ClientLookupLoggingMixin:
+    async def get_client(self, client_id):  # type: ignore[override]
+        client = await super().get_client(client_id)
+        found = client is not None
+        logger.info(
+            "oauth client lookup client_id=%s found=%s instance=%s",
+            client_id,
+            found,
+            INSTANCE_ID,
+        )
+        if not found:
+            # MISS is the invalid_client root cause — surface it at WARNING so it
+            # stands out in production logs without changing any behaviour.
+            logger.warning(
+                "oauth client lookup MISS client_id=%s instance=%s — not in "
+                "OAuth-state store (evicted, or registered on another replica / "
+                "before a redeploy). Downstream client will see invalid_client.",
+                client_id,
+                INSTANCE_ID,
+            )
+        return client
+
+
+# ---------------------------------------------------------------------------
+# JIT re-registration: heal orphaned hosted connectors instead of dead-ending
+# ---------------------------------------------------------------------------
+# A hosted connector (ChatGPT, Claude.ai) caches its DCR client_id on the
+# vendor's servers and replays it forever, never re-registering on
+# invalid_client. If that registration is lost from the OAuth-state store — the
+# 2026-07-14 wipe, an eviction, or a client that predates the durable mirror —
+# get_client() returns None and the user hits a permanent dead end (remove +
+# re-add is the only escape).
+#
+# This mixin closes that hole. On a get_client MISS it reconstructs a public
+# ProxyDCRClient from the client_id, IDENTICAL to what OAuthProxy.register_client
+# would build, bounded by the proxy's own trusted redirect allowlist
+# (self._allowed_client_redirect_uris). ProxyDCRClient.validate_redirect_uri then
+# accepts ONLY redirect_uris matching those trusted patterns (chatgpt.com/*,
+# claude.ai/*, cursor, localhost) — so a connector presenting a trusted redirect
+# heals transparently, while an unknown client_id with an untrusted redirect is
+# still rejected downstream. It grants no new capability: these are public
+# clients (client_secret=None, token_endpoint_auth_method="none"), the flow is
+# PKCE-protected, and the authorization code can only be delivered to an
+# already-trusted redirect.
+#
+# It deliberately does NOT persist: reconstruction is deterministic (client_id +
+# fixed allowlist), so re-derivation is free and correct on every /authorize and
+# /token, and an arbitrary client_id can never grow the store. With no allowlist
+# configured it reconstructs nothing and preserves the old None-returning
+# behaviour (it never widens trust).
+class _JitReregistrationMixin:
+    async def get_client(self, client_id):  # type: ignore[override]
+        client = await super().get_client(client_id)
+        if client is not None:
+            return client
+        reconstructed = self._jit_reconstruct_client(client_id)
+        if reconstructed is not None:
+            logger.warning(
+                "oauth client JIT-reconstructed client_id=%s instance=%s — absent "
+                "from the OAuth-state store; healed via allowlist-bounded "
+                "re-registration (orphaned hosted connector).",
+                client_id,
+                INSTANCE_ID,
+            )
+        return reconstructed
+
+    def _jit_reconstruct_client(self, client_id):
+        """Rebuild an orphaned public DCR client from its id + the proxy's trusted
+        redirect allowlist. Mirrors OAuthProxy.register_client exactly. Returns None
+        when no allowlist is configured (never widens trust)."""
+        allowed = getattr(self, "_allowed_client_redirect_uris", None)
+        if not allowed:
+            return None
+        from pydantic import AnyUrl
+
+        # Real DCR clients declare "openid email profile" (the Cognito scope set) at
+        # registration. A proxy with no required_scopes has an empty
+        # _default_scope_str; reconstructing with that would make the SDK reject the
+        # connector's own openid/email/profile request as invalid_scope. Fall back to
+        # the connector scope so a healed client can request what it always requests.
+        scope = getattr(self, "_default_scope_str", "") or "openid email profile"
+        return ProxyDCRClient(
+            client_id=client_id,
+            client_secret=None,
+            redirect_uris=[AnyUrl("http://localhost")],
+            grant_types=["authorization_code", "refresh_token"],
+            scope=scope,
+            token_endpoint_auth_method="none",
+            allowed_redirect_uri_patterns=allowed,
+            client_name="Restored connector",
+        )
+
+
+class _LoggingOAuthProxy(_JitReregistrationMixin, _ClientLookupLoggingMixin, OAuthProxy):
+    """OAuthProxy with client-lookup HIT/MISS logging + JIT re-registration of
+    orphaned hosted connectors. Behaviour-identical for known clients."""
+
+
+class _LoggingAWSCognitoProvider(
+    _JitReregistrationMixin, _ClientLookupLoggingMixin, AWSCognitoProvider
+):
+    """AWSCognitoProvider with client-lookup logging + JIT re-registration.
+    Behaviour-identical for known clients."""
+
+
+# FastMCP's stock "Client Not Registered" page (create_unregistered_client_html
+# in fastmcp/server/auth/handlers/authorize.py) is written for LOCAL MCP clients.
+# It tells the user to "clear authentication tokens in your MCP client (or
+# restart it)" and states the client "should automatically re-register".
+#
+# Neither holds for a hosted connector. ChatGPT and Claude.ai keep the DCR
+# registration on their own servers: there is no token-clearing control in the
+# UI, restarting the app changes nothing, and because the OAuth hop is
+# browser-delegated the client never learns the sign-in failed — it waits on a
+# callback that never arrives. After the 2026-07-14 OAuth-state loss, prod logs
+# show individual connectors replaying one dead client_id 253-2320 times without
+# ever re-registering. The stock page sent exactly those users in a circle.
+#
+# This renderer states the only action that resolves it — remove the connector,
+# add it again — and is installed over FastMCP's module-level function, which
+# AuthorizationHandler._create_enhanced_error_response resolves by global lookup
+# at call time. Status code, headers and control flow are untouched; only the
+# HTML body differs. The JSON branch (non-browser Accept) is left as upstream
+# ships it — that one is read by programs, not people.
+#
+# SECURITY: client_id is reflected from the query string, so it is escaped with
+# html.escape() exactly as upstream does. Nothing else is interpolated.
+_UNREGISTERED_CLIENT_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<meta name="robots" content="noindex">
+<title>__TITLE__</title>
+<style>
+  :root {
+    color-scheme: light dark;
+    --bg: #f6f7f9; --surface: #ffffff; --text: #10131a; --muted: #5b6472;
+    --line: #e4e7ec; --accent: #1c56d6; --warn-bg: #fff8e6; --warn-line: #f0c65a;
+  }
+  @media (prefers-color-scheme: dark) {
+    :root {
+      --bg: #0d1017; --surface: #161a23; --text: #eef1f6; --muted: #9aa4b2;
+      --line: #262c38; --accent: #7aa2f7; --warn-bg: #2a2312; --warn-line: #6b5622;
+    }
+  }
+  * { margin: 0; padding: 0; box-sizing: border-box; }
+  body {
+    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+    background: var(--bg); color: var(--text);
+    min-height: 100vh; display: flex; align-items: center; justify-content: center;
+    padding: 1.5rem; line-height: 1.55;
+  }
+  main {
+    background: var(--surface); border: 1px solid var(--line); border-radius: 14px;
+    max-width: 40rem; width: 100%; padding: 2rem;
+  }
+  h1 { font-size: 1.45rem; letter-spacing: -0.01em; margin-bottom: 0.5rem; }
+  p { color: var(--muted); margin-bottom: 1rem; }
+  .fix {
+    background: var(--warn-bg); border: 1px solid var(--warn-line);
+    border-radius: 10px; padding: 1rem 1.25rem; margin: 1.25rem 0;
+  }
+  .fix strong { color: var(--text); }
+  dl { margin: 0.75rem 0 0; }
+  dt { font-weight: 600; font-size: 0.9rem; margin-top: 0.75rem; }
+  dd { color: var(--muted); font-size: 0.9rem; margin-left: 0; }
+  code {
+    font-family: ui-monospace, SFMono-Regular, Menlo, monospace; font-size: 0.85em;
+    background: var(--bg); border: 1px solid var(--line); border-radius: 5px;
+    padding: 0.1rem 0.35rem; word-break: break-all;
+  }
+  .note { font-size: 0.875rem; border-top: 1px solid var(--line);
+          margin-top: 1.5rem; padding-top: 1rem; }
+  a { color: var(--accent); }
+</style>
+</head>
+<body>
+<main>
+  <h1>Reconnect __SERVER_NAME__</h1>
+  <p>Sign-in could not be completed. This connector is using a registration that
+     no longer exists on our server, so authorization stops here.</p>
+
+  <div class="fix">
+    <strong>To fix it: remove the connector, then add it again.</strong>
+    <dl>
+      <dt>ChatGPT</dt>
+      <dd>Settings &rarr; Connectors &rarr; remove __SERVER_NAME__, then add it
+          back and sign in.</dd>
+      <dt>Claude.ai / Claude Desktop</dt>
+      <dd>Settings &rarr; Connectors &rarr; remove __SERVER_NAME__, then re-add
+          and sign in.</dd>
+      <dt>Claude Code, Codex, Cursor, opencode</dt>
+      <dd>Remove and re-add the server, or run your client's login command again.</dd>
+    </dl>
+  </div>
+
+  <p><strong>Retrying or reloading this page will not help.</strong> Your client
+     cannot detect this failure — it is waiting for a response that will never
+     arrive — so it will keep sending the same expired registration until the
+     connector is removed. Restarting the app does not clear it either, because
+     hosted connectors store the registration on their own servers.</p>
+
+  <p>Nothing is wrong with your account and no data is affected. Adding the
+     connector again creates a fresh registration and restores normal access.</p>
+
+  <div class="note">
+    <p style="margin:0">If it still fails after re-adding, contact support and
+       include this client ID: <code>__CLIENT_ID__</code></p>
+  </div>
+</main>
+</body>
+</html>
+"""
+
+
+def _fr_unregistered_client_html(
+    client_id: str,
+    registration_endpoint: str,
+    discovery_endpoint: str,
+    server_name: str | None = None,
+    server_icon_url: str | None = None,
+    title: str = "Client Not Registered",
+) -> str:
+    """Render the unregistered-client page with recovery steps that actually work.
+
+    Signature mirrors FastMCP's create_unregistered_client_html so it is a drop-in
+    for the handler's keyword call. `registration_endpoint`, `discovery_endpoint`
+    and `server_icon_url` are accepted for that compatibility and intentionally
+    unused: re-registration is not a user-actionable step here, which is the whole
+    point of this override.
+    """
+    import html as _html
+
+    return (
+        _UNREGISTERED_CLIENT_PAGE.replace("__CLIENT_ID__", _html.escape(client_id))
+        .replace("__SERVER_NAME__", _html.escape(server_name or "this connector"))
+        .replace("__TITLE__", _html.escape(title))
+    )
+
+
+# Install over the upstream renderer. The handler looks this name up on the module
+# at call time, so rebinding the attribute is what swaps the page; subclassing the
+# handler would additionally require re-wiring the SDK route table.
+_fastmcp_authorize_handlers.create_unregistered_client_html = (
+    _fr_unregistered_client_html
+)
+
+
+# In production the AWSCognitoProvider constructor makes a live HTTPS
+# call to AWS Cognito's OIDC discovery endpoint, so it cannot run with
+# synthetic creds. When DEV_MODE_API_KEY is active we want a local
+# server that boots without any real Cognito account — so we skip the
+# provider entirely. The `subscription_required` and
+# `_authorize_or_raise` bypasses already accept the request without a
+# JWT in that mode, so removing the provider doesn't open a new hole;
+# it just means the OAuth proxy endpoints (/authorize, /token, etc.)
+# disappear, which is what we want locally.
+if DEV_MODE_API_KEY:
+    auth_provider = None
+elif MCP_UPSTREAM_AUTH_BASE:
+    # WAF-fix repoint: front a custom OAuth AS (web #654) instead of talking to
+    # Cognito's hosted UI directly, with a SPLIT token endpoint so the
+    # server-to-server token exchange hits the WAF-free api.* gateway while the
+    # browser authorize hop stays on the WAF-fronted host. Issued tokens are
+    # still Cognito-minted, so the verifier is the same AWSCognitoTokenVerifier
+    # AWSCognitoProvider uses internally (downstream kid/aud/issuer checks are
+    # unchanged). Uses DEDICATED connector creds — fail loud if they're absent
+    # rather than silently falling back to Cognito (which would mask a
+    # half-configured deploy).
+    #
+    # DEPLOY-CRITICAL: on this path COGNITO_CLIENT_ID is used ONLY for the
+    # downstream binding — subscription_required / _authorize_or_raise reject the
+    # request when the verified token's client_id != COGNITO_CLIENT_ID. The custom
+    # AS mints tokens under ITS OWN Cognito app client, which is NOT the MCP
+    # connector client. So the repoint deployment MUST set COGNITO_CLIENT_ID to
+    # the AS's token-minting client id (and COGNITO_USER_POOL_ID to that pool), or
+    # EVERY tool call 403s on the binding check. See tracking issue #656.
+    if not (MCP_OAUTH_CLIENT_ID and MCP_OAUTH_CLIENT_SECRET):
+        raise RuntimeError(
+            "MCP_UPSTREAM_AUTH_BASE is set but MCP_OAUTH_CLIENT_ID / "
+            "MCP_OAUTH_CLIENT_SECRET are not. The OAuth-proxy repoint requires "
+            "dedicated connector credentials (NOT the Cognito client secret). "
+            "Set both, or unset MCP_UPSTREAM_AUTH_BASE to use AWSCognitoProvider."
+        )
+    _require_secure_upstream("MCP_UPSTREAM_AUTH_BASE", MCP_UPSTREAM_AUTH_BASE)
+    _require_secure_upstream("MCP_UPSTREAM_TOKEN_BASE", MCP_UPSTREAM_TOKEN_BASE)
+    _cognito_issuer = (
+        f"https://cognito-idp.{COGNITO_REGION}.amazonaws.com/{COGNITO_USER_POOL_ID}"
+    )
+    auth_provider = _LoggingOAuthProxy(
+        upstream_authorization_endpoint=f"{MCP_UPSTREAM_AUTH_BASE}/oauth/authorize",
+        upstream_token_endpoint=f"{MCP_UPSTREAM_TOKEN_BASE}/oauth/token",
+        upstream_client_id=MCP_OAUTH_CLIENT_ID,
+        upstream_client_secret=MCP_OAUTH_CLIENT_SECRET,
+        token_verifier=AWSCognitoTokenVerifier(
+            jwks_uri=f"{_cognito_issuer}/.well-known/jwks.json",
+            issuer=_cognito_issuer,
+            algorithm="RS256",
+        ),
+        base_url=MCP_BASE_URL,
+        redirect_path=MCP_OAUTH_REDIRECT_PATH,
+        valid_scopes=["openid", "email", "profile"],
+        allowed_client_redirect_uris=ALLOWED_CLIENT_REDIRECT_URI_PATTERNS,
+        client_storage=_oauth_storage,
+        # First-party, fixed-scope connector: Claude/OpenAI already collect their own
+        # connect-consent, our downstream login is the real identity gate, and
+        # ALLOWED_CLIENT_REDIRECT_URI_PATTERNS is the confused-deputy control. The extra
+        # FastMCP consent screen is a redundant second approval, so we skip it. Redirect
+        # allowlist + fixed read-only scopes + PKCE remain in force.
+        require_authorization_consent=False,
+    )
+else:
+    auth_provider = _LoggingAWSCognitoProvider(
+        user_pool_id=COGNITO_USER_POOL_ID,
+        aws_region=COGNITO_REGION,
+        client_id=COGNITO_CLIENT_ID,
+        client_secret=COGNITO_CLIENT_SECRET,
+        base_url=MCP_BASE_URL,
+        redirect_path="/auth/callback",
+        required_scopes=["openid", "email", "profile"],
+        allowed_client_redirect_uris=ALLOWED_CLIENT_REDIRECT_URI_PATTERNS,
+        client_storage=_oauth_storage,
+        # First-party, fixed-scope connector: Claude/OpenAI already collect their own
+        # connect-consent, our downstream login is the real identity gate, and
+        # ALLOWED_CLIENT_REDIRECT_URI_PATTERNS is the confused-deputy control. The extra
+        # FastMCP consent screen is a redundant second approval, so we skip it. Redirect
+        # allowlist + fixed read-only scopes + PKCE remain in force. Kept consistent with
+        # the OAuthProxy path above so a fallback deploy doesn't resurrect the screen.
+        require_authorization_consent=False,
+    )
+
+import datetime as _dt
+
+# Recency guidance, split so neither half goes stale on a long-running server.
+# _RECENCY_RULE is date-FREE (safe to bake into the static instructions at boot —
+# it names no date). The LIVE date rides the per-session tools/list channel via
+# _RecencyMiddleware, recomputed each session: `instructions` is fixed at boot by
+# the low-level MCP session and cannot carry a fresh date, but tools/list is
+# produced by the FastMCP handler and refreshes per session. So a server that
+# runs for weeks without a restart never serves a stale year.
+_RECENCY_RULE = (
+    "RECENCY — do NOT assume the current year from your training data; it may be "
+    "older than today. Each tool description ends with the server's live current "
+    "date — trust THAT over any year you assume. For 'latest', 'recent', 'current', "
+    "'this year', or year-to-date requests, query WITHOUT an upper date bound and "
+    "sort newest-first (ordering=-release_datetime / -publication_datetime); the "
+    "newest result IS the latest even if it post-dates your knowledge cutoff.\n\n"
+)
+
+
+def _recency_date_note() -> str:
+    """The server's CURRENT date as a short tool-description suffix, recomputed on
+    every tools/list (per session) by _RecencyMiddleware — never a hard-coded year
+    and never frozen at boot."""
+    return f"\n\n[Server current date: {_dt.date.today().isoformat()} — treat this as today.]"
+
+
+mcp = FastMCP(
+    name="FinancialReports",
+    version=MCP_VERSION,
+    website_url=WEBSITE_URL,
+    instructions=(
+        # _RECENCY_RULE is date-FREE (safe to bake at boot); the LIVE date rides
+        # the per-session tools/list channel via _RecencyMiddleware (see below).
+        _RECENCY_RULE +
+        "FinancialReports = official regulatory filings (annual reports, "
+        "interim reports, 10-K/Q, 20-F, ESEF, ad-hoc disclosures, insider "
+        "transactions, ESG/climate reports, prospectuses) and normalized "
+        "financials for tens of thousands of listed companies in the US, "
+        "EU, UK, APAC and LATAM — sourced directly from regulators (SEC, "
+        "ESMA, ASX, etc.). Use this server whenever the user names a public "
+        "company, ticker, or ISIN; cites a filing type; or asks for a "
+        "financial line item, peer comparison, industry screen, or filings "
+        "watchlist.\n\n"
+        "SLASH COMMANDS (prefer these over hand-assembled tool chains):\n"
+        "  /compare_financials_yoy        — YoY deltas across two fiscal years\n"
+        "  /find_filing_section           — pull a named section from a filing\n"
+        "  /summarize_recent_filings      — dated briefing of recent filings\n"
+        "Reach for the slash command first if the user's question matches "
+        "any of these shapes; only assemble tools manually if no command "
+        "fits.\n\n"
+        "CORE RULES:\n"
+        "1. Resolve company first: companies_list (name/ticker) or "
+        "isins_retrieve (ISIN) → use the returned internal integer id "
+        "for per-company tools (NOT the ticker or ISIN itself).\n"
+        "2. Currency: always display the reporting currency next to "
+        "every monetary value. Never aggregate USD/EUR/CHF/etc. without "
+        "explicit FX conversion.\n"
+        "3. Periods: always state the fiscal period and period_end_date "
+        "with financial data. \"Last year\" is ambiguous — name the "
+        "fiscal period you returned.\n"
+        "4. Filing type codes (most common — pass via filing_type_code "
+        "on filings_list):\n"
+        "     10-K       Annual Report (US, AND foreign-private-issuer "
+        "20-F filings — FR rolls them up under 10-K)\n"
+        "     10-K-ESEF  Annual Report (EU/ESEF issuers)\n"
+        "     IR         Interim / Quarterly Report (10-Q, half-year, Q1-Q4)\n"
+        "     ER         Earnings Release\n"
+        "     MDA        Management Discussion & Analysis\n"
+        "     DIRS       Director's Dealing (insider transactions)\n"
+        "   For ESG/governance/M&A/etc, fetch the resource "
+        "`fr://guide/filing-types` for the full 31-code table.\n"
+        "5. Ambiguity / scope: ask the user to disambiguate when a search "
+        "returns multiple plausible matches. Refuse out-of-scope queries "
+        "(stock prices, analyst consensus, sentiment) plainly — do not "
+        "burn tool calls hunting.\n\n"
+        "READ THESE RESOURCES BEFORE COMPLEX QUERIES:\n"
+        "  fr://guide/filing-types            — full 31-code filing-type "
+        "table (read for ESG, governance, M&A, dividends, transcripts).\n"
+        "  fr://guide/industry-classification — ISIC 4-level hierarchy "
+        "+ all 22 sections + peer-query recipe (read for sector / "
+        "industry / peer queries).\n"
+        "  fr://guide/markdown-strategy       — when to fall back to "
+        "filings_markdown_retrieve, processing_status gating, "
+        "pagination (read whenever you need a value the normalised "
+        "financials dataset doesn't have).\n\n"
+        "CANONICAL WORKFLOWS (one-liners; full recipes in the resources):\n"
+        "  resolve → filings_list (processing_status='COMPLETED', "
+        "filing_type_code=…) → filings_markdown_retrieve → summarize\n"
+        "  resolve → companies_financials_retrieve → if value missing, "
+        "fr://guide/markdown-strategy\n"
+        "  industry/peer queries → fr://guide/industry-classification\n"
+        "  watchlist_companies_bulk_add_create → webhooks_create"
+    ),
+    auth=auth_provider,
+    # Multi-size icons let connector renderers pick the right resolution.
+    # Claude.ai connector cards prefer the 192/512 PNG over the 32×32 favicon.
+    #
+    # IMPORTANT: advertise URLs from THIS server's own origin, not the CDN.
+    # Three reasons:
+    #   1. FastMCP's auto-generated /consent OAuth page renders this URL as
+    #      the page logo. Our own CSP (img-src 'self' data:) blocks any
+    #      cross-origin image, so a CDN URL silently breaks the consent
+    #      page branding.
+    #   2. Several MCP host UIs (incl. Claude.ai) prefer same-origin icons
+    #      that match the connector's resource URI — cross-origin
+    #      advertisements may silently fail to render.
+    #   3. The /icon-*.png routes on this server already proxy + cache the
+    #      same CDN bytes, so there's no asset cost — just URL hygiene.
+    icons=[
+        Icon(src=f"{MCP_BASE_URL.rstrip('/')}/icon.png", mimeType="image/png", sizes=["32x32"]),
+        Icon(src=f"{MCP_BASE_URL.rstrip('/')}/icon-192.png", mimeType="image/png", sizes=["192x192"]),
+        Icon(src=f"{MCP_BASE_URL.rstrip('/')}/icon-512.png", mimeType="image/png", sizes=["512x512"]),
+    ],
+)
+
+
+# ---------------------------------------------------------------------------
+# Recency middleware — inject the server's LIVE date into tool descriptions per session
+# ---------------------------------------------------------------------------
+class _RecencyMiddleware(Middleware):
+    """Append the server's LIVE current date to every tool description on each
+    tools/list, recomputed per session via _recency_date_note() (date.today() at
+    request time). tools/list is produced by the FastMCP handler — unlike
+    `initialize`, whose instructions the low-level session fixes at boot — so the
+    edit reaches the wire and refreshes per session; a server running for weeks
+    never serves a stale year. Tools are model_copy'd so the registry originals
+    stay clean and the note never accumulates across calls."""
+
+    async def on_list_tools(self, context, call_next):
+        tools = await call_next(context)
+        note = _recency_date_note()
+        return [
+            t.model_copy(update={"description": (t.description or "") + note})
+            for t in tools
+        ]
+
+
+mcp.add_middleware(_RecencyMiddleware())
+
+
+# ---------------------------------------------------------------------------
+# Per-request context (token + user info), set by @auth_required
+# ---------------------------------------------------------------------------
+_current_token: ContextVar[str] = ContextVar("_current_token", default="")
+# Cognito `sub` of the caller — the key for per-user server-side state.
+_current_sub: ContextVar[str] = ContextVar("_current_sub", default="")
+
+
+_MAX_JOSE_HEADER_B64 = 4096
+
+
+def _jose_header(token: str) -> Optional[dict]:
+    """Decode the JOSE header of a JWT-shaped string. None if not a JWT.
+
+    Size-capped: this runs on every tool call, so a multi-KB first segment
+    is treated as opaque rather than paying base64+JSON decode cost (no real
+    Cognito/FastMCP header comes anywhere near the cap).
+    """
+    parts = token.split(".")
+    if len(parts) != 3 or len(parts[0]) > _MAX_JOSE_HEADER_B64:
+        return None
+    try:
+        pad = "=" * (-len(parts[0]) % 4)
+        header = _json.loads(base64.urlsafe_b64decode(parts[0] + pad))
+    except Exception:
+        return None
+    return header if isinstance(header, dict) else None
+
+
+def _jwt_fingerprint(token: str) -> str:
+    """Safe diagnostic for a bearer credential — NEVER includes the token.
+
+    Distinguishes the issue-#32 failure class (an HS256 proxy JWT without a
+    `kid`) from a proper Cognito RS256 token in a single log field.
+    """
+    if not token:
+        return "absent"
+    header = _jose_header(token)
+    if header is None:
+        return f"opaque(len={len(token)})"
+    alg = header.get("alg", "?")
+    kid = "present" if header.get("kid") else "missing"
+    return f"jwt(alg={alg} kid={kid})"
+
+
+def _jwt_lacks_kid(token: str) -> bool:
+    """True only for JWT-shaped tokens whose JOSE header has no `kid`.
+
+    The upstream API accepts exclusively Cognito RS256 JWTs (kid required).
+    A JWT without one is the FastMCP proxy's own HS256 token leaking through
+    `get_access_token()`'s SDK-contextvar fallback (issue #32) — it would be
+    rejected upstream with 403 "No kid provided". Opaque non-JWT strings
+    (dev API keys, test tokens) are not this failure mode and pass.
+    """
+    header = _jose_header(token)
+    return header is not None and not header.get("kid")
+
+
+# ---------------------------------------------------------------------------
+# Shared HTTP client — module-level for connection-pool reuse
+# ---------------------------------------------------------------------------
+async def _inject_correlation(request: httpx.Request) -> None:
+    """Stamp the per-tool-call id so one value joins the MCP log line, the
+    MCPToolEvent row, and the origin's request log.
+
+    Host-scoped for the same reason `_inject_auth` is: this is our own diagnostic
+    id and there is no reason to hand it to the CDN or any other host. Kept as a
+    separate hook rather than folded into `_inject_auth`, whose whole contract is
+    "auth only, host-scoped, fail closed" — mixing a diagnostic concern into a
+    security-critical function is not worth the one line of wiring it saves.
+
+    A hyphenated header name is mandatory: nginx drops headers containing
+    underscores unless `underscores_in_headers` is on, which it is not.
+    """
+    call_id = current_call_id()
+    if not call_id:
+        return
+    if request.url.host and request.url.host != _API_HOST:
+        return
+    request.headers.setdefault("X-Client-Request-Id", call_id)
+
+
+async def _inject_auth(request: httpx.Request) -> None:
+    """Add upstream auth header from `_current_token`. Format depends on whether
+    the dev API-key bypass is active. Scoped to the FR API host so a caller
+    credential is never forwarded to the CDN or any other host the client touches."""
+    token = _current_token.get()
+    if not token:
+        return
+    if request.url.host and request.url.host != _API_HOST:
+        return
+    if DEV_MODE_API_KEY:
+        request.headers.setdefault("X-API-Key", token)
+        return
+    # Fail closed (issue #32): never forward a credential the upstream is
+    # guaranteed to reject. Raising here surfaces an actionable error instead
+    # of an opaque upstream 403.
+    if _jwt_lacks_kid(token):
+        logger.error(
+            "refusing to forward non-upstream credential to %s: %s",
+            request.url.path,
+            _jwt_fingerprint(token),
+        )
+        raise AuthenticationError(
+            "Your session credentials could not be forwarded to the "
+            "FinancialReports API. Please disconnect and reconnect the "
+            "FinancialReports connector, then retry."
+        )
+    if "Authorization" not in request.headers:
+        request.headers["Authorization"] = f"Bearer {token}"
+
+
+# Limits are explicit to bound burst load against the upstream API (a single
+# Claude session routinely fans out 5–10 parallel tool calls; at 10 instances the
+# unbounded default lets us spike hundreds of TLS handshakes against
+# api.financialreports.eu). Hoisted to a constant because the transport below
+# needs the same values — see the warning there.
+_API_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=20,
+    keepalive_expiry=30.0,
+)
+
+# ⚠️  http2= and limits= MUST be repeated here, not just on the AsyncClient.
+# httpx's _init_transport() returns a caller-supplied transport verbatim and only
+# uses its own http2/limits/verify kwargs to BUILD the default one. So passing
+# transport= silently discards those client-level kwargs — which would drop the
+# HTTP/2 multiplexing and the explicit pool bounds this comment block exists to
+# guarantee.
+#
+# retries=2 covers connect-phase failures only (DNS, TCP, TLS) and never a
+# request that reached the server, so it is safe for POST as well. Note it is
+# invisible to the test suite: respx patches
+# httpcore.AsyncConnectionPool.handle_async_request, which is the method that
+# *contains* httpcore's retry loop, so a mocked ConnectError is seen exactly
+# once. Prod-only hardening by construction — do not add a test asserting it.
+#
+# The upstream transport is a small set of independent HTTP/2 pools rather than
+# one. With http2=True a single pool multiplexes every concurrent call onto ONE
+# connection, so a 10 MB markdown stream and a 2 KB lookup share a TCP window
+# and the server's max-concurrent-streams cap, and a fan-out stalls head-of-line
+# behind whichever stream is slowest. `_BalancedHTTP2Transport` places each new
+# stream on the member with the fewest active streams, breaking ties by the most
+# connection-level flow-control headroom. MCP_UPSTREAM_HTTP2_CONNECTIONS sets N;
+# _API_LIMITS is split across the members so the process-wide bounds above hold.
+_UPSTREAM_HTTP2_CONNECTIONS = max(
+    1, int(os.environ.get("MCP_UPSTREAM_HTTP2_CONNECTIONS", "2"))
+)
+# A fresh HTTP/2 connection's receive window: the 65_535-byte protocol default
+# plus the 2**24 httpcore grants at connection start. Used as the headroom of a
+# member that has not connected yet, so an idle member ranks as fully open.
+_H2_FRESH_WINDOW = 65_535 + 2**24
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body wrapper that reports stream completion exactly once.
+
+    httpx closes every response — after `aread()` for a plain request, on
+    leaving `client.stream(...)` for a streamed one — so `aclose` is the one
+    reliable end-of-stream signal for the balancer's active-stream count.
+    """
+
+    def __init__(self, stream: Any, release: Callable[[], None]) -> None:
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+
+class _BalancedHTTP2Transport(httpx.AsyncBaseTransport):
+    """N independent HTTP/2 pools behind one transport, balanced per stream.
+
+    Each member is a plain AsyncHTTPTransport — http2 and its share of the
+    limits repassed explicitly, per the warning above — so connection setup,
+    connect retries and pooling are untouched httpx/httpcore behaviour; this
+    class only chooses which member a request goes to and counts streams.
+    """
+
+    def __init__(self, size: int, limits: httpx.Limits, retries: int = 2) -> None:
+        member_limits = httpx.Limits(
+            max_connections=max(1, (limits.max_connections or 100) // size),
+            max_keepalive_connections=max(1, (limits.max_keepalive_connections or 20) // size),
+            keepalive_expiry=limits.keepalive_expiry,
+        )
+        self.members = [
+            httpx.AsyncHTTPTransport(retries=retries, http2=True, limits=member_limits)
+            for _ in range(size)
+        ]
+        self._active = [0] * size
+        self._opened = [0] * size
+
+    @staticmethod
+    def _h2_states(member: httpx.AsyncHTTPTransport) -> list[Any]:
+        # httpcore keeps the h2 state machine two private hops down; read it
+        # defensively so an httpcore refactor degrades to stream-count-only
+        # balancing instead of breaking every request.
+        states = []
+        for conn in member._pool.connections:
+            state = getattr(getattr(conn, "_connection", None), "_h2_state", None)
+            if state is not None and not conn.is_closed():
+                states.append(state)
+        return states
+
+    def _headroom(self, index: int) -> int:
+        try:
+            windows = [s.inbound_flow_control_window for s in self._h2_states(self.members[index])]
+        except Exception:
+            return _H2_FRESH_WINDOW
+        return max(windows, default=_H2_FRESH_WINDOW)
+
+    def _pick(self) -> int:
+        return min(
+            range(len(self.members)),
+            key=lambda i: (self._active[i], -self._headroom(i), i),
+        )
+
+    def _release(self, index: int) -> None:
+        self._active[index] -= 1
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        index = self._pick()
+        self._active[index] += 1
+        self._opened[index] += 1
+        try:
+            response = await self.members[index].handle_async_request(request)
+        except BaseException:
+            self._release(index)
+            raise
+        response.stream = _ReleasingStream(response.stream, lambda: self._release(index))
+        return response
+
+    async def aclose(self) -> None:
+        for member in self.members:
+            await member.aclose()
+
+    def stats(self) -> list[dict[str, Any]]:
+        """Per-connection stream counts and h2 state, for /health and logs."""
+        out = []
+        for index, member in enumerate(self.members):
+            states = []
+            try:
+                states = self._h2_states(member)
+            except Exception:
+                pass
+            out.append(
+                {
+                    "connection": index,
+                    "active_streams": self._active[index],
+                    "streams_opened": self._opened[index],
+                    "open": bool(states),
+                    "inbound_window": self._headroom(index),
+                    "max_concurrent_streams": max(
+                        (s.remote_settings.max_concurrent_streams for s in states),
+                        default=None,
+                    ),
+                }
+            )
+        return out
+
+
+_api_transport = _BalancedHTTP2Transport(_UPSTREAM_HTTP2_CONNECTIONS, _API_LIMITS)
+
+# A single AsyncClient per process. Connection pool + HTTP keep-alive are
+# reused across all tool calls. Closed on shutdown via the FastAPI lifespan
+# below. HTTP/2 multiplexes parallel calls over the transport's member
+# connections.
+#
+# The timeout is split rather than flat: a single 60 s budget meant an
+# unreachable upstream burned the full 60 s per call before failing, while the
+# read phase genuinely needs that long for large filing bodies.
+_api_client = httpx.AsyncClient(
+    base_url=API_BASE_URL,
+    timeout=httpx.Timeout(connect=5.0, read=60.0, write=10.0, pool=10.0),
+    limits=_API_LIMITS,
+    http2=True,
+    transport=_api_transport,
+    event_hooks={"request": [_inject_auth, _inject_correlation]},
+    headers={
+        # Must start with "FinancialReports-MCP-Server" — the Django admin
+        # dashboard filters APIRequestLog by this exact prefix.
+        "User-Agent": f"FinancialReports-MCP-Server/{MCP_VERSION}",
+    },
+)
+
+# ---------------------------------------------------------------------------
+# Priority lanes — bulk downloads vs interactive lookups
+# ---------------------------------------------------------------------------
+# Filing markdown downloads (up to _MAX_FILING_BYTES each) and 2 KB metadata
+# lookups used to share `_api_client`'s pool. Under load the downloads held the
+# pool slots and the connections' bandwidth, and a quick `companies_retrieve`
+# queued behind them until the 10 s pool timeout. So bulk transfers get their
+# own lane: a separate client whose pool, limits and timeouts are sized for
+# large bodies, and whose HTTP/2 connection has its own connection-level flow
+# control window, so a slow-draining download can no longer exhaust the window
+# that lookups share. (httpcore fixes the window size itself; the separate
+# connection is the lever we have.)
+#
+# The lane is picked by the generator per tool class — the markdown templates
+# stream on "bulk", every other GET template uses "interactive" — and bulk
+# requests additionally take a slot from `_bulk_semaphore`, so concurrent
+# downloads are capped per process and cannot starve interactive calls of CPU
+# or egress. A call waiting for a slot waits at most its remaining deadline.
+_API_BULK_LIMITS = httpx.Limits(
+    max_connections=20,
+    max_keepalive_connections=4,
+    keepalive_expiry=30.0,
+)
+_BULK_CONCURRENCY = max(1, int(os.environ.get("MCP_BULK_DOWNLOAD_CONCURRENCY", "8")))
+_bulk_semaphore = asyncio.Semaphore(_BULK_CONCURRENCY)
+
+# http2=/limits= repassed for the reason spelled out above `_api_transport`.
+_api_bulk_transport = httpx.AsyncHTTPTransport(
+    retries=2,
+    http2=True,
+    limits=_API_BULK_LIMITS,
+)
+# Same read budget as the interactive lane — a large body genuinely needs it —
+# but a longer pool wait: the semaphore already bounds how many downloads
+# compete, so a pool wait here means a connection is being set up, not that
+# the lane is saturated.
+_api_bulk_client = httpx.AsyncClient(
+    base_url=API_BASE_URL,
+    timeout=httpx.Timeout(connect=5.0, read=60.0, write=10.0, pool=30.0),
+    limits=_API_BULK_LIMITS,
+    http2=True,
+    transport=_api_bulk_transport,
+    event_hooks={"request": [_inject_auth, _inject_correlation]},
+    headers=_api_client.headers,
+)
+
+_LANE_CLIENTS: dict[str, httpx.AsyncClient] = {
+    "interactive": _api_client,
+    "bulk": _api_bulk_client,
+}
+
+
+@asynccontextmanager
+async def _lane_slot(lane: str) -> AsyncIterator[None]:
+    """Hold a bulk-download slot for the duration of the block; a no-op for
+    the interactive lane. The wait is bounded by the call's deadline."""
+    if lane != "bulk":
+        yield
+        return
+    try:
+        async with asyncio.timeout(_deadline_remaining()):
+            await _bulk_semaphore.acquire()
+    except TimeoutError as exc:
+        raise _deadline_exceeded() from exc
+    try:
+        yield
+    finally:
+        _bulk_semaphore.release()
+
+
+# ---------------------------------------------------------------------------
+# Hedged GETs — opt-in tail-latency cut for idempotent reads
+# ---------------------------------------------------------------------------
+# Every GET tool is annotated idempotentHint=True, so firing a duplicate at a
+# straggler is safe: if the first attempt is still outstanding after the
+# endpoint's rolling p95, a second one goes out and whichever answers first wins.
+# The loser is cancelled, which on HTTP/2 resets its stream instead of tearing
+# the connection down.
+#
+# Off unless MCP_HEDGE_REQUESTS=1. The hedge budget is a token bucket: every
+# primary request earns _HEDGE_BUDGET tokens and every hedge spends one, so over
+# any window hedges stay at or below that fraction of the request volume (5 %
+# by default) no matter how slow the upstream gets. A brown-out drains the
+# bucket within a few calls and hedging switches itself off — duplicating
+# requests into an overloaded upstream is the one thing it must never do.
+#
+# Streaming downloads (`_api_stream_get`) are never hedged: a duplicate there
+# re-downloads up to _MAX_FILING_BYTES for a latency win nobody can see.
+_HEDGE_ENABLED = os.environ.get("MCP_HEDGE_REQUESTS", "0").strip() == "1"
+_HEDGE_BUDGET = float(os.environ.get("MCP_HEDGE_BUDGET", "0.05"))
+# Caps the bucket so a long quiet period cannot bank a burst of hedges.
+_HEDGE_BURST = 5.0
+# Latency samples kept per endpoint family, and the minimum before any p95 is
+# trusted. Below the floor a cold endpoint never hedges — a p95 over a handful
+# of samples is mostly noise.
+_HEDGE_WINDOW = 200
+_HEDGE_MIN_SAMPLES = 20
+# Never hedge sooner than this, however fast the endpoint usually is: below it
+# the duplicate mostly races connection setup, not a slow upstream.
+_HEDGE_MIN_DELAY = 0.05
+
+# A request's endpoint family is the spec path template it was built from, so
+# `/companies/1/` and `/companies/2/` share one latency window (and, later, one
+# retry budget) and so does every free-text `/isins/{code}/`. The templates are
+# the spec's, emitted at generation time, literal segments first so
+# `/companies/merges/` is not taken for `/companies/{id}/`; anything else is
+# "other". Keys are therefore a closed set: the per-family maps cannot grow
+# with the ids callers send, and /health (unauthenticated) never echoes one.
+_ENDPOINT_TEMPLATES: list[str] = ['/companies/', '/companies/merges/', '/companies/resolve/', '/countries/', '/filing-categories/', '/filing-types/', '/filings/', '/isic-classes/', '/isic-divisions/', '/isic-groups/', '/isic-sections/', '/isins/', '/languages/', '/line-item-definitions/', '/security-listings/', '/sources/', '/watchlist/', '/watchlist/companies/', '/watchlist/companies/bulk-add/', '/watchlist/companies/bulk-remove/', '/webhooks/', '/companies/{id}/', '/companies/{id}/financials/', '/companies/{id}/next-annual-report/', '/countries/{id}/', '/filing-categories/{id}/', '/filing-types/{id}/', '/filings/{id}/', '/filings/{id}/history/', '/filings/{id}/markdown/', '/isic-classes/{id}/', '/isic-divisions/{id}/', '/isic-groups/{id}/', '/isic-sections/{id}/', '/isins/{code}/', '/languages/{id}/', '/line-item-definitions/{code}/', '/security-listings/{id}/', '/sources/{id}/', '/watchlist/companies/{company_id}/', '/webhooks/{id}/', '/webhooks/{id}/deliveries/', '/webhooks/{id}/regenerate-secret/', '/webhooks/{id}/test/', '/webhooks/{id}/deliveries/{delivery_uuid}/', '/webhooks/{id}/deliveries/{delivery_uuid}/replay/']
+_ENDPOINT_OTHER = "other"
+
+
+def _endpoint_template_re(template: str) -> re.Pattern[str]:
+    return re.compile(
+        "/".join(
+            "[^/]+" if segment.startswith("{") else re.escape(segment)
+            for segment in template.split("/")
+        )
+    )
+
+
+_ENDPOINT_TEMPLATE_RES = [(_endpoint_template_re(t), t) for t in _ENDPOINT_TEMPLATES]
+_API_BASE_PATH = urlsplit(API_BASE_URL).path.rstrip("/")
+
+
+def _endpoint_family(url: str) -> str:
+    """`/companies/123/financials/` -> `/companies/{id}/financials/`."""
+    path = urlsplit(url).path
+    if _API_BASE_PATH and path.startswith(_API_BASE_PATH + "/"):
+        path = path[len(_API_BASE_PATH) :]
+    for pattern, template in _ENDPOINT_TEMPLATE_RES:
+        if pattern.fullmatch(path):
+            return template
+    return _ENDPOINT_OTHER
+
+
+class _LatencyWindow:
+    """Rolling sample of recent request latencies for one endpoint family."""
+
+    def __init__(self, size: int = _HEDGE_WINDOW) -> None:
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if len(self._samples) < _HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _RatioBudget:
+    """Token bucket bounding extra requests to a fraction of primary requests.
+
+    Every primary request earns `ratio` tokens, every extra one (a hedge, a
+    retry) spends a whole token, and the balance is capped at `burst`.
+    """
+
+    def __init__(self, ratio: float, burst: float = _HEDGE_BURST, initial: float = 0.0) -> None:
+        self._ratio = ratio
+        self._burst = burst
+        self._tokens = initial
+
+    def earn(self) -> None:
+        self._tokens = min(self._burst, self._tokens + self._ratio)
+
+    def spend(self) -> bool:
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+
+# Keyed by `_endpoint_family`, so at most one window per spec path (+ "other").
+_hedge_latency: defaultdict[str, _LatencyWindow] = defaultdict(_LatencyWindow)
+_hedge_budget = _RatioBudget(_HEDGE_BUDGET)
+
+# The hedge goes out on its own pool. A second request on the primary client
+# could be multiplexed onto the very connection that is stalling — the
+# balancer only sees stream counts, not which stream is slow — which would
+# defeat the point. Same auth/correlation hooks, headers and
+# timeouts as `_api_client`, so a hedge is indistinguishable upstream.
+_api_hedge_transport = httpx.AsyncHTTPTransport(
+    retries=2,
+    http2=True,
+    limits=_API_LIMITS,
+)
+_api_hedge_client = httpx.AsyncClient(
+    base_url=API_BASE_URL,
+    timeout=_api_client.timeout,
+    limits=_API_LIMITS,
+    http2=True,
+    transport=_api_hedge_transport,
+    event_hooks={"request": [_inject_auth, _inject_correlation]},
+    headers=_api_client.headers,
+)
+
+
+async def _timed_get(
+    client: httpx.AsyncClient, window: _LatencyWindow, url: str, **kwargs: Any
+) -> httpx.Response:
+    started = time.monotonic()
+    response = await client.get(url, **kwargs)
+    window.record(time.monotonic() - started)
+    return response
+
+
+async def _hedged_get(url: str, lane: str = "interactive", **kwargs: Any) -> httpx.Response:
+    """One upstream GET attempt, hedged when enabled and the budget allows.
+
+    Only the interactive lane is hedged — the bulk lane trades latency for
+    throughput by design. Both attempts run as tasks that inherit this
+    context, so `_inject_auth` sees the caller's `_current_token` on the hedge
+    too. A transport error on the first finisher does not win the race — the
+    other attempt is awaited, and its error is only raised if both fail.
+    """
+    if lane != "interactive":
+        return await _LANE_CLIENTS[lane].get(url, **kwargs)
+    if not _HEDGE_ENABLED:
+        return await _api_client.get(url, **kwargs)
+
+    window = _hedge_latency[_endpoint_family(url)]
+    _hedge_budget.earn()
+    primary = asyncio.ensure_future(_timed_get(_api_client, window, url, **kwargs))
+    tasks = {primary}
+    try:
+        p95 = window.quantile(0.95)
+        if p95 is not None:
+            done, _ = await asyncio.wait(tasks, timeout=max(p95, _HEDGE_MIN_DELAY))
+            if not done and _hedge_budget.spend():
+                logger.info(
+                    "hedging upstream GET %s after %.3fs",
+                    _endpoint_family(url),
+                    max(p95, _HEDGE_MIN_DELAY),
+                )
+                tasks.add(
+                    asyncio.ensure_future(
+                        _timed_get(_api_hedge_client, window, url, **kwargs)
+                    )
+                )
+        first_error: Optional[BaseException] = None
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                first_error = first_error or task.exception()
+        raise first_error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # mark retrieved: a losing error is not news
+
+# ---------------------------------------------------------------------------
+# Per-call deadline — stop working once the host has stopped waiting
+# ---------------------------------------------------------------------------
+# The split client timeout (5 s connect, 60 s read) plus one retry lets a single
+# tool call run past two minutes, while the MCP SDKs abandon a request after
+# 60 s by default. Everything done past that point is work nobody reads — and
+# upstream load during exactly the kind of slowdown that caused it.
+#
+# So each tool call carries a monotonic deadline in `_call_deadline`, set by
+# `_DeadlineMiddleware` further down. `_api_get` and `_api_stream_get` clamp
+# every phase timeout to the time left, a retry whose backoff would not leave
+# room for the retry itself is skipped, and the middleware cancels the call
+# outright once the deadline passes — which also bounds every other await in
+# the call (token re-swap, store reads).
+#
+# The budget is MCP_TOOL_DEADLINE seconds (default 55: the SDK default minus
+# headroom for our answer to make it back). MCP_TOOL_DEADLINE_BY_HOST overrides
+# it per clientInfo name ("claude-ai=110,cursor=55"), and a client that states
+# its own timeout in the request's `_meta.timeoutMs` gets the smaller of the
+# two. MCP_TOOL_DEADLINE=0 switches deadlines off.
+_DEADLINE_DEFAULT = float(os.environ.get("MCP_TOOL_DEADLINE", "55"))
+# A retry needs at least this much budget left after its backoff to be worth
+# sending; below it the second request would be cut off mid-flight anyway.
+_DEADLINE_RETRY_FLOOR = 1.0
+
+
+def _parse_host_deadlines(raw: str) -> dict[str, float]:
+    """`"claude-ai=110, cursor=55"` -> {"claude-ai": 110.0, "cursor": 55.0}.
+
+    Malformed entries are logged and skipped rather than failing the boot — a
+    typo here should cost one host its override, not the whole service.
+    """
+    out: dict[str, float] = {}
+    for item in raw.split(","):
+        if not item.strip():
+            continue
+        name, _, value = item.partition("=")
+        try:
+            out[name.strip().lower()] = float(value)
+        except ValueError:
+            logger.warning("ignoring malformed MCP_TOOL_DEADLINE_BY_HOST entry %r", item)
+    return out
+
+
+_DEADLINE_BY_HOST = _parse_host_deadlines(os.environ.get("MCP_TOOL_DEADLINE_BY_HOST", ""))
+
+_call_deadline: ContextVar[Optional[float]] = ContextVar("_call_deadline", default=None)
+
+
+def _deadline_remaining() -> Optional[float]:
+    """Seconds left in this tool call's budget, or None when no deadline is set."""
+    deadline = _call_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def _deadline_allows(wait: float) -> bool:
+    """True unless waiting `wait` seconds would leave no room for one more request."""
+    remaining = _deadline_remaining()
+    return remaining is None or remaining - wait >= _DEADLINE_RETRY_FLOOR
+
+
+def _deadline_exceeded() -> "UpstreamHTTPError":
+    return UpstreamHTTPError(
+        "The tool call ran out of time before the FinancialReports API answered. "
+        "Retry, or narrow the request (a smaller page_size or fewer fiscal years).",
+        error_kind="deadline_exceeded",
+    )
+
+
+def _clamp_to_deadline(kwargs: dict[str, Any], base: httpx.Timeout) -> dict[str, Any]:
+    """Request kwargs with every timeout phase capped at the budget left.
+
+    Raises the deadline error outright when nothing is left, so an exhausted
+    call never puts another request on the wire.
+    """
+    remaining = _deadline_remaining()
+    if remaining is None:
+        return kwargs
+    if remaining <= 0:
+        raise _deadline_exceeded()
+    return {
+        **kwargs,
+        "timeout": httpx.Timeout(
+            connect=min(base.connect, remaining),
+            read=min(base.read, remaining),
+            write=min(base.write, remaining),
+            pool=min(base.pool, remaining),
+        ),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Retrying transient upstream failures — GET only
+# ---------------------------------------------------------------------------
+# One retry, GET only. POST is deliberately excluded: the upstream POST surface
+# (webhooks, watchlist) is not idempotent, and replaying a request that may
+# already have been applied is the exact failure mode this restriction prevents.
+_RETRY_STATUSES = frozenset({502, 503, 504})
+_RETRY_BACKOFF = 0.25
+_RETRY_JITTER = 0.25
+# DRF hands out Retry-After values of 47 s on burst limits and up to 1_209_600 s
+# (14 days) on quota errors. Anything past this cap outlives every MCP client's
+# tool timeout, so we skip the retry rather than clamp down to the cap —
+# clamping would guarantee a second request the upstream has already refused.
+_RETRY_AFTER_MAX = 2.0
+
+# Retry budget. An unconditional retry doubles the request volume during an
+# upstream brown-out — exactly when the upstream can least take it. Retries are
+# instead bounded per endpoint family (see `_endpoint_family`) by a token
+# bucket: every first attempt earns _RETRY_BUDGET_RATIO tokens and every retry
+# spends one, so over any window retries stay at or below that fraction of the
+# family's traffic (10 % by default). The bucket starts full at
+# _RETRY_BUDGET_BURST, so an isolated blip on a quiet replica still gets its
+# retry; a sustained brown-out drains it within a few calls. A denied retry
+# fails fast with the same response — and so the same hint text — the caller
+# would have seen had the retry failed too. Counters go out on /health.
+_RETRY_BUDGET_RATIO = float(os.environ.get("MCP_RETRY_BUDGET", "0.1"))
+_RETRY_BUDGET_BURST = float(os.environ.get("MCP_RETRY_BUDGET_BURST", "10"))
+
+
+class _RetryBudget(_RatioBudget):
+    """One endpoint family's retry bucket, plus its attempt/retry counters."""
+
+    def __init__(self, family: str) -> None:
+        super().__init__(_RETRY_BUDGET_RATIO, _RETRY_BUDGET_BURST, initial=_RETRY_BUDGET_BURST)
+        self.family = family
+        self.attempts = 0
+        self.retries = 0
+        self.denied = 0
+
+    def first_attempt(self) -> None:
+        self.attempts += 1
+        self.earn()
+
+    def allow_retry(self, reason: str) -> bool:
+        if not self.spend():
+            self.denied += 1
+            logger.warning(
+                "retry budget for %s exhausted, failing fast on %s", self.family, reason
+            )
+            return False
+        self.attempts += 1
+        self.retries += 1
+        return True
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "retries_denied": self.denied,
+            "tokens": round(self._tokens, 2),
+        }
+
+
+# Keyed by `_endpoint_family`, so at most one bucket per spec path (+ "other").
+_retry_budgets: dict[str, _RetryBudget] = {}
+
+
+def _retry_budget(url: str) -> _RetryBudget:
+    family = _endpoint_family(url)
+    budget = _retry_budgets.get(family)
+    if budget is None:
+        budget = _retry_budgets[family] = _RetryBudget(family)
+    return budget
+
+
+def _retry_budget_stats() -> dict[str, dict[str, Any]]:
+    """Per-family retry counters for /health."""
+    return {family: _retry_budgets[family].stats() for family in sorted(_retry_budgets)}
+
+
+async def _retry_sleep(seconds: float) -> None:
+    """Backoff sleep. A seam so tests can neutralise it without real delays."""
+    await asyncio.sleep(seconds)
+
+
+def _retry_delay(status: int, body_text: str, retry_after: str) -> Optional[float]:
+    """Seconds to wait before the single retry, or None to fail immediately.
+
+    5xx is narrowed to 502/503/504 — the load-balancer/gateway family that is
+    genuinely transient. 500 and 501 are usually deterministic, so retrying them
+    just doubles the latency of a guaranteed failure.
+
+    For 429 the decision is delegated to the #74 classifier rather than
+    re-derived: only `burst_limit` and `rate_limited` can clear inside a tool
+    call, while `quota_exhausted` / `spend_cap_daily` / `spend_ceiling_monthly`
+    do not reset within the period. `_classify_upstream_429` deliberately routes
+    unknown and malformed bodies to `rate_limited`, so testing against
+    `_NON_RETRYABLE_429` inherits that intended asymmetry for free.
+    """
+    if status == 429:
+        if _classify_upstream_429(body_text) in _NON_RETRYABLE_429:
+            return None
+    elif status not in _RETRY_STATUSES:
+        return None
+    if retry_after:
+        wait = float(int(retry_after))
+        return wait if wait <= _RETRY_AFTER_MAX else None
+    return _RETRY_BACKOFF + random.uniform(0.0, _RETRY_JITTER)
+
+
+# ---------------------------------------------------------------------------
+# Negative cache — upstream 404s on id lookups
+# ---------------------------------------------------------------------------
+# Models retry a hallucinated or stale id: the same `filings_retrieve(id=…)`
+# three or four times in one conversation, each a full upstream round trip for
+# the same 404. A 404 on a filing or company id lookup is remembered for
+# _NOT_FOUND_TTL seconds and replayed as a synthesized response carrying the
+# original status, headers and body, so every caller — `_raise_upstream_error`,
+# `_upstream_error_text`, `_format_response` — produces exactly the text it
+# would have. Existence is not personalized, so entries are shared across
+# users; they are per replica, because a Redis round trip would cost about
+# what it saves. Keyed by path alone: the id is in the path, and the query
+# parameters these endpoints take do not change whether the id exists.
+_NOT_FOUND_TTL = float(os.environ.get("MCP_NOT_FOUND_CACHE_TTL", "60"))
+_NOT_FOUND_MAX_ENTRIES = 2048
+_NOT_FOUND_PATH_RE = re.compile(r"^/(?:filings|companies)/\d+/(?:markdown/)?$")
+# Replay needs the request id and content type, not the hop-by-hop framing
+# httpx recomputes for the synthesized body.
+_NOT_FOUND_DROP_HEADERS = frozenset({"content-length", "content-encoding", "transfer-encoding"})
+_not_found: dict[str, tuple[float, bytes, list[tuple[str, str]]]] = {}
+_not_found_hits = 0
+
+
+def _not_found_replay(url: str) -> Optional[httpx.Response]:
+    """A fresh copy of the remembered 404 for `url`, or None."""
+    global _not_found_hits
+    entry = _not_found.get(url)
+    if entry is None:
+        return None
+    expires, body, headers = entry
+    if expires <= time.monotonic():
+        del _not_found[url]
+        return None
+    _not_found_hits += 1
+    return httpx.Response(
+        404, headers=headers, content=body, request=httpx.Request("GET", API_BASE_URL + url)
+    )
+
+
+def _remember_not_found(url: str, response: httpx.Response, body: bytes) -> None:
+    if response.status_code != 404 or _NOT_FOUND_TTL <= 0 or not _NOT_FOUND_PATH_RE.match(url):
+        return
+    if url not in _not_found and len(_not_found) >= _NOT_FOUND_MAX_ENTRIES:
+        _not_found.clear()  # cheap bound; a 404 storm repopulates what matters
+    headers = [
+        (name, value)
+        for name, value in response.headers.items()
+        if name.lower() not in _NOT_FOUND_DROP_HEADERS
+    ]
+    _not_found[url] = (time.monotonic() + _NOT_FOUND_TTL, body[:4096], headers)
+
+
+def _not_found_stats() -> dict[str, int]:
+    """Negative-cache counters for /health."""
+    return {"entries": len(_not_found), "hits": _not_found_hits}
+
+
+async def _api_get(url: str, lane: str = "interactive", **kwargs: Any) -> httpx.Response:
+    """GET the upstream — or replay a remembered 404 or quota 429 locally."""
+    replay = _not_found_replay(url) or await _quota_replay(url)
+    if replay is not None:
+        return replay
+    response = await _api_get_with_retry(url, lane, **kwargs)
+    if response.status_code == 404:
+        _remember_not_found(url, response, response.content)
+    await _note_quota_state(response)
+    return response
+
+
+async def _api_get_with_retry(url: str, lane: str = "interactive", **kwargs: Any) -> httpx.Response:
+    """GET the upstream, retrying once on a transient failure.
+
+    Retries by re-calling `.get()`, never by re-sending the same Request object.
+    That matters: `_inject_auth` is a per-Request event hook, so a fresh Request
+    re-runs the fail-closed credential guard with the current `_current_token`.
+    Re-sending a built Request would skip the hook entirely.
+
+    Each attempt goes through `_hedged_get`, a plain `.get()` on the lane's
+    client unless hedging is switched on. The retry is drawn from the endpoint
+    family's `_RetryBudget`; when that is spent the failure surfaces as is.
+    """
+    base = _LANE_CLIENTS[lane].timeout
+    budget = _retry_budget(url)
+    async with _lane_slot(lane):
+        budget.first_attempt()
+        try:
+            response = await _hedged_get(url, lane, **_clamp_to_deadline(kwargs, base))
+        except (httpx.TimeoutException, httpx.NetworkError) as exc:
+            delay = _RETRY_BACKOFF + random.uniform(0.0, _RETRY_JITTER)
+            if not _deadline_allows(delay):
+                raise _deadline_exceeded() from exc
+            if not budget.allow_retry(exc.__class__.__name__):
+                raise
+            logger.warning(
+                "upstream GET transport error, retrying once: %s",
+                exc.__class__.__name__,
+            )
+            await _retry_sleep(delay)
+            return await _hedged_get(url, lane, **_clamp_to_deadline(kwargs, base))
+
+        # Only a 429 body is read for the retry decision; decoding every
+        # successful body to text here was pure overhead.
+        body_text = response.text if response.status_code == 429 else ""
+        delay = _retry_delay(response.status_code, body_text, _retry_after_seconds(response))
+        if (
+            delay is None
+            or not _deadline_allows(delay)
+            or not budget.allow_retry(str(response.status_code))
+        ):
+            return response
+        logger.warning(
+            "upstream GET returned %s, retrying once after %.2fs",
+            response.status_code,
+            delay,
+        )
+        await _retry_sleep(delay)
+        return await _hedged_get(url, lane, **_clamp_to_deadline(kwargs, base))
+
+
+@asynccontextmanager
+async def _api_stream_get(
+    url: str, lane: str = "bulk", **kwargs: Any
+) -> AsyncIterator[httpx.Response]:
+    """Streaming GET, retrying once on a transient failure.
+
+    The retry decision is made on the status line, before any body byte is
+    consumed. A mid-body failure must NEVER be retried: re-streaming could
+    re-download up to _MAX_FILING_BYTES. The `handed_off` flag is what enforces
+    that — once the response is yielded to the caller, a timeout raised inside
+    the caller's own `aiter_bytes()` loop surfaces here, and re-raising is the
+    only correct response.
+
+    Classifying a 429 needs the body, so it is read here. httpx caches after
+    `aread()`, so the caller's own `aread()` still works.
+
+    Streams on the bulk lane by default and holds its slot until the caller
+    leaves the block, i.e. for the whole body. Retries share the endpoint
+    family's `_RetryBudget` with `_api_get`.
+    """
+    replay = _not_found_replay(url) or await _quota_replay(url)
+    if replay is not None:
+        yield replay
+        return
+    client = _LANE_CLIENTS[lane]
+    budget = _retry_budget(url)
+    async with _lane_slot(lane):
+        budget.first_attempt()
+        delay: Optional[float] = None
+        handed_off = False
+        try:
+            async with client.stream(
+                "GET", url, **_clamp_to_deadline(kwargs, client.timeout)
+            ) as response:
+                body_text = ""
+                if response.status_code == 429:
+                    body_text = (await response.aread()).decode("utf-8", errors="replace")
+                elif response.status_code == 404:
+                    # A 404 body is a short error document; read it so the next
+                    # lookup of this id can be answered locally.
+                    _remember_not_found(url, response, await response.aread())
+                await _note_quota_state(response)
+                delay = _retry_delay(
+                    response.status_code, body_text, _retry_after_seconds(response)
+                )
+                if (
+                    delay is None
+                    or not _deadline_allows(delay)
+                    or not budget.allow_retry(str(response.status_code))
+                ):
+                    handed_off = True
+                    yield response
+                    return
+                logger.warning(
+                    "upstream stream returned %s, retrying once after %.2fs",
+                    response.status_code,
+                    delay,
+                )
+        except (httpx.TimeoutException, httpx.NetworkError) as exc:
+            if handed_off:
+                raise
+            delay = _RETRY_BACKOFF + random.uniform(0.0, _RETRY_JITTER)
+            if not _deadline_allows(delay):
+                raise _deadline_exceeded() from exc
+            if not budget.allow_retry(exc.__class__.__name__):
+                raise
+            logger.warning(
+                "upstream stream transport error, retrying once: %s",
+                exc.__class__.__name__,
+            )
+
+        await _retry_sleep(delay)
+        async with client.stream(
+            "GET", url, **_clamp_to_deadline(kwargs, client.timeout)
+        ) as response:
+            # Same as the first attempt: `_note_quota_state` reads a 429's text.
+            if response.status_code == 429:
+                await response.aread()
+            elif response.status_code == 404:
+                _remember_not_found(url, response, await response.aread())
+            await _note_quota_state(response)
+            yield response
+
+
+def _auth_error(msg: str) -> str:
+    """Error message returned when authentication fails."""
+    record_tool_error("AuthenticationError", msg)
+    return f"⚠️ **Authentication required.** {msg}"
+
+
+_RECONNECT_MSG = (
+    "Your session could not be linked to upstream credentials. Please "
+    "disconnect and reconnect the FinancialReports connector, then retry."
+)
+
+
+async def _resolve_upstream_access_token(presented: str) -> Optional[Any]:
+    """Re-run the OAuth proxy's token swap (issue #32, fastmcp #1863).
+
+    Under Streamable HTTP, fastmcp's `get_access_token()` can fall back to
+    the SDK contextvar and hand us the FastMCP HS256 *reference* token
+    instead of the swapped upstream Cognito token — which the upstream API
+    rejects with 403 ("No kid provided"). `OAuthProxy.load_access_token()`
+    is the canonical swap (verify our JWT → JTI mapping → stored upstream
+    token → upstream verification); re-running it here recovers the token
+    the upstream actually accepts. Returns the swapped AccessToken, or None
+    when the session can't be linked (expired/lost upstream token) — the
+    caller fails closed with a reconnect hint.
+
+    Known fastmcp dependency (verified on 2.13.3): the swapped AccessToken's
+    `claims` are stripped to {sub, username, cognito:groups} by
+    AWSCognitoTokenVerifier, so the downstream client_id binding check passes
+    only via the `AccessToken.client_id` ATTRIBUTE, which JWTVerifier
+    populates from the Cognito token's raw `client_id` claim and the Cognito
+    verifier forwards. If a fastmcp upgrade changes that claim handling, the
+    re-swap recovery would start failing with "Invalid client_id" — re-verify
+    this chain on any fastmcp bump (the unit stubs can't catch it).
+    """
+    if auth_provider is None:
+        return None
+    try:
+        swapped = await auth_provider.load_access_token(presented)
+    except Exception:
+        logger.warning("upstream token re-swap raised", exc_info=True)
+        return None
+    if swapped is None:
+        logger.warning(
+            "upstream token re-swap failed: %s could not be linked to a "
+            "stored upstream token",
+            _jwt_fingerprint(presented),
+        )
+        return None
+    token = getattr(swapped, "token", None)
+    if not token or _jwt_lacks_kid(token):
+        logger.warning(
+            "upstream token re-swap returned a non-forwardable credential: %s",
+            _jwt_fingerprint(token or ""),
+        )
+        return None
+    logger.info(
+        "recovered upstream token via proxy re-swap (issue #32): %s -> %s",
+        _jwt_fingerprint(presented),
+        _jwt_fingerprint(token),
+    )
+    return swapped
+
+
+def subscription_required(
+    func: Callable[..., Awaitable[str]],
+) -> Callable[..., Awaitable[str]]:
+    """Auth decorator: validates the Cognito JWT and sets the per-request
+    token contextvar. Any authenticated FinancialReports account has full
+    access — no subscription check.
+    """
+
+    @wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> str:
+        # DEV-ONLY bypass: when DEV_MODE_API_KEY is set, skip JWT validation
+        # entirely and forward the personal API key to the backend. The prod
+        # hostname guard at module import time prevents this from ever being
+        # active in production.
+        if DEV_MODE_API_KEY:
+            token_reset = _current_token.set(DEV_MODE_API_KEY)
+            sub_reset = _current_sub.set("dev")
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _current_sub.reset(sub_reset)
+                _current_token.reset(token_reset)
+
+        try:
+            access_token = get_access_token()
+        except Exception as exc:
+            logger.warning("get_access_token raised: %s", exc)
+            return _auth_error("Could not retrieve access token.")
+
+        if access_token is None:
+            return _auth_error("No access token provided.")
+
+        # Issue #32: if the SDK fallback handed us the FastMCP reference
+        # token (JWT without kid), re-run the proxy swap to recover the
+        # upstream Cognito token; fail closed if the session can't be linked.
+        presented = getattr(access_token, "token", None)
+        if presented and _jwt_lacks_kid(presented):
+            access_token = await _resolve_upstream_access_token(presented)
+            if access_token is None:
+                return _auth_error(_RECONNECT_MSG)
+
+        claims = getattr(access_token, "claims", {}) or {}
+        sub = claims.get("sub")
+        raw_token = getattr(access_token, "token", None)
+
+        if not sub or not raw_token:
+            logger.warning("missing sub or token on access_token")
+            return _auth_error("Invalid token.")
+
+        # Defense in depth against cross-app-client token replay.
+        #
+        # MCP 2025-11-25 §Authorization mandates: "MCP servers MUST validate
+        # that access tokens were issued specifically for them as the
+        # intended audience". For Cognito access tokens this means checking
+        # both:
+        #   - `client_id` claim matches our Cognito app (so a token minted
+        #     for a *different* app client in the same user pool can't be
+        #     replayed against this server), AND
+        #   - `aud` claim, when present, is either our `client_id` (Cognito's
+        #     default audience) or our canonical resource URI (the form
+        #     reviewers expect per RFC 8707, future-proofing for when we
+        #     migrate to a Cognito Resource Server identifier).
+        #
+        # FastMCP's AWSCognitoProvider doesn't enforce either binding, so we
+        # fail closed here.
+        token_client_id = claims.get("client_id") or getattr(
+            access_token, "client_id", None
+        )
+        if token_client_id != COGNITO_CLIENT_ID:
+            logger.warning(
+                "rejecting token: client_id=%r expected=%r sub=%s",
+                token_client_id,
+                COGNITO_CLIENT_ID,
+                sub[:8],
+            )
+            return _auth_error("Invalid client_id.")
+
+        canonical_resource = f"{MCP_BASE_URL.rstrip('/')}/mcp"
+        accepted_audiences = {COGNITO_CLIENT_ID, canonical_resource, MCP_BASE_URL.rstrip("/")}
+        aud_claim = claims.get("aud")
+        if aud_claim is not None:
+            aud_values = aud_claim if isinstance(aud_claim, list) else [aud_claim]
+            if not any(a in accepted_audiences for a in aud_values):
+                logger.warning(
+                    "rejecting token: aud=%r not in %r sub=%s",
+                    aud_claim,
+                    accepted_audiences,
+                    sub[:8],
+                )
+                return _auth_error("Invalid audience.")
+
+        token_reset = _current_token.set(raw_token)
+        sub_reset = _current_sub.set(sub)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _current_sub.reset(sub_reset)
+            _current_token.reset(token_reset)
+
+    return wrapper
+
+
+def _require_auth_context() -> None:
+    if not _current_token.get():
+        logger.error("tool wrapper called without a token in context")
+        raise RuntimeError("Authentication required.")
+
+
+class AuthenticationError(RuntimeError):
+    """Raised by structured tools when authentication fails."""
+
+
+class UpstreamHTTPError(RuntimeError):
+    """Raised when the upstream FinancialReports API rejects a tool call.
+
+    Carries machine-readable context for the analytics middleware
+    (`upstream_status`, `request_id`) and an actionable message for the
+    LLM client. The upstream response body is logged server-side only —
+    it never reaches the client.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        *,
+        upstream_status: Optional[int] = None,
+        request_id: Optional[str] = None,
+        error_kind: str = "unknown",
+    ) -> None:
+        super().__init__(message)
+        self.upstream_status = upstream_status
+        self.request_id = request_id
+        # Stable enum-ish string so analytics can GROUP BY failure class
+        # without re-parsing the human message. Values:
+        #   "missing_profile"       — Cognito sub has no matching FR UserProfile
+        #   "expired_token"         — upstream said the token expired (or HTTP 401)
+        #   "invalid_credentials"   — any other 401/403
+        #   "quota_exhausted"       — 429, plan allowance spent for the period
+        #   "spend_cap_daily"       — 429, PAYG daily spend cap
+        #   "spend_ceiling_monthly" — 429, PAYG monthly self-serve ceiling
+        #   "burst_limit"           — 429, too many requests per minute
+        #   "rate_limited"          — 429 we could not classify (retry advice)
+        #   "transient"             — HTTP 5xx
+        #   "deadline_exceeded"     — the per-call time budget ran out first
+        #   "unknown"               — anything else
+        self.error_kind = error_kind
+
+
+# Upstream `detail` strings we discriminate on. Source of truth:
+# financialreports `users/authentication.py`. Match case-insensitive substring
+# so wording tweaks upstream don't silently flip us back to the wrong hint.
+_PROFILE_MISSING_MARKER = "user profile not found"
+_TOKEN_EXPIRED_MARKER = "token has expired"
+
+
+def _parse_upstream_json(body_text: str) -> Optional[dict]:
+    """Best-effort JSON-object parse of an upstream error body. Never raises."""
+    try:
+        payload = _json.loads(body_text)
+    except Exception:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def _classify_upstream_403(body_text: str) -> str:
+    """Map a raw 403 response body to a stable `error_kind` token.
+
+    Parsing is intentionally defensive: malformed JSON, empty bodies, and
+    unexpected shapes all fall through to `"invalid_credentials"`. The
+    upstream's `detail` field is the only thing inspected — never headers,
+    never anything that could carry a credential.
+    """
+    detail = ""
+    payload = _parse_upstream_json(body_text)
+    if payload is not None:
+        raw = payload.get("detail", "") or ""
+        if isinstance(raw, str):
+            detail = raw
+    detail_lower = detail.lower()
+    if _PROFILE_MISSING_MARKER in detail_lower:
+        return "missing_profile"
+    if _TOKEN_EXPIRED_MARKER in detail_lower:
+        return "expired_token"
+    return "invalid_credentials"
+
+
+# Upstream 429 discriminator. Source of truth: financialreports
+# `users/exceptions.py` — DRF's exception handler REPLACES the whole response
+# body and stamps exactly one of these four `type` values.
+#
+# Keyed on `type`, never on `detail`: on paid tiers the quota case carries DRF's
+# generic "Request was throttled. Expected available in N seconds." — byte-
+# identical to the burst case — so substring matching cannot separate them.
+_RATE_LIMIT_KINDS = {
+    "quota_limit_exceeded": "quota_exhausted",
+    "daily_spend_cap_reached": "spend_cap_daily",
+    "monthly_spend_ceiling_reached": "spend_ceiling_monthly",
+    "burst_limit_exceeded": "burst_limit",
+}
+
+# The 429s that retrying cannot fix within the current period. These get the
+# upstream's own remediation copy instead of "wait a moment and retry".
+_NON_RETRYABLE_429 = frozenset(
+    {"quota_exhausted", "spend_cap_daily", "spend_ceiling_monthly"}
+)
+
+# Client-facing cap for forwarded upstream copy. Larger than MAX_ERROR_DETAIL
+# (the analytics column budget) because the free-tier quota sentence plus its
+# absolute payg_url runs ~250 chars and must survive intact.
+_MAX_UPSTREAM_COPY = 400
+
+
+def _classify_upstream_429(body_text: str) -> str:
+    """Map a raw 429 body to a stable `error_kind` token.
+
+    Unrecognized, malformed, and empty bodies all fall through to
+    `"rate_limited"`, which renders as retry advice. That asymmetry is
+    deliberate: telling a burst-limited caller their allowance is gone until
+    next month is a far worse failure than telling a quota-exhausted caller to
+    retry, and a `type` the monolith adds later must not be read as quota.
+    """
+    payload = _parse_upstream_json(body_text)
+    if payload is None:
+        return "rate_limited"
+    raw_type = payload.get("type")
+    if not isinstance(raw_type, str):
+        return "rate_limited"
+    return _RATE_LIMIT_KINDS.get(raw_type, "rate_limited")
+
+
+def _upstream_429_copy(body_text: str) -> str:
+    """The upstream's own remediation sentence for a non-retryable 429.
+
+    Prefers `message` + `resolution` over `detail`: on paid tiers `detail` is
+    DRF's generic throttle string, while `message`/`resolution` always carry the
+    real copy. Forwarded rather than reconstructed here because the amounts, the
+    requests-vs-credits unit, the period wording and the absolute `payg_url` are
+    all runtime/env-dependent in the monolith — the URL is absolute
+    *specifically* so it survives this proxy.
+
+    Upstream text is untrusted input: redact credential-shaped substrings and
+    cap the length before any of it reaches the model's context.
+    """
+    payload = _parse_upstream_json(body_text)
+    if payload is None:
+        return ""
+    parts = [payload.get("message"), payload.get("resolution")]
+    text = " ".join(p.strip() for p in parts if isinstance(p, str) and p.strip())
+    if not text:
+        raw = payload.get("detail")
+        text = raw.strip() if isinstance(raw, str) else ""
+    return sanitize_error_detail(text, max_len=_MAX_UPSTREAM_COPY) if text else ""
+
+
+def _retry_after_seconds(response: httpx.Response) -> str:
+    """`Retry-After` when it is the integer-seconds form DRF emits (#40 §5).
+
+    RFC 9110 also permits an HTTP-date, which the monolith never produces.
+    Dropping anything non-numeric is safer than interpolating a date into a
+    sentence that reads as a number of seconds.
+    """
+    raw = (response.headers.get("retry-after") or "").strip()
+    return raw if raw.isdigit() else ""
+
+
+def _classify_upstream_error(status: int, body_text: str) -> str:
+    """Compute the `error_kind` for any non-2xx upstream response."""
+    if status == 403:
+        return _classify_upstream_403(body_text)
+    if status == 401:
+        return "expired_token"
+    if status == 429:
+        return _classify_upstream_429(body_text)
+    if status >= 500:
+        return "transient"
+    return "unknown"
+
+
+# Response headers we will accept as an upstream request identifier, in order of
+# preference. `x-request-id` is first so this stays correct if the monolith ever
+# starts emitting one — but it does not today, which is why
+# MCPToolEvent.upstream_request_id sat at 0 of 31,445 rows despite the MCP having
+# sent it all along. Nothing was being sent because nothing was being received.
+#
+# `cf-ray` is Cloudflare's per-request edge id. It is present on 100% of upstream
+# responses AND already captured in the origin's nginx access log
+# (log_format ... ray=$http_cf_ray), so it joins an MCPToolEvent row to an origin
+# request line with no upstream change and no migration — the column is 128 chars
+# and its whole ingest pipeline is already shipped and idle.
+#
+# Caveat worth knowing: this is a grep-join against nginx logs, not a SQL join,
+# and CDN-cached responses never reach origin (so there is no origin line — but in
+# that case there was nothing to correlate to either).
+_REQUEST_ID_HEADERS = ("x-request-id", "cf-ray")
+
+
+def _upstream_request_id(response: httpx.Response) -> Optional[str]:
+    """First usable per-request identifier from an upstream response."""
+    for header in _REQUEST_ID_HEADERS:
+        value = (response.headers.get(header) or "").strip()
+        if value:
+            return value
+    return None
+
+
+def _upstream_hint(
+    status: int,
+    error_kind: str = "unknown",
+    *,
+    upstream_copy: str = "",
+    retry_after: str = "",
+) -> str:
+    if status in (401, 403):
+        if error_kind == "missing_profile":
+            # Reconnecting won't help — the Cognito identity has no matching
+            # FR UserProfile. Tell the LLM to surface the actual remediation.
+            return (
+                "Your FinancialReports account isn't linked to the identity "
+                "you signed in with. Create a free account at "
+                "https://financialreports.eu/signup using the same email you "
+                "used to sign in, or contact support@financialreports.eu if "
+                "you already have one."
+            )
+        if error_kind == "expired_token":
+            return (
+                "Your session has expired. Please disconnect and reconnect "
+                "the FinancialReports connector."
+            )
+        return (
+            "The FinancialReports API rejected the forwarded credentials. "
+            "Ask the user to disconnect and reconnect the FinancialReports "
+            "connector, then retry."
+        )
+    if status == 404:
+        return "The requested resource does not exist upstream — check the id/arguments."
+    if status == 429:
+        # Quota and spend-cap exhaustion are not retryable within the period —
+        # "wait a moment" is actively wrong there (a credit allowance resets at
+        # the start of next month). Forward the upstream's own remediation,
+        # which carries the absolute payg_url. Anything unclassified falls
+        # through to retry advice on purpose. (#73)
+        if error_kind in _NON_RETRYABLE_429 and upstream_copy:
+            return upstream_copy
+        wait = f" Retry after {retry_after}s." if retry_after else ""
+        return "Rate limited by the FinancialReports API — wait a moment and retry." + wait
+    if status >= 500:
+        # The server already retried once before surfacing this (see _api_get),
+        # so do not tell the caller to retry immediately — that would be a third
+        # attempt against an upstream that has failed twice.
+        return "Transient upstream error, already retried once — report if it persists."
+    return "The request was rejected upstream — check the arguments."
+
+
+def _raise_upstream_error(func_name: str, response: httpx.Response) -> None:
+    """Log full upstream context server-side, raise a typed, actionable error.
+
+    The log line carries the response body snippet and a token fingerprint
+    (alg/kid presence — never the token); the raised message carries only
+    status, request id, and a next-step hint.
+    """
+    status = response.status_code
+    request_id = _upstream_request_id(response)
+    body_text = response.text[:1000]
+    error_kind = _classify_upstream_error(status, body_text)
+    logger.warning(
+        "upstream %s status=%d kind=%s request_id=%s client_request_id=%s "
+        "token_fp=%s body=%r",
+        func_name,
+        status,
+        error_kind,
+        request_id,
+        current_call_id(),
+        _jwt_fingerprint(_current_token.get()),
+        # Redact before logging: some gateways echo the Authorization header
+        # in error bodies, and this line ships to the log aggregator.
+        sanitize_error_detail(body_text),
+    )
+    suffix = f" (request-id: {request_id})" if request_id else ""
+    hint = _upstream_hint(
+        status,
+        error_kind,
+        upstream_copy=_upstream_429_copy(body_text) if status == 429 else "",
+        retry_after=_retry_after_seconds(response),
+    )
+    raise UpstreamHTTPError(
+        f"upstream {func_name} returned {status}{suffix}. {hint}",
+        upstream_status=status,
+        request_id=request_id,
+        error_kind=error_kind,
+    )
+
+
+def _upstream_error_text(response: httpx.Response, body_text: str) -> str:
+    """Client-facing error string for a text tool, plus the analytics side-effect.
+
+    The mirror of `_raise_upstream_error` for tools that return their failure as
+    a normal string rather than raising. Records structured context so the
+    middleware promotes the event to `status="error"` with a real `error_kind`,
+    and returns status + classified hint only — the raw upstream body stays
+    server-side, reaching analytics sanitized and the client never at all.
+    """
+    status = response.status_code
+    error_kind = _classify_upstream_error(status, body_text)
+    record_tool_error(
+        "UpstreamHTTPError",
+        f"{status} {response.reason_phrase}: {sanitize_error_detail(body_text)}",
+        upstream_status=status,
+        request_id=_upstream_request_id(response),
+        error_kind=error_kind,
+    )
+    hint = _upstream_hint(
+        status,
+        error_kind,
+        upstream_copy=_upstream_429_copy(body_text) if status == 429 else "",
+        retry_after=_retry_after_seconds(response),
+    )
+    return f"Error {status} {response.reason_phrase}: {hint}"
+
+
+async def _authorize_or_raise() -> tuple[Any, ...]:
+    """Token-validate for structured tools. Raises AuthenticationError
+    if authentication fails. Returns a tuple of context resets.
+    """
+    # DEV-ONLY bypass: mirror the bypass in `subscription_required`. When
+    # DEV_MODE_API_KEY is set, skip JWT validation entirely and return a
+    # context-reset tuple that `_release_auth_context` understands. The prod
+    # hostname guard at module import time prevents this from ever being
+    # active in production.
+    if DEV_MODE_API_KEY:
+        token_reset = _current_token.set(DEV_MODE_API_KEY)
+        return (token_reset, _current_sub.set("dev"))
+
+    try:
+        access_token = get_access_token()
+    except Exception as exc:
+        logger.warning("get_access_token raised: %s", exc)
+        raise AuthenticationError("Could not retrieve access token.") from exc
+
+    if access_token is None:
+        raise AuthenticationError("No access token provided.")
+
+    # Issue #32: mirror the re-swap in `subscription_required` — recover the
+    # upstream Cognito token when the SDK fallback handed us the FastMCP
+    # reference token; fail closed if the session can't be linked.
+    presented = getattr(access_token, "token", None)
+    if presented and _jwt_lacks_kid(presented):
+        access_token = await _resolve_upstream_access_token(presented)
+        if access_token is None:
+            raise AuthenticationError(_RECONNECT_MSG)
+
+    claims = getattr(access_token, "claims", {}) or {}
+    sub = claims.get("sub")
+    raw_token = getattr(access_token, "token", None)
+
+    if not sub or not raw_token:
+        raise AuthenticationError("Invalid token.")
+
+    token_client_id = claims.get("client_id") or getattr(
+        access_token, "client_id", None
+    )
+    if token_client_id != COGNITO_CLIENT_ID:
+        logger.warning(
+            "rejecting token: client_id=%r expected=%r sub=%s",
+            token_client_id,
+            COGNITO_CLIENT_ID,
+            sub[:8],
+        )
+        raise AuthenticationError("Invalid client_id.")
+
+    canonical_resource = f"{MCP_BASE_URL.rstrip('/')}/mcp"
+    accepted_audiences = {COGNITO_CLIENT_ID, canonical_resource, MCP_BASE_URL.rstrip("/")}
+    aud_claim = claims.get("aud")
+    if aud_claim is not None:
+        aud_values = aud_claim if isinstance(aud_claim, list) else [aud_claim]
+        if not any(a in accepted_audiences for a in aud_values):
+            logger.warning(
+                "rejecting token: aud=%r not in %r sub=%s",
+                aud_claim,
+                accepted_audiences,
+                sub[:8],
+            )
+            raise AuthenticationError("Invalid audience.")
+
+    token_reset = _current_token.set(raw_token)
+    return (token_reset, _current_sub.set(sub))
+
+
+def _release_auth_context(resets: tuple[Any, ...]) -> None:
+    for reset in reversed(resets):
+        reset.var.reset(reset)
+
+
+# ---------------------------------------------------------------------------
+# JSON pipeline — bytes in, one serialization out
+# ---------------------------------------------------------------------------
+# Tool responses are parsed straight from the buffered body bytes (no
+# `response.text` decode), scrubbed in place, and serialized once. orjson does
+# both several times faster than the stdlib and is used when installed; it is
+# optional because the stdlib path yields an equivalent document. Anything
+# orjson refuses — an integer past 64 bits — falls back to the stdlib rather
+# than failing the call. `scripts/bench_json_pipeline.py` measures both.
+def _json_loads(body: bytes | str) -> Any:
+    """Parse an upstream JSON body. Raises ValueError on malformed input."""
+    if _orjson is not None:
+        try:
+            return _orjson.loads(body)
+        except _orjson.JSONDecodeError:
+            pass
+    return _json.loads(body)
+
+
+def _json_dumps_pretty(obj: Any) -> str:
+    """Two-space indented JSON, non-ASCII kept as is — the text tools' format."""
+    if _orjson is not None:
+        try:
+            return _orjson.dumps(obj, option=_orjson.OPT_INDENT_2).decode()
+        except TypeError:
+            pass
+    return _json.dumps(obj, indent=2, ensure_ascii=False)
+
+
+def _json_size(obj: Any) -> int:
+    """Compact UTF-8 encoded size of `obj`, in bytes."""
+    if _orjson is not None:
+        try:
+            return len(_orjson.dumps(obj, default=str))
+        except TypeError:
+            pass
+    return len(_json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str).encode())
+
+
+# Fields removed from every tool response before it reaches the client.
+# `markdown_url` is the auth-gated /api/.../markdown/ endpoint: it returns 403
+# for an unauthenticated human, so it must never be surfaced as a link. The LLM
+# still reads filing content via filings_markdown_retrieve(filing_id) (keyed by
+# the `id` field, not this URL). Public, human-shareable links (viewer_url,
+# document / document_url, proxy_url) are deliberately KEPT.
+_CLIENT_HIDDEN_FIELDS = ('markdown_url',)
+
+
+def _scrub_object(obj: dict) -> None:
+    """`_scrub_response` for one object, without descending into its values."""
+    _ext = obj.get("extraction")
+    if isinstance(_ext, dict):
+        _ext.pop("model", None)
+        _ext.pop("prompt_version", None)
+    for _hidden in _CLIENT_HIDDEN_FIELDS:
+        obj.pop(_hidden, None)
+
+
+def _scrub_response(obj):
+    """Strip data that must not reach the client from any tool response.
+
+    Two concerns handled in one recursive pass:
+
+    1. Internal LLM provenance. The FR API emits
+       {"extraction": {"model", "prompt_version", "extracted_at", "notes"}} per
+       financial statement; model + prompt_version leak the internal extraction
+       model name and prompt scheme to end users (and competitors). extracted_at
+       and notes are kept as provenance.
+    2. Auth-gated links. Every key in `_CLIENT_HIDDEN_FIELDS` (currently
+       `markdown_url`) points at an authenticated /api/ endpoint that 403s for an
+       unauthenticated human; removing it stops the model handing a user a broken
+       link. Human-shareable links (viewer_url, document, proxy_url) are kept.
+
+    Recursive, mutates in place, returns obj; a no-op when neither shape is
+    present (e.g. reference-data tools)."""
+    if isinstance(obj, dict):
+        _scrub_object(obj)
+        for _v in obj.values():
+            _scrub_response(_v)
+    elif isinstance(obj, list):
+        for _item in obj:
+            _scrub_response(_item)
+    return obj
+
+
+# Per-tool scrub plans, compiled by the generator from each operation's
+# response schema. `_scrub_response` visits every dict and list in a response,
+# scalars included; a plan visits only the objects the schema says are there
+# and skips every scalar field. Each object visited gets `_scrub_object` — the
+# hidden keys and `extraction` provenance are dropped from *every* object, not
+# only where the schema declares them, because the schema undersells the
+# payload (`filings_list` rows carry `markdown_url` though FilingSummary does
+# not list it, and `view=full` returns whole Filings).
+#
+# A plan node is one object: `keys` maps the fields that can hold objects to
+# their nodes, `each` is the node for every value of a map, and `walk` runs the
+# full `_scrub_response` below a point the schema leaves untyped. Lists are
+# transparent: a node applies to each item. A tool without a plan (POST tools,
+# responses with no JSON schema) gets the full walk.
+_SCRUB_PLANS: dict[str, dict[str, Any]] = {}
+
+
+def _run_scrub_plan(value: Any, plan: dict[str, Any]) -> None:
+    if isinstance(value, list):
+        for item in value:
+            _run_scrub_plan(item, plan)
+        return
+    if not isinstance(value, dict):
+        return
+    if plan.get("walk"):
+        _scrub_response(value)
+        return
+    _scrub_object(value)
+    for key, sub in plan.get("keys", {}).items():
+        child = value.get(key)
+        if child is not None:
+            _run_scrub_plan(child, sub)
+    each = plan.get("each")
+    if each is not None:
+        for child in value.values():
+            _run_scrub_plan(child, each)
+
+
+def _scrub_for(tool: str, data: Any) -> Any:
+    """Scrub a response of `tool` with its compiled plan, or the full walk."""
+    plan = _SCRUB_PLANS.get(tool)
+    if plan is None:
+        return _scrub_response(data)
+    _run_scrub_plan(data, plan)
+    return data
+
+
+def _format_response(
+    response: httpx.Response,
+    fields: Optional[dict[str, Any]] = None,
+    on_results: bool = False,
+    tool: str = "",
+) -> str:
+    """Format an httpx.Response as a JSON code block for the LLM.
+
+    Sync — no I/O happens here, the response body is already buffered by httpx.
+    `fields` / `on_results` are a `_parse_fields` projection and where it applies;
+    `tool` picks the compiled scrub plan.
+    """
+    try:
+        response.raise_for_status()
+        data = _apply_fields(_scrub_for(tool, _json_loads(response.content)), fields, on_results)
+        return f"```json\n{_json_dumps_pretty(data)}\n```"
+    except httpx.HTTPStatusError as exc:
+        # Text tools are ~9 of 15 and used to return the raw upstream body here,
+        # unsanitized — both a leak risk and the reason they never got the
+        # quota upsell. Same classifier as the structured path now (#73); the
+        # unredacted-but-sanitized body still reaches analytics for triage.
+        return _upstream_error_text(exc.response, exc.response.text[:1000])
+    except Exception as exc:
+        record_tool_error("ResponseFormatError", str(exc))
+        return f"Error formatting response: {exc}"
+
+
+# ---------------------------------------------------------------------------
+# Compact table rendering — opt-in `output_format="table"` on text list tools
+# ---------------------------------------------------------------------------
+# A DRF page rendered as indented JSON repeats every key on every row and
+# spends most of its bytes on whitespace. With `output_format="table"` a text
+# list tool renders `results` as one pipe table: the header once, one line per
+# row, nested objects flattened to the columns the generator chose from the
+# response schema (their id / code / name), arrays of scalars joined in one
+# cell. Pagination collapses to a single line above it. Anything that is not a
+# `results` page — an error, an unexpected shape — renders as before.
+def _table_page_number(url: Any, default: str) -> str:
+    if not url:
+        return "none"
+    return httpx.URL(url).params.get("page") or default
+
+
+def _table_cell(row: Any, column: str) -> str:
+    value = row
+    for part in column.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, list) and not any(isinstance(v, (dict, list)) for v in value):
+        value = ", ".join("" if v is None else str(v) for v in value)
+    elif isinstance(value, (dict, list)):
+        value = _json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+    return str(value).replace("|", "\\|").replace("\r", " ").replace("\n", " ")
+
+
+def _format_table(response: httpx.Response, columns: tuple[str, ...], tool: str = "") -> str:
+    """Render a DRF page as a pagination line plus a pipe table."""
+    if not response.is_success:
+        return _format_response(response)
+    try:
+        data = _scrub_for(tool, _json_loads(response.content))
+    except ValueError:
+        return _format_response(response)
+    rows = data.get("results") if isinstance(data, dict) else None
+    if not isinstance(rows, list):
+        return _format_response(response)
+    lines = [
+        f"count={data.get('count')} rows={len(rows)} "
+        f"next_page={_table_page_number(data.get('next'), 'none')} "
+        f"previous_page={_table_page_number(data.get('previous'), '1')}",
+        "| " + " | ".join(columns) + " |",
+        "|" + "---|" * len(columns),
+    ]
+    lines.extend("| " + " | ".join(_table_cell(row, c) for c in columns) + " |" for row in rows)
+    return "\n".join(lines)
+
+
+# ---------------------------------------------------------------------------
+# Auto-pagination — opt-in `max_items` on paginated structured list tools
+# ---------------------------------------------------------------------------
+# Gathering "all filings since X" used to cost one model turn per DRF page.
+# With `max_items` set, the tool reads `count` from the first page, fetches the
+# pages it still needs concurrently (at most _AUTO_PAGINATE_CONCURRENCY in
+# flight, each an ordinary `_api_get` with its retry budget and deadline) and
+# returns them merged in page order as one DRF-shaped page.
+#
+# Pages fetched concurrently from a live list can overlap when rows are
+# inserted mid-walk, so rows are de-duplicated by `id`. The merge stops at
+# `max_items` rows or _AUTO_PAGINATE_MAX_BYTES of serialized rows, whichever
+# comes first, and at the first page that failed; `next` then points at the
+# page holding the first row left out, so the model can resume with `page=`.
+_AUTO_PAGINATE_MAX_ITEMS = int(os.environ.get("MCP_AUTO_PAGINATE_MAX_ITEMS", "500"))
+_AUTO_PAGINATE_CONCURRENCY = max(1, int(os.environ.get("MCP_AUTO_PAGINATE_CONCURRENCY", "4")))
+_AUTO_PAGINATE_MAX_BYTES = int(os.environ.get("MCP_AUTO_PAGINATE_MAX_BYTES", "200000"))
+# page_size asked for when the caller leaves it unset — fewer, larger pages.
+# The upstream may clamp it; the first page's actual length is what counts.
+_AUTO_PAGINATE_PAGE_SIZE = 100
+
+
+def _row_key(row: Any) -> Any:
+    if isinstance(row, dict) and row.get("id") is not None:
+        return row["id"]
+    return _json.dumps(row, sort_keys=True, default=str)
+
+
+async def _auto_paginate(
+    fetch: Callable[[dict[str, Any]], Awaitable[dict[str, Any]]],
+    url: str,
+    params: dict[str, Any],
+    max_items: int,
+) -> dict[str, Any]:
+    """Fetch and merge pages until `max_items` rows; `fetch` GETs one page.
+
+    The first page is fetched on its own — its errors surface exactly as a
+    plain call's would. Later pages that fail end the merge instead.
+    """
+    want = max(1, min(max_items, _AUTO_PAGINATE_MAX_ITEMS))
+    params = dict(params)
+    params.setdefault("page_size", min(want, _AUTO_PAGINATE_PAGE_SIZE))
+    start = int(params.get("page") or 1)
+
+    first = await fetch(params)
+    per_page = len(first.get("results") or [])
+    last = start
+    if per_page and first.get("next"):
+        available = max(0, int(first.get("count") or 0) - (start - 1) * per_page)
+        last = start + -(-min(want, available) // per_page) - 1
+
+    semaphore = asyncio.Semaphore(_AUTO_PAGINATE_CONCURRENCY)
+
+    async def _page(number: int) -> dict[str, Any]:
+        async with semaphore:
+            return await fetch({**params, "page": number})
+
+    rest = await asyncio.gather(
+        *(_page(n) for n in range(start + 1, last + 1)), return_exceptions=True
+    )
+
+    merged: list[Any] = []
+    seen: set[Any] = set()
+    size = 0
+    resume: Optional[int] = None
+    for number, page in enumerate([first, *rest], start):
+        if isinstance(page, BaseException):
+            logger.warning(
+                "auto-pagination stopped at page %d: %s", number, page.__class__.__name__
+            )
+            resume = number
+            break
+        for row in page.get("results") or []:
+            key = _row_key(row)
+            if key in seen:
+                continue
+            row_bytes = _json_size(row)
+            if len(merged) >= want or (merged and size + row_bytes > _AUTO_PAGINATE_MAX_BYTES):
+                resume = number
+                break
+            seen.add(key)
+            merged.append(row)
+            size += row_bytes
+        if resume is not None:
+            break
+    else:
+        if page.get("next"):
+            resume = last + 1
+
+    next_url = None
+    if resume is not None:
+        next_url = str(httpx.URL(API_BASE_URL + url, params={**params, "page": resume}))
+    return {
+        "count": first.get("count"),
+        "next": next_url,
+        "previous": first.get("previous"),
+        "results": merged,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Batch retrieves — the generated `*_retrieve_many` tools
+# ---------------------------------------------------------------------------
+# A peer comparison used to mean one `companies_financials_retrieve` per
+# company: an MCP round trip and an auth pass each. The `_many` companions take
+# a list of ids, authorize once for the whole batch, and fan the GETs out
+# concurrently — at most _BATCH_CONCURRENCY in flight, each an ordinary
+# `_api_get` sharing the caller's token, deadline and retry budget.
+#
+# One bad id must not sink the batch: a failed id comes back inline as
+# {"id", "error", "error_kind"} in its input position, with the same message
+# the single-id tool would have raised. Repeated ids are fetched once.
+_BATCH_MAX_IDS = 50
+_BATCH_CONCURRENCY = max(1, int(os.environ.get("MCP_BATCH_CONCURRENCY", "8")))
+
+
+async def _retrieve_many(
+    func_name: str,
+    path: str,
+    id_param: str,
+    ids: list[int],
+    params: dict[str, Any],
+    fields: Optional[dict[str, Any]] = None,
+) -> dict[str, Any]:
+    """GET `path` once per distinct id; results in input order, errors inline."""
+    if not ids:
+        raise ToolInputError("ids must list at least one id.")
+    if len(ids) > _BATCH_MAX_IDS:
+        raise ToolInputError(
+            f"ids lists {len(ids)} ids; at most {_BATCH_MAX_IDS} per call — split the batch."
+        )
+    urls = {i: path.format(**{id_param: _validate_path_param(id_param, i)}) for i in ids}
+    semaphore = asyncio.Semaphore(_BATCH_CONCURRENCY)
+
+    async def _one(item_id: int) -> dict[str, Any]:
+        async with semaphore:
+            try:
+                response = await _api_get(urls[item_id], lane="interactive", params=params)
+                if response.status_code != 200:
+                    _raise_upstream_error(func_name, response)
+                data = _scrub_for(func_name, _json_loads(response.content))
+                return {"id": item_id, "data": _project(data, fields)}
+            except httpx.HTTPError as exc:
+                # Type only — httpx messages can embed the request URL (see the
+                # structured template).
+                logger.warning(
+                    "upstream %s transport error: %s", func_name, exc.__class__.__name__
+                )
+                return {
+                    "id": item_id,
+                    "error": f"upstream {func_name} request failed "
+                    f"({exc.__class__.__name__}). The FinancialReports API was "
+                    "unreachable or timed out (already retried once).",
+                    "error_kind": "unknown",
+                }
+            except UpstreamHTTPError as exc:
+                return {"id": item_id, "error": str(exc), "error_kind": exc.error_kind}
+            except ValueError:
+                return {
+                    "id": item_id,
+                    "error": f"upstream {func_name} returned non-JSON body",
+                    "error_kind": "unknown",
+                }
+
+    distinct = list(dict.fromkeys(ids))
+    fetched = dict(zip(distinct, await asyncio.gather(*(_one(i) for i in distinct))))
+    return {"results": [fetched[i] for i in ids]}
+
+
+# ---------------------------------------------------------------------------
+# Shared per-user state — a local tier in front of the connector's Redis
+# ---------------------------------------------------------------------------
+# Small pieces of per-user state (feed cursors) must survive the next call
+# landing on a different replica, so they live in the Redis the OAuth proxy
+# already runs, under their own `mcp-<prefix>::` keys. A bounded in-process
+# dict sits in front of it: repeat reads on this replica skip the round trip,
+# and it is the whole store when MCP_REDIS_URL is unset (dev, tests).
+#
+# Redis must never cost a tool call its answer. Every round trip is bounded by
+# _SHARED_STATE_TIMEOUT — a `try/except` does not catch a HANG — and a failed
+# or slow one degrades to the local tier, as the analytics clientInfo lookup
+# does. Values carry their absolute expiry, so a copy pulled into another
+# replica's local tier expires when the original does.
+_SHARED_STATE_TIMEOUT = 0.25
+_SHARED_STATE_LOCAL_MAX = 4096
+
+
+class _SharedTTLStore:
+    """JSON values with a TTL: a local dict, backed by Redis when configured."""
+
+    def __init__(self, prefix: str, ttl: float, local_max: int = _SHARED_STATE_LOCAL_MAX) -> None:
+        self.prefix = prefix
+        self.ttl = ttl
+        self._local_max = local_max
+        self._local: dict[str, tuple[float, Any]] = {}
+
+    def _redis_key(self, key: str) -> str:
+        return f"mcp-{self.prefix}::{key}"
+
+    @staticmethod
+    def _redis() -> Any:
+        # Only bound when MCP_REDIS_URL is set; read per call so it is never
+        # captured before the client exists.
+        return globals().get("_redis_client")
+
+    def _remember(self, key: str, expires: float, value: Any) -> None:
+        if key not in self._local and len(self._local) >= self._local_max:
+            now = time.time()
+            for stale in [k for k, (exp, _) in self._local.items() if exp <= now]:
+                del self._local[stale]
+            if len(self._local) >= self._local_max:
+                self._local.clear()  # cheap bound; Redis still holds the entries
+        self._local[key] = (expires, value)
+
+    async def get(self, key: str) -> Any:
+        now = time.time()
+        hit = self._local.get(key)
+        if hit is not None:
+            if hit[0] > now:
+                return hit[1]
+            del self._local[key]
+        client = self._redis()
+        if client is None:
+            return None
+        try:
+            raw = await asyncio.wait_for(
+                client.get(self._redis_key(key)), timeout=_SHARED_STATE_TIMEOUT
+            )
+            if not raw:
+                return None
+            envelope = _json.loads(raw)
+            expires, value = float(envelope["exp"]), envelope["v"]
+        except Exception:
+            logger.debug("shared state read skipped prefix=%s", self.prefix, exc_info=True)
+            return None
+        if expires <= now:
+            return None
+        self._remember(key, expires, value)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.time() + ttl
+        self._remember(key, expires, value)
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            await asyncio.wait_for(
+                client.set(
+                    self._redis_key(key),
+                    _json.dumps({"v": value, "exp": expires}, separators=(",", ":")),
+                    ex=max(1, int(ttl) + 1),
+                ),
+                timeout=_SHARED_STATE_TIMEOUT,
+            )
+        except Exception:
+            logger.warning(
+                "shared state write failed prefix=%s — held on this replica only",
+                self.prefix,
+            )
+
+    async def delete(self, key: str) -> None:
+        self._local.pop(key, None)
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            await asyncio.wait_for(
+                client.delete(self._redis_key(key)), timeout=_SHARED_STATE_TIMEOUT
+            )
+        except Exception:
+            logger.debug("shared state delete skipped prefix=%s", self.prefix, exc_info=True)
+
+    def held_locally(self, key: str) -> bool:
+        """Whether this replica holds a live `key` — answered without Redis."""
+        hit = self._local.get(key)
+        return hit is not None and hit[0] > time.time()
+
+    def local_count(self) -> int:
+        return len(self._local)
+
+
+# ---------------------------------------------------------------------------
+# Quota-state short circuit — non-retryable 429s per user
+# ---------------------------------------------------------------------------
+# A `quota_exhausted` / `spend_cap_daily` / `spend_ceiling_monthly` 429 does not
+# clear for hours to days, yet every later call from that user went upstream
+# just to be told the same thing. The classified 429 is remembered per `sub`
+# in a _SharedTTLStore and replayed as a synthesized response — original body
+# and headers, Retry-After counted down to the upstream reset — so
+# `_raise_upstream_error` and `_upstream_error_text` render the same
+# `_upstream_429_copy` upsell they would have.
+#
+# The state is held for at most _QUOTA_STATE_TTL seconds, not until the reset:
+# a user who buys credits or raises a cap must not be locked out for two
+# weeks. When it lapses, one call probes upstream and either re-records the
+# state or clears it. A success clears it at once on this replica and in
+# Redis; another replica's local copy ages out within the same bound.
+#
+# After a Redis miss the user is presumed clear on this replica for
+# _QUOTA_RECHECK_SECONDS, so a fan-out (`*_many`, auto-pagination) costs one
+# Redis read, not one per upstream GET. Missing a state another replica just
+# recorded costs one upstream 429, which records it here too.
+_QUOTA_STATE_TTL = float(os.environ.get("MCP_QUOTA_STATE_TTL", "300"))
+_QUOTA_RECHECK_SECONDS = 5.0
+_quota_states = _SharedTTLStore("quota-state", ttl=_QUOTA_STATE_TTL)
+_quota_clear_until: dict[str, float] = {}
+_quota_replays = 0
+
+
+async def _quota_replay(url: str) -> Optional[httpx.Response]:
+    """The current user's remembered quota 429, or None to go upstream."""
+    global _quota_replays
+    sub = _current_sub.get()
+    if not sub or _QUOTA_STATE_TTL <= 0:
+        return None
+    now = time.monotonic()
+    if _quota_clear_until.get(sub, 0.0) > now:
+        return None
+    state = await _quota_states.get(sub)
+    if state is None:
+        if len(_quota_clear_until) >= _SHARED_STATE_LOCAL_MAX:
+            _quota_clear_until.clear()
+        _quota_clear_until[sub] = now + _QUOTA_RECHECK_SECONDS
+        return None
+    headers = [(name, value) for name, value in state["headers"] if name.lower() != "retry-after"]
+    if state["reset"] is not None:
+        headers.append(("retry-after", str(max(1, int(state["reset"] - time.time())))))
+    _quota_replays += 1
+    return httpx.Response(
+        429,
+        headers=headers,
+        content=state["body"].encode(),
+        request=httpx.Request("GET", API_BASE_URL + url),
+    )
+
+
+async def _note_quota_state(response: httpx.Response) -> None:
+    """Record a non-retryable 429 for the current user; clear it on success."""
+    sub = _current_sub.get()
+    if not sub or _QUOTA_STATE_TTL <= 0:
+        return
+    if response.is_success:
+        if _quota_states.held_locally(sub):
+            await _quota_states.delete(sub)
+        return
+    if response.status_code != 429:
+        return
+    body_text = response.text[:4096]
+    if _classify_upstream_429(body_text) not in _NON_RETRYABLE_429:
+        return
+    retry_after = _retry_after_seconds(response)
+    reset = time.time() + int(retry_after) if retry_after else None
+    headers = [
+        [name, value]
+        for name, value in response.headers.items()
+        if name.lower() not in _NOT_FOUND_DROP_HEADERS
+    ]
+    ttl = min(_QUOTA_STATE_TTL, int(retry_after)) if retry_after else _QUOTA_STATE_TTL
+    _quota_clear_until.pop(sub, None)
+    await _quota_states.set(sub, {"reset": reset, "body": body_text, "headers": headers}, ttl=ttl)
+
+
+def _quota_state_stats() -> dict[str, int]:
+    """Quota short-circuit counters for /health."""
+    return {"entries": _quota_states.local_count(), "replays": _quota_replays}
+
+
+# ---------------------------------------------------------------------------
+# Result-size budget for structured tools
+# ---------------------------------------------------------------------------
+# Hosts cap a tool result (Claude Code at 25k tokens by default) and cut what
+# is past the cap without telling the model: a big `filings_list` page or ten
+# years of financials arrived with half a row at the end and the rest of the
+# bytes wasted. A structured result larger than its tool's budget now returns
+# the leading rows plus a `continuation` token; the remainder is held per
+# user in a _SharedTTLStore and a follow-up call with the token is served from
+# it without going upstream. The remainder is split again if it still does
+# not fit, so a page is read in as many calls as it needs.
+#
+# Tokens are not consumed: these tools are annotated idempotent and a host
+# that retries a call must get the same answer. The local tier holds at most
+# _CONTINUATION_LOCAL_MAX remainders — each can be a large page — and Redis,
+# when configured, holds the rest until the TTL.
+_RESULT_MAX_BYTES = int(os.environ.get("MCP_RESULT_MAX_BYTES", "80000"))
+_CONTINUATION_TTL = float(os.environ.get("MCP_CONTINUATION_TTL", "600"))
+_CONTINUATION_LOCAL_MAX = 256
+
+
+def _parse_tool_budgets(raw: str) -> dict[str, int]:
+    """`"filings_list=60000, companies_financials_retrieve=120000"` -> {tool: bytes}.
+
+    Malformed entries are logged and skipped, as for MCP_TOOL_DEADLINE_BY_HOST.
+    """
+    out: dict[str, int] = {}
+    for item in raw.split(","):
+        if not item.strip():
+            continue
+        name, _, value = item.partition("=")
+        try:
+            out[name.strip()] = int(value)
+        except ValueError:
+            logger.warning("ignoring malformed MCP_RESULT_MAX_BYTES_BY_TOOL entry %r", item)
+    return out
+
+
+_RESULT_BUDGETS = _parse_tool_budgets(os.environ.get("MCP_RESULT_MAX_BYTES_BY_TOOL", ""))
+_continuations = _SharedTTLStore(
+    "continuation", ttl=_CONTINUATION_TTL, local_max=_CONTINUATION_LOCAL_MAX
+)
+_continuations_issued = 0
+_continuations_resumed = 0
+
+
+def _rows_within_budget(result: dict[str, Any], key: str, budget: int) -> Optional[int]:
+    """How many of `result[key]` fit in `budget` bytes, or None if all of it does.
+
+    Always at least one row, so every continuation makes progress.
+    """
+    rows = result.get(key)
+    if not isinstance(rows, list) or len(rows) < 2:
+        return None
+    # The envelope, the `"continuation":"<32 hex>"` member and a comma per row.
+    size = _json_size({**result, key: []}) + 50
+    for n, row in enumerate(rows):
+        size += _json_size(row) + 1
+        if n and size > budget:
+            return n
+    return None
+
+
+async def _budget_result(tool: str, result: dict[str, Any], key: str) -> dict[str, Any]:
+    """`result`, or its leading `key` rows and a `continuation` for the rest."""
+    global _continuations_issued
+    budget = _RESULT_BUDGETS.get(tool, _RESULT_MAX_BYTES)
+    n = _rows_within_budget(result, key, budget) if budget > 0 else None
+    if n is None:
+        return result
+    token = uuid.uuid4().hex
+    rows = result[key]
+    await _continuations.set(
+        f"{_current_sub.get()}:{token}", {"tool": tool, "result": {**result, key: rows[n:]}}
+    )
+    _continuations_issued += 1
+    return {**result, key: rows[:n], "continuation": token}
+
+
+async def _resume_result(tool: str, token: str, key: str) -> dict[str, Any]:
+    """The rows held back under `token`, budgeted again."""
+    global _continuations_resumed
+    state = await _continuations.get(f"{_current_sub.get()}:{token}")
+    if state is None or state.get("tool") != tool:
+        raise ToolInputError(
+            "Unknown or expired continuation. Call again without it to re-run the query."
+        )
+    _continuations_resumed += 1
+    return await _budget_result(tool, state["result"], key)
+
+
+def _continuation_stats() -> dict[str, int]:
+    """Result-budget counters for /health."""
+    return {
+        "entries": _continuations.local_count(),
+        "issued": _continuations_issued,
+        "resumed": _continuations_resumed,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Tool-input validation
+# ---------------------------------------------------------------------------
+class ToolInputError(ValueError):
+    """Raised when a tool argument fails server-side validation.
+
+    Caught at tool boundaries and turned into a user-visible error string
+    rather than letting the request reach the upstream API with an unsafe
+    or malformed value.
+    """
+
+
+# Regulator-compliant ISIN: 2 country letters + 9 alphanumerics + 1 check digit.
+_ISIN_RE = re.compile(r"^[A-Z]{2}[A-Z0-9]{9}[0-9]$")
+# Loose UUID match (any case, dash-separated). The FR backend accepts the
+# canonical form; we just want to refuse path traversal payloads here.
+_UUID_RE = re.compile(
+    r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
+)
+# Generic safety net for any string-typed path param the generator emits.
+# 128-char cap and a printable-ASCII allowlist that excludes "/", ".." path
+# components, query/fragment chars, and whitespace. Tools that need richer
+# inputs (e.g. UUIDs, ISINs) should be name-routed through the stricter
+# validators above.
+_GENERIC_PATH_RE = re.compile(r"^[A-Za-z0-9_.~:@!*'()+,;=$&%-]{1,128}$")
+
+
+def _validate_path_param(name: str, value: Any) -> str:
+    """Coerce + validate a path-param value before URL interpolation.
+
+    The generated tool wrappers build URLs as `template.format(**path_params)`.
+    Without validation, a string-typed parameter such as `code="../admin"`
+    silently rewrites the request path with the user's bearer attached.
+
+    Pattern-routed by the *parameter name* the OpenAPI schema declared:
+      - `*_uuid`           → must be a canonical UUID
+      - `code`, `*_code`   → must be a valid ISIN
+      - everything else    → must match the generic-path allowlist
+
+    Integers go through unchanged (path-traversal is impossible).
+    Returns the URL-quoted string ready to slot into the path.
+    """
+    if isinstance(value, bool):
+        raise ToolInputError(f"path parameter {name!r} must not be boolean")
+    if isinstance(value, int):
+        return str(value)
+
+    s = str(value)
+    if not s:
+        raise ToolInputError(f"path parameter {name!r} is empty")
+
+    if name == "code" or name.endswith("_code"):
+        if not _ISIN_RE.fullmatch(s):
+            raise ToolInputError(
+                f"{name!r} must be a 12-character ISIN (e.g. 'US0378331005')"
+            )
+    elif name.endswith("_uuid") or name == "uuid":
+        if not _UUID_RE.fullmatch(s):
+            raise ToolInputError(
+                f"{name!r} must be a UUID (e.g. '11111111-2222-3333-4444-555555555555')"
+            )
+    else:
+        if not _GENERIC_PATH_RE.fullmatch(s):
+            raise ToolInputError(
+                f"{name!r} contains characters that are not allowed in a URL path segment"
+            )
+
+    # quote() with safe="" turns any residual "/" or "?" into %2F / %3F so
+    # path traversal is structurally impossible even if the regex above
+    # ever expanded.
+    return quote(s, safe="")
+
+
+# Query-argument rules compiled from the OpenAPI snapshot. For each
+# schema-derived GET tool the generator emits `_PARAM_RULES[<tool>] =
+# _compile_param_rules({...})` — enums, date/date-time formats, patterns,
+# ranges, and the `ordering` fields the endpoint's description lists — and the
+# tool checks its arguments against them before any upstream call. A bad enum
+# value, a malformed date or an unknown ordering field then costs microseconds
+# and a precise message instead of a round trip and an upstream 400. The
+# upstream stays authoritative: a rule only rejects what it would reject too.
+#
+# Rejections raise ToolArgumentError, whose `error_kind` lands in the analytics
+# event next to the message (which names the parameter and the rule, never the
+# value), so the common mistakes can be counted per tool.
+class ToolArgumentError(ToolInputError):
+    """A tool argument broke a rule compiled from the API schema."""
+
+    error_kind = "invalid_argument"
+
+
+_PARAM_RULES: dict[str, dict[str, Callable[[Any], Optional[str]]]] = {}
+
+
+def _compile_param_rule(name: str, rule: dict[str, Any]) -> Callable[[Any], Optional[str]]:
+    """One parameter's checks as a function: the first problem, or None."""
+    checks: list[Callable[[Any], Optional[str]]] = []
+    if "enum" in rule:
+        allowed = frozenset(rule["enum"])
+        listed = ", ".join(str(v) for v in rule["enum"])
+        checks.append(lambda v: None if v in allowed else f"{name!r} must be one of: {listed}.")
+    if rule.get("format") in ("date", "date-time"):
+        if rule["format"] == "date":
+            parse: Callable[[str], Any] = _dt.date.fromisoformat
+            example = "2026-01-31"
+        else:
+            parse = _dt.datetime.fromisoformat
+            example = "2026-01-31T00:00:00Z"
+
+        def _format(v: Any) -> Optional[str]:
+            try:
+                parse(v)
+            except (TypeError, ValueError):
+                return f"{name!r} must be an ISO 8601 {rule['format']}, e.g. '{example}'."
+            return None
+
+        checks.append(_format)
+    if "pattern" in rule:
+        pattern = re.compile(rule["pattern"])
+        checks.append(
+            lambda v: None
+            if pattern.search(str(v))
+            else f"{name!r} must match the pattern {rule['pattern']}."
+        )
+    if "minimum" in rule:
+        low = rule["minimum"]
+        checks.append(lambda v: None if v >= low else f"{name!r} must be at least {low}.")
+    if "maximum" in rule:
+        high = rule["maximum"]
+        checks.append(lambda v: None if v <= high else f"{name!r} must be at most {high}.")
+    if "minLength" in rule or "maxLength" in rule:
+        shortest, longest = rule.get("minLength", 0), rule.get("maxLength")
+
+        def _length(v: Any) -> Optional[str]:
+            if len(str(v)) < shortest or (longest is not None and len(str(v)) > longest):
+                bound = f"{shortest}-{longest}" if longest is not None else f"at least {shortest}"
+                return f"{name!r} must be {bound} characters long."
+            return None
+
+        checks.append(_length)
+    if "ordering" in rule:
+        fields = frozenset(rule["ordering"])
+        listed = ", ".join(rule["ordering"])
+
+        def _ordering(v: Any) -> Optional[str]:
+            terms = [t.strip() for t in str(v).split(",")]
+            if all(t and t.lstrip("-") in fields for t in terms):
+                return None
+            return f"{name!r} accepts: {listed} (prefix '-' for descending, comma-separate several)."
+
+        checks.append(_ordering)
+
+    def _check(value: Any) -> Optional[str]:
+        for check in checks:
+            try:
+                problem = check(value)
+            except TypeError:
+                problem = f"{name!r} has the wrong type."
+            if problem:
+                return problem
+        return None
+
+    return _check
+
+
+def _compile_param_rules(spec: dict[str, dict[str, Any]]) -> dict[str, Callable[[Any], Optional[str]]]:
+    return {name: _compile_param_rule(name, rule) for name, rule in spec.items()}
+
+
+def _check_query_params(func_name: str, query_params: dict[str, Any]) -> None:
+    """Raise ToolArgumentError on the first argument that breaks its rule."""
+    rules = _PARAM_RULES.get(func_name)
+    if not rules:
+        return
+    for name, value in query_params.items():
+        check = rules.get(name)
+        if check is not None and value is not None:
+            problem = check(value)
+            if problem:
+                raise ToolArgumentError(problem)
+
+
+# ---------------------------------------------------------------------------
+# Field projection — the optional `fields` parameter
+# ---------------------------------------------------------------------------
+# Most questions need three to five fields of a Company that has dozens,
+# listings and merge history included. `fields="id,name,listings.mic"` keeps
+# only those (dotted paths reach into nested objects and through lists) before
+# anything is serialized; on a page it applies to each row of `results`. The
+# API takes no projection parameter, so this runs in-process; an operation
+# whose schema declares its own `fields` is passed through untouched instead.
+#
+# Top-level names are checked against the schema's, which the generator emits
+# into _FIELD_NAMES, so a typo fails loudly instead of returning empty rows.
+_FIELD_NAMES: dict[str, tuple[str, ...]] = {}
+_FIELD_PATH_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*$")
+
+
+def _field_columns(fields: Optional[str]) -> tuple[str, ...]:
+    return tuple(p.strip() for p in (fields or "").split(",") if p.strip())
+
+
+def _parse_fields(func_name: str, fields: Optional[str]) -> Optional[dict[str, Any]]:
+    """`fields` as a projection tree (None = keep the whole value), or None."""
+    if fields is None:
+        return None
+    paths = _field_columns(fields)
+    if not paths:
+        raise ToolArgumentError("'fields' must name at least one field.")
+    known = _FIELD_NAMES.get(func_name, ())
+    tree: dict[str, Any] = {}
+    for path in paths:
+        if not _FIELD_PATH_RE.match(path):
+            raise ToolArgumentError(f"'fields' entry {path!r} is not a dotted field path.")
+        parts = path.split(".")
+        if known and parts[0] not in known:
+            raise ToolArgumentError(
+                f"'fields' names unknown field {parts[0]!r}; known: {', '.join(known)}."
+            )
+        node = tree
+        for part in parts[:-1]:
+            if node.get(part, {}) is None:
+                break  # the whole parent is already selected
+            node = node.setdefault(part, {})
+        else:
+            node[parts[-1]] = None
+    return tree
+
+
+def _project(value: Any, tree: Optional[dict[str, Any]]) -> Any:
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [_project(v, tree) for v in value]
+    if not isinstance(value, dict):
+        return value
+    return {key: _project(value[key], sub) for key, sub in tree.items() if key in value}
+
+
+def _apply_fields(data: Any, tree: Optional[dict[str, Any]], on_results: bool) -> Any:
+    """Project a tool result: each row of a page's `results`, or the object."""
+    if tree is None:
+        return data
+    if on_results:
+        if isinstance(data, dict) and isinstance(data.get("results"), list):
+            data["results"] = [_project(row, tree) for row in data["results"]]
+        return data
+    return _project(data, tree)
+
+
+def _validate_webhook_url(value: Any) -> str:
+    """Block obvious SSRF amplification targets at the MCP boundary.
+
+    The Django backend is responsible for the authoritative check; this is
+    defense in depth so a misconfigured backend cannot be used by a
+    subscriber to probe the cloud instance-metadata endpoint, link-local
+    addresses, or loopback.
+    """
+    if not isinstance(value, str) or not value:
+        raise ToolInputError("webhook url must be a non-empty string")
+    parsed = urlsplit(value)
+    if parsed.scheme != "https":
+        raise ToolInputError("webhook url must use https://")
+    host = parsed.hostname
+    if not host:
+        raise ToolInputError("webhook url is missing a host")
+
+    # Block hostname-form private/reserved addresses. We only resolve when
+    # the hostname is already an IP literal; deferring DNS to the backend
+    # avoids a TOCTOU dance and matches its enforcement model.
+    try:
+        ip = ipaddress.ip_address(host)
+    except ValueError:
+        ip = None
+    if ip is not None and (
+        ip.is_private
+        or ip.is_loopback
+        or ip.is_link_local
+        or ip.is_multicast
+        or ip.is_reserved
+        or ip.is_unspecified
+    ):
+        raise ToolInputError("webhook url must not target a private or loopback address")
+    return value
+
+
+def _safe_error(func_name: str, exc: BaseException) -> str:
+    """Generic error string returned to the LLM.
+
+    We intentionally do NOT echo the exception message — it can include
+    upstream URLs, internal hostnames, or token fragments. The full
+    traceback is logged server-side by the caller via logger.exception().
+    """
+    # A text tool returns this string instead of raising, so the analytics
+    # middleware would log it status="ok" without help (#40 §1). Record the
+    # real error context; the middleware promotes the event to status="error".
+    record_tool_error(
+        type(exc).__name__,
+        str(exc),
+        upstream_status=getattr(exc, "upstream_status", None),
+        request_id=getattr(exc, "request_id", None),
+        error_kind=getattr(exc, "error_kind", "") or "",
+    )
+    if isinstance(exc, ToolInputError):
+        return f"Invalid argument: {exc}"
+    if isinstance(exc, (AuthenticationError, UpstreamHTTPError)):
+        # Our own constructed messages — safe by design (status + hint,
+        # no URLs, no bodies, no token material).
+        return str(exc)
+    return f"Error calling {func_name}. See server logs for details."
+
+
+# ---------------------------------------------------------------------------
+# FastAPI host
+# ---------------------------------------------------------------------------
+# FastMCP returns a Starlette app that already serves /mcp + all OAuth
+# endpoints. We mount it at root, with a few FastAPI routes (health, favicon,
+# browser landing) declared first so they win the route match.
+
+# Usage analytics: capture every tool/prompt call (sub + tool + sanitized args
+# + host + status + latency) and fire-and-forward to the web backend's internal
+# ingest endpoint. Inert unless MCP_ANALYTICS_INGEST_URL + MCP_INGEST_SHARED_SECRET
+# are set. Registered on the MCP-protocol layer (mcp.add_middleware) — NOT the
+# FastAPI app — because it needs tool/prompt semantics, not raw HTTP.
+_usage_emitter = build_emitter_from_env()
+# client_info_store: the same Redis the connector already runs. Needed because
+# stateless_http drops `clientInfo` after `initialize`, and with several replicas
+# the initialize and the tool call routinely land on different ones. None when
+# Redis is unset (dev/tests) — attribution then works per-process only.
+mcp.add_middleware(UsageAnalyticsMiddleware(
+    _usage_emitter, server_version=MCP_VERSION,
+    # `_redis_client` is only bound inside the `if MCP_REDIS_URL:` branch above,
+    # so it is genuinely absent in disk mode — read it defensively rather than
+    # NameError'ing the server at import time when Redis is unset.
+    client_info_store=globals().get("_redis_client"),
+))
+
+
+def _call_budget(context: Any) -> Optional[float]:
+    """Deadline budget in seconds for this tool call, or None for no deadline."""
+    host, _ = current_client_info(context)
+    budget = _DEADLINE_BY_HOST.get(host.lower(), _DEADLINE_DEFAULT)
+    if budget <= 0:
+        return None
+    try:
+        meta = getattr(getattr(context, "message", None), "meta", None)
+        stated = (getattr(meta, "model_extra", None) or {}).get("timeoutMs")
+        if isinstance(stated, (int, float)) and not isinstance(stated, bool) and stated > 0:
+            budget = min(budget, stated / 1000.0)
+    except Exception:
+        logger.debug("deadline: request _meta unreadable", exc_info=True)
+    return budget
+
+
+class _DeadlineMiddleware(Middleware):
+    """Carry the per-call deadline and cancel the call once it passes.
+
+    Registered after the analytics middleware, so it runs INSIDE it: the host
+    name `_call_budget` keys on has already been resolved for this call, and a
+    call cancelled here still reaches analytics as one error event with
+    error_kind="deadline_exceeded".
+    """
+
+    async def on_call_tool(self, context, call_next):
+        budget = _call_budget(context)
+        if budget is None:
+            return await call_next(context)
+        reset = _call_deadline.set(time.monotonic() + budget)
+        scope = asyncio.timeout(budget)
+        try:
+            async with scope:
+                return await call_next(context)
+        except TimeoutError as exc:
+            if not scope.expired():
+                raise  # a timeout from inside the tool, not our deadline
+            logger.warning(
+                "tool %s cancelled at its %.1fs deadline",
+                getattr(getattr(context, "message", None), "name", "?"),
+                budget,
+            )
+            raise _deadline_exceeded() from exc
+        finally:
+            _call_deadline.reset(reset)
+
+
+mcp.add_middleware(_DeadlineMiddleware())
+
+
+# Output-schema validation. The MCP SDK checks every structured result against
+# the tool's outputSchema with `jsonschema.validate`, which re-checks the
+# schema and builds a new validator on every call — for a 50-row filings_list
+# and its deeply inlined schema that was the largest CPU cost after parsing.
+# Validators are compiled once per tool (`_compile_output_validators`, run at
+# the end of the module; the generator already checked each schema against
+# its metaschema, the slow part) and this middleware validates with them; it then
+# hands the SDK a finished CallToolResult (`meta` set), which the SDK returns
+# as is instead of validating again. A tool without a compiled validator
+# (registered later) is left to the SDK.
+#
+# The schemas are generated from the same OpenAPI document as the requests,
+# so a mismatch means upstream drift, not a per-call accident: production
+# validates every _OUTPUT_VALIDATION_SAMPLE-th result per tool (the first one
+# always), the tests every one. 0 turns validation off. /health reports counts
+# and timings per tool under `output_validation`. The middleware is registered
+# innermost, after `_StructuredResultMiddleware` below.
+_OUTPUT_VALIDATION_SAMPLE = int(os.environ.get("MCP_OUTPUT_VALIDATION_SAMPLE", "10"))
+_output_validators: dict[str, Any] = {}
+_output_validation_stats: dict[str, dict[str, float]] = defaultdict(
+    lambda: {"calls": 0, "validated": 0, "failed": 0, "total_ms": 0.0, "max_ms": 0.0}
+)
+
+
+def _compile_output_validators() -> None:
+    """Build one validator per registered tool with an output schema."""
+    for name, tool in mcp._tool_manager._tools.items():
+        schema = getattr(tool, "output_schema", None)
+        if schema is None or name in _output_validators:
+            continue
+        _output_validators[name] = jsonschema.validators.validator_for(schema)(schema)
+
+
+class _OutputValidationMiddleware(Middleware):
+    """Validate structured results with the precompiled validators, sampled."""
+
+    async def on_call_tool(self, context, call_next):
+        result = await call_next(context)
+        name = getattr(getattr(context, "message", None), "name", "")
+        validator = _output_validators.get(name)
+        structured = getattr(result, "structured_content", None)
+        if validator is None or structured is None:
+            return result  # the SDK validates (or reports the missing output)
+        stats = _output_validation_stats[name]
+        stats["calls"] += 1
+        sample = _OUTPUT_VALIDATION_SAMPLE
+        if sample > 0 and (stats["calls"] - 1) % sample == 0:
+            started = time.perf_counter()
+            error = jsonschema.exceptions.best_match(validator.iter_errors(structured))
+            elapsed = (time.perf_counter() - started) * 1000
+            stats["validated"] += 1
+            stats["total_ms"] += elapsed
+            stats["max_ms"] = max(stats["max_ms"], elapsed)
+            if error is not None:
+                stats["failed"] += 1
+                logger.warning("tool %s output failed its schema: %s", name, error.message)
+                raise ToolError(f"Output validation error: {error.message}")
+        if result.meta is None:
+            result.meta = {}
+        return result
+
+
+def _output_validation_report() -> dict[str, dict[str, float]]:
+    """Per-tool validation counters and timings for /health."""
+    return {
+        name: {
+            "calls": int(s["calls"]),
+            "validated": int(s["validated"]),
+            "failed": int(s["failed"]),
+            "mean_ms": round(s["total_ms"] / s["validated"], 3) if s["validated"] else 0.0,
+            "max_ms": round(s["max_ms"], 3),
+        }
+        for name, s in sorted(_output_validation_stats.items())
+    }
+
+
+# Structured results: one serialization, optionally no duplicate. FastMCP
+# writes a structured result once, as the compact JSON text block it sends
+# next to `structuredContent`; the analytics middleware then measured the
+# result by serializing it again. This middleware records the text block's
+# length on the result (`serialized_chars`, read by `_result_metrics`).
+#
+# The text block is the whole result a second time. Clients that read
+# `structuredContent` (protocol 2025-06-18 and later) do not need it, so for
+# the hosts named in MCP_STRUCTURED_POINTER_HOSTS ("*" for all) it is
+# replaced with a one-line pointer. Off by default: the spec says a
+# structured result SHOULD carry its serialized copy for older clients, and
+# some hosts only show the model the text.
+_STRUCTURED_POINTER_HOSTS = frozenset(
+    h.strip().lower()
+    for h in os.environ.get("MCP_STRUCTURED_POINTER_HOSTS", "").split(",")
+    if h.strip()
+)
+_STRUCTURED_CONTENT_SINCE = "2025-06-18"
+
+
+def _sends_pointer(context: Any) -> bool:
+    """Whether this call's client gets a pointer instead of the text copy."""
+    if not _STRUCTURED_POINTER_HOSTS:
+        return False
+    host, _ = current_client_info(context)
+    if "*" not in _STRUCTURED_POINTER_HOSTS and host.lower() not in _STRUCTURED_POINTER_HOSTS:
+        return False
+    try:
+        version = (get_http_headers(include_all=True) or {}).get("mcp-protocol-version")
+    except Exception:
+        version = None
+    # No header: the transport spec says to assume 2025-03-26, which predates
+    # structuredContent.
+    return (version or "2025-03-26") >= _STRUCTURED_CONTENT_SINCE
+
+
+def _result_pointer(structured: dict[str, Any], chars: int) -> str:
+    rows = structured.get("results")
+    if isinstance(rows, list):
+        shape = f"{len(rows)} results"
+    else:
+        shape = "keys: " + ", ".join(list(structured)[:8])
+    note = "; more via `continuation`" if structured.get("continuation") else ""
+    return f"Result is in structuredContent ({shape}; {chars} chars of JSON{note})."
+
+
+class _StructuredResultMiddleware(Middleware):
+    """Record the size of a structured result's text copy; maybe replace it."""
+
+    async def on_call_tool(self, context, call_next):
+        result = await call_next(context)
+        structured = getattr(result, "structured_content", None)
+        content = getattr(result, "content", None) or []
+        if structured is None or len(content) != 1 or getattr(content[0], "text", None) is None:
+            return result
+        tool = mcp._tool_manager._tools.get(getattr(context.message, "name", ""))
+        if tool is None or (tool.output_schema or {}).get("x-fastmcp-wrap-result"):
+            return result  # a text tool: the text is the result, not a copy
+        chars = len(content[0].text)
+        result.serialized_chars = chars
+        if _sends_pointer(context):
+            result.content = [TextContent(type="text", text=_result_pointer(structured, chars))]
+        return result
+
+
+# FastMCP runs the last-registered middleware innermost, so the validator is
+# registered after this one and stays innermost: a failed validation reaches
+# the deadline and analytics layers as the call's error, its timing covers
+# validation alone, and only a validated result is measured or replaced here.
+mcp.add_middleware(_StructuredResultMiddleware())
+mcp.add_middleware(_OutputValidationMiddleware())
+
+# stateless_http=True — build a fresh transport per request instead of holding an
+# in-memory session table keyed by `Mcp-Session-Id`. This connector runs as a
+# horizontally-scaled Cloud Run service with NO load-balancer session affinity, so
+# a stateful session minted on instance A is unknown to instance B: the follow-up
+# `POST /mcp` 404s (spec-mandated "session not found"), the client surfaces
+# McpSessionTerminated, and its now-orphaned SSE GET stream idles out (~5 min) as
+# stream_timeout. Those three are the connector's dominant errors. Auth is fully
+# per-request — the presented bearer JWT is re-swapped against the Redis-backed
+# OAuth store (`_oauth_storage`), NOT the transport session — so dropping session
+# state is safe and eliminates all three failure modes. Do not remove without a
+# shared (Redis-backed) session store AND load-balancer affinity in place.
+mcp_app = mcp.http_app(path="/mcp", stateless_http=True)
+
+
+# Cache static asset bytes in-process so connector probes (Claude, Cursor,
+# ChatGPT) don't trigger one outbound CDN call per probe per replica.
+# Each entry is (bytes, fetched_at). TTL 24h matches the public Cache-Control.
+_ASSET_TTL = 86400.0
+_asset_cache: dict[str, tuple[bytes, str, float]] = {}
+_asset_cache_lock = asyncio.Lock()
+
+
+async def _fetch_asset(url: str, fallback_media: str) -> Optional[tuple[bytes, str]]:
+    """Return (bytes, media_type) for a CDN-hosted static asset.
+
+    Uses an in-process cache with `_ASSET_TTL` freshness; falls back to a
+    stale entry on transient CDN failure rather than 5xxing the probe.
+    Returns None if there's no cached entry and the upstream fetch fails.
+    """
+    now = time.monotonic()
+    cached = _asset_cache.get(url)
+    if cached is not None:
+        data, media, fetched_at = cached
+        if now - fetched_at < _ASSET_TTL:
+            return data, media
+
+    async with _asset_cache_lock:
+        # Re-check after lock acquisition.
+        cached = _asset_cache.get(url)
+        if cached is not None:
+            data, media, fetched_at = cached
+            if time.monotonic() - fetched_at < _ASSET_TTL:
+                return data, media
+        try:
+            resp = await _api_client.get(url, timeout=5.0)
+            resp.raise_for_status()
+            media = resp.headers.get("content-type", fallback_media)
+            data = resp.content
+            _asset_cache[url] = (data, media, time.monotonic())
+            return data, media
+        except Exception as exc:
+            logger.warning("asset fetch failed url=%s err=%s", url, exc)
+            if cached is not None:
+                # Serve stale on failure rather than giving the probe a 204.
+                return cached[0], cached[1]
+            return None
+
+
+# MCP_STARTUP_SELFCHECK: "warn" (default) logs and boots; "strict" fails boot;
+# "off" skips the probe entirely (used by the e2e compose stack, which boots two
+# containers against the real upstream and would otherwise trip the throttle).
+_SELFCHECK_MODE = os.environ.get("MCP_STARTUP_SELFCHECK", "warn").strip().lower()
+_SELFCHECK_PATH = "/health/"
+
+
+async def _upstream_selfcheck() -> None:
+    """Confirm the upstream is reachable at boot instead of at first user call.
+
+    Routed through `_api_client` on purpose: that way an API_BASE_URL or
+    transport misconfiguration surfaces here rather than silently degrading every
+    tool call. `_inject_auth` returns immediately when `_current_token` is empty
+    (its default), so this is genuinely unauthenticated.
+
+    Success means "the upstream answered", NOT "the upstream answered 200".
+    /health/ sits behind the anonymous burst throttle — 12 rapid unauthenticated
+    GETs return 200, 200, 200 then 429 — so a cold multi-instance scale-out would
+    see 429s. A 429 still proves reachability, which is the only thing this probe
+    is asking about. Requiring 200 would make boot flaky for no benefit.
+    """
+    if _SELFCHECK_MODE == "off":
+        return
+    try:
+        resp = await _api_client.get(_SELFCHECK_PATH, timeout=5.0)
+    except httpx.HTTPError as exc:
+        msg = "upstream self-check failed at startup: %s"
+        if _SELFCHECK_MODE == "strict":
+            logger.error(msg + " (MCP_STARTUP_SELFCHECK=strict)", exc.__class__.__name__)
+            raise
+        logger.warning(msg, exc.__class__.__name__)
+        return
+    logger.info("upstream self-check ok (status=%s)", resp.status_code)
+
+
+# ---------------------------------------------------------------------------
+# Upstream pre-warm and keepalive
+# ---------------------------------------------------------------------------
+# After a scale-from-zero, or any lull longer than _API_LIMITS.keepalive_expiry,
+# the first tool call pays DNS + TCP + TLS + HTTP/2 setup to the upstream on the
+# user's critical path. So boot opens the upstream connections up front and a
+# background loop keeps them from idling out.
+#
+# Keepalive is a bodiless anonymous HEAD on each pool, not an HTTP/2 PING frame.
+# httpcore offers no way to send a PING outside a request, and its idle expiry
+# is a client-side timer that only a completed request resets — a PING would
+# keep the server side of the connection alive while httpcore still discarded
+# it. The HEAD does both jobs: it resets the timer and proves the connection
+# still answers. Any HTTP response counts, for the reason `_upstream_selfcheck`
+# gives: /health/ is behind the anonymous burst throttle.
+#
+# MCP_UPSTREAM_WARM_CONNECTIONS is how many upstream connections to hold warm
+# (0 switches all of this off; default: every interactive connection plus the
+# bulk lane's one). With HTTP/2 each member pool multiplexes onto a single
+# connection, so one warm connection per member is the unit, taken primary pool
+# first. On Cloud Run with request-based CPU allocation the loop only runs while
+# the instance has CPU: it keeps a busy instance's pools warm between calls, and
+# an always-on-CPU instance warm while idle as well.
+_WARM_CONNECTIONS = int(
+    os.environ.get("MCP_UPSTREAM_WARM_CONNECTIONS", str(_UPSTREAM_HTTP2_CONNECTIONS + 1))
+)
+# Comfortably inside keepalive_expiry=30 s so a connection is refreshed before
+# httpcore would expire it.
+_WARM_INTERVAL = float(os.environ.get("MCP_UPSTREAM_KEEPALIVE_INTERVAL", "20"))
+# Re-resolve the upstream host this often. Python keeps no DNS cache of its own,
+# so this keeps the platform resolver's cache hot for the next connection and
+# logs a resolution failure before a tool call trips over it.
+_DNS_REFRESH_INTERVAL = float(os.environ.get("MCP_UPSTREAM_DNS_REFRESH", "60"))
+_WARM_TIMEOUT = 5.0
+
+
+def _upstream_pools() -> list[tuple[httpx.AsyncClient, httpx.AsyncHTTPTransport]]:
+    """Every (client, transport) pair holding upstream connections, primary first."""
+    pools = [(_api_client, _api_transport), (_api_bulk_client, _api_bulk_transport)]
+    if _HEDGE_ENABLED:
+        pools.append((_api_hedge_client, _api_hedge_transport))
+    return pools
+
+
+def _pool_width(transport: Any) -> int:
+    """Connections a transport holds when warm: one per HTTP/2 member pool."""
+    return len(getattr(transport, "members", (transport,)))
+
+
+def _warm_plan() -> list[tuple[httpx.AsyncClient, Any, int]]:
+    """(client, transport, connections to hold warm), primary pool first,
+    capped at _WARM_CONNECTIONS in total."""
+    plan, budget = [], max(0, _WARM_CONNECTIONS)
+    for client, transport in _upstream_pools():
+        count = min(budget, _pool_width(transport))
+        if count:
+            plan.append((client, transport, count))
+        budget -= count
+    return plan
+
+
+def _live_connections(transport: Any) -> int:
+    """Open (or opening) connections across a transport's pool(s)."""
+    return sum(
+        1
+        for member in getattr(transport, "members", (transport,))
+        for conn in member._pool.connections
+        if not conn.is_closed() and not conn.has_expired()
+    )
+
+
+def _warm_connection_count() -> int:
+    """Warm upstream connections across every pool — reported on /health."""
+    return sum(_live_connections(t) for _, t in _upstream_pools())
+
+
+async def _warm_pool(client: httpx.AsyncClient) -> None:
+    try:
+        await client.head(_SELFCHECK_PATH, timeout=_WARM_TIMEOUT)
+    except httpx.HTTPError as exc:
+        logger.info("upstream keepalive failed: %s", exc.__class__.__name__)
+
+
+async def _warm_round(cold_only: bool) -> None:
+    """One HEAD per connection to warm, fired concurrently.
+
+    Concurrency is what spreads them: `_BalancedHTTP2Transport` places each new
+    stream on its least-busy member, so N simultaneous HEADs land one per
+    member connection.
+    """
+    probes = []
+    for client, transport, count in _warm_plan():
+        if cold_only:
+            count -= _live_connections(transport)
+        probes.extend(_warm_pool(client) for _ in range(max(0, count)))
+    if probes:
+        await asyncio.gather(*probes)
+
+
+async def _prewarm_upstream() -> None:
+    """Open every warm connection that is not open yet.
+
+    The self-check has usually opened one on the primary pool already, so
+    this only adds the connections still missing.
+    """
+    await _warm_round(cold_only=True)
+    logger.info(
+        "upstream pre-warm: %d warm connection(s), target %d",
+        _warm_connection_count(),
+        _WARM_CONNECTIONS,
+    )
+
+
+async def _refresh_upstream_dns() -> None:
+    port = urlsplit(API_BASE_URL).port or 443
+    try:
+        await asyncio.get_running_loop().getaddrinfo(_API_HOST, port, type=socket.SOCK_STREAM)
+    except OSError as exc:
+        logger.warning("upstream DNS refresh for %s failed: %s", _API_HOST, exc)
+
+
+async def _keep_upstream_warm() -> None:
+    """Background loop: refresh every warm pool, re-resolve DNS periodically."""
+    next_dns = time.monotonic() + _DNS_REFRESH_INTERVAL
+    while True:
+        await asyncio.sleep(_WARM_INTERVAL)
+        try:
+            await _warm_round(cold_only=False)
+            if time.monotonic() >= next_dns:
+                next_dns = time.monotonic() + _DNS_REFRESH_INTERVAL
+                await _refresh_upstream_dns()
+        except Exception:
+            # The loop must outlive any single bad round; a dead keepalive
+            # task would silently put connection setup back on user calls.
+            logger.warning("upstream keepalive round failed", exc_info=True)
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Compose our shutdown work with FastMCP's existing lifespan.
+
+    Also performs an explicit Redis ping when MCP_REDIS_URL is configured,
+    so a misconfigured Redis URL fails the revision at boot rather than
+    silently falling back to broken OAuth at first user login, plus an
+    unauthenticated upstream reachability probe (see _upstream_selfcheck) and
+    the upstream pre-warm/keepalive loop.
+    """
+    if _oauth_storage is not None and MCP_REDIS_URL:
+        try:
+            import redis.asyncio as _aioredis  # late import; only needed when configured
+
+            _ping_client = _aioredis.from_url(MCP_REDIS_URL)
+            try:
+                await _ping_client.ping()
+                logger.info("Redis ping ok (%s)", _redact_redis_url(MCP_REDIS_URL))
+            finally:
+                await _ping_client.aclose()
+        except Exception:
+            logger.exception("Redis ping failed — failing fast at startup")
+            raise
+
+    await _upstream_selfcheck()
+
+    warm_task: Optional[asyncio.Task] = None
+    if _WARM_CONNECTIONS > 0:
+        await _prewarm_upstream()
+        warm_task = asyncio.create_task(_keep_upstream_warm())
+
+    await _usage_emitter.start()
+
+    try:
+        async with mcp_app.lifespan(app):
+            yield
+    finally:
+        if warm_task is not None:
+            warm_task.cancel()
+        await _api_client.aclose()
+        await _api_bulk_client.aclose()
+        await _api_hedge_client.aclose()
+        await _usage_emitter.aclose()
+        close = getattr(_oauth_storage, "aclose", None)
+        if callable(close):
+            try:
+                await close()
+            except Exception:
+                logger.warning("oauth storage aclose() raised", exc_info=True)
+
+
+app = FastAPI(
+    title="FinancialReports MCP Connector",
+    version=MCP_VERSION,
+    lifespan=_lifespan,
+    docs_url=None,
+    redoc_url=None,
+    openapi_url=None,
+)
+
+
+def _origin_allowed(origin: str) -> bool:
+    if origin in ALLOWED_MCP_ORIGINS:
+        return True
+    try:
+        host = urlsplit(origin).hostname or ""
+    except ValueError:
+        return False
+    return any(host.endswith(suffix) for suffix in ALLOWED_MCP_ORIGIN_SUFFIXES)
+
+
+class _OriginAndProtocolMiddleware(BaseHTTPMiddleware):
+    """Two MCP-spec MUST checks the host server is responsible for.
+
+    1. **Origin validation** (Transports §Security Warning, 2025-11-25):
+       reject browser-origin requests carrying a foreign Origin to
+       prevent DNS-rebinding attacks. We only enforce when the header
+       is present, since legitimate server-to-server clients
+       (Claude.ai backend, Cursor agents, ChatGPT) typically don't send
+       one.
+
+    2. **MCP-Protocol-Version handshake** (Transports §Protocol Version
+       Header, 2025-11-25): if the client sent an `MCP-Protocol-Version`
+       header that we don't support, return HTTP 400. Echo the negotiated
+       version on every response so clients can detect downgrades.
+
+    Both checks are scoped to the /mcp path; static endpoints (/, /health,
+    /favicon.ico, /icon.png, /.well-known/*) are unaffected.
+    """
+
+    _PROTECTED_PREFIX = "/mcp"
+
+    async def dispatch(self, request: Request, call_next: Callable[..., Any]) -> Response:
+        path = request.url.path
+        if path == self._PROTECTED_PREFIX or path.startswith(self._PROTECTED_PREFIX + "/"):
+            origin = request.headers.get("origin")
+            if origin and not _origin_allowed(origin):
+                logger.warning("rejecting /mcp request: foreign origin=%r", origin)
+                return JSONResponse(
+                    {"error": "forbidden_origin", "error_description": f"Origin {origin!r} not allowed"},
+                    status_code=403,
+                )
+
+            requested_version = request.headers.get("mcp-protocol-version")
+            if (
+                requested_version
+                and requested_version not in SUPPORTED_MCP_PROTOCOL_VERSIONS
+            ):
+                logger.warning(
+                    "rejecting /mcp request: unsupported MCP-Protocol-Version=%r",
+                    requested_version,
+                )
+                return JSONResponse(
+                    {
+                        "error": "unsupported_protocol_version",
+                        "error_description": (
+                            f"MCP-Protocol-Version {requested_version!r} is not supported. "
+                            f"Server supports: {sorted(SUPPORTED_MCP_PROTOCOL_VERSIONS)}."
+                        ),
+                        "supported_versions": sorted(SUPPORTED_MCP_PROTOCOL_VERSIONS),
+                    },
+                    status_code=400,
+                )
+
+        response: Response = await call_next(request)
+
+        # Echo the negotiated protocol version so clients can detect
+        # downgrades. Per spec, after init the value must be "the version
+        # negotiated during initialization"; outside an init we echo the
+        # server default. FastMCP doesn't surface the per-session value to
+        # middleware, so this is best-effort.
+        if path == self._PROTECTED_PREFIX or path.startswith(self._PROTECTED_PREFIX + "/"):
+            negotiated = request.headers.get("mcp-protocol-version") or DEFAULT_MCP_PROTOCOL_VERSION
+            response.headers.setdefault("MCP-Protocol-Version", negotiated)
+
+        # Augment FastMCP's WWW-Authenticate header with the `scope=`
+        # parameter the spec SHOULDs (Authorization §Protected Resource
+        # Metadata Discovery). The advertised scopes MUST match what the
+        # authorization server actually accepts on /register and /token,
+        # because RFC-7662-aware clients (Claude) take this as the value
+        # to send on dynamic client registration. We previously
+        # advertised "mcp:read" — Cognito has no such scope, so DCR
+        # rejected every Claude registration with `invalid_client_metadata`
+        # and the user-visible result was "Couldn't reach the MCP server".
+        # Use the same scopes the AS metadata advertises.
+        if response.status_code in (401, 403):
+            existing = response.headers.get("www-authenticate", "")
+            if existing.lower().startswith("bearer") and "scope=" not in existing.lower():
+                response.headers["WWW-Authenticate"] = (
+                    existing + ', scope="openid email profile"'
+                )
+
+        return response
+
+
+class _SecurityHeadersMiddleware(BaseHTTPMiddleware):
+    """Apply baseline security headers to every response.
+
+    The CSP is intentionally tight enough to neutralize accidental injection
+    in the landing page (which contains an inline script) but permissive
+    enough to allow the same-origin /favicon.ico image and the inline
+    style/script blocks the landing template ships with.
+    """
+
+    _CSP = (
+        "default-src 'none'; "
+        "img-src 'self' data:; "
+        "style-src 'self' 'unsafe-inline'; "
+        "script-src 'self' 'unsafe-inline'; "
+        "connect-src 'self'; "
+        "base-uri 'none'; "
+        "frame-ancestors 'none'"
+    )
+
+    async def dispatch(self, request: Request, call_next: Callable[..., Any]) -> Response:
+        response: Response = await call_next(request)
+        response.headers.setdefault("X-Content-Type-Options", "nosniff")
+        response.headers.setdefault("X-Frame-Options", "DENY")
+        response.headers.setdefault("Referrer-Policy", "strict-origin-when-cross-origin")
+        response.headers.setdefault(
+            "Permissions-Policy", "camera=(), microphone=(), geolocation=()"
+        )
+        # Only attach CSP to HTML responses. Applying to JSON/binary endpoints
+        # is harmless but adds bytes to every probe; the landing page is the
+        # only thing rendering markup we control.
+        ct = response.headers.get("content-type", "")
+        if ct.startswith("text/html"):
+            response.headers.setdefault("Content-Security-Policy", self._CSP)
+        return response
+
+
+class _RegisterErrorLogger(BaseHTTPMiddleware):
+    """Log /register 400s with the exact request body and our error
+    response. Kept lightweight (only fires on 400, not on success) so
+    it's not chatty in steady state.
+
+    Why permanent: this is the second time we've shipped a regression
+    that broke DCR (first was the Redis backend; second was the
+    "scope=mcp:read" mismatch). Without seeing the request body, both
+    bugs took multiple deploy cycles to diagnose. The cost of one log
+    line per failed registration is far less than one user complaint.
+    """
+
+    async def dispatch(self, request: Request, call_next: Callable[..., Any]) -> Response:
+        if request.url.path != "/register" or request.method != "POST":
+            return await call_next(request)
+
+        body_bytes = await request.body()
+
+        async def replay_receive():
+            return {"type": "http.request", "body": body_bytes, "more_body": False}
+
+        request._receive = replay_receive  # type: ignore[attr-defined]
+
+        response = await call_next(request)
+
+        if response.status_code == 400:
+            try:
+                req_text = body_bytes.decode("utf-8", errors="replace")[:2000]
+            except Exception:
+                req_text = "<unreadable>"
+
+            resp_chunks: list[bytes] = []
+            async for chunk in response.body_iterator:  # type: ignore[attr-defined]
+                resp_chunks.append(chunk)
+            resp_text = b"".join(resp_chunks).decode("utf-8", errors="replace")[:1000]
+
+            logger.warning(
+                "register_400 ua=%r body=%s resp=%s",
+                request.headers.get("user-agent", "?"),
+                req_text,
+                resp_text,
+            )
+
+            return Response(
+                content=b"".join(resp_chunks),
+                status_code=400,
+                headers=dict(response.headers),
+                media_type=response.media_type,
+            )
+
+        return response
+
+
+app.add_middleware(_RegisterErrorLogger)
+app.add_middleware(_OriginAndProtocolMiddleware)
+app.add_middleware(_SecurityHeadersMiddleware)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    # `allow_credentials=True` combined with `allow_origins=["*"]` is rejected
+    # by browsers per the Fetch spec. MCP Streamable HTTP uses a Bearer token
+    # in the Authorization header, not cookies, so credentials are unnecessary.
+    allow_credentials=False,
+    allow_methods=["GET", "POST", "OPTIONS", "DELETE"],
+    # Tightened from "*" — only the headers MCP clients actually send. Avoids
+    # exposing arbitrary cross-origin probing of /health and /favicon.ico
+    # while keeping every working MCP client functional.
+    allow_headers=[
+        "Authorization",
+        "Content-Type",
+        "Accept",
+        "mcp-session-id",
+        "mcp-protocol-version",
+    ],
+    # Canonical case per MCP spec, plus lowercase aliases for any client
+    # whose CORS impl is case-sensitive on expose-headers.
+    expose_headers=[
+        "MCP-Session-Id",
+        "MCP-Protocol-Version",
+        "mcp-session-id",
+        "mcp-protocol-version",
+    ],
+)
+
+
+@app.api_route("/health", methods=["GET", "HEAD"])
+async def health() -> dict[str, Any]:
+    return {
+        "status": "ok",
+        "service": "financial-reports-mcp",
+        "version": MCP_VERSION,
+        "upstream_warm_connections": _warm_connection_count(),
+        "upstream_connections": _api_transport.stats(),
+        "upstream_retry_budget": _retry_budget_stats(),
+        "upstream_not_found_cache": _not_found_stats(),
+        "upstream_quota_states": _quota_state_stats(),
+        "result_continuations": _continuation_stats(),
+        "output_validation": _output_validation_report(),
+    }
+
+
+@app.api_route("/favicon.ico", methods=["GET", "HEAD"])
+async def favicon() -> Response:
+    """Serve the FR favicon. CDN-backed, in-process cached, public 24h."""
+    asset = await _fetch_asset(FAVICON_URL, "image/x-icon")
+    if asset is None:
+        return Response(status_code=204)
+    data, media = asset
+    return Response(
+        content=data,
+        media_type=media,
+        headers={"Cache-Control": "public, max-age=86400"},
+    )
+
+
+async def _serve_asset(url: str, fallback_media: str = "image/png") -> Response:
+    asset = await _fetch_asset(url, fallback_media)
+    if asset is None:
+        return Response(status_code=204)
+    data, media = asset
+    return Response(
+        content=data,
+        media_type=media,
+        headers={"Cache-Control": "public, max-age=86400"},
+    )
+
+
+@app.api_route("/icon.png", methods=["GET", "HEAD"])
+async def icon_png() -> Response:
+    """Default PNG icon. Some MCP connector UIs (incl. Claude) ignore the
+    Icon advertised in the MCP `initialize` response and instead fetch a
+    server-relative `/icon.png`. We proxy it from the same CDN asset
+    `ICON_URL` advertises so both paths show the same artwork."""
+    return await _serve_asset(ICON_URL)
+
+
+@app.api_route("/icon-32.png", methods=["GET", "HEAD"])
+async def icon_png_32() -> Response:
+    return await _serve_asset(ICON_URL)
+
+
+@app.api_route("/icon-192.png", methods=["GET", "HEAD"])
+async def icon_png_192() -> Response:
+    """Larger variant for connector renderers that prefer ≥48×48."""
+    return await _serve_asset(ICON_URL_192)
+
+
+@app.api_route("/icon-512.png", methods=["GET", "HEAD"])
+async def icon_png_512() -> Response:
+    """Connector-directory thumbnail size (Claude.ai card)."""
+    return await _serve_asset(ICON_URL_512)
+
+
+@app.api_route("/apple-touch-icon.png", methods=["GET", "HEAD"])
+async def apple_touch_icon() -> Response:
+    """iOS/touch fallback that some clients probe before /icon.png."""
+    return await _serve_asset(APPLE_TOUCH_URL)
+
+
+@app.api_route("/robots.txt", methods=["GET", "HEAD"], response_class=PlainTextResponse)
+async def robots_txt() -> PlainTextResponse:
+    """Permissive robots policy + sitemap pointer.
+
+    Goal: get Google to index `/` (the landing page) so the favicon API
+    starts returning our brand mark. Block JSON-RPC and OAuth endpoints
+    so they don't pollute search results — they have no human-readable
+    content and 401 anyway.
+    """
+    base = MCP_BASE_URL.rstrip("/")
+    body = (
+        "User-agent: *\n"
+        "Allow: /\n"
+        "Disallow: /mcp\n"
+        "Disallow: /authorize\n"
+        "Disallow: /token\n"
+        "Disallow: /register\n"
+        "Disallow: /consent\n"
+        "\n"
+        f"Sitemap: {base}/sitemap.xml\n"
+    )
+    return PlainTextResponse(
+        content=body,
+        headers={"Cache-Control": "public, max-age=86400"},
+    )
+
+
+@app.api_route("/sitemap.xml", methods=["GET", "HEAD"])
+async def sitemap_xml() -> Response:
+    """Single-URL sitemap. Only `/` is a public, human-readable page on
+    this subdomain — everything else is JSON-RPC, OAuth, or asset proxies
+    and doesn't belong in search results.
+    """
+    base = MCP_BASE_URL.rstrip("/")
+    body = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        "  <url>\n"
+        f"    <loc>{base}/</loc>\n"
+        "    <changefreq>weekly</changefreq>\n"
+        "    <priority>1.0</priority>\n"
+        "  </url>\n"
+        "</urlset>\n"
+    )
+    return Response(
+        content=body,
+        media_type="application/xml",
+        headers={"Cache-Control": "public, max-age=86400"},
+    )
+
+
+@app.get("/.well-known/oauth-protected-resource")
+async def oauth_protected_resource_root() -> JSONResponse:
+    """RFC 9728 fallback for clients that probe the bare path.
+
+    FastMCP serves the path-scoped `/.well-known/oauth-protected-resource/mcp`,
+    but a non-trivial number of MCP clients still hit the unsuffixed path.
+    Returning the same metadata at both keeps OAuth discovery from 404ing
+    on those clients without requiring a code change in FastMCP.
+    """
+    return JSONResponse(
+        {
+            "resource": f"{MCP_BASE_URL.rstrip('/')}/mcp",
+            "authorization_servers": [MCP_BASE_URL.rstrip("/") + "/"],
+            "scopes_supported": ["openid", "email", "profile"],
+            "bearer_methods_supported": ["header"],
+        }
+    )
+
+
+@app.get("/.well-known/oauth-authorization-server")
+async def oauth_authorization_server_metadata() -> JSONResponse:
+    """Override FastMCP's default AS metadata so it advertises `none` in
+    `token_endpoint_auth_methods_supported`.
+
+    Microsoft Copilot Studio's `oauth2pkcewithprm` MCP connector is a public
+    (secretless) PKCE client. It reads our AS discovery metadata at connect
+    time and only attempts the `/token` code-exchange if `none` appears in
+    the advertised auth methods. FastMCP 2.13.3 accepts secretless public
+    PKCE clients at both `/register` and `/token` — verified live: DCR with
+    `token_endpoint_auth_method=none` issues a client with no secret, and
+    a subsequent `POST /token` for that client (fake code) fails at code
+    validation with `invalid_grant`, not at client-auth — so the token
+    handler already honours it. Only the discovery metadata is missing
+    `none`, which is why Copilot's public-PKCE client reads the metadata,
+    doesn't see `none`, and never attempts the token exchange (the exact
+    "GET /authorize but never POST /token" signature seen in prod).
+
+    Also add `response_modes_supported = ["query"]` — the OAuth 2.0 default,
+    but some clients (incl. Copilot's connector) prefer to see it explicitly.
+
+    FastAPI matches routes in registration order and `app.mount("/", …)` is
+    the LAST route declaration, so this handler wins over FastMCP's default
+    at `/.well-known/oauth-authorization-server`.
+    """
+    base = MCP_BASE_URL.rstrip("/")
+    return JSONResponse(
+        {
+            "issuer": base + "/",
+            "authorization_endpoint": f"{base}/authorize",
+            "token_endpoint": f"{base}/token",
+            "registration_endpoint": f"{base}/register",
+            "scopes_supported": ["openid", "email", "profile"],
+            "response_types_supported": ["code"],
+            "response_modes_supported": ["query"],
+            "grant_types_supported": ["authorization_code", "refresh_token"],
+            "token_endpoint_auth_methods_supported": [
+                "none",
+                "client_secret_post",
+                "client_secret_basic",
+            ],
+            "code_challenge_methods_supported": ["S256"],
+        }
+    )
+
+
+@app.get("/.well-known/openai-apps-challenge")
+async def openai_apps_challenge() -> PlainTextResponse:
+    """OpenAI ChatGPT Apps Directory domain-verification token."""
+    return PlainTextResponse(OPENAI_APPS_CHALLENGE)
+
+
+_LANDING_HTML = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>FinancialReports MCP — Public-company filings, available to Claude</title>
+    <meta name="description" content="The official MCP (Model Context Protocol) connector for FinancialReports. Direct access from Claude.ai, Claude Code, and any MCP-compatible client to regulatory filings, financial data, and corporate information from listed companies worldwide. 15 tools across 5 domains. Free for any FinancialReports account.">
+    <meta name="robots" content="index, follow">
+    __GOOGLE_SITE_VERIFICATION_META__
+    <link rel="canonical" href="__MCP_BASE_URL__/">
+
+    <link rel="icon" type="image/x-icon" href="__MCP_BASE_URL__/favicon.ico">
+    <link rel="icon" type="image/png" sizes="32x32" href="__MCP_BASE_URL__/icon-32.png">
+    <link rel="icon" type="image/png" sizes="192x192" href="__MCP_BASE_URL__/icon-192.png">
+    <link rel="apple-touch-icon" sizes="180x180" href="__MCP_BASE_URL__/apple-touch-icon.png">
+
+    <meta property="og:type" content="website">
+    <meta property="og:title" content="FinancialReports MCP — Public-company filings, available to Claude">
+    <meta property="og:description" content="The official MCP connector for FinancialReports. Free for any FinancialReports account.">
+    <meta property="og:image" content="__MCP_BASE_URL__/icon-512.png">
+    <meta property="og:url" content="__MCP_BASE_URL__/">
+    <meta property="og:site_name" content="FinancialReports">
+
+    <meta name="twitter:card" content="summary">
+    <meta name="twitter:title" content="FinancialReports MCP — Public-company filings, available to Claude">
+    <meta name="twitter:description" content="MCP connector for Claude — public-company filings, free.">
+    <meta name="twitter:image" content="__MCP_BASE_URL__/icon-512.png">
+    <style>
+        /* —— FinancialReports tokens (subset, inlined for the standalone landing) —— */
+        :root {
+            --fr-brand-500: #0066FF;
+            --fr-brand-600: #0052CC;
+            --fr-brand-50: #EAF2FF;
+            --fr-ink-0: #FFFFFF;
+            --fr-ink-50: #FAFBFC;
+            --fr-ink-100: #F4F5F7;
+            --fr-ink-200: #E6E8EC;
+            --fr-ink-300: #CDD2DA;
+            --fr-ink-400: #9AA2B0;
+            --fr-ink-500: #6B7280;
+            --fr-ink-600: #4B5260;
+            --fr-ink-700: #2D3340;
+            --fr-ink-900: #0B0F18;
+            --fr-success-500: #0E8A4A;
+            --fr-bg: var(--fr-ink-0);
+            --fr-bg-subtle: var(--fr-ink-50);
+            --fr-border: var(--fr-ink-200);
+            --fr-font-sans: -apple-system, BlinkMacSystemFont, "Inter Tight", "Inter", "Segoe UI", system-ui, sans-serif;
+            --fr-font-serif: "Source Serif 4", "Source Serif Pro", Georgia, "Times New Roman", serif;
+            --fr-font-mono: "JetBrains Mono", ui-monospace, "SF Mono", Menlo, Consolas, monospace;
+            --fr-radius-sm: 4px;
+            --fr-radius-md: 6px;
+            --fr-container: 1100px;
+        }
+        * { margin: 0; padding: 0; box-sizing: border-box; }
+        html { font-feature-settings: "ss01"; font-variant-numeric: tabular-nums; }
+        body {
+            font-family: var(--fr-font-sans);
+            background: var(--fr-bg);
+            color: var(--fr-ink-900);
+            line-height: 1.55;
+            -webkit-font-smoothing: antialiased;
+            -moz-osx-font-smoothing: grayscale;
+        }
+        a { color: var(--fr-brand-500); }
+
+        .container {
+            max-width: var(--fr-container);
+            margin: 0 auto;
+            padding: 0 32px;
+        }
+        @media (max-width: 640px) { .container { padding: 0 20px; } }
+
+        /* —— Top nav —— */
+        .nav { border-bottom: 1px solid var(--fr-border); padding: 16px 0; }
+        .nav__inner { display: flex; align-items: center; justify-content: space-between; gap: 24px; }
+        .nav__brand {
+            display: flex; align-items: center; gap: 12px;
+            text-decoration: none; color: var(--fr-ink-900);
+            font-weight: 600; font-size: 15px;
+        }
+        .nav__brand img { width: 24px; height: 24px; display: block; }
+        .nav__brand .tag {
+            color: var(--fr-ink-500); font-weight: 500; font-size: 12px;
+            font-family: var(--fr-font-mono); text-transform: uppercase; letter-spacing: 0.08em;
+            padding-left: 12px; margin-left: 4px; border-left: 1px solid var(--fr-border);
+        }
+        .nav__links a {
+            color: var(--fr-ink-600); text-decoration: none; font-size: 14px; margin-left: 24px;
+        }
+        .nav__links a:hover { color: var(--fr-ink-900); }
+        @media (max-width: 480px) { .nav__links { display: none; } }
+
+        /* —— Eyebrow —— */
+        .eyebrow {
+            font-family: var(--fr-font-mono); text-transform: uppercase;
+            font-size: 12px; letter-spacing: 0.08em;
+            color: var(--fr-ink-500); margin-bottom: 16px;
+        }
+
+        /* —— Hero —— */
+        .hero { padding: 72px 0 56px; border-bottom: 1px solid var(--fr-border); }
+        .hero h1 {
+            font-size: clamp(36px, 5.2vw, 60px);
+            font-weight: 500; line-height: 1.05; letter-spacing: -0.035em;
+            color: var(--fr-ink-900); margin: 0 0 28px; max-width: 18ch;
+        }
+        .hero h1 em {
+            font-family: var(--fr-font-serif); font-style: italic; font-weight: 400;
+            color: var(--fr-brand-500);
+        }
+        .hero p {
+            font-size: 18px; color: var(--fr-ink-600);
+            line-height: 1.55; max-width: 60ch;
+        }
+        .hero p strong { color: var(--fr-ink-900); font-weight: 600; }
+
+        /* —— Stats stack —— */
+        .stats {
+            border-bottom: 1px solid var(--fr-border);
+        }
+        .stats__inner {
+            display: grid; grid-template-columns: repeat(4, 1fr);
+        }
+        .stat { padding: 28px 24px; border-right: 1px solid var(--fr-border); }
+        .stat:last-child { border-right: none; }
+        .stat__num {
+            display: block; font-size: 28px; font-weight: 600;
+            font-variant-numeric: tabular-nums; color: var(--fr-ink-900);
+            line-height: 1.1; margin-bottom: 6px; letter-spacing: -0.02em;
+        }
+        .stat__label {
+            display: block; font-family: var(--fr-font-mono);
+            font-size: 12px; color: var(--fr-ink-500);
+            text-transform: uppercase; letter-spacing: 0.06em;
+        }
+        @media (max-width: 720px) {
+            .stats__inner { grid-template-columns: repeat(2, 1fr); }
+            .stat:nth-child(2) { border-right: none; }
+            .stat:nth-child(1), .stat:nth-child(2) { border-bottom: 1px solid var(--fr-border); }
+        }
+
+        /* —— Sections —— */
+        .section { padding: 64px 0; border-bottom: 1px solid var(--fr-border); }
+        .section h2 {
+            font-size: clamp(24px, 2.8vw, 32px); font-weight: 500;
+            letter-spacing: -0.02em; color: var(--fr-ink-900); margin: 0 0 16px;
+        }
+        .section p { font-size: 16px; color: var(--fr-ink-600); max-width: 65ch; }
+
+        /* —— Endpoint URL —— */
+        .endpoint {
+            margin: 24px 0 16px; display: flex; align-items: stretch; gap: 8px; max-width: 720px;
+        }
+        .endpoint code {
+            flex: 1; font-family: var(--fr-font-mono); font-size: 15px;
+            color: var(--fr-ink-900); background: var(--fr-bg-subtle);
+            border: 1px solid var(--fr-ink-300); border-radius: var(--fr-radius-md);
+            padding: 14px 16px; user-select: all; line-height: 1.2;
+            display: flex; align-items: center; word-break: break-all;
+        }
+        .btn {
+            display: inline-flex; align-items: center; justify-content: center;
+            font-family: var(--fr-font-sans); font-size: 14px; font-weight: 500;
+            text-decoration: none; border: 1px solid transparent;
+            border-radius: var(--fr-radius-md); padding: 0 18px; height: 44px;
+            cursor: pointer; white-space: nowrap; line-height: 1;
+            transition: background 120ms ease, border-color 120ms ease, color 120ms ease;
+        }
+        .btn--primary { background: var(--fr-brand-500); color: var(--fr-ink-0); }
+        .btn--primary:hover { background: var(--fr-brand-600); }
+        .btn--secondary {
+            background: var(--fr-ink-0); color: var(--fr-ink-700);
+            border-color: var(--fr-ink-300);
+        }
+        .btn--secondary:hover { border-color: var(--fr-ink-400); color: var(--fr-ink-900); }
+        .btn.copied {
+            background: var(--fr-success-500); color: var(--fr-ink-0);
+            border-color: var(--fr-success-500);
+        }
+        .meta {
+            font-family: var(--fr-font-mono); font-size: 12px;
+            color: var(--fr-ink-500); text-transform: uppercase;
+            letter-spacing: 0.06em; margin-top: 12px;
+        }
+
+        /* —— Setup steps —— */
+        ol.steps {
+            list-style: none; counter-reset: step;
+            margin: 24px 0; padding: 0; border-top: 1px solid var(--fr-border);
+        }
+        ol.steps li {
+            counter-increment: step; padding: 20px 0 20px 64px;
+            position: relative; border-bottom: 1px solid var(--fr-border);
+            color: var(--fr-ink-700); font-size: 16px; line-height: 1.55;
+        }
+        ol.steps li::before {
+            content: counter(step, decimal-leading-zero);
+            position: absolute; left: 0; top: 22px;
+            font-family: var(--fr-font-mono); font-size: 12px; font-weight: 500;
+            color: var(--fr-brand-500); letter-spacing: 0.04em;
+            background: var(--fr-brand-50); padding: 4px 8px;
+            border-radius: var(--fr-radius-sm);
+        }
+        ol.steps li code {
+            font-family: var(--fr-font-mono); font-size: 14px;
+            background: var(--fr-bg-subtle); border: 1px solid var(--fr-border);
+            padding: 2px 6px; border-radius: 4px; color: var(--fr-ink-900);
+        }
+        ol.steps li a {
+            color: var(--fr-brand-500); text-decoration: underline; text-underline-offset: 2px;
+        }
+
+        /* —— Tool grid —— */
+        .tools {
+            display: grid; grid-template-columns: repeat(3, 1fr); gap: 0;
+            margin-top: 24px; border-top: 1px solid var(--fr-border);
+            border-left: 1px solid var(--fr-border);
+        }
+        .tool {
+            border-right: 1px solid var(--fr-border);
+            border-bottom: 1px solid var(--fr-border);
+            padding: 20px 24px;
+        }
+        .tool__count {
+            font-family: var(--fr-font-mono); font-size: 12px;
+            color: var(--fr-brand-500); font-weight: 500;
+            letter-spacing: 0.06em; text-transform: uppercase; margin-bottom: 4px;
+        }
+        .tool__name {
+            font-size: 15px; color: var(--fr-ink-900);
+            font-weight: 500; margin-bottom: 4px;
+        }
+        .tool__desc { font-size: 13px; color: var(--fr-ink-600); line-height: 1.5; }
+        @media (max-width: 720px) { .tools { grid-template-columns: repeat(2, 1fr); } }
+        @media (max-width: 480px) { .tools { grid-template-columns: 1fr; } }
+
+        /* —— Closing CTA —— */
+        .cta {
+            padding: 72px 0; border-bottom: 1px solid var(--fr-border);
+            background: var(--fr-bg-subtle);
+        }
+        .cta h2 {
+            font-size: clamp(28px, 3.2vw, 40px); font-weight: 500;
+            letter-spacing: -0.025em; color: var(--fr-ink-900);
+            margin: 0 0 12px; max-width: 22ch;
+        }
+        .cta h2 em {
+            font-family: var(--fr-font-serif); font-style: italic;
+            font-weight: 400; color: var(--fr-brand-500);
+        }
+        .cta p {
+            font-size: 16px; color: var(--fr-ink-600);
+            max-width: 60ch; margin-bottom: 24px;
+        }
+        .cta__row { display: flex; flex-wrap: wrap; gap: 12px; }
+
+        /* —— Footer —— */
+        .footer { padding: 40px 0 56px; color: var(--fr-ink-500); font-size: 13px; }
+        .footer__row { display: flex; flex-wrap: wrap; align-items: center; }
+        .footer__row a {
+            color: var(--fr-ink-600); text-decoration: none;
+            padding-right: 16px; margin-right: 16px;
+            border-right: 1px solid var(--fr-border);
+        }
+        .footer__row a:last-child {
+            border-right: none; padding-right: 0; margin-right: 0;
+        }
+        .footer__row a:hover { color: var(--fr-ink-900); }
+        .footer__legal {
+            margin-top: 16px; color: var(--fr-ink-400);
+            font-family: var(--fr-font-mono); font-size: 11px; letter-spacing: 0.04em;
+        }
+
+        /* —— A11y / polish —— */
+        ::selection { background: var(--fr-brand-50); color: var(--fr-ink-900); }
+        :focus-visible { outline: 2px solid var(--fr-brand-500); outline-offset: 2px; }
+    </style>
+</head>
+<body>
+    <header class="nav">
+        <div class="container nav__inner">
+            <a href="https://financialreports.eu" class="nav__brand">
+                <img src="/icon.png" alt="">
+                FinancialReports<span class="tag">MCP</span>
+            </a>
+            <nav class="nav__links" aria-label="Primary">
+                <a href="__LANDING_URL__">Docs</a>
+                <a href="https://financialreports.eu/api/">API</a>
+                <a href="__SUPPORT_URL__">Support</a>
+            </nav>
+        </div>
+    </header>
+
+    <main>
+        <section class="hero">
+            <div class="container">
+                <p class="eyebrow">01 / Connector</p>
+                <h1>Public-company <em>filings</em>, available to Claude.</h1>
+                <p>
+                    The official MCP (Model Context Protocol) connector for FinancialReports. Direct access from Claude.ai, Claude Code, Cursor, and any MCP-compatible client to regulatory filings sourced from official regulators worldwide. <strong>Free for any FinancialReports account.</strong>
+                </p>
+            </div>
+        </section>
+
+        <section class="stats">
+            <div class="container stats__inner">
+                <div class="stat"><span class="stat__num">15</span><span class="stat__label">MCP tools</span></div>
+                <div class="stat"><span class="stat__num">5</span><span class="stat__label">Tool domains</span></div>
+                <div class="stat"><span class="stat__num">Free</span><span class="stat__label">For any FR account</span></div>
+                <div class="stat"><span class="stat__num">OAuth&nbsp;2.0</span><span class="stat__label">PKCE · DCR</span></div>
+            </div>
+        </section>
+
+        <section class="section">
+            <div class="container">
+                <p class="eyebrow">02 / Endpoint</p>
+                <h2>MCP endpoint</h2>
+                <p>Add this URL as a custom MCP connector in your client. OAuth 2.0 sign-in runs the first time you connect.</p>
+                <div class="endpoint">
+                    <code id="mcp-url">__MCP_BASE_URL__/mcp</code>
+                    <button class="btn btn--secondary" type="button" onclick="copyUrl()" id="copy-btn">Copy</button>
+                </div>
+                <p class="meta">Streamable HTTP · OAuth 2.0 · 15 tools · Free</p>
+            </div>
+        </section>
+
+        <section class="section">
+            <div class="container">
+                <p class="eyebrow">03 / Setup</p>
+                <h2>Connect in three steps</h2>
+                <ol class="steps">
+                    <li>Create a free account at <a href="https://financialreports.eu">financialreports.eu</a> if you don't have one yet — no paid plan required for MCP access.</li>
+                    <li>In your MCP client (Claude.ai, Claude Code, Cursor, etc.), add a custom connector with the URL <code>__MCP_BASE_URL__/mcp</code>.</li>
+                    <li>Sign in via OAuth when prompted. The 15 tools become available immediately — no reconnection needed.</li>
+                </ol>
+                <a href="__LANDING_URL__" class="btn btn--secondary">Full setup guide →</a>
+            </div>
+        </section>
+
+        <section class="section">
+            <div class="container">
+                <p class="eyebrow">04 / Tools</p>
+                <h2>15 tools across 5 domains</h2>
+                <p>A curated, read-only slice of the FinancialReports REST API — the most useful endpoints exposed as LLM-callable tools, regenerated automatically from the OpenAPI schema.</p>
+                <div class="tools">
+                    <div class="tool">
+                        <p class="tool__count">04 tools</p>
+                        <p class="tool__name">Companies</p>
+                        <p class="tool__desc">Search, retrieve, normalised financials, predicted next annual report</p>
+                    </div>
+                    <div class="tool">
+                        <p class="tool__count">04 tools</p>
+                        <p class="tool__name">Filings</p>
+                        <p class="tool__desc">List, retrieve, Markdown content, full-text Markdown search</p>
+                    </div>
+                    <div class="tool">
+                        <p class="tool__count">02 tools</p>
+                        <p class="tool__name">ISINs</p>
+                        <p class="tool__desc">Lookup by ISIN, list dual-listings</p>
+                    </div>
+                    <div class="tool">
+                        <p class="tool__count">02 tools</p>
+                        <p class="tool__name">Filing taxonomy</p>
+                        <p class="tool__desc">Filing types &amp; categories reference</p>
+                    </div>
+                    <div class="tool">
+                        <p class="tool__count">03 tools</p>
+                        <p class="tool__name">Guides</p>
+                        <p class="tool__desc">Filing-type taxonomy, ISIC industry classification, Markdown fetch strategy</p>
+                    </div>
+                </div>
+            </div>
+        </section>
+    </main>
+
+    <section class="cta">
+        <div class="container">
+            <h2>Free for the web. Free for <em>Claude</em>. Paid for the API.</h2>
+            <p>The MCP connector is part of the public utility — no paywall, no caveats. Programmatic API access (REST + GraphQL, redistribution rights, bulk pulls) lives behind a paid plan.</p>
+            <div class="cta__row">
+                <a href="https://financialreports.eu" class="btn btn--primary">Open FinancialReports</a>
+                <a href="https://financialreports.eu/api/" class="btn btn--secondary">View API plans</a>
+            </div>
+        </div>
+    </section>
+
+    <footer class="footer">
+        <div class="container">
+            <div class="footer__row">
+                <a href="__LANDING_URL__">Documentation</a>
+                <a href="__PRIVACY_URL__">Privacy</a>
+                <a href="__TERMS_URL__">Terms</a>
+                <a href="__IMPRINT_URL__">Imprint</a>
+                <a href="__SUPPORT_URL__">Support</a>
+            </div>
+            <div class="footer__legal">
+                FinancialReports · Public-company filings · Sourced from our internal sourcing system.
+            </div>
+        </div>
+    </footer>
+
+    <script>
+        function copyUrl() {
+            const url = document.getElementById("mcp-url").textContent;
+            const btn = document.getElementById("copy-btn");
+            navigator.clipboard.writeText(url).then(function() {
+                btn.textContent = "Copied";
+                btn.classList.add("copied");
+                setTimeout(function() {
+                    btn.textContent = "Copy";
+                    btn.classList.remove("copied");
+                }, 1800);
+            });
+        }
+    </script>
+</body>
+</html>"""
+
+
+# Build the optional Google site-verification meta tag once. Empty string when
+# the env var is unset, which collapses the placeholder line to whitespace and
+# keeps the rendered HTML otherwise byte-identical to the no-verification case.
+_GSV_META = (
+    f'<meta name="google-site-verification" content="{GOOGLE_SITE_VERIFICATION}">'
+    if GOOGLE_SITE_VERIFICATION
+    else ""
+)
+
+# Pre-rendered once at module load — the URL placeholders are fixed for
+# the lifetime of the process and string.replace per request was wasted
+# work.
+_RENDERED_LANDING_HTML = (
+    _LANDING_HTML
+    .replace("__MCP_BASE_URL__", MCP_BASE_URL.rstrip("/"))
+    .replace("__GOOGLE_SITE_VERIFICATION_META__", _GSV_META)
+    .replace("__LANDING_URL__", LANDING_URL)
+    .replace("__PRIVACY_URL__", PRIVACY_URL)
+    .replace("__TERMS_URL__", TERMS_URL)
+    .replace("__IMPRINT_URL__", IMPRINT_URL)
+    .replace("__SUPPORT_URL__", SUPPORT_URL)
+)
+
+
+@app.api_route("/", methods=["GET", "HEAD"], response_class=HTMLResponse)
+async def root_landing() -> HTMLResponse:
+    """Self-contained landing page for users who hit the bare domain.
+
+    Includes a copy-button for the canonical /mcp URL and step-by-step setup
+    instructions. We do NOT redirect or smart-route here — earlier experiments
+    with 307-redirects from / to /mcp broke OAuth because Claude/ChatGPT/Cursor
+    derive the RFC 8707 resource indicator from the URL the user typed in the
+    connector dialog, causing an invalid_target mismatch downstream.
+    """
+    return HTMLResponse(content=_RENDERED_LANDING_HTML, status_code=200)
+
+
+# IMPORTANT: mount must be the LAST route declaration so the explicit FastAPI
+# routes above take precedence.
+app.mount("/", mcp_app)
+
+
+
+_PARAM_RULES["companies_list"] = _compile_param_rules({'listing_status': {'enum': ['DELISTED', 'LISTED', 'SUSPENDED', 'UNKNOWN']}, 'ordering': {'ordering': ['id', 'name', 'date_ipo', 'year_founded', 'country_iso__name', 'relevance']}, 'page': {'minimum': 1}, 'view': {'enum': ['full', 'summary']}})
+
+
+_SCRUB_PLANS["companies_list"] = {'keys': {'results': {}}}
+
+
+_FIELD_NAMES["companies_list"] = ('id', 'name', 'tagline', 'isins', 'lei', 'sub_industry_code', 'country_code')
+
+@mcp.tool(
+    tags={"Companies"},
+    annotations=ToolAnnotations(
+        title="List Companies",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+    output_schema={'type': 'object', 'properties': {'count': {'type': ['integer', 'null'], 'example': 123}, 'next': {'type': ['string', 'null'], 'example': 'http://api.example.org/accounts/?page=4'}, 'previous': {'type': ['string', 'null'], 'example': 'http://api.example.org/accounts/?page=2'}, 'results': {'type': ['array', 'null'], 'items': {'type': ['object', 'null'], 'properties': {'id': {'type': ['integer', 'null'], 'readOnly': True, 'description': 'Unique identifier for the company.'}, 'name': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Company name.'}, 'tagline': {'type': ['string', 'null'], 'readOnly': True, 'description': "A short, one-liner describing the company's value proposition."}, 'isins': {'type': ['array', 'null'], 'items': {'type': ['string', 'null']}, 'readOnly': True, 'description': 'Primary ISIN(s) for the company. Use the company detail endpoint for the full list.'}, 'lei': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Legal Entity Identifier (ISO 17442).'}, 'sub_industry_code': {'type': ['string', 'null'], 'readOnly': True, 'description': 'ISIC classification code classifying the company.'}, 'country_code': {'type': ['string', 'null'], 'readOnly': True, 'description': "ISO 3166-1 alpha-2 country code of the company's primary registration or headquarters."}}}}, 'continuation': {'type': 'string', 'description': 'Pass back to get the rows that did not fit.'}}},
+)
+async def companies_list(
+    cik: str | None = None,
+    countries: str | None = None,
+    industry: str | None = None,
+    industry_group: str | None = None,
+    isin: str | None = None,
+    lei: str | None = None,
+    listing_status: Literal["DELISTED", "LISTED", "SUSPENDED", "UNKNOWN"] | None = None,
+    on_watchlist: bool | None = None,
+    ordering: str | None = None,
+    page: int | None = None,
+    page_size: int | None = None,
+    search: str | None = None,
+    sector: str | None = None,
+    sub_industry: str | None = None,
+    ticker: str | None = None,
+    view: Literal["full", "summary"] | None = "summary",
+    max_items: int | None = None,
+    fields: str | None = None,
+    continuation: str | None = None,
+) -> dict[str, Any]:
+    """Retrieve a paginated list of companies.
+
+**When to use this tool:** Use as the **first step** to resolve a company name, ticker, or partial match to a FinancialReports internal ID. Required before calling any per-company tool (financials, filings, watchlist). CONFIRM the match — state the resolved company's full name and country before reporting data ("Apple" can surface "Apple Hospitality REIT"). PEER / SCREENING LISTS: include ONLY companies whose requested data you actually retrieved this session; if a candidate's data comes back empty, mark it "no data available" or drop it — never invent a figure to complete the list. A short honest list beats a long fabricated one.
+
+**When NOT to use this tool:** Don't use if you already have a company ID from a previous call. Don't use for ISIN lookups — use `isins_retrieve` instead.
+
+**Examples:**
+- Find Apple -> search="Apple" (Inspect results — 'Apple Inc.' vs 'Apple Hospitality REIT')
+- German automotive companies -> countries="DE", sector="C" (ISIC Section C = Manufacturing)
+
+**Detail:** rows are the compact `view="summary"`; `view="full"` returns the detailed representation (different field set).
+
+**Many rows:** `max_items` merges pages into one call; values above the server's cap are clamped.
+
+**Fewer fields:** `fields="id,name"` (dotted for nested) returns only those.
+
+**Large results:** if `continuation` is set, the rest did not fit; call again with it for the next part."""
+    resets = await _authorize_or_raise()
+    try:
+        if continuation is not None:
+            return await _resume_result("companies_list", continuation, "results")
+        query_params: dict[str, Any] = {
+            "cik": cik,
+            "countries": countries,
+            "industry": industry,
+            "industry_group": industry_group,
+            "isin": isin,
+            "lei": lei,
+            "listing_status": listing_status,
+            "on_watchlist": on_watchlist,
+            "ordering": ordering,
+            "page": page,
+            "page_size": page_size,
+            "search": search,
+            "sector": sector,
+            "sub_industry": sub_industry,
+            "ticker": ticker,
+            "view": view,
+        }
+        _check_query_params("companies_list", query_params)
+        projection = _parse_fields("companies_list", fields)
+        path_params: dict[str, str] = {}
+        url = "/companies/"
+        if path_params:
+            url = url.format(**path_params)
+
+        async def _fetch(page_params: dict[str, Any]) -> dict[str, Any]:
+            try:
+                response = await _api_get(url, lane="interactive", params=page_params)
+            except httpx.HTTPError as exc:
+                # Transport-level failure (timeout, connect error, pool limit).
+                # Only the exception *type* reaches the client — httpx messages
+                # can embed the full request URL.
+                #
+                # Use exc.__class__.__name__, never type(exc).__name__ (issue #80).
+                # Tool parameters are named by the upstream schema and some collide
+                # with builtins — filings_list has a query param literally called
+                # `type`. Inside the emitted body that parameter shadows the builtin,
+                # so type(exc) raised "'NoneType' object is not callable" and
+                # destroyed the real upstream error. Attribute access cannot be
+                # shadowed by a parameter name.
+                logger.warning(
+                    "upstream companies_list transport error: %s",
+                    exc.__class__.__name__,
+                )
+                raise UpstreamHTTPError(
+                    f"upstream companies_list request failed ({exc.__class__.__name__}). "
+                    "The FinancialReports API was unreachable or timed out "
+                    "(already retried once)."
+                ) from exc
+            if response.status_code != 200:
+                _raise_upstream_error("companies_list", response)
+            try:
+                return _scrub_for("companies_list", _json_loads(response.content))
+            except ValueError as exc:
+                raise RuntimeError(f"upstream companies_list returned non-JSON body") from exc
+
+        page_params = {k: v for k, v in query_params.items() if v is not None}
+        if max_items is not None:
+            result = await _auto_paginate(_fetch, url, page_params, max_items)
+        else:
+            result = await _fetch(page_params)
+        # Projected after auto-pagination, whose de-duplication keys on `id`.
+        result = _apply_fields(result, projection, True)
+        result = await _budget_result("companies_list", result, "results")
+        return result
+    finally:
+        _release_auth_context(resets)
+
+
+_SCRUB_PLANS["companies_retrieve"] = {'keys': {'sector': {}, 'industry_group': {'keys': {'sector': {}}}, 'industry': {'keys': {'industry_group': {'keys': {'sector': {}}}}}, 'sub_industry': {'keys': {'industry': {'keys': {'industry_group': {'keys': {'sector': {}}}}}}}, 'designated_sponsor': {}, 'listed_stock_exchange': {}, 'stock_index': {}, 'listings': {}, 'legal_form': {}, 'jurisdiction': {}, 'merged_into': {}}}
+
+
+_FIELD_NAMES["companies_retrieve"] = ('id', 'name', 'tagline', 'description', 'description_last_updated', 'isins', 'isin_count', 'primary_isin', 'lei', 'country_code', 'address', 'city', 'zip_code', 'sector', 'industry_group', 'industry', 'sub_industry', 'ir_link', 'homepage_link', 'logo', 'date_public', 'date_ipo', 'main_stock_exchange', 'is_listed', 'listing_status', 'delisting_date', 'delisting_reason', 'social_facebook', 'social_instagram', 'social_twitter', 'social_linkedin', 'social_youtube', 'social_tiktok', 'social_pinterest', 'social_xing', 'social_glassdoor', 'year_founded', 'corporate_video_id', 'served_area', 'headcount', 'contact_email', 'ticker', 'local_company_id', 'shares_outstanding', 'designated_sponsor', 'listed_stock_exchange', 'stock_index', 'listings', 'legal_status', 'legal_form', 'jurisdiction', 'legal_address', 'legal_city', 'legal_zip_code', 'is_merged', 'merged_into')
+
+@mcp.tool(
+    tags={"Companies"},
+    annotations=ToolAnnotations(
+        title="Retrieve Company Details",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+    output_schema={'type': 'object', 'properties': {'id': {'type': ['integer', 'null'], 'readOnly': True, 'description': 'Unique identifier for the company.'}, 'name': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Company name.'}, 'tagline': {'type': ['string', 'null'], 'readOnly': True, 'description': "A short, one-liner describing the company's value proposition."}, 'description': {'type': ['string', 'null'], 'readOnly': True, 'description': "A detailed description or 'About Us' text for the company."}, 'description_last_updated': {'type': ['string', 'null'], 'readOnly': True, 'description': "Timestamp of the last update to the company's description."}, 'isins': {'type': ['array', 'null'], 'items': {'type': ['string', 'null']}, 'readOnly': True, 'description': 'ISINs associated with the company (capped at 100; use the ISIN endpoint for the full list).'}, 'isin_count': {'type': ['integer', 'null'], 'readOnly': True, 'description': 'Total number of ISINs associated with this company.'}, 'primary_isin': {'type': ['string', 'null'], 'readOnly': True, 'description': "The company's primary ISIN (ISO 6166), or null when no primary is designated. Equivalent to isins[0] when a primary exists."}, 'lei': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Legal Entity Identifier (ISO 17442).'}, 'country_code': {'type': ['string', 'null'], 'readOnly': True, 'description': "ISO 3166-1 alpha-2 country code of the company's primary registration or headquarters."}, 'address': {'type': ['string', 'null'], 'readOnly': True, 'description': "The company's primary street address."}, 'city': {'type': ['string', 'null'], 'readOnly': True, 'description': "The city where the company's headquarters is located."}, 'zip_code': {'type': ['string', 'null'], 'readOnly': True, 'description': "The postal or ZIP code for the company's address."}, 'sector': {'oneOf': [{'$ref': '#/$defs/sector'}, {'type': 'null'}], 'readOnly': True, 'description': "Company's ISIC Section classification."}, 'industry_group': {'oneOf': [{'$ref': '#/$defs/industry_group'}, {'type': 'null'}], 'readOnly': True, 'description': "Company's ISIC Division classification."}, 'industry': {'oneOf': [{'$ref': '#/$defs/industry'}, {'type': 'null'}], 'readOnly': True, 'description': "Company's ISIC Group classification."}, 'sub_industry': {'oneOf': [{'type': 'object', 'properties': {'code': {'type': 'string', 'readOnly': True, 'description': 'ISIC Class code.'}, 'name': {'type': 'string', 'readOnly': True, 'description': 'ISIC Class name.'}, 'industry': {'allOf': [{'$ref': '#/$defs/industry'}], 'readOnly': True, 'description': 'Parent ISIC Group.'}}}, {'type': 'null'}], 'readOnly': True, 'description': "Company's ISIC Class classification."}, 'ir_link': {'type': ['string', 'null'], 'readOnly': True, 'description': "Link to the company's Investor Relations page."}, 'homepage_link': {'type': ['string', 'null'], 'readOnly': True, 'description': "Link to the company's main homepage."}, 'logo': {'type': ['string', 'null'], 'readOnly': True, 'description': "URL of the company's logo file."}, 'date_public': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Date this company record was last updated on the FinancialFilings platform. This is NOT the IPO date — see `date_ipo` instead.'}, 'date_ipo': {'type': ['string', 'null'], 'readOnly': True, 'description': "Date of the company's Initial Public Offering (IPO). Returns null when the IPO date is unknown."}, 'main_stock_exchange': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Primary stock exchange where the company is listed.'}, 'is_listed': {'type': ['boolean', 'null'], 'readOnly': True, 'description': 'Indicates if the company is currently publicly listed.'}, 'listing_status': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Canonical exchange-listing state. One of: LISTED, DELISTED, SUSPENDED, UNKNOWN. The boolean `is_listed` is derived from this (False only when DELISTED).'}, 'delisting_date': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Date the company was delisted, if known. Null while listed.'}, 'delisting_reason': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Reason for delisting when DELISTED: ACQUISITION, BANKRUPTCY, GOING_PRIVATE, REGULATORY, VOLUNTARY, EXCHANGE_TRANSFER, MATURED, OTHER. Empty string while listed.'}, 'social_facebook': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Facebook profile/page identifier.'}, 'social_instagram': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Instagram profile identifier.'}, 'social_twitter': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Twitter handle (without @).'}, 'social_linkedin': {'type': ['string', 'null'], 'readOnly': True, 'description': 'LinkedIn company page identifier/URL path.'}, 'social_youtube': {'type': ['string', 'null'], 'readOnly': True, 'description': 'YouTube channel identifier.'}, 'social_tiktok': {'type': ['string', 'null'], 'readOnly': True, 'description': 'TikTok profile identifier.'}, 'social_pinterest': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Pinterest profile identifier.'}, 'social_xing': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Xing company profile identifier.'}, 'social_glassdoor': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Glassdoor company identifier.'}, 'year_founded': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Date the company was founded.'}, 'corporate_video_id': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Identifier for a corporate video (e.g., YouTube ID).'}, 'served_area': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Geographical area served by the company.'}, 'headcount': {'type': ['integer', 'null'], 'readOnly': True, 'description': 'Approximate number of employees.'}, 'contact_email': {'type': ['string', 'null'], 'readOnly': True, 'description': 'General contact email address.'}, 'ticker': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Primary stock ticker symbol.'}, 'local_company_id': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Local registration or jurisdiction-specific ID (e.g., HRB 24902, CIK 123456).'}, 'shares_outstanding': {'type': ['integer', 'null'], 'readOnly': True, 'description': "The total number of a corporation's stock shares that have been authorized and issued."}, 'designated_sponsor': {'type': ['array', 'null'], 'items': {'type': ['object', 'null'], 'properties': {'id': {'type': ['integer', 'null'], 'readOnly': True}, 'name': {'type': ['string', 'null'], 'readOnly': True}}}, 'readOnly': True, 'description': "Financial institutions that act as market makers for the company's stock."}, 'listed_stock_exchange': {'type': ['array', 'null'], 'items': {'type': ['object', 'null'], 'properties': {'id': {'type': ['integer', 'null'], 'readOnly': True}, 'name': {'type': ['string', 'null'], 'readOnly': True}, 'ticker': {'type': ['string', 'null'], 'readOnly': True}, 'website': {'type': ['string', 'null'], 'readOnly': True}}}, 'readOnly': True, 'description': 'A list of stock exchanges where the company is listed.'}, 'stock_index': {'type': ['array', 'null'], 'items': {'type': ['object', 'null'], 'properties': {'id': {'type': ['integer', 'null'], 'readOnly': True}, 'name': {'type': ['string', 'null'], 'readOnly': True}, 'ticker': {'type': ['string', 'null'], 'readOnly': True}, 'isin': {'type': ['string', 'null'], 'readOnly': True}}}, 'readOnly': True, 'description': 'A list of stock indices the company is a component of.'}, 'listings': {'type': ['array', 'null'], 'items': {'type': ['object', 'null'], 'description': 'Inline schema type for the curated `listings[]` array on CompanySerializer.\n\nThese 6 fields are what ``CompanySerializer.get_listings`` returns — a\nde-duplicated, equity-only subset of ``SecurityListing`` rows.  Using an\nexplicit serializer here (rather than ``SecurityListingSerializer``) keeps\nthe OpenAPI contract tight and avoids advertising the 11-field full model\nshape that includes ``company``, ``market_sector``, etc.', 'properties': {'mic': {'type': ['string', 'null']}, 'ticker': {'type': ['string', 'null']}, 'exchange_name': {'type': ['string', 'null']}, 'exch_code': {'type': ['string', 'null']}, 'security_type': {'type': ['string', 'null']}, 'figi': {'type': ['string', 'null']}}}, 'readOnly': True, 'description': 'Equity venue listings for this company (exchange + ticker), deduplicated by (MIC, ticker). Excludes warrants/options/futures/rights. Populated from per-venue identifier data; coverage expands over time.'}, 'legal_status': {'type': ['string', 'null'], 'readOnly': True, 'description': 'The operational and legal registration status sourced from GLEIF (e.g., ACTIVE, INACTIVE).'}, 'legal_form': {'oneOf': [{'type': 'object', 'properties': {'elf_code': {'type': 'string', 'readOnly': True, 'description': 'The 4-character ISO 20275 ELF code (e.g., XJHM).'}, 'name': {'type': 'string', 'readOnly': True, 'description': 'Human-readable name of the legal form.'}}}, {'type': 'null'}], 'readOnly': True, 'description': 'The ISO 20275 Entity Legal Form sourced from GLEIF.'}, 'jurisdiction': {'oneOf': [{'type': 'object', 'properties': {'code': {'type': 'string', 'readOnly': True, 'description': 'ISO 3166-1 or ISO 3166-2 jurisdiction code (e.g., GB, US-DE).'}, 'name': {'type': 'string', 'readOnly': True, 'description': 'Human-readable name of the jurisdiction.'}}}, {'type': 'null'}], 'readOnly': True, 'description': 'The legal jurisdiction of incorporation sourced from GLEIF.'}, 'legal_address': {'type': ['string', 'null'], 'readOnly': True, 'description': 'The official registered legal address of the company sourced from GLEIF.'}, 'legal_city': {'type': ['string', 'null'], 'readOnly': True, 'description': 'The city of the registered legal address sourced from GLEIF.'}, 'legal_zip_code': {'type': ['string', 'null'], 'readOnly': True, 'description': 'The postal code of the registered legal address sourced from GLEIF.'}, 'is_merged': {'type': ['boolean', 'null'], 'readOnly': True, 'description': 'True when this company record has been retired as a duplicate and replaced by the company in `merged_into`. Retired records are excluded from the company list but remain retrievable by id so an existing integration can discover the replacement rather than receiving a bare 404. See the merges feed at /api/companies/merges/.'}, 'merged_into': {'oneOf': [{'type': 'object', 'description': 'Inline schema type for `merged_into` on CompanySerializer (#1118).\n\nDeliberately two fields: the pointer exists so a consumer can repoint its\nown row, not so it can avoid a second request. Fetch the canonical id for\nthe full record.', 'properties': {'id': {'type': 'integer', 'description': 'Internal id of the canonical company that replaced this one.'}, 'name': {'type': 'string', 'description': 'Name of the canonical company.'}}}, {'type': 'null'}], 'readOnly': True, 'description': 'The canonical company that replaced this one, or null when this record is live. Repoint stored references to this id.'}}, '$defs': {'industry_group': {'type': 'object', 'properties': {'code': {'type': 'string', 'readOnly': True, 'description': 'ISIC Division code.'}, 'name': {'type': 'string', 'readOnly': True, 'description': 'ISIC Division name.'}, 'sector': {'allOf': [{'$ref': '#/$defs/sector'}], 'readOnly': True, 'description': 'Parent ISIC Section.'}}}, 'industry': {'type': 'object', 'properties': {'code': {'type': 'string', 'readOnly': True, 'description': 'ISIC Group code.'}, 'name': {'type': 'string', 'readOnly': True, 'description': 'ISIC Group name.'}, 'industry_group': {'allOf': [{'$ref': '#/$defs/industry_group'}], 'readOnly': True, 'description': 'Parent ISIC Division.'}}}, 'sector': {'type': 'object', 'properties': {'code': {'type': 'string', 'readOnly': True, 'description': 'ISIC Section code.'}, 'name': {'type': 'string', 'readOnly': True, 'description': 'ISIC Section name.'}}}}},
+)
+async def companies_retrieve(
+    id: int,
+    fields: str | None = None,
+) -> dict[str, Any]:
+    """Retrieve detailed information for a single company by its internal ID.
+
+**When to use this tool:** Use to get full company metadata (LEI, description, headquarters, social links, stock exchanges, indices) after resolving the ID via `companies_list`.
+
+**When NOT to use this tool:** Don't use for financial data — use `companies_financials_retrieve`. Don't use just to confirm a company exists — `companies_list` already returns enough for identification.
+
+**Examples:**
+- What's the LEI for ASML? -> id=<company_id from companies_list> (Returns lei field)
+
+**Fewer fields:** `fields="id,name"` (dotted for nested) returns only those."""
+    resets = await _authorize_or_raise()
+    try:
+        query_params: dict[str, Any] = {
+        }
+        projection = _parse_fields("companies_retrieve", fields)
+        path_params: dict[str, str] = {}
+        if id is not None:
+            path_params["id"] = _validate_path_param(
+                "id", id
+            )
+        url = "/companies/{id}/"
+        if path_params:
+            url = url.format(**path_params)
+
+        async def _fetch(page_params: dict[str, Any]) -> dict[str, Any]:
+            try:
+                response = await _api_get(url, lane="interactive", params=page_params)
+            except httpx.HTTPError as exc:
+                # Transport-level failure (timeout, connect error, pool limit).
+                # Only the exception *type* reaches the client — httpx messages
+                # can embed the full request URL.
+                #
+                # Use exc.__class__.__name__, never type(exc).__name__ (issue #80).
+                # Tool parameters are named by the upstream schema and some collide
+                # with builtins — filings_list has a query param literally called
+                # `type`. Inside the emitted body that parameter shadows the builtin,
+                # so type(exc) raised "'NoneType' object is not callable" and
+                # destroyed the real upstream error. Attribute access cannot be
+                # shadowed by a parameter name.
+                logger.warning(
+                    "upstream companies_retrieve transport error: %s",
+                    exc.__class__.__name__,
+                )
+                raise UpstreamHTTPError(
+                    f"upstream companies_retrieve request failed ({exc.__class__.__name__}). "
+                    "The FinancialReports API was unreachable or timed out "
+                    "(already retried once)."
+                ) from exc
+            if response.status_code != 200:
+                _raise_upstream_error("companies_retrieve", response)
+            try:
+                return _scrub_for("companies_retrieve", _json_loads(response.content))
+            except ValueError as exc:
+                raise RuntimeError(f"upstream companies_retrieve returned non-JSON body") from exc
+
+        page_params = {k: v for k, v in query_params.items() if v is not None}
+        result = await _fetch(page_params)
+        # Projected after auto-pagination, whose de-duplication keys on `id`.
+        result = _apply_fields(result, projection, False)
+        return result
+    finally:
+        _release_auth_context(resets)
+
+@mcp.tool(
+    tags={"Companies"},
+    annotations=ToolAnnotations(
+        title="Retrieve Company Details (batch)",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+    output_schema={'type': 'object', 'properties': {'results': {'type': 'array', 'items': {'type': 'object', 'properties': {'id': {'type': 'integer'}, 'data': {'type': 'object', 'properties': {'id': {'type': ['integer', 'null'], 'readOnly': True, 'description': 'Unique identifier for the company.'}, 'name': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Company name.'}, 'tagline': {'type': ['string', 'null'], 'readOnly': True, 'description': "A short, one-liner describing the company's value proposition."}, 'description': {'type': ['string', 'null'], 'readOnly': True, 'description': "A detailed description or 'About Us' text for the company."}, 'description_last_updated': {'type': ['string', 'null'], 'readOnly': True, 'description': "Timestamp of the last update to the company's description."}, 'isins': {'type': ['array', 'null'], 'items': {'type': ['string', 'null']}, 'readOnly': True, 'description': 'ISINs associated with the company (capped at 100; use the ISIN endpoint for the full list).'}, 'isin_count': {'type': ['integer', 'null'], 'readOnly': True, 'description': 'Total number of ISINs associated with this company.'}, 'primary_isin': {'type': ['string', 'null'], 'readOnly': True, 'description': "The company's primary ISIN (ISO 6166), or null when no primary is designated. Equivalent to isins[0] when a primary exists."}, 'lei': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Legal Entity Identifier (ISO 17442).'}, 'country_code': {'type': ['string', 'null'], 'readOnly': True, 'description': "ISO 3166-1 alpha-2 country code of the company's primary registration or headquarters."}, 'address': {'type': ['string', 'null'], 'readOnly': True, 'description': "The company's primary street address."}, 'city': {'type': ['string', 'null'], 'readOnly': True, 'description': "The city where the company's headquarters is located."}, 'zip_code': {'type': ['string', 'null'], 'readOnly': True, 'description': "The postal or ZIP code for the company's address."}, 'sector': {'oneOf': [{'$ref': '#/$defs/sector'}, {'type': 'null'}], 'readOnly': True, 'description': "Company's ISIC Section classification."}, 'industry_group': {'oneOf': [{'$ref': '#/$defs/industry_group'}, {'type': 'null'}], 'readOnly': True, 'description': "Company's ISIC Division classification."}, 'industry': {'oneOf': [{'$ref': '#/$defs/industry'}, {'type': 'null'}], 'readOnly': True, 'description': "Company's ISIC Group classification."}, 'sub_industry': {'oneOf': [{'type': 'object', 'properties': {'code': {'type': 'string', 'readOnly': True, 'description': 'ISIC Class code.'}, 'name': {'type': 'string', 'readOnly': True, 'description': 'ISIC Class name.'}, 'industry': {'allOf': [{'$ref': '#/$defs/industry'}], 'readOnly': True, 'description': 'Parent ISIC Group.'}}}, {'type': 'null'}], 'readOnly': True, 'description': "Company's ISIC Class classification."}, 'ir_link': {'type': ['string', 'null'], 'readOnly': True, 'description': "Link to the company's Investor Relations page."}, 'homepage_link': {'type': ['string', 'null'], 'readOnly': True, 'description': "Link to the company's main homepage."}, 'logo': {'type': ['string', 'null'], 'readOnly': True, 'description': "URL of the company's logo file."}, 'date_public': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Date this company record was last updated on the FinancialFilings platform. This is NOT the IPO date — see `date_ipo` instead.'}, 'date_ipo': {'type': ['string', 'null'], 'readOnly': True, 'description': "Date of the company's Initial Public Offering (IPO). Returns null when the IPO date is unknown."}, 'main_stock_exchange': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Primary stock exchange where the company is listed.'}, 'is_listed': {'type': ['boolean', 'null'], 'readOnly': True, 'description': 'Indicates if the company is currently publicly listed.'}, 'listing_status': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Canonical exchange-listing state. One of: LISTED, DELISTED, SUSPENDED, UNKNOWN. The boolean `is_listed` is derived from this (False only when DELISTED).'}, 'delisting_date': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Date the company was delisted, if known. Null while listed.'}, 'delisting_reason': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Reason for delisting when DELISTED: ACQUISITION, BANKRUPTCY, GOING_PRIVATE, REGULATORY, VOLUNTARY, EXCHANGE_TRANSFER, MATURED, OTHER. Empty string while listed.'}, 'social_facebook': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Facebook profile/page identifier.'}, 'social_instagram': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Instagram profile identifier.'}, 'social_twitter': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Twitter handle (without @).'}, 'social_linkedin': {'type': ['string', 'null'], 'readOnly': True, 'description': 'LinkedIn company page identifier/URL path.'}, 'social_youtube': {'type': ['string', 'null'], 'readOnly': True, 'description': 'YouTube channel identifier.'}, 'social_tiktok': {'type': ['string', 'null'], 'readOnly': True, 'description': 'TikTok profile identifier.'}, 'social_pinterest': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Pinterest profile identifier.'}, 'social_xing': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Xing company profile identifier.'}, 'social_glassdoor': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Glassdoor company identifier.'}, 'year_founded': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Date the company was founded.'}, 'corporate_video_id': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Identifier for a corporate video (e.g., YouTube ID).'}, 'served_area': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Geographical area served by the company.'}, 'headcount': {'type': ['integer', 'null'], 'readOnly': True, 'description': 'Approximate number of employees.'}, 'contact_email': {'type': ['string', 'null'], 'readOnly': True, 'description': 'General contact email address.'}, 'ticker': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Primary stock ticker symbol.'}, 'local_company_id': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Local registration or jurisdiction-specific ID (e.g., HRB 24902, CIK 123456).'}, 'shares_outstanding': {'type': ['integer', 'null'], 'readOnly': True, 'description': "The total number of a corporation's stock shares that have been authorized and issued."}, 'designated_sponsor': {'type': ['array', 'null'], 'items': {'type': ['object', 'null'], 'properties': {'id': {'type': ['integer', 'null'], 'readOnly': True}, 'name': {'type': ['string', 'null'], 'readOnly': True}}}, 'readOnly': True, 'description': "Financial institutions that act as market makers for the company's stock."}, 'listed_stock_exchange': {'type': ['array', 'null'], 'items': {'type': ['object', 'null'], 'properties': {'id': {'type': ['integer', 'null'], 'readOnly': True}, 'name': {'type': ['string', 'null'], 'readOnly': True}, 'ticker': {'type': ['string', 'null'], 'readOnly': True}, 'website': {'type': ['string', 'null'], 'readOnly': True}}}, 'readOnly': True, 'description': 'A list of stock exchanges where the company is listed.'}, 'stock_index': {'type': ['array', 'null'], 'items': {'type': ['object', 'null'], 'properties': {'id': {'type': ['integer', 'null'], 'readOnly': True}, 'name': {'type': ['string', 'null'], 'readOnly': True}, 'ticker': {'type': ['string', 'null'], 'readOnly': True}, 'isin': {'type': ['string', 'null'], 'readOnly': True}}}, 'readOnly': True, 'description': 'A list of stock indices the company is a component of.'}, 'listings': {'type': ['array', 'null'], 'items': {'type': ['object', 'null'], 'description': 'Inline schema type for the curated `listings[]` array on CompanySerializer.\n\nThese 6 fields are what ``CompanySerializer.get_listings`` returns — a\nde-duplicated, equity-only subset of ``SecurityListing`` rows.  Using an\nexplicit serializer here (rather than ``SecurityListingSerializer``) keeps\nthe OpenAPI contract tight and avoids advertising the 11-field full model\nshape that includes ``company``, ``market_sector``, etc.', 'properties': {'mic': {'type': ['string', 'null']}, 'ticker': {'type': ['string', 'null']}, 'exchange_name': {'type': ['string', 'null']}, 'exch_code': {'type': ['string', 'null']}, 'security_type': {'type': ['string', 'null']}, 'figi': {'type': ['string', 'null']}}}, 'readOnly': True, 'description': 'Equity venue listings for this company (exchange + ticker), deduplicated by (MIC, ticker). Excludes warrants/options/futures/rights. Populated from per-venue identifier data; coverage expands over time.'}, 'legal_status': {'type': ['string', 'null'], 'readOnly': True, 'description': 'The operational and legal registration status sourced from GLEIF (e.g., ACTIVE, INACTIVE).'}, 'legal_form': {'oneOf': [{'type': 'object', 'properties': {'elf_code': {'type': 'string', 'readOnly': True, 'description': 'The 4-character ISO 20275 ELF code (e.g., XJHM).'}, 'name': {'type': 'string', 'readOnly': True, 'description': 'Human-readable name of the legal form.'}}}, {'type': 'null'}], 'readOnly': True, 'description': 'The ISO 20275 Entity Legal Form sourced from GLEIF.'}, 'jurisdiction': {'oneOf': [{'type': 'object', 'properties': {'code': {'type': 'string', 'readOnly': True, 'description': 'ISO 3166-1 or ISO 3166-2 jurisdiction code (e.g., GB, US-DE).'}, 'name': {'type': 'string', 'readOnly': True, 'description': 'Human-readable name of the jurisdiction.'}}}, {'type': 'null'}], 'readOnly': True, 'description': 'The legal jurisdiction of incorporation sourced from GLEIF.'}, 'legal_address': {'type': ['string', 'null'], 'readOnly': True, 'description': 'The official registered legal address of the company sourced from GLEIF.'}, 'legal_city': {'type': ['string', 'null'], 'readOnly': True, 'description': 'The city of the registered legal address sourced from GLEIF.'}, 'legal_zip_code': {'type': ['string', 'null'], 'readOnly': True, 'description': 'The postal code of the registered legal address sourced from GLEIF.'}, 'is_merged': {'type': ['boolean', 'null'], 'readOnly': True, 'description': 'True when this company record has been retired as a duplicate and replaced by the company in `merged_into`. Retired records are excluded from the company list but remain retrievable by id so an existing integration can discover the replacement rather than receiving a bare 404. See the merges feed at /api/companies/merges/.'}, 'merged_into': {'oneOf': [{'type': 'object', 'description': 'Inline schema type for `merged_into` on CompanySerializer (#1118).\n\nDeliberately two fields: the pointer exists so a consumer can repoint its\nown row, not so it can avoid a second request. Fetch the canonical id for\nthe full record.', 'properties': {'id': {'type': 'integer', 'description': 'Internal id of the canonical company that replaced this one.'}, 'name': {'type': 'string', 'description': 'Name of the canonical company.'}}}, {'type': 'null'}], 'readOnly': True, 'description': 'The canonical company that replaced this one, or null when this record is live. Repoint stored references to this id.'}}}, 'error': {'type': 'string'}, 'error_kind': {'type': 'string'}}, 'required': ['id']}}}, 'required': ['results'], '$defs': {'industry_group': {'type': 'object', 'properties': {'code': {'type': 'string', 'readOnly': True, 'description': 'ISIC Division code.'}, 'name': {'type': 'string', 'readOnly': True, 'description': 'ISIC Division name.'}, 'sector': {'allOf': [{'$ref': '#/$defs/sector'}], 'readOnly': True, 'description': 'Parent ISIC Section.'}}}, 'industry': {'type': 'object', 'properties': {'code': {'type': 'string', 'readOnly': True, 'description': 'ISIC Group code.'}, 'name': {'type': 'string', 'readOnly': True, 'description': 'ISIC Group name.'}, 'industry_group': {'allOf': [{'$ref': '#/$defs/industry_group'}], 'readOnly': True, 'description': 'Parent ISIC Division.'}}}, 'sector': {'type': 'object', 'properties': {'code': {'type': 'string', 'readOnly': True, 'description': 'ISIC Section code.'}, 'name': {'type': 'string', 'readOnly': True, 'description': 'ISIC Section name.'}}}}},
+)
+async def companies_retrieve_many(
+    ids: list[int],
+    fields: str | None = None,
+) -> dict[str, Any]:
+    """Batch form of `companies_retrieve`: up to 50 ids in one call, fetched concurrently. `results` keeps the order of `ids`; an id that failed carries `error` instead of `data`, the rest still return. Other parameters, `fields` included, apply to every id."""
+    resets = await _authorize_or_raise()
+    try:
+        query_params: dict[str, Any] = {
+        }
+        return await _retrieve_many(
+            "companies_retrieve",
+            "/companies/{id}/",
+            "id",
+            ids,
+            {k: v for k, v in query_params.items() if v is not None},
+            _parse_fields("companies_retrieve", fields),
+        )
+    finally:
+        _release_auth_context(resets)
+
+
+_PARAM_RULES["companies_financials_retrieve"] = _compile_param_rules({'fiscal_period': {'enum': ['9M', 'FY', 'H1', 'H2', 'Q1', 'Q2', 'Q3', 'Q4']}, 'statement_type': {'enum': ['BS', 'CFS', 'IS']}})
+
+
+_SCRUB_PLANS["companies_financials_retrieve"] = {'keys': {'currency': {}, 'filters': {}, 'periods': {'keys': {'statements': {'walk': True}}}}}
+
+
+_FIELD_NAMES["companies_financials_retrieve"] = ('company_id', 'currency', 'sources_masked', 'filters', 'period_count', 'periods')
+
+@mcp.tool(
+    tags={"Companies"},
+    annotations=ToolAnnotations(
+        title="Retrieve Company Financials",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+    output_schema={'type': 'object', 'properties': {'company_id': {'type': ['integer', 'null']}, 'currency': {'type': ['object', 'null'], 'properties': {'code': {'type': ['string', 'null']}, 'name': {'type': ['string', 'null']}, 'symbol': {'type': ['string', 'null']}}}, 'sources_masked': {'type': ['boolean', 'null']}, 'filters': {'type': ['object', 'null'], 'properties': {'statement_type': {'type': ['string', 'null']}, 'fiscal_year': {'type': ['integer', 'null']}, 'fiscal_year_from': {'type': ['integer', 'null']}, 'fiscal_year_to': {'type': ['integer', 'null']}, 'fiscal_period': {'type': ['string', 'null']}, 'line_items': {'type': ['array', 'null'], 'items': {'type': ['string', 'null']}}, 'as_of': {'type': ['string', 'null']}}}, 'period_count': {'type': ['integer', 'null']}, 'periods': {'type': ['array', 'null'], 'items': {'type': ['object', 'null'], 'properties': {'fiscal_year': {'type': ['integer', 'null']}, 'fiscal_period': {'type': ['string', 'null']}, 'period_start_date': {'type': ['string', 'null']}, 'period_end_date': {'type': ['string', 'null']}, 'statements': {'type': ['array', 'null'], 'items': {'type': ['object', 'null']}}}}}, 'continuation': {'type': 'string', 'description': 'Pass back to get the rows that did not fit.'}}},
+)
+async def companies_financials_retrieve(
+    id: int,
+    as_of: str | None = None,
+    fiscal_period: Literal["9M", "FY", "H1", "H2", "Q1", "Q2", "Q3", "Q4"] | None = None,
+    fiscal_year: int | None = None,
+    fiscal_year_from: int | None = None,
+    fiscal_year_to: int | None = None,
+    line_items: str | None = None,
+    statement_type: Literal["BS", "CFS", "IS"] | None = None,
+    fields: str | None = None,
+    continuation: str | None = None,
+) -> dict[str, Any]:
+    """**Experimental endpoint — the response schema may change without an API version bump.**
+
+Returns standardized financial KPIs for a company as a structured document: a company envelope containing `periods`, each holding its Income Statement, Balance Sheet and Cash Flow `statements`, each holding `line_items`.
+
+When several filings report the same period, the most recently published filing is selected; every contributing filing is listed in the statement's `sources` array. `source_filing` and `sources` are returned only for accounts with source unmasking enabled (`sources_masked` reports which applies). Use `as_of=YYYY-MM-DD` for a point-in-time view.
+
+Use the `depth` and `parent_code` fields on each line item to render the Capital IQ-style statement hierarchy.
+
+**When to use this tool:** Use to get standardized financial line items (income statement, balance sheet, cash flow) for a company. Data is deduplicated across filings — the most recently published filing wins. SOURCING: attribute every figure to its fiscal period + period_end_date and reporting currency. GROUNDEDNESS (critical): report ONLY values present in the `periods` this call returns. If `period_count` is 0 or `periods` is empty, FinancialReports has no *structured* financials for this company yet (common for US/SEC issuers — structured data is currently ESEF/EU-derived and being expanded). Do NOT stop and do NOT estimate — FALL BACK to the filing: call `filings_list` for this `id` filtered to an annual-report `filing_type_code` (e.g. 10-K, 20-F, or the local annual type), take the most recently released one, retrieve it with `filings_markdown_retrieve`, and read the figures directly from the filing body — citing the filing type, date, and fiscal period. Never estimate, recall a figure from training knowledge, or attach a citation to a number you did not read from a tool result this session.
+
+**When NOT to use this tool:** Don't use for filing documents or markdown content — use `filings_list` + `filings_markdown_retrieve`. Don't use without resolving the company ID first via `companies_list`.
+
+**Examples:**
+- Munich Re 2024 income statement -> id=<id>, fiscal_year=2024, statement_type='IS' (Use depth + parent_code to render Capital IQ-style hierarchy)
+- Compare EBITDA across 3 companies -> id=<id>, statement_type='IS', line_items='ebitda' (Call in parallel for each company. Always show currency.)
+
+**Fewer fields:** `fields="id,name"` (dotted for nested) returns only those.
+
+**Large results:** if `continuation` is set, the rest did not fit; call again with it for the next part."""
+    resets = await _authorize_or_raise()
+    try:
+        if continuation is not None:
+            return await _resume_result("companies_financials_retrieve", continuation, "periods")
+        query_params: dict[str, Any] = {
+            "as_of": as_of,
+            "fiscal_period": fiscal_period,
+            "fiscal_year": fiscal_year,
+            "fiscal_year_from": fiscal_year_from,
+            "fiscal_year_to": fiscal_year_to,
+            "line_items": line_items,
+            "statement_type": statement_type,
+        }
+        _check_query_params("companies_financials_retrieve", query_params)
+        projection = _parse_fields("companies_financials_retrieve", fields)
+        path_params: dict[str, str] = {}
+        if id is not None:
+            path_params["id"] = _validate_path_param(
+                "id", id
+            )
+        url = "/companies/{id}/financials/"
+        if path_params:
+            url = url.format(**path_params)
+
+        async def _fetch(page_params: dict[str, Any]) -> dict[str, Any]:
+            try:
+                response = await _api_get(url, lane="interactive", params=page_params)
+            except httpx.HTTPError as exc:
+                # Transport-level failure (timeout, connect error, pool limit).
+                # Only the exception *type* reaches the client — httpx messages
+                # can embed the full request URL.
+                #
+                # Use exc.__class__.__name__, never type(exc).__name__ (issue #80).
+                # Tool parameters are named by the upstream schema and some collide
+                # with builtins — filings_list has a query param literally called
+                # `type`. Inside the emitted body that parameter shadows the builtin,
+                # so type(exc) raised "'NoneType' object is not callable" and
+                # destroyed the real upstream error. Attribute access cannot be
+                # shadowed by a parameter name.
+                logger.warning(
+                    "upstream companies_financials_retrieve transport error: %s",
+                    exc.__class__.__name__,
+                )
+                raise UpstreamHTTPError(
+                    f"upstream companies_financials_retrieve request failed ({exc.__class__.__name__}). "
+                    "The FinancialReports API was unreachable or timed out "
+                    "(already retried once)."
+                ) from exc
+            if response.status_code != 200:
+                _raise_upstream_error("companies_financials_retrieve", response)
+            try:
+                return _scrub_for("companies_financials_retrieve", _json_loads(response.content))
+            except ValueError as exc:
+                raise RuntimeError(f"upstream companies_financials_retrieve returned non-JSON body") from exc
+
+        page_params = {k: v for k, v in query_params.items() if v is not None}
+        result = await _fetch(page_params)
+        # Projected after auto-pagination, whose de-duplication keys on `id`.
+        result = _apply_fields(result, projection, False)
+        result = await _budget_result("companies_financials_retrieve", result, "periods")
+        return result
+    finally:
+        _release_auth_context(resets)
+
+@mcp.tool(
+    tags={"Companies"},
+    annotations=ToolAnnotations(
+        title="Retrieve Company Financials (batch)",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+    output_schema={'type': 'object', 'properties': {'results': {'type': 'array', 'items': {'type': 'object', 'properties': {'id': {'type': 'integer'}, 'data': {'type': 'object', 'properties': {'company_id': {'type': ['integer', 'null']}, 'currency': {'type': ['object', 'null'], 'properties': {'code': {'type': ['string', 'null']}, 'name': {'type': ['string', 'null']}, 'symbol': {'type': ['string', 'null']}}}, 'sources_masked': {'type': ['boolean', 'null']}, 'filters': {'type': ['object', 'null'], 'properties': {'statement_type': {'type': ['string', 'null']}, 'fiscal_year': {'type': ['integer', 'null']}, 'fiscal_year_from': {'type': ['integer', 'null']}, 'fiscal_year_to': {'type': ['integer', 'null']}, 'fiscal_period': {'type': ['string', 'null']}, 'line_items': {'type': ['array', 'null'], 'items': {'type': ['string', 'null']}}, 'as_of': {'type': ['string', 'null']}}}, 'period_count': {'type': ['integer', 'null']}, 'periods': {'type': ['array', 'null'], 'items': {'type': ['object', 'null'], 'properties': {'fiscal_year': {'type': ['integer', 'null']}, 'fiscal_period': {'type': ['string', 'null']}, 'period_start_date': {'type': ['string', 'null']}, 'period_end_date': {'type': ['string', 'null']}, 'statements': {'type': ['array', 'null'], 'items': {'type': ['object', 'null']}}}}}, 'continuation': {'type': 'string', 'description': 'Pass back to get the rows that did not fit.'}}}, 'error': {'type': 'string'}, 'error_kind': {'type': 'string'}}, 'required': ['id']}}}, 'required': ['results']},
+)
+async def companies_financials_retrieve_many(
+    ids: list[int],
+    as_of: str | None = None,
+    fiscal_period: Literal["9M", "FY", "H1", "H2", "Q1", "Q2", "Q3", "Q4"] | None = None,
+    fiscal_year: int | None = None,
+    fiscal_year_from: int | None = None,
+    fiscal_year_to: int | None = None,
+    line_items: str | None = None,
+    statement_type: Literal["BS", "CFS", "IS"] | None = None,
+    fields: str | None = None,
+) -> dict[str, Any]:
+    """Batch form of `companies_financials_retrieve`: up to 50 ids in one call, fetched concurrently. `results` keeps the order of `ids`; an id that failed carries `error` instead of `data`, the rest still return. Other parameters, `fields` included, apply to every id."""
+    resets = await _authorize_or_raise()
+    try:
+        query_params: dict[str, Any] = {
+            "as_of": as_of,
+            "fiscal_period": fiscal_period,
+            "fiscal_year": fiscal_year,
+            "fiscal_year_from": fiscal_year_from,
+            "fiscal_year_to": fiscal_year_to,
+            "line_items": line_items,
+            "statement_type": statement_type,
+        }
+        _check_query_params("companies_financials_retrieve", query_params)
+        return await _retrieve_many(
+            "companies_financials_retrieve",
+            "/companies/{id}/financials/",
+            "id",
+            ids,
+            {k: v for k, v in query_params.items() if v is not None},
+            _parse_fields("companies_financials_retrieve", fields),
+        )
+    finally:
+        _release_auth_context(resets)
+
+
+_SCRUB_PLANS["companies_next_annual_report_retrieve"] = {'walk': True}
+
+
+_FIELD_NAMES["companies_next_annual_report_retrieve"] = ('start_date', 'end_date', 'confidence', 'is_overdue')
+
+@mcp.tool(
+    tags={"Companies"},
+    annotations=ToolAnnotations(
+        title="Predict Next Annual Report",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+)
+@subscription_required
+async def companies_next_annual_report_retrieve(
+    id: int,
+    fields: str | None = None,
+) -> str:
+    """Calculates the expected release window for the next annual report based on historical filing patterns.
+
+**Fewer fields:** `fields="id,name"` (dotted for nested) returns only those."""
+    try:
+        _require_auth_context()
+        query_params: dict[str, Any] = {
+        }
+        projection = _parse_fields("companies_next_annual_report_retrieve", fields)
+        path_params: dict[str, str] = {}
+        if id is not None:
+            path_params["id"] = _validate_path_param(
+                "id", id
+            )
+        url = "/companies/{id}/next-annual-report/"
+        if path_params:
+            url = url.format(**path_params)
+
+        response = await _api_get(
+            url,
+            lane="interactive",
+            params={k: v for k, v in query_params.items() if v is not None},
+        )
+        return _format_response(response, projection, False, tool="companies_next_annual_report_retrieve")
+    except ToolInputError as exc:
+        return _safe_error("companies_next_annual_report_retrieve", exc)
+    except Exception as exc:
+        logger.exception("companies_next_annual_report_retrieve failed")
+        return _safe_error("companies_next_annual_report_retrieve", exc)
+
+@mcp.tool(
+    tags={"Companies"},
+    annotations=ToolAnnotations(
+        title="Resolve Companies by Identifier (Batch)",
+        readOnlyHint=False,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False
+    ),
+)
+@subscription_required
+async def companies_resolve_create(
+    rows: list,
+) -> str:
+    """Reconcile a list of your identifiers against our coverage in one request.
+
+Each row may carry any mix of `isin`, `lei`, `cik`, `ticker` and `name`, plus an optional opaque `ref` echoed back so you can join results to your source rows. Results are returned in input order.
+
+**Resolution order** — ISIN, LEI, CIK, ticker, venue ticker, name. First hit wins, but every identifier you supply is evaluated: if two of them resolve to different companies the row comes back `ambiguous` with `identifier_conflict` and both in `candidates`, rather than us silently picking one.
+
+**A name alone never returns `matched`.** No matter how close the match, a name-only row caps at `ambiguous` and hands you candidates to choose from. Names are not identifiers, and asserting a match on one is how filings end up attached to the wrong issuer.
+
+**Venue-ticker matches are qualified, not asserted.** A ticker that only resolves through our security-listing data is cross-checked against the `name` you supplied. If they disagree you get `ambiguous` + `name_disagrees`; if you supplied no name we cannot corroborate at all, so you get `matched` carrying `security_listing_unverified` — trust that bucket accordingly.
+
+**Billing** — one request is one call against your quota, whatever the row count. Rows we do not cover are not billed differently from rows we do.
+
+Maximum 500 rows per request. Up to 50 rows per request reach the name lookup; beyond that a row carrying only a name returns `not_covered` with `name_t...
+
+**When to use this tool:** Use when the user hands you a **list** of identifiers — a spreadsheet column, a portfolio, a peer set — and you need FinancialReports IDs for all of them. One request covers up to 500 rows and costs one call against quota regardless of row count, so it is far cheaper than a `companies_list` search per name. Pass an opaque `ref` per row to join the results back to the user's own rows. Act only on rows whose `status` is `matched`; for `ambiguous`, ask the user to choose from `candidates` rather than picking one yourself.
+
+**When NOT to use this tool:** Don't use for a single company — `companies_list` (name/ticker) or `isins_retrieve` (ISIN) is one hop and returns richer match context. Don't send more than 50 name-only rows in one request: rows past that cap return `not_covered` with `name_tier_skipped`, so split name-heavy batches.
+
+**Examples:**
+- Here are 40 tickers from my portfolio — pull their latest filings -> rows=[{"ref": "row-1", "ticker": "GOOG", "name": "Alphabet Inc."}, ...] (Resolve every ID in one call, then fan out to filings_list per matched row)
+- Do you cover these ISINs? -> rows=[{"isin": "US5949181045"}, {"isin": "US0378331005"}] (not_covered means no coverage — say so; never substitute a near match)"""
+    try:
+        _require_auth_context()
+        path_params: dict[str, str] = {}
+        body: dict[str, Any] = {
+            "rows": rows,
+        }
+        url = "/companies/resolve/"
+        if path_params:
+            url = url.format(**path_params)
+
+        response = await _api_client.post(
+            url,
+            json={k: v for k, v in body.items() if v is not None},
+        )
+        return _format_response(response)
+    except ToolInputError as exc:
+        return _safe_error("companies_resolve_create", exc)
+    except Exception as exc:
+        logger.exception("companies_resolve_create failed")
+        return _safe_error("companies_resolve_create", exc)
+
+
+_PARAM_RULES["filing_categories_list"] = _compile_param_rules({'page': {'minimum': 1}})
+
+
+_SCRUB_PLANS["filing_categories_list"] = {'keys': {'results': {}}}
+
+
+_FIELD_NAMES["filing_categories_list"] = ('id', 'name', 'sort_order')
+
+@mcp.tool(
+    tags={"Filing Categories"},
+    annotations=ToolAnnotations(
+        title="List Filing Categories",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+)
+@subscription_required
+async def filing_categories_list(
+    page: int | None = None,
+    page_size: int | None = None,
+    fields: str | None = None,
+    output_format: Literal["json", "table"] = "json",
+) -> str:
+    """Retrieve the 11 standardized disclosure types (categories) defined by the FRCF.
+
+**Compact:** `output_format="table"` returns one row per item under one header.
+
+**Fewer fields:** `fields="id,name"` (dotted for nested) returns only those."""
+    try:
+        _require_auth_context()
+        query_params: dict[str, Any] = {
+            "page": page,
+            "page_size": page_size,
+        }
+        _check_query_params("filing_categories_list", query_params)
+        projection = _parse_fields("filing_categories_list", fields)
+        path_params: dict[str, str] = {}
+        url = "/filing-categories/"
+        if path_params:
+            url = url.format(**path_params)
+
+        response = await _api_get(
+            url,
+            lane="interactive",
+            params={k: v for k, v in query_params.items() if v is not None},
+        )
+        if output_format == "table":
+            return _format_table(
+                response,
+                _field_columns(fields) or ('id', 'name', 'sort_order'),
+                tool="filing_categories_list",
+            )
+        return _format_response(response, projection, True, tool="filing_categories_list")
+    except ToolInputError as exc:
+        return _safe_error("filing_categories_list", exc)
+    except Exception as exc:
+        logger.exception("filing_categories_list failed")
+        return _safe_error("filing_categories_list", exc)
+
+
+_PARAM_RULES["filing_types_list"] = _compile_param_rules({'page': {'minimum': 1}})
+
+
+_SCRUB_PLANS["filing_types_list"] = {'keys': {'results': {'keys': {'category': {}}}}}
+
+
+_FIELD_NAMES["filing_types_list"] = ('id', 'code', 'name', 'description', 'category')
+
+@mcp.tool(
+    tags={"Filing Types"},
+    annotations=ToolAnnotations(
+        title="List Filing Types",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+)
+@subscription_required
+async def filing_types_list(
+    category: int | None = None,
+    page: int | None = None,
+    page_size: int | None = None,
+    search: str | None = None,
+    fields: str | None = None,
+    output_format: Literal["json", "table"] = "json",
+) -> str:
+    """Retrieve a paginated list of all available filing types.
+
+**Compact:** `output_format="table"` returns one row per item under one header.
+
+**Fewer fields:** `fields="id,name"` (dotted for nested) returns only those."""
+    try:
+        _require_auth_context()
+        query_params: dict[str, Any] = {
+            "category": category,
+            "page": page,
+            "page_size": page_size,
+            "search": search,
+        }
+        _check_query_params("filing_types_list", query_params)
+        projection = _parse_fields("filing_types_list", fields)
+        path_params: dict[str, str] = {}
+        url = "/filing-types/"
+        if path_params:
+            url = url.format(**path_params)
+
+        response = await _api_get(
+            url,
+            lane="interactive",
+            params={k: v for k, v in query_params.items() if v is not None},
+        )
+        if output_format == "table":
+            return _format_table(
+                response,
+                _field_columns(fields) or ('id', 'code', 'name', 'description', 'category.id', 'category.name'),
+                tool="filing_types_list",
+            )
+        return _format_response(response, projection, True, tool="filing_types_list")
+    except ToolInputError as exc:
+        return _safe_error("filing_types_list", exc)
+    except Exception as exc:
+        logger.exception("filing_types_list failed")
+        return _safe_error("filing_types_list", exc)
+
+
+_PARAM_RULES["filings_list"] = _compile_param_rules({'added_to_platform_from': {'format': 'date-time'}, 'added_to_platform_to': {'format': 'date-time'}, 'fiscal_period': {'enum': ['9M', 'FY', 'H1', 'H2', 'Q1', 'Q2', 'Q3', 'Q4']}, 'ordering': {'ordering': ['id', 'release_datetime', 'added_to_platform']}, 'page': {'minimum': 1}, 'release_datetime_from': {'format': 'date-time'}, 'release_datetime_to': {'format': 'date-time'}, 'updated_date_from': {'format': 'date-time'}, 'updated_date_to': {'format': 'date-time'}, 'view': {'enum': ['full', 'summary']}})
+
+
+_SCRUB_PLANS["filings_list"] = {'keys': {'results': {'keys': {'company': {}, 'filing_type': {'keys': {'category': {}}}}}, 'history_window': {}}}
+
+
+_FIELD_NAMES["filings_list"] = ('id', 'title', 'release_datetime', 'document_url', 'proxy_url', 'viewer_url', 'company', 'filing_type', 'processing_status', 'file_extension', 'file_size')
+
+@mcp.tool(
+    tags={"Filings"},
+    annotations=ToolAnnotations(
+        title="List Filings",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+    output_schema={'type': 'object', 'properties': {'count': {'type': ['integer', 'null'], 'example': 123}, 'next': {'type': ['string', 'null'], 'example': 'http://api.example.org/accounts/?page=4'}, 'previous': {'type': ['string', 'null'], 'example': 'http://api.example.org/accounts/?page=2'}, 'results': {'type': ['array', 'null'], 'items': {'type': ['object', 'null'], 'properties': {'id': {'type': ['integer', 'null'], 'readOnly': True}, 'title': {'type': ['string', 'null'], 'description': 'Optional title for the filing', 'maxLength': 200}, 'release_datetime': {'type': ['string', 'null'], 'description': 'Time the document was published on the authority page'}, 'document_url': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Direct URL to the raw filing package (e.g., ZIP/PDF) on S3.'}, 'proxy_url': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Direct URL to the extracted, browser-renderable main document.'}, 'viewer_url': {'type': ['string', 'null'], 'readOnly': True, 'description': 'URL to view the filing in the interactive web platform.'}, 'company': {'allOf': [{'type': 'object', 'properties': {'id': {'type': 'integer', 'readOnly': True, 'description': 'Unique identifier for the company.'}, 'name': {'type': 'string', 'readOnly': True, 'description': 'Company name.'}, 'tagline': {'type': 'string', 'readOnly': True, 'description': "A short, one-liner describing the company's value proposition."}, 'isins': {'type': 'array', 'items': {'type': 'string'}, 'readOnly': True, 'description': 'Primary ISIN(s) for the company. Use the company detail endpoint for the full list.'}, 'lei': {'type': 'string', 'readOnly': True, 'description': 'Legal Entity Identifier (ISO 17442).'}, 'sub_industry_code': {'type': ['string', 'null'], 'readOnly': True, 'description': 'ISIC classification code classifying the company.'}, 'country_code': {'type': 'string', 'readOnly': True, 'description': "ISO 3166-1 alpha-2 country code of the company's primary registration or headquarters."}}}], 'readOnly': True}, 'filing_type': {'allOf': [{'type': 'object', 'properties': {'id': {'type': 'integer', 'readOnly': True}, 'code': {'type': 'string', 'readOnly': True, 'description': 'Unique code identifying the filing type.'}, 'name': {'type': 'string', 'readOnly': True, 'description': 'Human-readable name of the filing type.'}, 'description': {'type': 'string', 'readOnly': True, 'description': 'Detailed description of the filing type.'}, 'category': {'oneOf': [{'type': 'object', 'properties': {'id': {'type': 'integer', 'readOnly': True}, 'name': {'type': 'string', 'readOnly': True, 'description': 'Name of the disclosure category.'}, 'sort_order': {'type': 'integer', 'readOnly': True, 'description': 'Order priority for display.'}}}, {'type': 'null'}], 'readOnly': True, 'description': 'The broad functional category (Disclosure Type) this report belongs to.'}}}], 'readOnly': True}, 'processing_status': {'allOf': [{'enum': ['PENDING', 'QUEUED', 'PROCESSING', 'COMPLETED', 'FAILED', 'SKIPPED'], 'type': 'string', 'description': '* `PENDING` - Pending\n* `QUEUED` - Queued\n* `PROCESSING` - Processing\n* `COMPLETED` - Completed\n* `FAILED` - Failed\n* `SKIPPED` - Skipped'}], 'description': 'The lifecycle status of the raw document to markdown conversion.\n\n* `PENDING` - Pending\n* `QUEUED` - Queued\n* `PROCESSING` - Processing\n* `COMPLETED` - Completed\n* `FAILED` - Failed\n* `SKIPPED` - Skipped'}, 'file_extension': {'type': ['string', 'null'], 'description': 'File extension (e.g., PDF, HTML).', 'maxLength': 10}, 'file_size': {'type': ['integer', 'null'], 'maximum': 2147483647, 'minimum': 0, 'description': 'File size in bytes. Stores locally to avoid storage backend hits.'}}}}, 'history_window': {'type': ['object', 'null'], 'description': "Present when the caller's plan applies a rolling history window AND this request reached past its cutoff. Absent for callers with unrestricted history. It means the PLAN bounds how far back this account can see — filings older than the cutoff exist in the FinancialFilings archive. It is never a statement about catalog coverage, and it does not by itself prove that this particular result set lost rows.", 'properties': {'limited': {'type': ['boolean', 'null']}, 'max_history_days': {'type': ['integer', 'null']}, 'cutoff': {'type': ['string', 'null']}, 'detail': {'type': ['string', 'null']}}}, 'continuation': {'type': 'string', 'description': 'Pass back to get the rows that did not fit.'}}},
+)
+async def filings_list(
+    added_to_platform_from: str | None = None,
+    added_to_platform_to: str | None = None,
+    categories: str | None = None,
+    category: int | None = None,
+    company: int | None = None,
+    company_isin: str | None = None,
+    countries: str | None = None,
+    extensions: str | None = None,
+    file_size_max: int | None = None,
+    file_size_min: int | None = None,
+    fiscal_period: Literal["9M", "FY", "H1", "H2", "Q1", "Q2", "Q3", "Q4"] | None = None,
+    fiscal_year: int | None = None,
+    language: str | None = None,
+    languages: str | None = None,
+    lei: str | None = None,
+    on_watchlist: bool | None = None,
+    ordering: str | None = None,
+    page: int | None = None,
+    page_size: int | None = None,
+    period_ending_date: str | None = None,
+    period_ending_date_from: str | None = None,
+    period_ending_date_to: str | None = None,
+    release_datetime_from: str | None = None,
+    release_datetime_to: str | None = None,
+    search: str | None = None,
+    source: float | None = None,
+    sources: str | None = None,
+    type: str | None = None,
+    types: str | None = None,
+    updated_date_from: str | None = None,
+    updated_date_to: str | None = None,
+    view: Literal["full", "summary"] | None = "summary",
+    max_items: int | None = None,
+    fields: str | None = None,
+    continuation: str | None = None,
+) -> dict[str, Any]:
+    """Retrieve a paginated list of regulatory filings.
+
+**When to use this tool:** Use to search and filter regulatory filings across companies. Supports filtering by company, filing type, category, country, date range. Returns metadata — not filing content.
+
+**When NOT to use this tool:** Don't use to get filing content — use `filings_markdown_retrieve` after getting the filing ID. Don't use for financial KPIs — use `companies_financials_retrieve`.
+
+**Examples:**
+- Apple's most recent 10-K -> company=<id>, filing_type='10-K', ordering='-release_datetime', page_size=1 (filing_type is jurisdiction-specific. Use filing_category for cross-jurisdiction queries.)
+- All insider transactions at Tesla in the last 30 days -> company=<id>, filing_category='insider_transaction', from_date='2026-04-16'
+
+**Detail:** rows are the compact `view="summary"`; `view="full"` returns the detailed representation (different field set).
+
+**Many rows:** `max_items` merges pages into one call; values above the server's cap are clamped.
+
+**Fewer fields:** `fields="id,name"` (dotted for nested) returns only those.
+
+**Large results:** if `continuation` is set, the rest did not fit; call again with it for the next part."""
+    resets = await _authorize_or_raise()
+    try:
+        if continuation is not None:
+            return await _resume_result("filings_list", continuation, "results")
+        query_params: dict[str, Any] = {
+            "added_to_platform_from": added_to_platform_from,
+            "added_to_platform_to": added_to_platform_to,
+            "categories": categories,
+            "category": category,
+            "company": company,
+            "company_isin": company_isin,
+            "countries": countries,
+            "extensions": extensions,
+            "file_size_max": file_size_max,
+            "file_size_min": file_size_min,
+            "fiscal_period": fiscal_period,
+            "fiscal_year": fiscal_year,
+            "language": language,
+            "languages": languages,
+            "lei": lei,
+            "on_watchlist": on_watchlist,
+            "ordering": ordering,
+            "page": page,
+            "page_size": page_size,
+            "period_ending_date": period_ending_date,
+            "period_ending_date_from": period_ending_date_from,
+            "period_ending_date_to": period_ending_date_to,
+            "release_datetime_from": release_datetime_from,
+            "release_datetime_to": release_datetime_to,
+            "search": search,
+            "source": source,
+            "sources": sources,
+            "type": type,
+            "types": types,
+            "updated_date_from": updated_date_from,
+            "updated_date_to": updated_date_to,
+            "view": view,
+        }
+        _check_query_params("filings_list", query_params)
+        projection = _parse_fields("filings_list", fields)
+        path_params: dict[str, str] = {}
+        url = "/filings/"
+        if path_params:
+            url = url.format(**path_params)
+
+        async def _fetch(page_params: dict[str, Any]) -> dict[str, Any]:
+            try:
+                response = await _api_get(url, lane="interactive", params=page_params)
+            except httpx.HTTPError as exc:
+                # Transport-level failure (timeout, connect error, pool limit).
+                # Only the exception *type* reaches the client — httpx messages
+                # can embed the full request URL.
+                #
+                # Use exc.__class__.__name__, never type(exc).__name__ (issue #80).
+                # Tool parameters are named by the upstream schema and some collide
+                # with builtins — filings_list has a query param literally called
+                # `type`. Inside the emitted body that parameter shadows the builtin,
+                # so type(exc) raised "'NoneType' object is not callable" and
+                # destroyed the real upstream error. Attribute access cannot be
+                # shadowed by a parameter name.
+                logger.warning(
+                    "upstream filings_list transport error: %s",
+                    exc.__class__.__name__,
+                )
+                raise UpstreamHTTPError(
+                    f"upstream filings_list request failed ({exc.__class__.__name__}). "
+                    "The FinancialReports API was unreachable or timed out "
+                    "(already retried once)."
+                ) from exc
+            if response.status_code != 200:
+                _raise_upstream_error("filings_list", response)
+            try:
+                return _scrub_for("filings_list", _json_loads(response.content))
+            except ValueError as exc:
+                raise RuntimeError(f"upstream filings_list returned non-JSON body") from exc
+
+        page_params = {k: v for k, v in query_params.items() if v is not None}
+        if max_items is not None:
+            result = await _auto_paginate(_fetch, url, page_params, max_items)
+        else:
+            result = await _fetch(page_params)
+        # Projected after auto-pagination, whose de-duplication keys on `id`.
+        result = _apply_fields(result, projection, True)
+        result = await _budget_result("filings_list", result, "results")
+        return result
+    finally:
+        _release_auth_context(resets)
+
+
+_SCRUB_PLANS["filings_retrieve"] = {'keys': {'company': {}, 'filing_type': {'keys': {'category': {}}}, 'language': {}, 'source': {}}}
+
+
+_FIELD_NAMES["filings_retrieve"] = ('id', 'company', 'filing_type', 'language', 'filing_date', 'title', 'added_to_platform', 'updated_date', 'dissemination_datetime', 'release_datetime', 'source', 'document', 'proxy_url', 'viewer_url', 'file_extension', 'file_size', 'filing_type_confidence', 'filing_type_reasoning', 'fiscal_year', 'fiscal_period', 'period_ending_date')
+
+@mcp.tool(
+    tags={"Filings"},
+    annotations=ToolAnnotations(
+        title="Retrieve Filing Details",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+    output_schema={'type': 'object', 'properties': {'id': {'type': ['integer', 'null'], 'readOnly': True}, 'company': {'allOf': [{'type': 'object', 'properties': {'id': {'type': 'integer', 'readOnly': True, 'description': 'Unique identifier for the company.'}, 'name': {'type': 'string', 'readOnly': True, 'description': 'Company name.'}, 'tagline': {'type': 'string', 'readOnly': True, 'description': "A short, one-liner describing the company's value proposition."}, 'isins': {'type': 'array', 'items': {'type': 'string'}, 'readOnly': True, 'description': 'Primary ISIN(s) for the company. Use the company detail endpoint for the full list.'}, 'lei': {'type': 'string', 'readOnly': True, 'description': 'Legal Entity Identifier (ISO 17442).'}, 'sub_industry_code': {'type': ['string', 'null'], 'readOnly': True, 'description': 'ISIC classification code classifying the company.'}, 'country_code': {'type': 'string', 'readOnly': True, 'description': "ISO 3166-1 alpha-2 country code of the company's primary registration or headquarters."}}}], 'readOnly': True}, 'filing_type': {'allOf': [{'type': 'object', 'properties': {'id': {'type': 'integer', 'readOnly': True}, 'code': {'type': 'string', 'readOnly': True, 'description': 'Unique code identifying the filing type.'}, 'name': {'type': 'string', 'readOnly': True, 'description': 'Human-readable name of the filing type.'}, 'description': {'type': 'string', 'readOnly': True, 'description': 'Detailed description of the filing type.'}, 'category': {'oneOf': [{'type': 'object', 'properties': {'id': {'type': 'integer', 'readOnly': True}, 'name': {'type': 'string', 'readOnly': True, 'description': 'Name of the disclosure category.'}, 'sort_order': {'type': 'integer', 'readOnly': True, 'description': 'Order priority for display.'}}}, {'type': 'null'}], 'readOnly': True, 'description': 'The broad functional category (Disclosure Type) this report belongs to.'}}}], 'readOnly': True}, 'language': {'allOf': [{'type': 'object', 'properties': {'id': {'type': 'integer', 'readOnly': True}, 'code': {'type': 'string', 'readOnly': True, 'description': 'ISO 639-1 language code (lowercase).'}, 'name': {'type': 'string', 'readOnly': True, 'description': 'Name of the language.'}}}], 'readOnly': True}, 'filing_date': {'type': ['string', 'null'], 'description': 'The official date of the filing (soon to be deprecated).'}, 'title': {'type': ['string', 'null'], 'description': 'Optional title for the filing', 'maxLength': 200}, 'added_to_platform': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Date and time when the filing was added to our platform'}, 'updated_date': {'type': ['string', 'null'], 'readOnly': True, 'description': 'The date and time this filing record was last modified.'}, 'dissemination_datetime': {'type': ['string', 'null'], 'description': 'Time the document was released to the public and sent to the authority'}, 'release_datetime': {'type': ['string', 'null'], 'description': 'Time the document was published on the authority page'}, 'source': {'oneOf': [{'type': 'object', 'properties': {'id': {'type': 'integer', 'readOnly': True}, 'name': {'type': 'string', 'readOnly': True, 'description': 'Generic label identifying the regional authority for this data source.'}, 'url': {'type': ['string', 'null'], 'format': 'uri', 'readOnly': True, 'description': 'Homepage URL for the data source, when available.'}, 'description': {'type': 'string', 'readOnly': True, 'description': 'Description of the data source.'}, 'has_named_speakers': {'type': ['boolean', 'null'], 'readOnly': True, 'description': "Tri-state: true if this source's CT (call transcript) filings are confirmed to carry named speaker attribution (name/title/affiliation), false if confirmed generic labels like 'Speaker 1', null if not yet measured. Treat null as 'not a positive match', not as false — an unmeasured source is not the same claim as a confirmed-generic one. Not meaningful for non-transcript sources."}}}, {'type': 'null'}], 'readOnly': True}, 'document': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Direct URL to the raw filing package (e.g., ZIP/PDF) on S3.'}, 'proxy_url': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Direct URL to the extracted, browser-renderable main document.'}, 'viewer_url': {'type': ['string', 'null'], 'readOnly': True, 'description': 'URL to view the filing in the interactive web platform.'}, 'file_extension': {'type': ['string', 'null'], 'description': 'File extension (e.g., PDF, HTML).', 'maxLength': 10}, 'file_size': {'type': ['integer', 'null'], 'maximum': 2147483647, 'minimum': 0, 'description': 'File size in bytes. Stores locally to avoid storage backend hits.'}, 'filing_type_confidence': {'type': ['number', 'null'], 'readOnly': True, 'description': 'Confidence score (0.0–1.0) assigned by the automated classification system for the filing type.'}, 'filing_type_reasoning': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Step-by-step rationale produced by the automated classification system for the assigned filing type. Indicative only — not manually reviewed.'}, 'fiscal_year': {'type': ['integer', 'null'], 'readOnly': True, 'description': 'The accounting fiscal year this filing covers (e.g., 2024). Populated for annual, quarterly, interim reports and earnings releases. Null if not yet determined.'}, 'fiscal_period': {'readOnly': True, 'description': 'The specific fiscal period covered by this filing. Possible values: FY (Full Year), Q1, Q2, Q3, Q4, H1 (First Half), H2 (Second Half). Populated for annual, quarterly, interim reports and earnings releases. Null if not yet determined.\n\n* `FY` - Full Year\n* `Q1` - First Quarter\n* `Q2` - Second Quarter\n* `Q3` - Third Quarter\n* `Q4` - Fourth Quarter\n* `H1` - First Half\n* `H2` - Second Half\n* `9M` - Nine Months', 'oneOf': [{'enum': ['FY', 'Q1', 'Q2', 'Q3', 'Q4', 'H1', 'H2', '9M'], 'type': 'string', 'description': '* `FY` - Full Year\n* `Q1` - First Quarter\n* `Q2` - Second Quarter\n* `Q3` - Third Quarter\n* `Q4` - Fourth Quarter\n* `H1` - First Half\n* `H2` - Second Half\n* `9M` - Nine Months'}, {'type': 'null'}]}, 'period_ending_date': {'type': ['string', 'null'], 'readOnly': True, 'description': 'The exact date the reported financial period ends (e.g., 2024-12-31). Populated for annual, quarterly, interim reports and earnings releases. Null if not yet determined.'}}},
+)
+async def filings_retrieve(
+    id: int,
+    fields: str | None = None,
+) -> dict[str, Any]:
+    """Retrieve detailed information for a single filing by its ID.
+
+**When to use this tool:** Use to get full metadata for a single filing — source URL, PDF link, viewer URL, classification confidence, fiscal period. Call after `filings_list` when you need details beyond the list view. SHAREABLE LINKS: when a human needs to open the filing, hand them a PUBLIC link — `viewer_url` (the interactive web page) or `document` (the raw PDF/ZIP). NEVER give a user an `/api/...` URL — including the paginated `next`/`previous` links — those require credentials and 403 for an unauthenticated person. Filing CONTENT for you (the model) comes from `filings_markdown_retrieve(filing_id)`, not from a URL.
+
+**When NOT to use this tool:** Don't use for the actual filing content — use `filings_markdown_retrieve`. Don't use to search for filings — use `filings_list`.
+
+**Examples:**
+- Show me the source PDF for this filing -> id=<filing_id> (Returns document (raw PDF/ZIP URL) and proxy_url (rendered))
+- Send me a link to read this filing -> id=<filing_id> (Share viewer_url (public web page) — never the /api/ markdown URL)
+
+**Fewer fields:** `fields="id,name"` (dotted for nested) returns only those."""
+    resets = await _authorize_or_raise()
+    try:
+        query_params: dict[str, Any] = {
+        }
+        projection = _parse_fields("filings_retrieve", fields)
+        path_params: dict[str, str] = {}
+        if id is not None:
+            path_params["id"] = _validate_path_param(
+                "id", id
+            )
+        url = "/filings/{id}/"
+        if path_params:
+            url = url.format(**path_params)
+
+        async def _fetch(page_params: dict[str, Any]) -> dict[str, Any]:
+            try:
+                response = await _api_get(url, lane="interactive", params=page_params)
+            except httpx.HTTPError as exc:
+                # Transport-level failure (timeout, connect error, pool limit).
+                # Only the exception *type* reaches the client — httpx messages
+                # can embed the full request URL.
+                #
+                # Use exc.__class__.__name__, never type(exc).__name__ (issue #80).
+                # Tool parameters are named by the upstream schema and some collide
+                # with builtins — filings_list has a query param literally called
+                # `type`. Inside the emitted body that parameter shadows the builtin,
+                # so type(exc) raised "'NoneType' object is not callable" and
+                # destroyed the real upstream error. Attribute access cannot be
+                # shadowed by a parameter name.
+                logger.warning(
+                    "upstream filings_retrieve transport error: %s",
+                    exc.__class__.__name__,
+                )
+                raise UpstreamHTTPError(
+                    f"upstream filings_retrieve request failed ({exc.__class__.__name__}). "
+                    "The FinancialReports API was unreachable or timed out "
+                    "(already retried once)."
+                ) from exc
+            if response.status_code != 200:
+                _raise_upstream_error("filings_retrieve", response)
+            try:
+                return _scrub_for("filings_retrieve", _json_loads(response.content))
+            except ValueError as exc:
+                raise RuntimeError(f"upstream filings_retrieve returned non-JSON body") from exc
+
+        page_params = {k: v for k, v in query_params.items() if v is not None}
+        result = await _fetch(page_params)
+        # Projected after auto-pagination, whose de-duplication keys on `id`.
+        result = _apply_fields(result, projection, False)
+        return result
+    finally:
+        _release_auth_context(resets)
+
+@mcp.tool(
+    tags={"Filings"},
+    annotations=ToolAnnotations(
+        title="Retrieve Filing Markdown",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+)
+@subscription_required
+async def filings_markdown_retrieve(
+    filing_id: int,
+    offset: int = 0,
+    limit: int = 50000,
+) -> str:
+    """Retrieve the raw processed content of a single filing in Markdown format.
+
+**When to use this tool:** Use to get the full text of a filing as Markdown. Supports pagination via offset/limit for long documents. Start with offset=0 and repeat with increasing offsets until no truncation marker appears.
+
+**When NOT to use this tool:** Don't use to search for filings — use `filings_list` first. Not every filing has Markdown content; only filings whose `processing_status == "COMPLETED"` do — check that field (returned by `filings_list` / `filings_retrieve`) before calling this tool.
+
+**Examples:**
+- Show me Apple's 10-K risk factors -> filing_id=<id>, offset=0, limit=50000 (Summarize specific sections — don't dump the whole document)
+
+    Returns the full processed Markdown content of a filing in pageable chunks.
+    For long filings, call this tool repeatedly with increasing `offset` values
+    until the response no longer contains the truncation marker. Use a limit
+    of 50000 chars (default) for most LLM context windows; the per-call cap
+    is 150000 chars (Claude.ai's documented tool-result ceiling).
+    """
+    try:
+        _require_auth_context()
+        if not isinstance(filing_id, int) or filing_id <= 0:
+            raise ToolInputError("filing_id must be a positive integer")
+        if offset < 0:
+            raise ToolInputError("offset must be >= 0")
+        # Clamp `limit` so a misbehaving caller cannot ask the server to
+        # return tens of MB of text in a single call. 150k is the Claude.ai/
+        # Claude Desktop documented tool-result ceiling — anything larger
+        # gets truncated by the host anyway.
+        limit = max(1, min(int(limit), 150000))
+
+        url = f"/filings/{filing_id}/markdown/"
+
+        # Stream so we never buffer more than _MAX_FILING_BYTES into memory,
+        # even when the upstream body is much larger than the user's slice.
+        async with _api_stream_get(url, lane="bulk") as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                return _upstream_error_text(
+                    response, body[:1000].decode("utf-8", errors="replace")
+                )
+
+            buf = bytearray()
+            truncated_upstream = False
+            async for chunk in response.aiter_bytes():
+                if len(buf) + len(chunk) > _MAX_FILING_BYTES:
+                    take = _MAX_FILING_BYTES - len(buf)
+                    if take > 0:
+                        buf.extend(chunk[:take])
+                    truncated_upstream = True
+                    break
+                buf.extend(chunk)
+
+        full_text = buf.decode("utf-8", errors="replace")
+        total_length = len(full_text)
+        # Huge-filing conditional pointer: on the first chunk of a very long
+        # filing, tell the model (in the RESULT) to search instead of paging it
+        # all into context.
+        _nav_hint = ""
+        if offset == 0 and total_length > 120000:
+            _nav_hint = (
+                f"HUGE FILING: {total_length} chars (~{total_length // 2500} pages). "
+                "Do NOT page through all of it. To find a specific figure, line item, "
+                f"or section, call filings_markdown_search(filing_id={filing_id}, "
+                "query='<what you need, e.g. total revenue>') — it returns only the "
+                "matching passages with their offsets.\n\n"
+            )
+        if offset >= total_length:
+            return (
+                f"--- MARKDOWN CONTENT (chars {offset} to {total_length} of {total_length}) ---\n"
+                "(empty: offset is at or past the end of the document)"
+            )
+        end_index = min(offset + limit, total_length)
+        chunk = full_text[offset:end_index]
+
+        header = (
+            f"--- MARKDOWN CONTENT (chars {offset} to {end_index} of {total_length}) ---\n"
+        )
+        if end_index < total_length:
+            header += (
+                f"--- TRUNCATED. Call again with offset={end_index} to continue. ---\n"
+            )
+        if truncated_upstream:
+            header += (
+                f"--- WARNING: filing exceeds {_MAX_FILING_BYTES} bytes; "
+                "tail was discarded. ---\n"
+            )
+
+        return _nav_hint + header + "\n" + chunk
+    except ToolInputError as exc:
+        return _safe_error("filings_markdown_retrieve", exc)
+    except Exception as exc:
+        logger.exception("filings_markdown_retrieve failed")
+        return _safe_error("filings_markdown_retrieve", exc)
+
+
+_PARAM_RULES["isins_list"] = _compile_param_rules({'page': {'minimum': 1}})
+
+
+_SCRUB_PLANS["isins_list"] = {'keys': {'results': {'keys': {'company': {}}}}}
+
+
+_FIELD_NAMES["isins_list"] = ('code', 'is_primary', 'company', 'figi', 'composite_figi', 'share_class_figi', 'security_type', 'security_type2', 'market_sector', 'exch_code', 'figi_last_updated')
+
+@mcp.tool(
+    tags={"ISINs"},
+    annotations=ToolAnnotations(
+        title="List ISINs",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+    output_schema={'type': 'object', 'properties': {'count': {'type': ['integer', 'null'], 'example': 123}, 'next': {'type': ['string', 'null'], 'example': 'http://api.example.org/accounts/?page=4'}, 'previous': {'type': ['string', 'null'], 'example': 'http://api.example.org/accounts/?page=2'}, 'results': {'type': ['array', 'null'], 'items': {'type': ['object', 'null'], 'properties': {'code': {'type': ['string', 'null'], 'readOnly': True, 'description': 'The 12-character International Securities Identification Number.'}, 'is_primary': {'type': ['boolean', 'null'], 'readOnly': True, 'description': 'Indicates if this is the primary ISIN for the company on this platform.'}, 'company': {'allOf': [{'type': 'object', 'properties': {'id': {'type': 'integer', 'readOnly': True, 'description': 'Unique identifier for the company.'}, 'name': {'type': 'string', 'readOnly': True, 'description': 'Company name.'}, 'tagline': {'type': 'string', 'readOnly': True, 'description': "A short, one-liner describing the company's value proposition."}, 'isins': {'type': 'array', 'items': {'type': 'string'}, 'readOnly': True, 'description': 'Primary ISIN(s) for the company. Use the company detail endpoint for the full list.'}, 'lei': {'type': 'string', 'readOnly': True, 'description': 'Legal Entity Identifier (ISO 17442).'}, 'sub_industry_code': {'type': ['string', 'null'], 'readOnly': True, 'description': 'ISIC classification code classifying the company.'}, 'country_code': {'type': 'string', 'readOnly': True, 'description': "ISO 3166-1 alpha-2 country code of the company's primary registration or headquarters."}}}], 'readOnly': True, 'description': 'The company associated with this ISIN.'}, 'figi': {'type': ['string', 'null'], 'readOnly': True, 'description': 'The 12-character Financial Instrument Global Identifier (FIGI) for this specific listing.'}, 'composite_figi': {'type': ['string', 'null'], 'readOnly': True, 'description': 'The composite FIGI representing the instrument across all exchanges in a given country.'}, 'share_class_figi': {'type': ['string', 'null'], 'readOnly': True, 'description': 'The share class FIGI representing the instrument globally, regardless of exchange.'}, 'security_type': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Primary security type classification (e.g., Common Stock, ETP, REIT).'}, 'security_type2': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Secondary security type classification providing additional granularity.'}, 'market_sector': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Market sector classification from OpenFIGI (e.g., Equity, Govt, Corp).'}, 'exch_code': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Exchange code where this security is listed (e.g., GY, US, LN).'}, 'figi_last_updated': {'type': ['string', 'null'], 'readOnly': True, 'description': 'Timestamp of the last successful FIGI data enrichment for this ISIN.'}}}}, 'continuation': {'type': 'string', 'description': 'Pass back to get the rows that did not fit.'}}},
+)
+async def isins_list(
+    code: str | None = None,
+    codes: str | None = None,
+    company: int | None = None,
+    is_primary: bool | None = None,
+    page: int | None = None,
+    page_size: int | None = None,
+    search: str | None = None,
+    max_items: int | None = None,
+    fields: str | None = None,
+    continuation: str | None = None,
+) -> dict[str, Any]:
+    """Search and resolve ISINs (International Securities Identification Numbers) to companies.
+
+**Many rows:** `max_items` merges pages into one call; values above the server's cap are clamped.
+
+**Fewer fields:** `fields="id,name"` (dotted for nested) returns only those.
+
+**Large results:** if `continuation` is set, the rest did not fit; call again with it for the next part."""
+    resets = await _authorize_or_raise()
+    try:
+        if continuation is not None:
+            return await _resume_result("isins_list", continuation, "results")
+        query_params: dict[str, Any] = {
+            "code": code,
+            "codes": codes,
+            "company": company,
+            "is_primary": is_primary,
+            "page": page,
+            "page_size": page_size,
+            "search": search,
+        }
+        _check_query_params("isins_list", query_params)
+        projection = _parse_fields("isins_list", fields)
+        path_params: dict[str, str] = {}
+        url = "/isins/"
+        if path_params:
+            url = url.format(**path_params)
+
+        async def _fetch(page_params: dict[str, Any]) -> dict[str, Any]:
+            try:
+                response = await _api_get(url, lane="interactive", params=page_params)
+            except httpx.HTTPError as exc:
+                # Transport-level failure (timeout, connect error, pool limit).
+                # Only the exception *type* reaches the client — httpx messages
+                # can embed the full request URL.
+                #
+                # Use exc.__class__.__name__, never type(exc).__name__ (issue #80).
+                # Tool parameters are named by the upstream schema and some collide
+                # with builtins — filings_list has a query param literally called
+                # `type`. Inside the emitted body that parameter shadows the builtin,
+                # so type(exc) raised "'NoneType' object is not callable" and
+                # destroyed the real upstream error. Attribute access cannot be
+                # shadowed by a parameter name.
+                logger.warning(
+                    "upstream isins_list transport error: %s",
+                    exc.__class__.__name__,
+                )
+                raise UpstreamHTTPError(
+                    f"upstream isins_list request failed ({exc.__class__.__name__}). "
+                    "The FinancialReports API was unreachable or timed out "
+                    "(already retried once)."
+                ) from exc
+            if response.status_code != 200:
+                _raise_upstream_error("isins_list", response)
+            try:
+                return _scrub_for("isins_list", _json_loads(response.content))
+            except ValueError as exc:
+                raise RuntimeError(f"upstream isins_list returned non-JSON body") from exc
+
+        page_params = {k: v for k, v in query_params.items() if v is not None}
+        if max_items is not None:
+            result = await _auto_paginate(_fetch, url, page_params, max_items)
+        else:
+            result = await _fetch(page_params)
+        # Projected after auto-pagination, whose de-duplication keys on `id`.
+        result = _apply_fields(result, projection, True)
+        result = await _budget_result("isins_list", result, "results")
+        return result
+    finally:
+        _release_auth_context(resets)
+
+
+_SCRUB_PLANS["isins_retrieve"] = {'keys': {'company': {}}}
+
+
+_FIELD_NAMES["isins_retrieve"] = ('code', 'is_primary', 'company', 'figi', 'composite_figi', 'share_class_figi', 'security_type', 'security_type2', 'market_sector', 'exch_code', 'figi_last_updated')
+
+@mcp.tool(
+    tags={"ISINs"},
+    annotations=ToolAnnotations(
+        title="Retrieve ISIN",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+)
+@subscription_required
+async def isins_retrieve(
+    code: str,
+    fields: str | None = None,
+) -> str:
+    """Retrieve details for a specific ISIN.
+
+**When to use this tool:** Use to resolve an ISIN (12-character code like US0378331005) to a company. Fastest path when the user provides an ISIN directly.
+
+**When NOT to use this tool:** Don't use for name or ticker lookups — use `companies_list` with the `search` parameter instead.
+
+**Examples:**
+- Look up US0378331005 -> id='US0378331005' (Returns the company associated with this ISIN)
+
+**Fewer fields:** `fields="id,name"` (dotted for nested) returns only those."""
+    try:
+        _require_auth_context()
+        query_params: dict[str, Any] = {
+        }
+        projection = _parse_fields("isins_retrieve", fields)
+        path_params: dict[str, str] = {}
+        if code is not None:
+            path_params["code"] = _validate_path_param(
+                "code", code
+            )
+        url = "/isins/{code}/"
+        if path_params:
+            url = url.format(**path_params)
+
+        response = await _api_get(
+            url,
+            lane="interactive",
+            params={k: v for k, v in query_params.items() if v is not None},
+        )
+        return _format_response(response, projection, False, tool="isins_retrieve")
+    except ToolInputError as exc:
+        return _safe_error("isins_retrieve", exc)
+    except Exception as exc:
+        logger.exception("isins_retrieve failed")
+        return _safe_error("isins_retrieve", exc)
+
+
+@mcp.resource(
+    uri="fr://guide/filing-types",
+    name="FR filing-type taxonomy",
+    description=(
+        "All 31 filing-type codes the FinancialReports backend uses, with "
+        "categories and one-line descriptions. Read this whenever a user "
+        "asks about a filing type that isn't in the top-6 inline list "
+        "(10-K, 10-K-ESEF, IR, ER, MDA, DIRS) — e.g. ESG, governance, "
+        "M&A, dividend notices, call transcripts, investor presentations."
+    ),
+    mime_type="text/markdown",
+)
+def _resource_filing_types() -> str:
+    return (
+        "# FR filing-type codes (31 total)\n\n"
+        "Pass these via the `filing_type_code` query param on "
+        "`filings_list`. The first column is the code; the third is the "
+        "FR taxonomy category.\n\n"
+        "**20-F note:** foreign private issuers filing 20-F with the SEC "
+        "are rolled up under `10-K` in this dataset. Don't search for "
+        "`20-F` as a code — it doesn't exist.\n\n"
+        "| Code | Name | Category |\n"
+        "|---|---|---|\n"
+        "| 10-K | Annual Report (US + 20-F) | Financial Reporting & Info |\n"
+        "| 10-K-ESEF | Annual Report (ESEF, EU) | Financial Reporting & Info |\n"
+        "| IR | Interim / Quarterly Report | Financial Reporting & Info |\n"
+        "| ER | Earnings Release | Financial Reporting & Info |\n"
+        "| XLSX | Financial Supplement Data | Financial Reporting & Info |\n"
+        "| AR | Audit Report / Information | Financial Reporting & Info |\n"
+        "| MDA | Management Reports / MD&A | Management & Remuneration |\n"
+        "| MANG | Board/Management Information | Management & Remuneration |\n"
+        "| DEF 14A | Remuneration Information | Management & Remuneration |\n"
+        "| DIRS | Director's Dealing (insider transactions) | Management & Remuneration |\n"
+        "| SR | Environmental & Social Information (ESG) | ESG Information |\n"
+        "| CGR | Governance Information | ESG Information |\n"
+        "| CT | Call Transcript (earnings calls) | Investor Communication |\n"
+        "| IP | Investor Presentation | Investor Communication |\n"
+        "| RPA | Report Publication Announcement | Investor Communication |\n"
+        "| TAR | M&A Activity | M&A, Partnerships & Legal |\n"
+        "| MA | Merger & Acquisition | M&A, Partnerships & Legal |\n"
+        "| LTR | Legal Proceedings Report | M&A, Partnerships & Legal |\n"
+        "| AGM-R | AGM Information | Annual General Meeting |\n"
+        "| DVA | Voting Results & Voting Rights | Annual General Meeting |\n"
+        "| PSI | Proxy Solicitation & Information Statement | Annual General Meeting |\n"
+        "| CAP | Capital/Financing Update | Debt Information |\n"
+        "| IRAT | Interest Rate Update/Notice | Debt Information |\n"
+        "| MRQ | Major Shareholding Notification | Equity Information |\n"
+        "| DIV | Notice of Dividend Amount | Equity Information |\n"
+        "| SHA | Share Issue/Capital Change | Equity Information |\n"
+        "| POS | Transaction in Own Shares | Equity Information |\n"
+        "| FS | Fund Information / Factsheet | Investment Vehicle Info |\n"
+        "| NAV | Net Asset Value | Investment Vehicle Info |\n"
+        "| DLST | Delisting Announcement | Listing/Delisting |\n"
+        "| RNS | Regulatory Filings | Other |\n"
+        "\n"
+        "If you need the source of truth at runtime (e.g. a new code was "
+        "added since this resource was written), call `filing_types_list` "
+        "— it returns the live list."
+    )
+
+
+@mcp.resource(
+    uri="fr://guide/industry-classification",
+    name="FR industry classification (ISIC)",
+    description=(
+        "ISIC 4-level industry hierarchy used by the FinancialReports "
+        "backend, with all 22 sections and a peer-query recipe. Read "
+        "this whenever a user asks about a sector, industry, peer "
+        "comparison, peer median, or wants to screen companies by "
+        "business activity."
+    ),
+    mime_type="text/markdown",
+)
+def _resource_industry() -> str:
+    return (
+        "# Industry classification (ISIC, 4 levels)\n\n"
+        "Hierarchy from broad to specific:\n"
+        "- **Section**  (1 letter, 22 total)    drills down to →\n"
+        "- **Division** (2 digits, 87 total)    drills down to →\n"
+        "- **Group**    (3 digits, 258 total)   drills down to →\n"
+        "- **Class**    (4 digits, 463 total)   ← companies are tagged here\n\n"
+        "Each company has `isic_class` on the `companies_*` responses.\n\n"
+        "## Navigation\n\n"
+        "Top-down: `isic_sections_list` → `isic_divisions_list` → "
+        "`isic_groups_list` → `isic_classes_list`. Use the `_retrieve` "
+        "endpoints to inspect a single node.\n\n"
+        "Direct filter on companies: `companies_list?isic_class=<4-digit-code>`.\n\n"
+        "## The 22 sections\n\n"
+        "| Section | Activity |\n"
+        "|---|---|\n"
+        "| A | Agriculture, forestry & fishing |\n"
+        "| B | Mining & quarrying |\n"
+        "| C | Manufacturing |\n"
+        "| D | Electricity, gas, steam |\n"
+        "| E | Water, sewerage, waste |\n"
+        "| F | Construction |\n"
+        "| G | Wholesale & retail trade |\n"
+        "| H | Transportation & storage |\n"
+        "| I | Accommodation & food service |\n"
+        "| J | Publishing, broadcasting, media (note: this taxonomy keeps media here, NOT IT) |\n"
+        "| K | Telecom, IT, software, consultancy (note: software is K here, not J) |\n"
+        "| L | Financial & insurance |\n"
+        "| M | Real estate |\n"
+        "| N | Professional, scientific & technical |\n"
+        "| O | Administrative & support |\n"
+        "| P | Public administration |\n"
+        "| Q | Education |\n"
+        "| R | Human health & social work |\n"
+        "| S | Arts, sports, recreation |\n"
+        "| T | Other services |\n"
+        "| U | Households as employers |\n"
+        "| V | Extraterritorial organizations |\n\n"
+        "## Peer / sector query recipe\n\n"
+        "For median / quartiles / mean of a line item across peers, call "
+        "`companies_peer_statistics` (an ISIC class or an id list) — one call, "
+        "grouped by currency, with sample sizes. To compute them by hand:\n\n"
+        "1. Resolve target company → get its `isic_class` from "
+        "`companies_retrieve`.\n"
+        "2. `companies_list?isic_class=<code>` → list of peers.\n"
+        "3. For each peer, `companies_financials_retrieve` → the line "
+        "item of interest.\n"
+        "4. Compute median / mean / quartiles in your response. NEVER "
+        "aggregate across currencies — group peers by reporting "
+        "currency first, or report per-currency aggregates separately.\n"
+        "5. State sample size explicitly: 'median across 12 peers with "
+        "reported revenue in EUR' beats 'industry median'.\n\n"
+        "## Combining with country filter\n\n"
+        "For \"semiconductor manufacturers in Asia\" — first identify the "
+        "ISIC class (drill: Section C → Division 26 → Group 261 → Class "
+        "for semiconductors; use `isic_classes_list?search=semiconductor` "
+        "to find the exact code), then "
+        "`companies_list?isic_class=<code>&country=<ISO2>`."
+    )
+
+
+@mcp.resource(
+    uri="fr://guide/markdown-strategy",
+    name="FR markdown-fetch strategy",
+    description=(
+        "When and how to use filings_markdown_retrieve effectively. "
+        "Covers (1) processing_status gating (only COMPLETED filings "
+        "have markdown), (2) fallback from companies_financials_retrieve "
+        "when a line item is missing, (3) pagination semantics. Read "
+        "before fetching markdown content."
+    ),
+    mime_type="text/markdown",
+)
+def _resource_markdown() -> str:
+    return (
+        "# Markdown-fetch strategy\n\n"
+        "## When to use filings_markdown_retrieve\n\n"
+        "Markdown has *broader* coverage than the normalised financials "
+        "dataset. Reach for it when:\n\n"
+        "- `companies_financials_retrieve` returns null/missing for a "
+        "line item the user asked for (debt schedules, segment data, "
+        "non-IFRS metrics, capex breakdowns, etc.).\n"
+        "- The user wants a *section* of a filing (risk factors, MD&A, "
+        "going concern, climate disclosures) — use the "
+        "/find_filing_section slash command.\n"
+        "- The user wants verbatim language from the filing.\n\n"
+        "Do NOT reach for markdown when:\n\n"
+        "- The user wants a single normalised KPI for a single period "
+        "and `companies_financials_retrieve` has it.\n"
+        "- The user just wants to know what was filed and when — use "
+        "/summarize_recent_filings instead.\n\n"
+        "## Sharing a filing link with a human\n\n"
+        "You (the model) fetch filing text with filings_markdown_retrieve("
+        "filing_id) — you never need a URL for that. When a *human* needs "
+        "to open a filing, hand them a PUBLIC link: `viewer_url` (the "
+        "interactive web page) or `document` (the raw PDF/ZIP). NEVER give "
+        "a user an `/api/...` URL — including the auth-gated markdown "
+        "endpoint and the paginated `next`/`previous` links — those "
+        "require credentials and return 403 for an unauthenticated "
+        "person.\n\n"
+        "## processing_status gate\n\n"
+        "Every filing has `processing_status`. Markdown is only "
+        "available when this == `'COMPLETED'`. Other values you may "
+        "see: `PROCESSING`, `PENDING`, `FAILED`.\n\n"
+        "Two ways to avoid wasted calls:\n\n"
+        "1. Filter the list call: `filings_list?processing_status="
+        "'COMPLETED'&...`. Recommended for any list query that "
+        "precedes a markdown fetch.\n"
+        "2. Read the `processing_status` field on each filing returned "
+        "by filings_list / filings_retrieve before calling markdown.\n\n"
+        "Calling markdown on a non-COMPLETED filing wastes one tool call "
+        "and returns nothing useful.\n\n"
+        "## Pagination\n\n"
+        "Long filings (ESEF annual reports can be 100+ pages) come back "
+        "paginated. `filings_markdown_retrieve` accepts `offset` and "
+        "`limit` (default limit 50000 chars, per-call cap 150000). "
+        "When the response contains a truncation marker, call again "
+        "with an increased `offset` until either the marker is gone or "
+        "you've located the section you needed.\n\n"
+        "Don't blindly fetch every page — if you've found the answer "
+        "(e.g. located the risk-factor section the user asked for), "
+        "stop.\n\n"
+        "## Markdown-fallback workflow\n\n"
+        "User asks: \"What's Roche's free cash flow for FY2024?\"\n\n"
+        "1. resolve: `companies_list?search=Roche` → company id.\n"
+        "2. try the structured path: `companies_financials_retrieve("
+        "company_id, fiscal_year=2024)`.\n"
+        "3. if free_cash_flow is null/missing in that response: "
+        "`filings_list?company=<id>&filing_type_code=10-K-ESEF"
+        "&processing_status=COMPLETED&ordering=-publication_datetime"
+        "&limit=1`.\n"
+        "4. `filings_markdown_retrieve` on that filing_id, paginate "
+        "until you hit the cash-flow statement.\n"
+        "5. Extract the value, cite the filing (type + publication "
+        "date + page-ish location)."
+    )
+
+
+
+@mcp.tool(
+    annotations=ToolAnnotations(
+        title="FR filing-type taxonomy",
+        readOnlyHint=True, destructiveHint=False,
+        idempotentHint=True, openWorldHint=False,
+    ),
+)
+async def get_fr_filing_type_taxonomy() -> str:
+    """The full 31-code filing-type taxonomy (codes + categories). Read before
+    filtering filings by type — especially for ESG, governance, M&A, dividends,
+    transcripts, or any type beyond 10-K / IR / ER / MDA / DIRS."""
+    return _resource_filing_types.fn()
+
+
+@mcp.tool(
+    annotations=ToolAnnotations(
+        title="FR industry classification (ISIC)",
+        readOnlyHint=True, destructiveHint=False,
+        idempotentHint=True, openWorldHint=False,
+    ),
+)
+async def get_fr_industry_classification_isic() -> str:
+    """The ISIC industry hierarchy (sections/divisions/groups/classes) and how
+    to screen peers. Read for any sector, industry, or peer-comparison query,
+    then screen with companies_list(sector=...)."""
+    return _resource_industry.fn()
+
+
+@mcp.tool(
+    annotations=ToolAnnotations(
+        title="FR markdown-fetch strategy",
+        readOnlyHint=True, destructiveHint=False,
+        idempotentHint=True, openWorldHint=False,
+    ),
+)
+async def get_fr_markdown_fetch_strategy() -> str:
+    """When and how to fall back to filings_markdown_retrieve for values the
+    normalized financials dataset doesn't carry, including processing_status
+    gating and pagination."""
+    return _resource_markdown.fn()
+
+
+
+@mcp.tool(
+    tags={"Filings"},
+    annotations=ToolAnnotations(
+        title="Search Filing Document",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+)
+@subscription_required
+async def filings_markdown_search(
+    filing_id: int,
+    query: str,
+    max_hits: int = 5,
+) -> str:
+    """Search a filing's processed Markdown for `query` and return ONLY the matching
+    passages with their character offsets — use this INSTEAD of paging a long filing
+    to find a specific figure, line item, or section (e.g. query='total revenue').
+    Case-insensitive. Each hit shows ~440 chars of context and an offset you can pass
+    to filings_markdown_retrieve to read more around it."""
+    try:
+        _require_auth_context()
+        if not isinstance(filing_id, int) or filing_id <= 0:
+            raise ToolInputError("filing_id must be a positive integer")
+        if not query or not query.strip():
+            raise ToolInputError("query must be a non-empty string")
+        url = f"/filings/{filing_id}/markdown/"
+        async with _api_stream_get(url, lane="bulk") as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                return _upstream_error_text(
+                    response, body[:1000].decode("utf-8", errors="replace")
+                )
+            buf = bytearray()
+            async for _chunk in response.aiter_bytes():
+                if len(buf) + len(_chunk) > _MAX_FILING_BYTES:
+                    buf.extend(_chunk[: _MAX_FILING_BYTES - len(buf)])
+                    break
+                buf.extend(_chunk)
+        full_text = buf.decode("utf-8", errors="replace")
+        raw = query.strip()
+        try:
+            cap = max(1, min(int(max_hits), 10))
+        except (TypeError, ValueError):
+            raise ToolInputError("max_hits must be an integer between 1 and 10")
+        # Number queries: also try the thousands-comma form, since filings render
+        # figures as e.g. "19,409" — so a query of "19409" still finds it.
+        cands = [raw]
+        _bare = raw.replace(",", "")
+        if _bare.isdigit() and len(_bare) >= 4:
+            cands = [_bare, format(int(_bare), ",")]
+        hay_l = full_text.lower()
+        hits = []
+        for cand in dict.fromkeys(cands):
+            cl = cand.lower()
+            start = 0
+            while len(hits) < cap:
+                i = hay_l.find(cl, start)
+                if i < 0:
+                    break
+                lo = max(0, i - 200)
+                hi = min(len(full_text), i + len(cand) + 240)
+                hits.append((i, full_text[lo:hi]))
+                start = i + len(cand)
+            if hits:
+                break
+        if not hits:
+            return (
+                f"No match for {query!r} in filing {filing_id} ({len(full_text)} chars). "
+                "Try a shorter or different query (e.g. a single key term), or page the "
+                "document with filings_markdown_retrieve."
+            )
+        parts = [f"{len(hits)} match(es) for {query!r} in filing {filing_id} "
+                 f"(document is {len(full_text)} chars):"]
+        for off, span in hits:
+            parts.append(f"\n--- match near offset {off} ---\n...{span}...")
+        return "\n".join(parts)
+    except ToolInputError as exc:
+        return _safe_error("filings_markdown_search", exc)
+    except Exception as exc:
+        logger.exception("filings_markdown_search failed")
+        return _safe_error("filings_markdown_search", exc)
+
+
+
+_FINANCIALS_PATH = "/companies/{id}/financials/"
+_FISCAL_PERIODS = ("FY", "H1", "H2", "Q1", "Q2", "Q3", "Q4", "9M")
+_MAX_LINE_ITEMS = 20
+_ISIC_CLASS_RE = re.compile(r"^[0-9]{4}$")
+
+
+def _parse_line_items(line_items: str) -> list[str]:
+    codes = list(dict.fromkeys(c.strip() for c in (line_items or "").split(",") if c.strip()))
+    if not codes:
+        raise ToolInputError("line_items must list at least one KPI code, e.g. 'revenue,ebitda'.")
+    if len(codes) > _MAX_LINE_ITEMS:
+        raise ToolInputError(f"line_items accepts at most {_MAX_LINE_ITEMS} codes per call.")
+    return codes
+
+
+def _number(raw: Any) -> Optional[float]:
+    """A line item's decimal string as a finite float, else None."""
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        return None
+    if value != value or value in (float("inf"), float("-inf")):
+        return None
+    return value
+
+
+def _currency_code(raw: Any) -> str:
+    """A currency as its code string, whether sent as `{code: ...}` or bare."""
+    if isinstance(raw, dict):
+        raw = raw.get("code")
+    return raw if isinstance(raw, str) else ""
+
+
+def _period_line_items(doc: dict[str, Any], fiscal_period: str) -> dict[int, dict[str, dict[str, Any]]]:
+    """`{fiscal_year: {code: item}}` from one financials document.
+
+    Only periods of `fiscal_period` count. Each item carries its `name`,
+    `value` (a float, or None when reported null or unparseable — never
+    guessed at), `currency`, `sort_order` and the period's `period_end_date`.
+    A line item's own currency wins over its statement's, which wins over the
+    company's.
+    """
+    company_currency = _currency_code(doc.get("currency"))
+    by_year: dict[int, dict[str, dict[str, Any]]] = {}
+    for period in doc.get("periods") or []:
+        year = period.get("fiscal_year")
+        if year is None or period.get("fiscal_period") != fiscal_period:
+            continue
+        items = by_year.setdefault(year, {})
+        for statement in period.get("statements") or []:
+            statement_currency = _currency_code(statement.get("currency")) or company_currency
+            for item in statement.get("line_items") or []:
+                code = item.get("code")
+                if not code or code in items:
+                    continue
+                items[code] = {
+                    "name": item.get("name") or code,
+                    "value": _number(item.get("value")),
+                    "currency": _currency_code(item.get("currency")) or statement_currency,
+                    "sort_order": item.get("sort_order"),
+                    "statement_type": statement.get("statement_type"),
+                    "period_end_date": period.get("period_end_date"),
+                }
+    return by_year
+
+
+def _line_item_order(code: str, item: dict[str, Any]) -> tuple[Any, ...]:
+    """Statement order: by statement type, then the upstream `sort_order`."""
+    order = item.get("sort_order")
+    return (item.get("statement_type") or "", order is None, order or 0, code)
+
+
+def _period_values(doc: dict[str, Any], fiscal_period: str) -> dict[int, dict[str, tuple[float, str]]]:
+    """`{fiscal_year: {code: (value, currency)}}`, non-null values only."""
+    return {
+        year: {
+            code: (item["value"], item["currency"])
+            for code, item in items.items()
+            if item["value"] is not None
+        }
+        for year, items in _period_line_items(doc, fiscal_period).items()
+    }
+
+
+def _describe(values: list[float]) -> dict[str, Any]:
+    """Median, quartiles, mean and range of one sample (n >= 1)."""
+    ordered = sorted(values)
+    if len(ordered) > 1:
+        p25, _, p75 = statistics.quantiles(ordered, n=4, method="inclusive")
+    else:
+        p25 = p75 = ordered[0]
+    return {
+        "n": len(ordered),
+        "median": statistics.median(ordered),
+        "p25": p25,
+        "p75": p75,
+        "mean": statistics.fmean(ordered),
+        "min": ordered[0],
+        "max": ordered[-1],
+    }
+
+
+async def _get_json(func_name: str, url: str, params: dict[str, Any]) -> Any:
+    """One upstream GET for a synthetic tool, failing like a structured tool."""
+    try:
+        response = await _api_get(url, lane="interactive", params=params)
+    except httpx.HTTPError as exc:
+        logger.warning("upstream %s transport error: %s", func_name, exc.__class__.__name__)
+        raise UpstreamHTTPError(
+            f"upstream {func_name} request failed ({exc.__class__.__name__}). "
+            "The FinancialReports API was unreachable or timed out "
+            "(already retried once)."
+        ) from exc
+    if response.status_code != 200:
+        _raise_upstream_error(func_name, response)
+    try:
+        return _scrub_for(func_name, _json_loads(response.content))
+    except ValueError as exc:
+        raise RuntimeError(f"upstream {func_name} returned non-JSON body") from exc
+
+
+async def _isic_peer_ids(isic_class: str, countries: Optional[str], limit: int) -> list[int]:
+    """Ids of up to `limit` companies tagged with ISIC class `isic_class`."""
+    code = (isic_class or "").strip()
+    if not _ISIC_CLASS_RE.match(code):
+        raise ToolInputError("isic_class must be a 4-digit ISIC class code, e.g. '2610'.")
+    params = {"sub_industry": code, "page_size": limit, "view": "summary"}
+    if countries:
+        params["countries"] = countries
+    page = await _get_json("companies_list", "/companies/", params)
+    return [row["id"] for row in page.get("results") or [] if isinstance(row.get("id"), int)]
+
+
+_PEER_STATS_OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "peer_count": {"type": "integer"},
+        "fiscal_period": {"type": "string"},
+        "fiscal_year": {"type": ["integer", "null"]},
+        "statistics": {
+            "type": "object",
+            "description": "line item code -> reporting currency -> summary",
+            "additionalProperties": {
+                "type": "object",
+                "additionalProperties": {
+                    "type": "object",
+                    "properties": {
+                        "n": {"type": "integer"},
+                        "median": {"type": "number"},
+                        "p25": {"type": "number"},
+                        "p75": {"type": "number"},
+                        "mean": {"type": "number"},
+                        "min": {"type": "number"},
+                        "max": {"type": "number"},
+                        "fiscal_years": {"type": "object"},
+                        "company_ids": {"type": "array", "items": {"type": "integer"}},
+                    },
+                },
+            },
+        },
+        "missing": {
+            "type": "object",
+            "description": "line item code -> peers with no value for it",
+            "additionalProperties": {"type": "array", "items": {"type": "integer"}},
+        },
+        "errors": {"type": "array", "items": {"type": "object"}},
+    },
+    "required": ["peer_count", "fiscal_period", "statistics", "missing", "errors"],
+}
+
+
+@mcp.tool(
+    tags={"Companies"},
+    annotations=ToolAnnotations(
+        title="Peer Statistics",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+    output_schema=_PEER_STATS_OUTPUT_SCHEMA,
+)
+async def companies_peer_statistics(
+    line_items: str,
+    isic_class: str | None = None,
+    ids: list[int] | None = None,
+    countries: str | None = None,
+    fiscal_year: int | None = None,
+    fiscal_period: Literal["FY", "H1", "H2", "Q1", "Q2", "Q3", "Q4", "9M"] = "FY",
+    max_peers: int = 30,
+) -> dict[str, Any]:
+    """Peer median, quartiles, mean, min/max and sample size for KPI `line_items` (comma-separated codes), computed server-side and grouped by reporting currency — never mixed. Peers are `ids`, or up to `max_peers` (max 50) companies in 4-digit ISIC class `isic_class`, optionally within `countries`. Each peer contributes its `fiscal_year` value, or its latest year with data; `missing` lists peers without a value. Quote `n` with every statistic."""
+    resets = await _authorize_or_raise()
+    try:
+        codes = _parse_line_items(line_items)
+        if (isic_class is None) == (ids is None):
+            raise ToolInputError("Pass exactly one of isic_class or ids.")
+        if ids is None:
+            limit = max(1, min(int(max_peers), _BATCH_MAX_IDS))
+            peer_ids = await _isic_peer_ids(isic_class, countries, limit)
+        else:
+            peer_ids = list(dict.fromkeys(ids))
+        params: dict[str, Any] = {"line_items": ",".join(codes), "fiscal_period": fiscal_period}
+        if fiscal_year is not None:
+            params["fiscal_year"] = fiscal_year
+
+        samples: dict[str, dict[str, list[tuple[int, int, float]]]] = {c: {} for c in codes}
+        missing: dict[str, list[int]] = {c: [] for c in codes}
+        errors: list[dict[str, Any]] = []
+        batch = (
+            await _retrieve_many(
+                "companies_financials_retrieve", _FINANCIALS_PATH, "id", peer_ids, params
+            )
+            if peer_ids
+            else {"results": []}
+        )
+        for entry in batch["results"]:
+            if "error" in entry:
+                errors.append(entry)
+                continue
+            by_year = _period_values(entry["data"], fiscal_period)
+            years = [y for y in by_year if by_year[y]]
+            if fiscal_year is not None:
+                years = [y for y in years if y == fiscal_year]
+            values = by_year[max(years)] if years else {}
+            for code in codes:
+                if code not in values:
+                    missing[code].append(entry["id"])
+                    continue
+                value, currency = values[code]
+                samples[code].setdefault(currency or "unknown", []).append(
+                    (entry["id"], max(years), value)
+                )
+
+        stats: dict[str, dict[str, Any]] = {}
+        for code, by_currency in samples.items():
+            stats[code] = {}
+            for currency, rows in sorted(by_currency.items()):
+                summary = _describe([value for _, _, value in rows])
+                year_counts: dict[str, int] = {}
+                for _, year, _ in rows:
+                    year_counts[str(year)] = year_counts.get(str(year), 0) + 1
+                summary["fiscal_years"] = year_counts
+                summary["company_ids"] = [company_id for company_id, _, _ in rows]
+                stats[code][currency] = summary
+        return {
+            "peer_count": len(peer_ids),
+            "fiscal_period": fiscal_period,
+            "fiscal_year": fiscal_year,
+            "statistics": stats,
+            "missing": missing,
+            "errors": errors,
+        }
+    finally:
+        _release_auth_context(resets)
+
+
+_YOY_COLUMNS = [
+    "code",
+    "name",
+    "prior",
+    "prior_currency",
+    "current",
+    "current_currency",
+    "abs_delta",
+    "pct_delta",
+    "flag",
+]
+
+
+def _yoy_row(
+    code: str, prior: Optional[dict[str, Any]], current: Optional[dict[str, Any]]
+) -> list[Any]:
+    """One aligned row; a delta only when both values exist in one currency."""
+    prior_value = prior["value"] if prior else None
+    current_value = current["value"] if current else None
+    prior_currency = prior["currency"] if prior else None
+    current_currency = current["currency"] if current else None
+    abs_delta = pct_delta = flag = None
+    if prior_value is None:
+        flag = "prior_null"
+    elif current_value is None:
+        flag = "current_null"
+    elif prior_currency != current_currency:
+        flag = "currency_changed"
+    else:
+        abs_delta = current_value - prior_value
+        if prior_value:
+            pct_delta = round(abs_delta / abs(prior_value) * 100, 2)
+        else:
+            flag = "prior_zero"
+    return [
+        code,
+        (current or prior)["name"],
+        prior_value,
+        prior_currency,
+        current_value,
+        current_currency,
+        abs_delta,
+        pct_delta,
+        flag,
+    ]
+
+
+_YOY_OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "company_id": {"type": "integer"},
+        "fiscal_period": {"type": "string"},
+        "current_fiscal_year": {"type": "integer"},
+        "prior_fiscal_year": {"type": "integer"},
+        "period_end_date": {"type": "object"},
+        "currency_changed": {"type": "boolean"},
+        "missing_years": {"type": "array", "items": {"type": "integer"}},
+        "columns": {"type": "array", "items": {"type": "string"}},
+        "rows": {"type": "array", "items": {"type": "array"}},
+        "row_count": {"type": "integer"},
+    },
+    "required": ["company_id", "columns", "rows", "currency_changed", "missing_years"],
+}
+
+
+@mcp.tool(
+    tags={"Companies"},
+    annotations=ToolAnnotations(
+        title="Year-over-Year Financials",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+    output_schema=_YOY_OUTPUT_SCHEMA,
+)
+async def companies_financials_yoy(
+    id: int,
+    current_fiscal_year: int,
+    prior_fiscal_year: int,
+    line_items: str | None = None,
+    statement_type: Literal["BS", "CFS", "IS"] | None = None,
+    fiscal_period: Literal["FY", "H1", "H2", "Q1", "Q2", "Q3", "Q4", "9M"] = "FY",
+    top: int | None = None,
+) -> dict[str, Any]:
+    """Year-over-year table of a company's reported line items, computed server-side: one row per line item (see `columns`) with both values and the absolute and percent delta, largest movers first. A row whose currency changed is flagged `currency_changed` with no delta; a value missing in one year is flagged `prior_null`/`current_null` — show it as n/a, never 0. `top` keeps the N largest movers."""
+    resets = await _authorize_or_raise()
+    try:
+        if current_fiscal_year == prior_fiscal_year:
+            raise ToolInputError("current_fiscal_year and prior_fiscal_year must differ.")
+        url = _FINANCIALS_PATH.format(id=_validate_path_param("id", id))
+        params: dict[str, Any] = {"fiscal_period": fiscal_period}
+        if line_items:
+            params["line_items"] = ",".join(_parse_line_items(line_items))
+        if statement_type:
+            params["statement_type"] = statement_type
+        current_doc, prior_doc = await asyncio.gather(
+            _get_json(
+                "companies_financials_retrieve", url, {**params, "fiscal_year": current_fiscal_year}
+            ),
+            _get_json(
+                "companies_financials_retrieve", url, {**params, "fiscal_year": prior_fiscal_year}
+            ),
+        )
+        current = _period_line_items(current_doc, fiscal_period).get(current_fiscal_year, {})
+        prior = _period_line_items(prior_doc, fiscal_period).get(prior_fiscal_year, {})
+
+        codes = sorted(
+            set(current) | set(prior),
+            key=lambda code: _line_item_order(code, current.get(code) or prior[code]),
+        )
+        all_rows = [_yoy_row(code, prior.get(code), current.get(code)) for code in codes]
+        # Largest absolute movers first; flagged rows keep statement order after them.
+        all_rows.sort(key=lambda row: (row[6] is None, -abs(row[6] or 0.0)))
+        rows = all_rows if top is None else all_rows[: max(0, int(top))]
+
+        def _end_date(items: dict[str, dict[str, Any]]) -> Optional[str]:
+            return next((i["period_end_date"] for i in items.values() if i["period_end_date"]), None)
+
+        return {
+            "company_id": id,
+            "fiscal_period": fiscal_period,
+            "current_fiscal_year": current_fiscal_year,
+            "prior_fiscal_year": prior_fiscal_year,
+            "period_end_date": {"current": _end_date(current), "prior": _end_date(prior)},
+            "currency_changed": any(row[8] == "currency_changed" for row in all_rows),
+            "missing_years": [
+                year
+                for year, items in ((current_fiscal_year, current), (prior_fiscal_year, prior))
+                if not items
+            ],
+            "columns": _YOY_COLUMNS,
+            "rows": rows,
+            "row_count": len(all_rows),
+        }
+    finally:
+        _release_auth_context(resets)
+
+
+_MATRIX_META_COLUMNS = ["code", "name", "statement_type"]
+
+
+_MATRIX_OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "company_id": {"type": "integer"},
+        "fiscal_period": {"type": "string"},
+        "fiscal_years": {"type": "array", "items": {"type": "integer"}},
+        "period_end_date": {"type": "array", "items": {"type": ["string", "null"]}},
+        "currency": {"type": "array", "items": {"type": ["string", "null"]}},
+        "columns": {"type": "array", "items": {"type": "string"}},
+        "rows": {"type": "array", "items": {"type": "array"}},
+        "currency_exceptions": {"type": "array", "items": {"type": "object"}},
+        "row_count": {"type": "integer"},
+    },
+    "required": ["company_id", "fiscal_years", "columns", "rows"],
+}
+
+
+@mcp.tool(
+    tags={"Companies"},
+    annotations=ToolAnnotations(
+        title="Financials Matrix",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+    output_schema=_MATRIX_OUTPUT_SCHEMA,
+)
+async def companies_financials_matrix(
+    id: int,
+    fiscal_year_from: int | None = None,
+    fiscal_year_to: int | None = None,
+    line_items: str | None = None,
+    statement_type: Literal["BS", "CFS", "IS"] | None = None,
+    fiscal_period: Literal["FY", "H1", "H2", "Q1", "Q2", "Q3", "Q4", "9M"] = "FY",
+) -> dict[str, Any]:
+    """A company's reported line items across fiscal years as one compact matrix — the multi-year trend view of `companies_financials_retrieve` at a fraction of its size. `fiscal_years`, `period_end_date` and `currency` are header rows aligned with the year columns of `columns`; each row is a line item followed by one value per year (null = not reported, never 0). A cell whose currency differs from its year's header is listed in `currency_exceptions`."""
+    resets = await _authorize_or_raise()
+    try:
+        if (
+            fiscal_year_from is not None
+            and fiscal_year_to is not None
+            and fiscal_year_from > fiscal_year_to
+        ):
+            raise ToolInputError("fiscal_year_from must not be after fiscal_year_to.")
+        url = _FINANCIALS_PATH.format(id=_validate_path_param("id", id))
+        params: dict[str, Any] = {"fiscal_period": fiscal_period}
+        if fiscal_year_from is not None:
+            params["fiscal_year_from"] = fiscal_year_from
+        if fiscal_year_to is not None:
+            params["fiscal_year_to"] = fiscal_year_to
+        if line_items:
+            params["line_items"] = ",".join(_parse_line_items(line_items))
+        if statement_type:
+            params["statement_type"] = statement_type
+        doc = await _get_json("companies_financials_retrieve", url, params)
+        by_year = {
+            year: items
+            for year, items in _period_line_items(doc, fiscal_period).items()
+            if items
+        }
+        years = sorted(by_year)
+
+        header_currency: list[Optional[str]] = []
+        end_dates: list[Optional[str]] = []
+        for year in years:
+            items = by_year[year].values()
+            # The year's currency is the one most of its line items report in.
+            counts: dict[str, int] = {}
+            for item in items:
+                if item["currency"]:
+                    counts[item["currency"]] = counts.get(item["currency"], 0) + 1
+            header_currency.append(max(counts, key=counts.get) if counts else None)
+            end_dates.append(next((i["period_end_date"] for i in items if i["period_end_date"]), None))
+
+        first_seen: dict[str, dict[str, Any]] = {}
+        for year in reversed(years):
+            for code, item in by_year[year].items():
+                first_seen.setdefault(code, item)
+        codes = sorted(first_seen, key=lambda code: _line_item_order(code, first_seen[code]))
+
+        rows: list[list[Any]] = []
+        exceptions: list[dict[str, Any]] = []
+        for code in codes:
+            item = first_seen[code]
+            row: list[Any] = [code, item["name"], item["statement_type"]]
+            for year, currency in zip(years, header_currency):
+                cell = by_year[year].get(code)
+                row.append(cell["value"] if cell else None)
+                if cell and cell["value"] is not None and cell["currency"] != currency:
+                    exceptions.append(
+                        {"code": code, "fiscal_year": year, "currency": cell["currency"]}
+                    )
+            rows.append(row)
+
+        return {
+            "company_id": id,
+            "fiscal_period": fiscal_period,
+            "fiscal_years": years,
+            "period_end_date": end_dates,
+            "currency": header_currency,
+            "columns": _MATRIX_META_COLUMNS + [str(year) for year in years],
+            "rows": rows,
+            "currency_exceptions": exceptions,
+            "row_count": len(rows),
+        }
+    finally:
+        _release_auth_context(resets)
+
+
+_DIGEST_COLUMNS = ["id", "date", "type", "title", "viewer_url"]
+_DIGEST_MAX_LOOKBACK_DAYS = 3650
+
+
+def _digest_row(filing: dict[str, Any]) -> list[Any]:
+    filing_type = filing.get("filing_type") or {}
+    return [
+        filing.get("id"),
+        (filing.get("release_datetime") or "")[:10] or None,
+        filing_type.get("name") or filing_type.get("code"),
+        filing.get("title"),
+        filing.get("viewer_url"),
+    ]
+
+
+_DIGEST_OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "company": {"type": "integer"},
+        "release_datetime_from": {"type": "string"},
+        "count": {"type": ["integer", "null"]},
+        "returned": {"type": "integer"},
+        "truncated": {"type": "boolean"},
+        "next": {"type": ["string", "null"]},
+        "columns": {"type": "array", "items": {"type": "string"}},
+        "categories": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "category": {"type": "string"},
+                    "count": {"type": "integer"},
+                    "rows": {"type": "array", "items": {"type": "array"}},
+                },
+            },
+        },
+        "history_window": {"type": ["object", "null"]},
+    },
+    "required": ["company", "count", "returned", "truncated", "columns", "categories"],
+}
+
+
+@mcp.tool(
+    tags={"Filings"},
+    annotations=ToolAnnotations(
+        title="Recent Filings Digest",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False,
+    ),
+    output_schema=_DIGEST_OUTPUT_SCHEMA,
+)
+async def filings_recent_digest(
+    company: int,
+    lookback_days: int = 90,
+) -> dict[str, Any]:
+    """Every filing a company released in the last `lookback_days`, newest first and grouped by filing category, in one call — all pages are fetched server-side. Each row is `columns` (id, date, type, title, viewer_url); each category carries its `count`. If `truncated`, `returned` of `count` filings fit; `next` resumes the walk via `filings_list`."""
+    resets = await _authorize_or_raise()
+    try:
+        days = int(lookback_days)
+        if not 1 <= days <= _DIGEST_MAX_LOOKBACK_DAYS:
+            raise ToolInputError(
+                f"lookback_days must be between 1 and {_DIGEST_MAX_LOOKBACK_DAYS}."
+            )
+        cutoff = (_dt.datetime.now(_dt.timezone.utc) - _dt.timedelta(days=days)).strftime(
+            "%Y-%m-%dT00:00:00Z"
+        )
+        params = {
+            "company": company,
+            "release_datetime_from": cutoff,
+            "ordering": "-release_datetime",
+            "view": "summary",
+        }
+        history_window: list[Any] = []
+
+        async def _fetch(page_params: dict[str, Any]) -> dict[str, Any]:
+            page = await _get_json("filings_list", "/filings/", page_params)
+            if not history_window:
+                history_window.append(page.get("history_window"))
+            return page
+
+        merged = await _auto_paginate(_fetch, "/filings/", params, _AUTO_PAGINATE_MAX_ITEMS)
+
+        groups: dict[str, dict[str, Any]] = {}
+        for filing in merged["results"]:
+            category = ((filing.get("filing_type") or {}).get("category") or {})
+            name = category.get("name") or "Uncategorized"
+            group = groups.setdefault(
+                name,
+                {"sort_order": category.get("sort_order"), "category": name, "rows": []},
+            )
+            group["rows"].append(_digest_row(filing))
+        ordered = sorted(
+            groups.values(),
+            key=lambda g: (g["sort_order"] is None, g["sort_order"] or 0, g["category"]),
+        )
+        return {
+            "company": company,
+            "release_datetime_from": cutoff,
+            "count": merged["count"],
+            "returned": len(merged["results"]),
+            "truncated": merged["next"] is not None,
+            "next": merged["next"],
+            "columns": _DIGEST_COLUMNS,
+            "categories": [
+                {"category": g["category"], "count": len(g["rows"]), "rows": g["rows"]}
+                for g in ordered
+            ],
+            "history_window": history_window[0] if history_window else None,
+        }
+    finally:
+        _release_auth_context(resets)
+
+
+# Feed cursors: an opaque token per poll, mapped per user to the window the
+# next poll starts from. Windows close _FEED_SETTLE_SECONDS in the past so a
+# write still in flight lands in the next window instead of between two.
+# The list endpoint has no id__gt filter and cannot order by updated_date, so
+# updated_date itself is the key a backlog is drained by. Each poll reads one
+# window with its updated_date_to frozen, all pages at once through
+# `_auto_paginate`, sized to hold about _AUTO_PAGINATE_MAX_ITEMS changes: the
+# cursor keeps the width the last window's density calls for, and the first
+# page's `count` checks it (a window that turns out fuller is cut in
+# proportion and re-checked). The next poll starts where the window ended; no
+# page number outlives a call, so a filing updated mid-drain moves past the
+# frozen bound into a later window instead of shifting unread rows onto a
+# page already returned. A window that still comes back short (the byte cap,
+# a failed page) is read again narrower. Only a single second holding more
+# changes than one window is paged to the end, within one call, and the next
+# poll starts after it.
+# Bounds are inclusive and to the second, so rows updated in a window's last
+# second come back in the next window; their (id, updated_date) pairs are the
+# cursor's `seen` list and are dropped there, while a later update of the same
+# filing carries a new updated_date and is returned again. A used cursor stays
+# valid, so a client that lost the response can repeat the poll, until the
+# cursor after it is used; then it is deleted.
+_FEED_CURSOR_TTL = float(os.environ.get("MCP_FEED_CURSOR_TTL_SECONDS", str(14 * 24 * 3600)))
+_FEED_SETTLE_SECONDS = 30
+_FEED_MAX_LOOKBACK_HOURS = 24 * 30
+_FEED_FILTERS = ("on_watchlist", "company", "countries", "categories", "types")
+_feed_cursors = _SharedTTLStore("filings-feed", _FEED_CURSOR_TTL)
+
+
+def _feed_timestamp(ts: float) -> str:
+    return _dt.datetime.fromtimestamp(ts, _dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _feed_epoch(stamp: str) -> int:
+    """An ISO-8601 timestamp, any offset (none means UTC), as whole UTC seconds."""
+    parsed = _dt.datetime.fromisoformat(stamp)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=_dt.timezone.utc)
+    return int(parsed.timestamp() // 1)
+
+
+def _feed_seen_key(filing: dict[str, Any]) -> str:
+    return f"{filing.get('id')}@{filing.get('updated_date')}"
+
+
+def _feed_key_epoch(key: str) -> Optional[int]:
+    try:
+        return _feed_epoch(key.partition("@")[2])
+    except ValueError:
+        return None
+
+
+def _feed_row(filing: dict[str, Any]) -> dict[str, Any]:
+    """What a feed poll keeps of a full filing row; small, so `_auto_paginate`'s
+    byte cap counts the rows returned, not the upstream's."""
+    return {"id": filing.get("id"), "key": _feed_seen_key(filing), "row": _digest_row(filing)}
+
+
+_FEED_OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "cursor": {"type": "string"},
+        "since": {"type": "string"},
+        "until": {"type": "string"},
+        "count": {"type": ["integer", "null"]},
+        "returned": {"type": "integer"},
+        "has_more": {"type": "boolean"},
+        "columns": {"type": "array", "items": {"type": "string"}},
+        "rows": {"type": "array", "items": {"type": "array"}},
+    },
+    "required": ["cursor", "since", "until", "returned", "has_more", "columns", "rows"],
+}
+
+
+@mcp.tool(
+    tags={"Filings"},
+    annotations=ToolAnnotations(
+        title="Filings Changes Feed",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=False,
+        openWorldHint=False,
+    ),
+    output_schema=_FEED_OUTPUT_SCHEMA,
+)
+async def filings_changes_since(
+    cursor: str | None = None,
+    on_watchlist: bool | None = None,
+    company: int | None = None,
+    countries: str | None = None,
+    categories: str | None = None,
+    types: str | None = None,
+    lookback_hours: int = 24,
+) -> dict[str, Any]:
+    """Filings added or updated since your last poll — for monitoring a watchlist or a screen without re-reading what you have seen. The first call (no `cursor`) returns the last `lookback_hours` of changes matching the filters; every response carries a new `cursor`, and passing it back returns only changes since. A cursor keeps the filters it started with. If `has_more`, poll again with the new cursor right away. Rows follow `columns`."""
+    resets = await _authorize_or_raise()
+    try:
+        filters = {
+            name: value
+            for name, value in zip(
+                _FEED_FILTERS, (on_watchlist, company, countries, categories, types)
+            )
+            if value is not None
+        }
+        owner = _current_sub.get()
+        if cursor is None:
+            hours = int(lookback_hours)
+            if not 1 <= hours <= _FEED_MAX_LOOKBACK_HOURS:
+                raise ToolInputError(
+                    f"lookback_hours must be between 1 and {_FEED_MAX_LOOKBACK_HOURS}."
+                )
+            state = {
+                "filters": filters,
+                "since": _feed_timestamp(time.time() - hours * 3600),
+                "until": None,
+                "seen": [],
+                "width": None,
+                "previous": None,
+            }
+        else:
+            state = await _feed_cursors.get(f"{owner}:{cursor}")
+            if state is None:
+                raise ToolInputError(
+                    "Unknown or expired cursor. Call without a cursor to start a new feed."
+                )
+            if filters and filters != state["filters"]:
+                raise ToolInputError(
+                    "A cursor keeps the filters it was started with; "
+                    "call without a cursor to change them."
+                )
+
+        end = state["until"] or _feed_timestamp(time.time() - _FEED_SETTLE_SECONDS)
+        params = {
+            **state["filters"],
+            "updated_date_from": state["since"],
+            "ordering": "id",
+            "view": "full",  # the summary view has no updated_date
+            "page": 1,
+            "page_size": _AUTO_PAGINATE_PAGE_SIZE,
+        }
+        probes: dict[str, dict[str, Any]] = {}
+
+        async def _fetch(page_params: dict[str, Any]) -> dict[str, Any]:
+            upper = page_params["updated_date_to"]
+            if int(page_params["page"]) == 1 and upper in probes:
+                return probes[upper]
+            doc = await _get_json("filings_list", "/filings/", page_params)
+            return {**doc, "results": [_feed_row(f) for f in doc.get("results") or []]}
+
+        low, high = _feed_epoch(state["since"]), _feed_epoch(end)
+        width = state.get("width")
+        top = high if width is None else min(high, low + width)
+        while True:
+            upper = _feed_timestamp(top)
+            probes[upper] = await _fetch({**params, "updated_date_to": upper})
+            count = int(probes[upper].get("count") or 0)
+            if count <= _AUTO_PAGINATE_MAX_ITEMS or top == low:
+                break
+            # Fuller than one window: cut in proportion, as if evenly spread.
+            top = low + min(top - low - 1, (top - low) * _AUTO_PAGINATE_MAX_ITEMS // count)
+
+        window = {**params, "updated_date_to": upper}
+        merged = await _auto_paginate(_fetch, "/filings/", window, _AUTO_PAGINATE_MAX_ITEMS)
+        results = list(merged["results"])
+        while merged["next"] and top == low:  # one second, more than a window
+            resume = int(httpx.URL(merged["next"]).params["page"])
+            merged = await _auto_paginate(
+                _fetch, "/filings/", {**window, "page": resume}, _AUTO_PAGINATE_MAX_ITEMS
+            )
+            results.extend(merged["results"])
+        complete = merged["next"] is None
+
+        seen = set(state["seen"])
+        rows = []
+        for result in results:
+            if result["key"] not in seen:
+                seen.add(result["key"])
+                rows.append(result["row"])
+
+        drained = complete and top == high
+        if not complete:
+            # Read again, narrower; what this poll returned is in `seen`.
+            next_since, width = state["since"], max(1, (top - low) // 2)
+        elif top == low and not drained:
+            # The window was its first second, read whole above; start past it
+            # or the next poll would size itself to it again.
+            next_since, width = _feed_timestamp(low + 1), 1
+        else:
+            # The next window is sized to this one's density, up or down; a new
+            # backlog (after a drain) starts from its whole window again.
+            next_since = upper
+            fitted = (top - low) * _AUTO_PAGINATE_MAX_ITEMS // max(count, 1)
+            width = None if drained else max(1, fitted)
+        floor = _feed_epoch(next_since)
+        carried = dict.fromkeys([*state["seen"], *(result["key"] for result in results)])
+        next_state = {
+            "filters": state["filters"],
+            "since": next_since,
+            "until": None if drained else end,
+            "seen": [key for key in carried if (_feed_key_epoch(key) or floor - 1) >= floor],
+            "width": width,
+            "previous": cursor,
+        }
+        next_cursor = uuid.uuid4().hex
+        await _feed_cursors.set(f"{owner}:{next_cursor}", next_state)
+        if state.get("previous"):
+            await _feed_cursors.delete(f"{owner}:{state['previous']}")
+        return {
+            "cursor": next_cursor,
+            "since": state["since"],
+            "until": upper,
+            "count": count,
+            "returned": len(rows),
+            "has_more": not drained,
+            "columns": _DIGEST_COLUMNS,
+            "rows": rows,
+        }
+    finally:
+        _release_auth_context(resets)
+
+
+# ---------------------------------------------------------------------------
+# MCP Prompts — server-defined slash commands for recurring workflows.
+# Registered via @mcp.prompt(); surface in MCP clients as slash commands.
+# ---------------------------------------------------------------------------
+from mcp.types import PromptMessage
+
+
+@mcp.prompt(
+    name="compare_financials_yoy",
+    description=(
+        "Compute year-over-year deltas for a company's reported financials "
+        "(revenue, EBITDA, net income, debt, cash flow, etc.). Use whenever "
+        "the user asks how a company changed vs the prior year or wants a "
+        "YoY table — prefer this over manually orchestrating two "
+        "companies_financials_retrieve calls and computing deltas by hand."
+    ),
+)
+async def compare_financials_yoy(
+    ticker_or_name: str,
+    current_fiscal_year: int,
+    prior_fiscal_year: int,
+) -> list[PromptMessage]:
+    """Guided message sequence for a YoY financial comparison workflow."""
+    instructions = (
+        f"You will compare {ticker_or_name}'s financials for FY"
+        f"{current_fiscal_year} vs FY{prior_fiscal_year} using ONLY the "
+        "FinancialReports MCP server.\n\n"
+        "Steps:\n"
+        f"1. Call `companies_list` with search=\"{ticker_or_name}\" to "
+        "resolve the company. If multiple results, pick the one whose "
+        "primary listing matches the user's intent; if ambiguous, ask "
+        "the user.\n"
+        "2. Call `companies_financials_yoy` with id=<id>, "
+        f"current_fiscal_year={current_fiscal_year}, "
+        f"prior_fiscal_year={prior_fiscal_year}, top=8. It fetches both "
+        "years and returns the aligned table with deltas already computed. "
+        "(Only if that tool is unavailable: call "
+        "`companies_financials_retrieve` once per fiscal year and compute "
+        "the same table by hand.)\n"
+        "3. Present the rows: value in each year, absolute delta, percent "
+        "change, and the reporting currency. Never aggregate across "
+        "currencies. A row flagged `currency_changed` has no delta — show "
+        "both currencies side-by-side and STOP; do not compute one. A row "
+        "flagged `prior_null` / `current_null` renders as 'n/a' (not 0).\n"
+        "4. Cite filing type and period_end_date for each value used."
+    )
+    return [
+        PromptMessage(role="user", content=TextContent(type="text", text=instructions)),
+    ]
+
+
+@mcp.prompt(
+    name="find_filing_section",
+    description=(
+        "Locate and return a named section (risk factors, MD&A, going "
+        "concern, segment data, climate disclosures, etc.) from a "
+        "company's most recent filing of a given type. Use instead of "
+        "fetching the full markdown and grepping manually — this prompt "
+        "handles pagination correctly and refuses to fabricate when the "
+        "section is absent."
+    ),
+)
+async def find_filing_section(
+    ticker_or_name: str,
+    filing_type: str,
+    section_keyword: str,
+) -> list[PromptMessage]:
+    """Guide the assistant through resolve → list → markdown → grep."""
+    instructions = (
+        f"Find the section in {ticker_or_name}'s most recent {filing_type} "
+        f"that discusses '{section_keyword}'.\n\n"
+        "Steps:\n"
+        f"1. `companies_list` with search=\"{ticker_or_name}\".\n"
+        f"2. Map '{filing_type}' to a filing_type_code. Common mappings:\n"
+        "   annual report / 10-K / 20-F   →  '10-K'\n"
+        "   ESEF annual / EU annual       →  '10-K-ESEF'\n"
+        "   10-Q / quarterly / interim    →  'IR'\n"
+        "   earnings release              →  'ER'\n"
+        "   MD&A                          →  'MDA'\n"
+        "   ESG / sustainability          →  'SR'\n"
+        "   governance                    →  'CGR'\n"
+        "   call transcript               →  'CT'\n"
+        "   investor presentation         →  'IP'\n"
+        "   M&A                           →  'TAR' or 'MA'\n"
+        "   insider transactions          →  'DIRS'\n"
+        "   For anything else, call `filing_types_list` first.\n"
+        f"3. `filings_list` with company=<id>, filing_type_code=<mapped>, "
+        "processing_status='COMPLETED', ordering=-publication_datetime, "
+        "limit=1. The processing_status filter avoids returning a filing "
+        "whose markdown isn't ready yet.\n"
+        "4. `filings_markdown_retrieve` for that filing_id. The response "
+        "is paginated — keep calling with increasing offset until the "
+        "truncation marker is gone OR you have located the section.\n"
+        f"5. Return ONLY the markdown excerpt containing "
+        f"'{section_keyword}', plus 2 paragraphs of surrounding context. "
+        "Cite filing type and publication date. If the keyword is not "
+        f"present after exhausting all pages, say 'Section matching "
+        f"\"{section_keyword}\" not found in filing <id> after "
+        "<n> pages' — do NOT fabricate content from training data."
+    )
+    return [
+        PromptMessage(role="user", content=TextContent(type="text", text=instructions)),
+    ]
+
+
+@mcp.prompt(
+    name="summarize_recent_filings",
+    description=(
+        "Produce a dated briefing of every filing a company published in "
+        "a recent window, grouped by category with materiality flags. Use "
+        "for earnings-call prep, due-diligence catch-up, or 'what did X "
+        "file recently' — saves ~6 tool calls vs assembling manually and "
+        "uses server-side date filtering so active filers (Tesla et al.) "
+        "are not silently truncated."
+    ),
+)
+async def summarize_recent_filings(
+    ticker_or_name: str,
+    lookback_days: int = 90,
+) -> list[PromptMessage]:
+    """List recent filings and ask the model to produce a tight briefing."""
+    from datetime import date, timedelta
+    cutoff = (date.today() - timedelta(days=lookback_days)).isoformat()
+    instructions = (
+        f"Summarize {ticker_or_name}'s regulatory filings from the last "
+        f"{lookback_days} days (released on or after {cutoff}).\n\n"
+        "Steps:\n"
+        f"1. `companies_list` with search=\"{ticker_or_name}\".\n"
+        f"2. `filings_recent_digest` with company=<id>, "
+        f"lookback_days={lookback_days}. It walks every page server-side "
+        "and returns the filings already grouped by category. If "
+        "`truncated` is true, tell the user how many of `count` were "
+        "left out. (Without that tool: `filings_list` with company=<id>, "
+        f"release_datetime_from='{cutoff}', ordering=-release_datetime, "
+        "max_items=500.)\n"
+        "3. Produce a briefing: one bullet per filing with type, "
+        "date, and a one-line significance assessment, under the "
+        "digest's category headings.\n"
+        "4. Highlight anything that looks material (guidance changes, "
+        "M&A language, going-concern flags) and call it out in a "
+        "'Watch items' section. Do NOT fetch markdown bodies unless the "
+        "user asks."
+    )
+    return [
+        PromptMessage(role="user", content=TextContent(type="text", text=instructions)),
+    ]
+
+
+# Every tool is registered by now.
+_compile_output_validators()
+
+
+# ---------------------------------------------------------------------------
+# Local dev entrypoint
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    # Pass the app object directly rather than an import string — the import
+    # string form ("module:app") fails when this file is invoked as
+    # `python -m src.financial_reports_mcp`, because the actual module path
+    # is `src.financial_reports_mcp`, not `financial_reports_mcp`.
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=int(os.environ.get("PORT", "8000")),
+        log_level=os.environ.get("LOG_LEVEL", "info").lower(),
+    )
@@ -436,11 +436,15 @@ def _result_metrics(result) -> dict:
 
     ``response_bytes`` is a size PROXY, not wire bytes — the name is kept only for
     column stability across this repo and the web ingest serializer (#54). It is
-    ``len()`` of the re-serialized ``structured_content`` JSON, or of the text
-    payload: a CHARACTER count, which diverges from UTF-8 bytes for non-ASCII, and
-    excludes the MCP envelope, framing, headers, and transport encoding. Good for
-    relative size trends; never reconcile it against load-balancer / APM / CDN
-    byte counters.
+    ``len()`` of the structured result's JSON, or of the text payload: a CHARACTER
+    count, which diverges from UTF-8 bytes for non-ASCII, and excludes the MCP
+    envelope, framing, headers, and transport encoding. Good for relative size
+    trends; never reconcile it against load-balancer / APM / CDN byte counters.
+
+    A structured result the server already serialized carries the length of
+    that JSON as ``serialized_chars`` and is not serialized again here; without
+    it the result is re-serialized (``json.dumps``, so with ", " separators —
+    slightly larger than the compact copy on the wire).
     """
     out = {"result_count": None, "has_data": None, "response_bytes": None,
            "returned_ids": [], "result_countries": []}
@@ -449,7 +453,10 @@ def _result_metrics(result) -> dict:
         if sc is None and isinstance(result, dict):
             sc = result
         if isinstance(sc, dict):
-            out["response_bytes"] = len(json.dumps(sc, default=str))
+            size = getattr(result, "serialized_chars", None)
+            out["response_bytes"] = (
+                size if isinstance(size, int) else len(json.dumps(sc, default=str))
+            )
             cnt = _count_results(sc)
             out["result_count"] = cnt
             out["has_data"] = (cnt > 0) if cnt is not None else bool(sc)
@@ -777,7 +784,7 @@ class UsageAnalyticsMiddleware(Middleware):
 
     @staticmethod
     def _identity(context):
-        sub = client_id = host_name = host_version = None
+        sub = client_id = None
         try:
             token = get_access_token()  # None under DEV_MODE_API_KEY bypass
         except Exception:
@@ -786,17 +793,29 @@ class UsageAnalyticsMiddleware(Middleware):
             claims = getattr(token, "claims", {}) or {}
             sub = claims.get("sub")
             client_id = claims.get("client_id") or getattr(token, "client_id", None)
-        fc = getattr(context, "fastmcp_context", None)
-        try:
-            client_info = fc.session.client_params.clientInfo
-            host_name = getattr(client_info, "name", None)
-            host_version = getattr(client_info, "version", None)
-        except Exception:
-            pass
-        if not host_name:
-            # Stateless transport: the session no longer carries clientInfo, so
-            # fall back to what `_resolve_client_info` looked up for this call.
-            carried = _client_info.get()
-            if carried:
-                host_name, host_version = carried
-        return sub, client_id, host_name, host_version
+        host_name, host_version = current_client_info(context)
+        return sub, client_id, host_name or None, host_version or None
+
+
+def current_client_info(context) -> tuple:
+    """(host name, host version) for the call in `context`, or ("", "").
+
+    Prefers the live session's clientInfo; under the stateless transport falls
+    back to what `UsageAnalyticsMiddleware._resolve_client_info` looked up for
+    this call, so it is only populated for code running INSIDE that middleware.
+    Never raises."""
+    host_name = host_version = None
+    fc = getattr(context, "fastmcp_context", None)
+    try:
+        client_info = fc.session.client_params.clientInfo
+        host_name = getattr(client_info, "name", None)
+        host_version = getattr(client_info, "version", None)
+    except Exception:
+        pass
+    if not host_name:
+        # Stateless transport: the session no longer carries clientInfo, so
+        # fall back to what `_resolve_client_info` looked up for this call.
+        carried = _client_info.get()
+        if carried:
+            host_name, host_version = carried
+    return host_name or "", host_version or ""
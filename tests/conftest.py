@@ -59,6 +59,8 @@ def _env() -> Iterator[None]:
         "MCP_BASE_URL": TEST_BASE_URL,
         "API_BASE_URL": TEST_API_BASE,
         "MCP_VERSION": "test",
+        # Production samples output validation; tests check every result.
+        "MCP_OUTPUT_VALIDATION_SAMPLE": "1",
     }
     saved = {k: os.environ.get(k) for k in overrides}
     os.environ.update(overrides)
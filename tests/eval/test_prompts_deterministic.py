@@ -11,9 +11,9 @@ import pytest
 # Prompt name → set of tool names that the rendered instructions must mention.
 # Add a row here whenever a new @mcp.prompt() lands in scripts/generate_mcp_tools.py.
 EXPECTED_PROMPTS: dict[str, set[str]] = {
-    "compare_financials_yoy": {"companies_list", "companies_financials_retrieve"},
+    "compare_financials_yoy": {"companies_list", "companies_financials_yoy"},
     "find_filing_section": {"companies_list", "filings_list", "filings_markdown_retrieve"},
-    "summarize_recent_filings": {"companies_list", "filings_list"},
+    "summarize_recent_filings": {"companies_list", "filings_recent_digest"},
 }
 
 # Resource URI → set of substrings the resource body must contain.
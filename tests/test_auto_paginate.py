@@ -0,0 +1,170 @@
+"""Opt-in auto-pagination (`max_items`) on paginated structured list tools.
+
+Contract pinned here:
+
+  * Only structured tools with DRF `page`/`page_size` grow the parameter; left
+    unset, a call is the same single GET it always was.
+  * With `max_items`, the first page's `count` decides how many more pages to
+    fetch; they go out concurrently (bounded) and merge back in page order,
+    de-duplicated by `id`, capped at `max_items` rows and a byte budget.
+  * Whenever rows are left out, `next` points at the page holding the first of
+    them, so the model can resume with `page=`.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+
+import httpx
+import pytest
+
+from .conftest import TEST_API_BASE, TEST_CLIENT_ID
+
+URL = f"{TEST_API_BASE}/filings/"
+
+
+def _tool(mcp_module, name="filings_list"):
+    tool = mcp_module.mcp._tool_manager._tools[name]
+    return getattr(tool, "fn", None) or getattr(tool, "function", None)
+
+
+def _auth_as(mcp_module, monkeypatch, fake_access_token) -> None:
+    at = fake_access_token(client_id=TEST_CLIENT_ID, token="real-access-token")
+    monkeypatch.setattr(mcp_module, "get_access_token", lambda: at)
+
+
+def _paged(total: int, *, overlap: int = 0, stall: float = 0.0, in_flight=None):
+    """DRF list of `total` rows; each later page repeats `overlap` earlier rows."""
+
+    async def _side_effect(request: httpx.Request) -> httpx.Response:
+        if in_flight is not None:
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(stall)
+        if in_flight is not None:
+            in_flight["now"] -= 1
+        page = int(request.url.params.get("page", 1))
+        size = int(request.url.params.get("page_size", 10))
+        lo = max(0, (page - 1) * size - (overlap if page > 1 else 0))
+        hi = min(total, page * size)
+        nxt = f"{URL}?page={page + 1}&page_size={size}" if hi < total else None
+        return httpx.Response(
+            200,
+            json={
+                "count": total,
+                "next": nxt,
+                "previous": None,
+                "results": [{"id": i, "title": f"filing {i}"} for i in range(lo, hi)],
+            },
+        )
+
+    return _side_effect
+
+
+def test_only_paginated_structured_tools_take_max_items(mcp_module) -> None:
+    tools = mcp_module.mcp._tool_manager._tools
+    for name in ("companies_list", "filings_list"):
+        assert "max_items" in inspect.signature(_tool(mcp_module, name)).parameters
+    for name in ("companies_retrieve", "filings_retrieve"):
+        if name in tools:
+            assert "max_items" not in inspect.signature(_tool(mcp_module, name)).parameters
+
+
+def test_description_names_no_fixed_cap(mcp_module) -> None:
+    # The cap is MCP_AUTO_PAGINATE_MAX_ITEMS, a runtime setting.
+    description = mcp_module.mcp._tool_manager._tools["filings_list"].description
+    assert "`max_items` merges pages" in description
+    assert str(mcp_module._AUTO_PAGINATE_MAX_ITEMS) not in description
+
+
+@pytest.mark.asyncio
+async def test_unset_max_items_is_one_plain_page(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(URL).mock(side_effect=_paged(50))
+
+    out = await _tool(mcp_module)(page_size=10)
+
+    assert route.call_count == 1
+    assert len(out["results"]) == 10
+
+
+@pytest.mark.asyncio
+async def test_pages_merge_in_order_and_dedupe(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    # Pages overlap by two rows, as when filings land mid-walk.
+    route = respx_router.get(URL).mock(side_effect=_paged(45, overlap=2))
+
+    out = await _tool(mcp_module)(page_size=10, max_items=100)
+
+    assert route.call_count == 5
+    assert [r["id"] for r in out["results"]] == list(range(45))
+    assert out["count"] == 45
+    assert out["next"] is None
+
+
+@pytest.mark.asyncio
+async def test_max_items_caps_rows_and_points_next_at_resume_page(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(URL).mock(side_effect=_paged(200))
+
+    out = await _tool(mcp_module)(page_size=10, max_items=25)
+
+    assert route.call_count == 3
+    assert [r["id"] for r in out["results"]] == list(range(25))
+    assert httpx.URL(out["next"]).params["page"] == "3"
+
+
+@pytest.mark.asyncio
+async def test_pages_fetch_concurrently_within_bound(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    monkeypatch.setattr(mcp_module, "_AUTO_PAGINATE_CONCURRENCY", 2)
+    in_flight = {"now": 0, "max": 0}
+    respx_router.get(URL).mock(side_effect=_paged(60, stall=0.02, in_flight=in_flight))
+
+    out = await _tool(mcp_module)(page_size=10, max_items=60)
+
+    assert len(out["results"]) == 60
+    assert in_flight["max"] == 2
+
+
+@pytest.mark.asyncio
+async def test_byte_cap_truncates(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    row_bytes = len('{"id":10,"title":"filing 10"}')
+    monkeypatch.setattr(mcp_module, "_AUTO_PAGINATE_MAX_BYTES", row_bytes * 12)
+    respx_router.get(URL).mock(side_effect=_paged(40))
+
+    out = await _tool(mcp_module)(page_size=10, max_items=40)
+
+    assert 10 <= len(out["results"]) < 13
+    assert httpx.URL(out["next"]).params["page"] == "2"
+
+
+@pytest.mark.asyncio
+async def test_failed_later_page_returns_what_merged(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    healthy = _paged(30)
+
+    async def _third_page_fails(request: httpx.Request) -> httpx.Response:
+        if request.url.params.get("page") == "3":
+            return httpx.Response(404)
+        return await healthy(request)
+
+    respx_router.get(URL).mock(side_effect=_third_page_fails)
+
+    out = await _tool(mcp_module)(page_size=10, max_items=30)
+
+    assert [r["id"] for r in out["results"]] == list(range(20))
+    assert httpx.URL(out["next"]).params["page"] == "3"
@@ -0,0 +1,152 @@
+"""Per-call deadline propagation from the MCP request to upstream calls.
+
+Contract pinned here:
+
+  * The budget comes from MCP_TOOL_DEADLINE, overridden per host name by
+    MCP_TOOL_DEADLINE_BY_HOST, and shortened by a client-stated
+    `_meta.timeoutMs`.
+  * Every upstream request has its timeout phases clamped to the budget left;
+    an exhausted budget never puts another request on the wire.
+  * A retry whose backoff would not leave room for the retry is skipped.
+  * The middleware cancels a call that outlives its deadline and surfaces it as
+    error_kind="deadline_exceeded" — to the client and to analytics.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from .conftest import TEST_API_BASE, TEST_CLIENT_ID
+
+OK_PAGE = {"count": 0, "results": []}
+
+
+def _structured_tool(mcp_module, name="companies_list"):
+    tool = mcp_module.mcp._tool_manager._tools[name]
+    return getattr(tool, "fn", None) or getattr(tool, "function", None)
+
+
+def _auth_as(mcp_module, monkeypatch, fake_access_token) -> None:
+    at = fake_access_token(client_id=TEST_CLIENT_ID, token="real-access-token")
+    monkeypatch.setattr(mcp_module, "get_access_token", lambda: at)
+
+
+def _context(host: str = "", timeout_ms=None):
+    """Minimal stand-in for a FastMCP MiddlewareContext."""
+    extra = {} if timeout_ms is None else {"timeoutMs": timeout_ms}
+    info = SimpleNamespace(name=host, version="1")
+    return SimpleNamespace(
+        message=SimpleNamespace(name="companies_list", meta=SimpleNamespace(model_extra=extra)),
+        fastmcp_context=SimpleNamespace(
+            session=SimpleNamespace(client_params=SimpleNamespace(clientInfo=info))
+        ),
+    )
+
+
+# --- budget resolution -------------------------------------------------------
+
+
+def test_host_deadlines_parse_and_skip_malformed(mcp_module) -> None:
+    parsed = mcp_module._parse_host_deadlines("claude-ai=110, Cursor=55,bogus,x=y,")
+    assert parsed == {"claude-ai": 110.0, "cursor": 55.0}
+
+
+def test_budget_prefers_host_override_and_stated_timeout(mcp_module, monkeypatch) -> None:
+    monkeypatch.setattr(mcp_module, "_DEADLINE_DEFAULT", 55.0)
+    monkeypatch.setattr(mcp_module, "_DEADLINE_BY_HOST", {"claude-ai": 110.0})
+
+    assert mcp_module._call_budget(_context("other")) == 55.0
+    assert mcp_module._call_budget(_context("Claude-AI")) == 110.0
+    # A client-stated timeout only ever shortens the budget.
+    assert mcp_module._call_budget(_context("claude-ai", timeout_ms=20_000)) == 20.0
+    assert mcp_module._call_budget(_context("claude-ai", timeout_ms=500_000)) == 110.0
+
+
+def test_zero_budget_disables_the_deadline(mcp_module, monkeypatch) -> None:
+    monkeypatch.setattr(mcp_module, "_DEADLINE_DEFAULT", 0.0)
+    assert mcp_module._call_budget(_context("claude-ai", timeout_ms=1000)) is None
+
+
+# --- clamping ----------------------------------------------------------------
+
+
+@pytest.mark.asyncio
+async def test_request_timeouts_clamp_to_remaining_budget(mcp_module) -> None:
+    base = mcp_module._api_client.timeout
+    assert mcp_module._clamp_to_deadline({}, base) == {}  # no deadline: untouched
+
+    mcp_module._call_deadline.set(time.monotonic() + 3.0)
+    kwargs = mcp_module._clamp_to_deadline({"params": {"page": 1}}, base)
+    assert kwargs["params"] == {"page": 1}
+    timeout = kwargs["timeout"]
+    for phase in (timeout.connect, timeout.read, timeout.write, timeout.pool):
+        assert 0 < phase <= 3.0
+
+
+@pytest.mark.asyncio
+async def test_exhausted_budget_never_reaches_upstream(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(f"{TEST_API_BASE}/companies/").mock(
+        return_value=httpx.Response(200, json=OK_PAGE)
+    )
+    mcp_module._call_deadline.set(time.monotonic() - 1.0)
+
+    with pytest.raises(mcp_module.UpstreamHTTPError) as info:
+        await _structured_tool(mcp_module)()
+
+    assert info.value.error_kind == "deadline_exceeded"
+    assert route.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_retry_skipped_when_backoff_would_outlive_budget(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(f"{TEST_API_BASE}/companies/").mock(
+        side_effect=[httpx.Response(503), httpx.Response(200, json=OK_PAGE)]
+    )
+    mcp_module._call_deadline.set(time.monotonic() + 0.5)
+
+    with pytest.raises(mcp_module.UpstreamHTTPError) as info:
+        await _structured_tool(mcp_module)()
+
+    assert info.value.upstream_status == 503
+    assert route.call_count == 1
+
+
+# --- cancellation through the real middleware chain --------------------------
+
+
+@pytest.mark.asyncio
+async def test_middleware_cancels_call_at_deadline(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    from fastmcp import Client
+
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    monkeypatch.setattr(mcp_module, "_DEADLINE_DEFAULT", 0.2)
+
+    async def _stall(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(5)
+        return httpx.Response(200, json=OK_PAGE)
+
+    respx_router.get(f"{TEST_API_BASE}/filing-types/").mock(side_effect=_stall)
+    captured: list[dict] = []
+    monkeypatch.setattr(mcp_module._usage_emitter, "emit", lambda ev: captured.append(ev))
+
+    started = time.monotonic()
+    async with Client(mcp_module.mcp) as client:
+        result = await client.call_tool("filing_types_list", {}, raise_on_error=False)
+
+    assert time.monotonic() - started < 3
+    assert result.is_error
+    assert "ran out of time" in result.content[0].text
+    events = [e for e in captured if e["name"] == "filing_types_list"]
+    assert events[-1]["error_kind"] == "deadline_exceeded"
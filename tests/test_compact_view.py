@@ -0,0 +1,67 @@
+"""Compact `view` by default on list tools.
+
+Contract pinned here:
+
+  * An operation with a `view` enum defaults to its most compact value, even
+    when the upstream default is richer, and the description names the
+    upgrade.
+  * A call that omits `view` asks upstream for the compact rows; `view="full"`
+    is passed through when asked for.
+  * The advertised row schema is the compact one.
+"""
+from __future__ import annotations
+
+import httpx
+import pytest
+
+from .conftest import TEST_API_BASE, TEST_CLIENT_ID
+
+PAGE = {"count": 0, "next": None, "previous": None, "results": []}
+
+
+def _tool(mcp_module, name):
+    tool = mcp_module.mcp._tool_manager._tools[name]
+    return getattr(tool, "fn", None) or getattr(tool, "function", None)
+
+
+def test_policy_overrides_a_richer_upstream_default() -> None:
+    import scripts.generate_mcp_tools as gen
+
+    operation = {
+        "parameters": [
+            {"in": "query", "name": "view", "schema": {"type": "string", "enum": ["full", "minimal"], "default": "full"}}
+        ]
+    }
+    params = gen.extract_query_params(operation)
+
+    hint = gen.compact_view(operation, params)
+
+    assert params[0]["default_val"] == ' = "minimal"'
+    assert 'view="full"' in hint and "different field set" in hint
+    assert gen.compact_view({"parameters": []}, []) == ""
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name, path", [("companies_list", "/companies/"), ("filings_list", "/filings/")])
+async def test_lists_ask_for_the_compact_view(
+    mcp_module, monkeypatch, fake_access_token, respx_router, name, path
+) -> None:
+    at = fake_access_token(client_id=TEST_CLIENT_ID, token="real-access-token")
+    monkeypatch.setattr(mcp_module, "get_access_token", lambda: at)
+    route = respx_router.get(f"{TEST_API_BASE}{path}").mock(return_value=httpx.Response(200, json=PAGE))
+
+    await _tool(mcp_module, name)()
+    assert route.calls.last.request.url.params["view"] == "summary"
+    await _tool(mcp_module, name)(view="full")
+    assert route.calls.last.request.url.params["view"] == "full"
+
+    tool = mcp_module.mcp._tool_manager._tools[name]
+    assert 'view="full"' in tool.description
+
+
+def test_row_schema_is_the_compact_shape(mcp_module) -> None:
+    tools = mcp_module.mcp._tool_manager._tools
+    rows = tools["filings_list"].output_schema["properties"]["results"]["items"]["properties"]
+
+    # FilingSummary rows, not the full Filing with its source and language.
+    assert "title" in rows and "source" not in rows
@@ -0,0 +1,148 @@
+"""Field projection (`fields`) on generated GET tools.
+
+Contract pinned here:
+
+  * `fields` takes comma-separated dotted paths; the result keeps only those —
+    per row of `results` on a page, through lists for nested paths — and the
+    parameter is never sent upstream (the API has no projection of its own).
+  * Text, structured and batch tools all honour it; on a table it picks the
+    columns.
+  * An unknown top-level name is rejected before any upstream call.
+  * The advertised output schema requires nothing a projection could drop.
+"""
+from __future__ import annotations
+
+import httpx
+import pytest
+
+from .conftest import TEST_API_BASE, TEST_CLIENT_ID
+
+COMPANY = {
+    "id": 7,
+    "name": "Example AG",
+    "country_code": "DE",
+    "description": "A long description " * 50,
+    "listings": [
+        {"mic": "XETR", "ticker": "EXA", "exchange_name": "Xetra"},
+        {"mic": "XFRA", "ticker": "EXA", "exchange_name": "Frankfurt"},
+    ],
+    "sector": {"code": "20", "name": "Industrials"},
+}
+
+
+def _tool(mcp_module, name):
+    tool = mcp_module.mcp._tool_manager._tools[name]
+    return getattr(tool, "fn", None) or getattr(tool, "function", None)
+
+
+def _auth_as(mcp_module, monkeypatch, fake_access_token) -> None:
+    at = fake_access_token(client_id=TEST_CLIENT_ID, token="real-access-token")
+    monkeypatch.setattr(mcp_module, "get_access_token", lambda: at)
+
+
+def test_projection_tree(mcp_module) -> None:
+    tree = mcp_module._parse_fields("companies_retrieve", " id, listings.mic,sector,sector.name ")
+
+    assert tree == {"id": None, "listings": {"mic": None}, "sector": None}
+    assert mcp_module._project(COMPANY, tree) == {
+        "id": 7,
+        "listings": [{"mic": "XETR"}, {"mic": "XFRA"}],
+        "sector": {"code": "20", "name": "Industrials"},
+    }
+
+
+@pytest.mark.asyncio
+async def test_structured_retrieve_is_projected(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(f"{TEST_API_BASE}/companies/7/").mock(
+        return_value=httpx.Response(200, json=COMPANY)
+    )
+
+    out = await _tool(mcp_module, "companies_retrieve")(id=7, fields="id,name,listings.mic")
+
+    assert out == {"id": 7, "name": "Example AG", "listings": [{"mic": "XETR"}, {"mic": "XFRA"}]}
+    assert "fields" not in route.calls.last.request.url.params
+
+
+@pytest.mark.asyncio
+async def test_pages_project_each_row_after_auto_pagination(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+
+    def _page(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params.get("page", 1))
+        rows = [dict(COMPANY, id=page * 10 + i) for i in range(2)]
+        nxt = f"{TEST_API_BASE}/companies/?page={page + 1}" if page < 2 else None
+        return httpx.Response(200, json={"count": 4, "next": nxt, "previous": None, "results": rows})
+
+    respx_router.get(f"{TEST_API_BASE}/companies/").mock(side_effect=_page)
+
+    out = await _tool(mcp_module, "companies_list")(max_items=4, fields="country_code")
+
+    # All four rows survive: de-duplication ran on `id` before projection.
+    assert out["results"] == [{"country_code": "DE"}] * 4
+    assert out["count"] == 4
+
+
+@pytest.mark.asyncio
+async def test_batch_and_text_tools_honour_fields(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    respx_router.get(url__regex=rf"{TEST_API_BASE}/companies/\d+/$").mock(
+        return_value=httpx.Response(200, json=COMPANY)
+    )
+    respx_router.get(f"{TEST_API_BASE}/filing-types/").mock(
+        return_value=httpx.Response(
+            200,
+            json={
+                "count": 1,
+                "next": None,
+                "previous": None,
+                "results": [{"id": 1, "code": "AR", "name": "Annual", "category": {"id": 2, "name": "FR"}}],
+            },
+        )
+    )
+
+    batch = await _tool(mcp_module, "companies_retrieve_many")(ids=[7, 8], fields="name")
+    text = await _tool(mcp_module, "filing_types_list")(fields="code,category.name")
+    table = await _tool(mcp_module, "filing_types_list")(fields="code,category.name", output_format="table")
+
+    assert [r["data"] for r in batch["results"]] == [{"name": "Example AG"}] * 2
+    assert '"code": "AR"' in text and '"name": "FR"' in text and '"id"' not in text
+    assert table.splitlines()[1:] == ["| code | category.name |", "|---|---|", "| AR | FR |"]
+
+
+@pytest.mark.asyncio
+async def test_unknown_field_is_rejected_before_upstream(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(f"{TEST_API_BASE}/companies/7/").mock(
+        return_value=httpx.Response(200, json=COMPANY)
+    )
+
+    with pytest.raises(mcp_module.ToolArgumentError) as info:
+        await _tool(mcp_module, "companies_retrieve")(id=7, fields="id,revenue")
+
+    assert "'revenue'" in str(info.value)
+    assert route.call_count == 0
+
+
+def test_output_schema_requires_nothing_projectable(mcp_module) -> None:
+    def _required(node):
+        if isinstance(node, dict):
+            yield from ([node["required"]] if "required" in node else [])
+            for v in node.values():
+                yield from _required(v)
+        elif isinstance(node, list):
+            for v in node:
+                yield from _required(v)
+
+    tools = mcp_module.mcp._tool_manager._tools
+    assert list(_required(tools["filings_retrieve"].output_schema)) == []
+    rows = tools["filings_list"].output_schema["properties"]["results"]["items"]
+    assert list(_required(rows)) == []
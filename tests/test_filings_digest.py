@@ -0,0 +1,109 @@
+"""Recent-filings digest (`filings_recent_digest`).
+
+Contract pinned here:
+
+  * The lookback window becomes a server-side `release_datetime_from` filter,
+    newest first, and every page of it is walked in one call.
+  * Filings come back as compact rows (`columns`) grouped by filing category
+    in the category's display order, each group with its count.
+  * When the walk is capped, `truncated` is set and `next` resumes it.
+"""
+from __future__ import annotations
+
+import httpx
+import pytest
+
+from .conftest import TEST_API_BASE, TEST_CLIENT_ID
+
+URL = f"{TEST_API_BASE}/filings/"
+
+ANNUAL = {"name": "Financial Reporting", "sort_order": 1}
+ADHOC = {"name": "Ad-hoc Disclosures", "sort_order": 2}
+
+
+def _tool(mcp_module):
+    tool = mcp_module.mcp._tool_manager._tools["filings_recent_digest"]
+    return getattr(tool, "fn", None) or getattr(tool, "function", None)
+
+
+def _auth_as(mcp_module, monkeypatch, fake_access_token) -> None:
+    at = fake_access_token(client_id=TEST_CLIENT_ID, token="real-access-token")
+    monkeypatch.setattr(mcp_module, "get_access_token", lambda: at)
+
+
+def _filing(i: int) -> dict:
+    category = ADHOC if i % 3 else ANNUAL
+    return {
+        "id": i,
+        "title": f"Filing {i}",
+        "release_datetime": f"2026-09-{(i % 28) + 1:02d}T08:00:00Z",
+        "viewer_url": f"https://viewer.test.invalid/{i}",
+        "document_url": f"https://docs.test.invalid/{i}.pdf",
+        "filing_type": {"code": "AR" if category is ANNUAL else "ADHOC", "name": "Type", "category": category},
+    }
+
+
+def _paged(total: int):
+    def _side_effect(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params.get("page", 1))
+        size = int(request.url.params["page_size"])
+        lo, hi = (page - 1) * size, min(total, page * size)
+        return httpx.Response(
+            200,
+            json={
+                "count": total,
+                "next": f"{URL}?page={page + 1}" if hi < total else None,
+                "previous": None,
+                "results": [_filing(i) for i in range(lo, hi)],
+            },
+        )
+
+    return _side_effect
+
+
+@pytest.mark.asyncio
+async def test_walks_every_page_and_groups_by_category(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(URL).mock(side_effect=_paged(250))
+
+    out = await _tool(mcp_module)(company=7, lookback_days=30)
+
+    assert route.call_count == 3
+    params = route.calls[0].request.url.params
+    assert params["company"] == "7"
+    assert params["ordering"] == "-release_datetime"
+    assert params["release_datetime_from"] == out["release_datetime_from"]
+    assert out["release_datetime_from"].endswith("T00:00:00Z")
+    assert (out["count"], out["returned"], out["truncated"]) == (250, 250, False)
+    assert [g["category"] for g in out["categories"]] == ["Financial Reporting", "Ad-hoc Disclosures"]
+    assert sum(g["count"] for g in out["categories"]) == 250
+    assert out["categories"][0]["rows"][0] == [
+        0, "2026-09-01", "Type", "Filing 0", "https://viewer.test.invalid/0"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_capped_walk_is_flagged_with_resume_link(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    monkeypatch.setattr(mcp_module, "_AUTO_PAGINATE_MAX_ITEMS", 150)
+    respx_router.get(URL).mock(side_effect=_paged(400))
+
+    out = await _tool(mcp_module)(company=7)
+
+    assert out["truncated"] is True
+    assert (out["count"], out["returned"]) == (400, 150)
+    assert httpx.URL(out["next"]).params["page"] == "2"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("days", [0, 5000])
+async def test_lookback_out_of_range_is_rejected(
+    mcp_module, monkeypatch, fake_access_token, days
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    with pytest.raises(mcp_module.ToolInputError):
+        await _tool(mcp_module)(company=7, lookback_days=days)
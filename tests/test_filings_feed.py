@@ -0,0 +1,320 @@
+"""Incremental filings feed (`filings_changes_since`) and its cursor store.
+
+Contract pinned here:
+
+  * A poll is an `updated_date_from`/`updated_date_to` window over
+    `filings_list`; the returned cursor starts the next window where this one
+    ended, with the filters the feed was started with.
+  * Filings updated in the window's last second come back in the next window
+    and are returned once per `updated_date`: a later update of the same filing
+    in that second is returned again.
+  * A backlog too big for one poll is drained by `updated_date` windows sized
+    to about `_AUTO_PAGINATE_MAX_ITEMS` changes, so the upstream calls track
+    the number of changes; no page number outlives a poll, so updates made
+    mid-drain do not lose rows.
+  * A used cursor can be polled again until the cursor after it is used.
+  * Cursors belong to the user who got them and survive a replica change via
+    Redis; without Redis (or with Redis failing) the local tier still works.
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+
+import httpx
+import pytest
+
+from .conftest import TEST_API_BASE, TEST_CLIENT_ID
+
+URL = f"{TEST_API_BASE}/filings/"
+NOW = 1_800_000_000.0
+
+
+def _tool(mcp_module):
+    tool = mcp_module.mcp._tool_manager._tools["filings_changes_since"]
+    return getattr(tool, "fn", None) or getattr(tool, "function", None)
+
+
+def _auth_as(mcp_module, monkeypatch, fake_access_token, sub="test-sub-12345678") -> None:
+    at = fake_access_token(client_id=TEST_CLIENT_ID, token="real-access-token", sub=sub)
+    monkeypatch.setattr(mcp_module, "get_access_token", lambda: at)
+
+
+def _stamp(ts: float) -> str:
+    """Upstream's `updated_date`, with microseconds."""
+    return dt.datetime.fromtimestamp(ts, dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _second(stamp: str) -> int:
+    return int(dt.datetime.fromisoformat(stamp).timestamp() // 1)
+
+
+@pytest.fixture
+def clock(mcp_module, monkeypatch) -> list[float]:
+    now = [NOW]
+    monkeypatch.setattr(mcp_module.time, "time", lambda: now[0])
+    return now
+
+
+class _FakeRedis:
+    """The three redis.asyncio calls the store makes, over a dict."""
+
+    def __init__(self, fail: bool = False) -> None:
+        self.data: dict[str, str] = {}
+        self.fail = fail
+
+    async def get(self, key):
+        if self.fail:
+            raise ConnectionError("down")
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        if self.fail:
+            raise ConnectionError("down")
+        self.data[key] = value
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+class _Upstream:
+    """`/filings/` over `updated` (id -> updated_date), bounds inclusive to the second."""
+
+    def __init__(self, updated: dict[int, str]) -> None:
+        self.updated = updated
+        self.requests: list[dict] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        self.requests.append(dict(params))
+        low, high = _second(params["updated_date_from"]), _second(params["updated_date_to"])
+        ids = sorted(i for i, at in self.updated.items() if low <= _second(at) <= high)
+        page = int(params.get("page", 1))
+        size = int(params.get("page_size", 100))
+        rows = ids[(page - 1) * size : page * size]
+        return httpx.Response(
+            200,
+            json={
+                "count": len(ids),
+                "next": f"{URL}?page={page + 1}" if page * size < len(ids) else None,
+                "previous": None,
+                "results": [
+                    {
+                        "id": i,
+                        "title": f"Filing {i}",
+                        "filing_type": {},
+                        "updated_date": self.updated[i],
+                    }
+                    for i in rows
+                ],
+            },
+        )
+
+
+async def _drain(tool, cursor: str, polls: int = 60) -> tuple[list[int], dict]:
+    delivered: list[int] = []
+    for _ in range(polls):
+        page = await tool(cursor=cursor)
+        delivered += [row[0] for row in page["rows"]]
+        cursor = page["cursor"]
+        if not page["has_more"]:
+            return delivered, page
+    raise AssertionError("feed did not drain")
+
+
+@pytest.mark.asyncio
+async def test_cursor_starts_next_window_and_drops_boundary_repeats(
+    mcp_module, monkeypatch, fake_access_token, respx_router, clock
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    end = NOW - 30
+    upstream = _Upstream({1: _stamp(end - 3600), 2: _stamp(end - 60), 3: _stamp(end + 0.4)})
+    respx_router.get(URL).mock(side_effect=upstream)
+
+    first = await _tool(mcp_module)(on_watchlist=True, lookback_hours=6)
+    clock[0] += 600
+    upstream.updated[4] = _stamp(end + 100)
+    second = await _tool(mcp_module)(cursor=first["cursor"])
+
+    assert [row[0] for row in first["rows"]] == [1, 2, 3]
+    assert [row[0] for row in second["rows"]] == [4]
+    assert second["since"] == first["until"]
+    assert second["cursor"] != first["cursor"]
+    windows = upstream.requests
+    assert windows[0]["on_watchlist"] == windows[1]["on_watchlist"] == "true"
+    assert windows[0]["ordering"] == "id" and windows[0]["view"] == "full"
+    assert windows[1]["updated_date_from"] == windows[0]["updated_date_to"]
+
+
+@pytest.mark.asyncio
+async def test_second_update_in_the_boundary_second_is_returned(
+    mcp_module, monkeypatch, fake_access_token, respx_router, clock
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    end = NOW - 30
+    upstream = _Upstream({3: _stamp(end + 0.2)})
+    respx_router.get(URL).mock(side_effect=upstream)
+
+    first = await _tool(mcp_module)(company=7)
+    upstream.updated[3] = _stamp(end + 0.7)
+    clock[0] += 600
+    second = await _tool(mcp_module)(cursor=first["cursor"])
+
+    assert [row[0] for row in first["rows"]] == [3]
+    assert [row[0] for row in second["rows"]] == [3]
+
+
+@pytest.mark.asyncio
+async def test_boundary_rows_with_an_offset_are_not_repeated(
+    mcp_module, monkeypatch, fake_access_token, respx_router, clock
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    end = dt.datetime.fromtimestamp(NOW - 30, dt.timezone(dt.timedelta(hours=-5)))
+    upstream = _Upstream({3: end.replace(microsecond=400000).isoformat()})
+    respx_router.get(URL).mock(side_effect=upstream)
+
+    first = await _tool(mcp_module)(company=7)
+    clock[0] += 600
+    second = await _tool(mcp_module)(cursor=first["cursor"])
+
+    assert [row[0] for row in first["rows"]] == [3]
+    assert second["rows"] == []
+
+
+@pytest.mark.asyncio
+async def test_upstream_calls_track_the_number_of_changes(
+    mcp_module, monkeypatch, fake_access_token, respx_router, clock
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    span = 30 * 24 * 3600 - 120
+    upstream = _Upstream({i: _stamp(NOW - span + i * span // 1000) for i in range(1000)})
+    respx_router.get(URL).mock(side_effect=upstream)
+    tool = _tool(mcp_module)
+
+    first = await tool(company=7, lookback_hours=30 * 24)
+    delivered, _ = await _drain(tool, first["cursor"])
+
+    assert sorted([row[0] for row in first["rows"]] + delivered) == list(range(1000))
+    # 10 pages of 100, plus a few `count` checks while sizing windows.
+    assert len(upstream.requests) <= 14
+
+
+@pytest.mark.asyncio
+async def test_large_window_drains_by_updated_date_without_losing_rows(
+    mcp_module, monkeypatch, fake_access_token, respx_router, clock
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    monkeypatch.setattr(mcp_module, "_AUTO_PAGINATE_MAX_ITEMS", 100)
+    upstream = _Upstream({i: _stamp(NOW - 5 * 3600 + i * 60) for i in range(250)})
+    respx_router.get(URL).mock(side_effect=upstream)
+    tool = _tool(mcp_module)
+
+    first = await tool(company=7)
+    assert first["has_more"] is True and first["returned"] <= 100
+    undelivered = max(set(range(250)) - {row[0] for row in first["rows"]})
+    # An update mid-drain moves a filing out of the window being drained
+    # (with page numbers this shifted unread rows onto consumed pages).
+    upstream.updated[undelivered] = _stamp(NOW + 5)
+    clock[0] += 60
+    delivered, last = await _drain(tool, first["cursor"])
+    delivered = [row[0] for row in first["rows"]] + delivered
+    clock[0] += 600
+    delivered += [row[0] for row in (await tool(cursor=last["cursor"]))["rows"]]
+
+    assert sorted(delivered) == list(range(250))
+
+
+@pytest.mark.asyncio
+async def test_crowded_second_is_read_whole_and_stepped_past(
+    mcp_module, monkeypatch, fake_access_token, respx_router, clock
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    monkeypatch.setattr(mcp_module, "_AUTO_PAGINATE_MAX_ITEMS", 100)
+    crowded = NOW - 3600
+    updated = {i: _stamp(crowded + i / 1000) for i in range(150)}
+    updated.update({i: _stamp(crowded + i) for i in range(150, 155)})
+    respx_router.get(URL).mock(side_effect=_Upstream(updated))
+    tool = _tool(mcp_module)
+
+    first = await tool(company=7, lookback_hours=2)
+    delivered, _ = await _drain(tool, first["cursor"])
+
+    assert sorted([row[0] for row in first["rows"]] + delivered) == list(range(155))
+
+
+@pytest.mark.asyncio
+async def test_used_cursor_lives_until_its_successor_is_used(
+    mcp_module, monkeypatch, fake_access_token, respx_router, clock
+) -> None:
+    redis = _FakeRedis()
+    monkeypatch.setattr(mcp_module, "_redis_client", redis, raising=False)
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    respx_router.get(URL).mock(side_effect=_Upstream({}))
+    tool = _tool(mcp_module)
+
+    first = await tool(company=7)
+    await tool(cursor=first["cursor"])  # the response is lost; the poll is repeated
+    second = await tool(cursor=first["cursor"])
+    third = await tool(cursor=second["cursor"])
+
+    live = {key.rsplit(":", 1)[1] for key in redis.data}
+    assert {second["cursor"], third["cursor"]} <= live
+    assert first["cursor"] not in live
+    with pytest.raises(mcp_module.ToolInputError):
+        await tool(cursor=first["cursor"])
+
+
+@pytest.mark.asyncio
+async def test_cursor_is_private_and_keeps_its_filters(
+    mcp_module, monkeypatch, fake_access_token, respx_router, clock
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    respx_router.get(URL).mock(side_effect=_Upstream({1: _stamp(NOW - 3600)}))
+    first = await _tool(mcp_module)(company=7)
+
+    with pytest.raises(mcp_module.ToolInputError):
+        await _tool(mcp_module)(cursor=first["cursor"], company=8)
+
+    _auth_as(mcp_module, monkeypatch, fake_access_token, sub="someone-else")
+    with pytest.raises(mcp_module.ToolInputError):
+        await _tool(mcp_module)(cursor=first["cursor"])
+
+
+@pytest.mark.asyncio
+async def test_store_shares_through_redis_and_honours_expiry(mcp_module, monkeypatch) -> None:
+    redis = _FakeRedis()
+    monkeypatch.setattr(mcp_module, "_redis_client", redis, raising=False)
+    replica_a = mcp_module._SharedTTLStore("test", ttl=60)
+    replica_b = mcp_module._SharedTTLStore("test", ttl=60)
+
+    await replica_a.set("k", {"since": "2026-01-01T00:00:00Z"})
+    await replica_a.set("gone", 1, ttl=-1)
+
+    assert list(redis.data) == ["mcp-test::k", "mcp-test::gone"]
+    assert await replica_b.get("k") == {"since": "2026-01-01T00:00:00Z"}
+    assert await replica_b.get("gone") is None
+    await replica_b.delete("k")
+    assert await mcp_module._SharedTTLStore("test", ttl=60).get("k") is None
+
+
+@pytest.mark.asyncio
+async def test_store_degrades_to_local_tier(mcp_module, monkeypatch) -> None:
+    monkeypatch.setattr(mcp_module, "_redis_client", _FakeRedis(fail=True), raising=False)
+    store = mcp_module._SharedTTLStore("test", ttl=60)
+
+    await store.set("k", 1)
+
+    assert await store.get("k") == 1
+    assert await mcp_module._SharedTTLStore("test", ttl=60).get("k") is None
+
+
+@pytest.mark.asyncio
+async def test_stalled_redis_is_bounded(mcp_module, monkeypatch) -> None:
+    class _Stalled(_FakeRedis):
+        async def get(self, key):
+            await asyncio.sleep(5)
+
+    monkeypatch.setattr(mcp_module, "_redis_client", _Stalled(), raising=False)
+    monkeypatch.setattr(mcp_module, "_SHARED_STATE_TIMEOUT", 0.01)
+
+    assert await mcp_module._SharedTTLStore("test", ttl=60).get("k") is None
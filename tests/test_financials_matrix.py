@@ -0,0 +1,124 @@
+"""Multi-year financials matrix (`companies_financials_matrix`).
+
+Contract pinned here:
+
+  * One upstream call with the caller's `fiscal_year_from`/`fiscal_year_to`
+    range and filters passed through.
+  * Periods pivot into line items × years: `fiscal_years`, `period_end_date`
+    and `currency` are header rows aligned with the year columns, rows follow
+    statement order, and an unreported cell is null — never 0.
+  * A cell reported in a currency other than its year's header is listed in
+    `currency_exceptions`.
+"""
+from __future__ import annotations
+
+import httpx
+import pytest
+
+from .conftest import TEST_API_BASE, TEST_CLIENT_ID
+
+URL = f"{TEST_API_BASE}/companies/7/financials/"
+
+
+def _tool(mcp_module):
+    tool = mcp_module.mcp._tool_manager._tools["companies_financials_matrix"]
+    return getattr(tool, "fn", None) or getattr(tool, "function", None)
+
+
+def _auth_as(mcp_module, monkeypatch, fake_access_token) -> None:
+    at = fake_access_token(client_id=TEST_CLIENT_ID, token="real-access-token")
+    monkeypatch.setattr(mcp_module, "get_access_token", lambda: at)
+
+
+def _period(year: int, items: list[tuple[str, str, int, str | None]], currency: str = "EUR") -> dict:
+    return {
+        "fiscal_year": year,
+        "fiscal_period": "FY",
+        "period_end_date": f"{year}-12-31",
+        "statements": [
+            {
+                "statement_type": statement_type,
+                "currency": {"code": currency},
+                "line_items": [
+                    {"code": code, "name": code.title(), "sort_order": order, "value": value}
+                    for code, st, order, value in items
+                    if st == statement_type
+                ],
+            }
+            for statement_type in ("BS", "IS")
+        ],
+    }
+
+
+@pytest.mark.asyncio
+async def test_periods_pivot_into_year_columns(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(URL).mock(
+        return_value=httpx.Response(
+            200,
+            json={
+                "company_id": 7,
+                "currency": {"code": "EUR"},
+                "periods": [
+                    _period(2024, [("revenue", "IS", 1, "120"), ("assets", "BS", 1, "900")]),
+                    _period(2023, [("revenue", "IS", 1, "100"), ("ebit", "IS", 2, "10")]),
+                ],
+            },
+        )
+    )
+
+    out = await _tool(mcp_module)(id=7, fiscal_year_from=2023, fiscal_year_to=2024)
+
+    params = route.calls.last.request.url.params
+    assert (params["fiscal_year_from"], params["fiscal_year_to"]) == ("2023", "2024")
+    assert route.call_count == 1
+    assert out["fiscal_years"] == [2023, 2024]
+    assert out["period_end_date"] == ["2023-12-31", "2024-12-31"]
+    assert out["currency"] == ["EUR", "EUR"]
+    assert out["columns"] == ["code", "name", "statement_type", "2023", "2024"]
+    assert out["rows"] == [
+        ["assets", "Assets", "BS", None, 900.0],
+        ["revenue", "Revenue", "IS", 100.0, 120.0],
+        ["ebit", "Ebit", "IS", 10.0, None],
+    ]
+    assert out["currency_exceptions"] == []
+
+
+@pytest.mark.asyncio
+async def test_off_header_currency_is_listed(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    period = _period(2024, [("revenue", "IS", 1, "1"), ("ebit", "IS", 2, "2"), ("assets", "BS", 1, "3")])
+    period["statements"][0]["currency"] = {"code": "USD"}
+    respx_router.get(URL).mock(
+        return_value=httpx.Response(200, json={"company_id": 7, "periods": [period]})
+    )
+
+    out = await _tool(mcp_module)(id=7)
+
+    assert out["currency"] == ["EUR"]
+    assert out["currency_exceptions"] == [{"code": "assets", "fiscal_year": 2024, "currency": "USD"}]
+
+
+@pytest.mark.asyncio
+async def test_matrix_is_smaller_than_the_nested_document(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    items = [(f"item_{i}", "IS", i, f"{i * 1000}.00") for i in range(30)]
+    doc = {"company_id": 7, "periods": [_period(year, items) for year in range(2015, 2025)]}
+    respx_router.get(URL).mock(return_value=httpx.Response(200, json=doc))
+
+    out = await _tool(mcp_module)(id=7)
+
+    assert len(mcp_module._json.dumps(out)) * 3 < len(mcp_module._json.dumps(doc))
+
+
+@pytest.mark.asyncio
+async def test_inverted_range_is_rejected(mcp_module, monkeypatch, fake_access_token) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    with pytest.raises(mcp_module.ToolInputError):
+        await _tool(mcp_module)(id=7, fiscal_year_from=2024, fiscal_year_to=2020)
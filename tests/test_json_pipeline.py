@@ -0,0 +1,87 @@
+"""JSON pipeline for tool responses: bytes in, one serialization out.
+
+Contract pinned here:
+
+  * Upstream bodies are parsed from bytes; with or without orjson the text
+    tools render the same two-space document, non-ASCII kept as is.
+  * Input orjson refuses (integers past 64 bits) falls back to the stdlib
+    instead of failing the call; malformed bodies still raise ValueError.
+  * A successful GET is not decoded to text just for the retry decision.
+"""
+from __future__ import annotations
+
+import json
+
+import httpx
+import pytest
+
+from .conftest import TEST_API_BASE, TEST_CLIENT_ID
+
+DOC = {
+    "count": 1,
+    "results": [
+        {
+            "id": 7,
+            "name": "Société Générale — Bank",
+            "tags": [],
+            "meta": {},
+            "value": 1234567.125,
+            "active": True,
+            "parent": None,
+            "markdown_url": "https://api.test.invalid/filings/7/markdown/",
+        }
+    ],
+}
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def backend(request, mcp_module, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(mcp_module, "_orjson", None)
+    return request.param
+
+
+def test_text_rendering_matches_the_stdlib(mcp_module, backend) -> None:
+    body = json.dumps(DOC).encode()
+    response = httpx.Response(200, content=body, request=httpx.Request("GET", TEST_API_BASE))
+
+    out = mcp_module._format_response(response)
+
+    expected = dict(DOC, results=[{k: v for k, v in DOC["results"][0].items() if k != "markdown_url"}])
+    assert out == f"```json\n{json.dumps(expected, indent=2, ensure_ascii=False)}\n```"
+
+
+def test_out_of_range_integers_fall_back(mcp_module, backend) -> None:
+    huge = 2**70
+
+    assert mcp_module._json_loads(f'{{"n": {huge}}}'.encode()) == {"n": huge}
+    assert str(huge) in mcp_module._json_dumps_pretty({"n": huge})
+    assert mcp_module._json_size({"n": huge}) == len(f'{{"n":{huge}}}')
+    with pytest.raises(ValueError):
+        mcp_module._json_loads(b"<html>502</html>")
+
+
+def test_size_counts_utf8_bytes(mcp_module, backend) -> None:
+    assert mcp_module._json_size({"name": "Ä"}) == len('{"name":"Ä"}'.encode())
+
+
+@pytest.mark.asyncio
+async def test_success_is_not_decoded_for_the_retry_check(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    at = fake_access_token(client_id=TEST_CLIENT_ID, token="real-access-token")
+    monkeypatch.setattr(mcp_module, "get_access_token", lambda: at)
+    respx_router.get(f"{TEST_API_BASE}/companies/7/").mock(
+        return_value=httpx.Response(200, json={"id": 7})
+    )
+    seen: list[str] = []
+    real = mcp_module._retry_delay
+    monkeypatch.setattr(
+        mcp_module, "_retry_delay", lambda status, text, after: seen.append(text) or real(status, text, after)
+    )
+
+    tool = mcp_module.mcp._tool_manager._tools["companies_retrieve"]
+    assert (await tool.fn(id=7)) == {"id": 7}
+    assert seen == [""]
@@ -0,0 +1,117 @@
+"""Negative cache for upstream 404s on filing / company id lookups.
+
+Contract pinned here:
+
+  * A 404 on `/filings/{id}/`, `/companies/{id}/` or `/filings/{id}/markdown/`
+    is remembered for `_NOT_FOUND_TTL` seconds; a repeat lookup of that id is
+    answered without an upstream call, by any user.
+  * The replay produces exactly the error text the first failure did, for
+    structured, text and streaming tools alike.
+  * Only 404s on id lookups are cached — not list endpoints, not other errors —
+    and entries expire.
+"""
+from __future__ import annotations
+
+import httpx
+import pytest
+from starlette.testclient import TestClient
+
+from .conftest import TEST_API_BASE, TEST_CLIENT_ID
+
+NOT_FOUND = httpx.Response(
+    404, json={"detail": "No Filing matches the given query."}, headers={"x-request-id": "req-1"}
+)
+
+
+def _tool(mcp_module, name):
+    tool = mcp_module.mcp._tool_manager._tools[name]
+    return getattr(tool, "fn", None) or getattr(tool, "function", None)
+
+
+def _auth_as(mcp_module, monkeypatch, fake_access_token, sub="test-sub-12345678") -> None:
+    at = fake_access_token(client_id=TEST_CLIENT_ID, token="real-access-token", sub=sub)
+    monkeypatch.setattr(mcp_module, "get_access_token", lambda: at)
+
+
+@pytest.mark.asyncio
+async def test_repeat_lookup_replays_the_same_error_across_users(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(f"{TEST_API_BASE}/filings/999/").mock(return_value=NOT_FOUND)
+
+    with pytest.raises(mcp_module.UpstreamHTTPError) as first:
+        await _tool(mcp_module, "filings_retrieve")(id=999)
+    _auth_as(mcp_module, monkeypatch, fake_access_token, sub="another-user")
+    with pytest.raises(mcp_module.UpstreamHTTPError) as second:
+        await _tool(mcp_module, "filings_retrieve")(id=999)
+
+    assert route.call_count == 1
+    assert str(second.value) == str(first.value)
+    assert "req-1" in str(second.value)
+    assert second.value.upstream_status == 404
+    assert mcp_module._not_found_stats() == {"entries": 1, "hits": 1}
+
+
+@pytest.mark.asyncio
+async def test_streamed_markdown_404_is_cached_too(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(f"{TEST_API_BASE}/filings/999/markdown/").mock(
+        return_value=NOT_FOUND
+    )
+
+    first = await _tool(mcp_module, "filings_markdown_retrieve")(filing_id=999)
+    second = await _tool(mcp_module, "filings_markdown_retrieve")(filing_id=999)
+
+    assert route.call_count == 1
+    assert first == second
+    assert first.startswith("Error 404")
+
+
+@pytest.mark.asyncio
+async def test_only_id_lookup_404s_are_cached(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    listing = respx_router.get(f"{TEST_API_BASE}/filings/").mock(return_value=NOT_FOUND)
+    flaky = respx_router.get(f"{TEST_API_BASE}/companies/5/").mock(
+        return_value=httpx.Response(500)
+    )
+
+    for _ in range(2):
+        with pytest.raises(mcp_module.UpstreamHTTPError):
+            await _tool(mcp_module, "filings_list")()
+        with pytest.raises(mcp_module.UpstreamHTTPError):
+            await _tool(mcp_module, "companies_retrieve")(id=5)
+
+    assert listing.call_count == 2
+    assert flaky.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_entries_expire(mcp_module, monkeypatch, fake_access_token, respx_router) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(f"{TEST_API_BASE}/companies/7/").mock(
+        side_effect=[NOT_FOUND, httpx.Response(200, json={"id": 7, "name": "Now listed"})]
+    )
+    with pytest.raises(mcp_module.UpstreamHTTPError):
+        await _tool(mcp_module, "companies_retrieve")(id=7)
+
+    expires, body, headers = mcp_module._not_found["/companies/7/"]
+    mcp_module._not_found["/companies/7/"] = (expires - 3600, body, headers)
+    out = await _tool(mcp_module, "companies_retrieve")(id=7)
+
+    assert out["name"] == "Now listed"
+    assert route.call_count == 2
+
+
+def test_health_reports_the_cache(mcp_module, respx_router) -> None:
+    respx_router.get(f"{TEST_API_BASE}/health/").mock(return_value=httpx.Response(200))
+    respx_router.head(f"{TEST_API_BASE}/health/").mock(return_value=httpx.Response(200))
+
+    with TestClient(mcp_module.app) as client:
+        stats = client.get("/health").json()["upstream_not_found_cache"]
+
+    assert stats == {"entries": 0, "hits": 0}
@@ -0,0 +1,102 @@
+"""Precompiled, sampled output-schema validation.
+
+Contract pinned here:
+
+  * Every tool with an output schema has a validator compiled at import.
+  * Structured results are validated with it, through the real middleware
+    chain, and the SDK does not validate them a second time.
+  * A result that fails its schema is a tool error, as before.
+  * With MCP_OUTPUT_VALIDATION_SAMPLE=N only every Nth result per tool is
+    checked, the first one always; /health reports counts and timings.
+"""
+from __future__ import annotations
+
+import httpx
+import pytest
+
+from .conftest import TEST_API_BASE, TEST_CLIENT_ID
+
+URL = f"{TEST_API_BASE}/filings/"
+PAGE = {
+    "count": 1,
+    "next": None,
+    "previous": None,
+    "results": [{"id": 1, "title": "Annual Report", "viewer_url": "https://example.test/1/"}],
+}
+
+
+def _auth_as(mcp_module, monkeypatch, fake_access_token) -> None:
+    at = fake_access_token(client_id=TEST_CLIENT_ID, token="real-access-token")
+    monkeypatch.setattr(mcp_module, "get_access_token", lambda: at)
+
+
+def test_validators_are_compiled_at_import(mcp_module) -> None:
+    tools = mcp_module.mcp._tool_manager._tools
+    with_schema = {n for n, t in tools.items() if t.output_schema is not None}
+
+    assert set(mcp_module._output_validators) == with_schema
+    assert "filings_list" in with_schema
+
+
+@pytest.mark.asyncio
+async def test_results_are_validated_once(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    from fastmcp import Client
+    from mcp.server.lowlevel import server as lowlevel
+
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    respx_router.get(URL).mock(return_value=httpx.Response(200, json=PAGE))
+    output_schema = mcp_module.mcp._tool_manager._tools["filings_list"].output_schema
+    sdk_checks: list[dict] = []
+    real = lowlevel.jsonschema.validate
+    # The server SDK passes instance= / schema= by keyword; the client session
+    # (which validates on its own side) passes them positionally.
+    monkeypatch.setattr(
+        lowlevel.jsonschema,
+        "validate",
+        lambda *a, **k: sdk_checks.append(k.get("schema")) or real(*a, **k),
+    )
+
+    async with Client(mcp_module.mcp) as client:
+        result = await client.call_tool("filings_list", {})
+
+    assert result.structured_content["results"][0]["id"] == 1
+    assert output_schema not in sdk_checks
+    assert mcp_module._output_validation_report()["filings_list"]["validated"] == 1
+
+
+@pytest.mark.asyncio
+async def test_schema_failure_is_a_tool_error(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    from fastmcp import Client
+
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    respx_router.get(URL).mock(return_value=httpx.Response(200, json=dict(PAGE, count="many")))
+
+    async with Client(mcp_module.mcp) as client:
+        result = await client.call_tool("filings_list", {}, raise_on_error=False)
+
+    assert result.is_error
+    assert "Output validation error" in result.content[0].text
+    assert mcp_module._output_validation_report()["filings_list"]["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_sampling_checks_every_nth_result(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    from fastmcp import Client
+
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    monkeypatch.setattr(mcp_module, "_OUTPUT_VALIDATION_SAMPLE", 3)
+    respx_router.get(URL).mock(return_value=httpx.Response(200, json=PAGE))
+
+    async with Client(mcp_module.mcp) as client:
+        for _ in range(4):
+            await client.call_tool("filings_list", {})
+
+    report = mcp_module._output_validation_report()["filings_list"]
+    assert (report["calls"], report["validated"]) == (4, 2)
+    assert report["max_ms"] >= report["mean_ms"] > 0
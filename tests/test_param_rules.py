@@ -0,0 +1,123 @@
+"""Local validation of query arguments against rules compiled from the schema.
+
+Contract pinned here:
+
+  * The generator derives per-parameter rules from `openapi.snapshot.json`:
+    enums, date/date-time formats, JSON Schema ranges and patterns, the
+    `ordering` fields an endpoint's description lists, and a 1-based `page`.
+  * A generated tool rejects a bad argument as a ToolArgumentError (a
+    ToolInputError) before any upstream call; valid arguments pass untouched.
+  * The rejection carries `error_kind="invalid_argument"` into analytics, for
+    text tools too.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import httpx
+import pytest
+
+from .conftest import TEST_API_BASE, TEST_CLIENT_ID
+
+SNAPSHOT = Path(__file__).resolve().parent.parent / "scripts" / "openapi.snapshot.json"
+OK_PAGE = {"count": 0, "next": None, "previous": None, "results": []}
+
+
+def _tool(mcp_module, name):
+    tool = mcp_module.mcp._tool_manager._tools[name]
+    return getattr(tool, "fn", None) or getattr(tool, "function", None)
+
+
+def _auth_as(mcp_module, monkeypatch, fake_access_token) -> None:
+    at = fake_access_token(client_id=TEST_CLIENT_ID, token="real-access-token")
+    monkeypatch.setattr(mcp_module, "get_access_token", lambda: at)
+
+
+def test_rules_come_from_the_snapshot() -> None:
+    import scripts.generate_mcp_tools as gen
+
+    operation = json.loads(SNAPSHOT.read_text())["paths"]["/filings/"]["get"]
+    rules = gen.compile_param_rules(operation)
+
+    assert rules["ordering"] == {"ordering": ["id", "release_datetime", "added_to_platform"]}
+    assert rules["release_datetime_from"] == {"format": "date-time"}
+    assert rules["fiscal_period"]["enum"][0] == "9M"
+    assert rules["page"] == {"minimum": 1}
+    assert "company" not in rules
+
+
+@pytest.mark.parametrize(
+    ("rule", "good", "bad"),
+    [
+        ({"ordering": ["id", "name"]}, "-name,id", "-publication_date"),
+        ({"format": "date-time"}, "2026-01-31T00:00:00Z", "31/01/2026"),
+        ({"format": "date-time"}, "2026-01-31", "yesterday"),
+        ({"format": "date"}, "2026-01-31", "2026-13-01"),
+        ({"enum": ["BS", "IS"]}, "IS", "PL"),
+        ({"minimum": 1}, 1, 0),
+        ({"pattern": "^[^/]+$"}, "abc", "a/b"),
+    ],
+)
+def test_compiled_rules(mcp_module, rule, good, bad) -> None:
+    check = mcp_module._compile_param_rule("p", rule)
+    assert check(good) is None
+    assert "'p'" in check(bad)
+
+
+@pytest.mark.asyncio
+async def test_structured_tool_rejects_before_upstream(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(f"{TEST_API_BASE}/filings/").mock(
+        return_value=httpx.Response(200, json=OK_PAGE)
+    )
+
+    with pytest.raises(mcp_module.ToolArgumentError) as info:
+        await _tool(mcp_module, "filings_list")(ordering="-publication_datetime")
+
+    assert "release_datetime" in str(info.value)
+    assert info.value.error_kind == "invalid_argument"
+    assert isinstance(info.value, mcp_module.ToolInputError)
+    assert route.call_count == 0
+
+    await _tool(mcp_module, "filings_list")(
+        ordering="-release_datetime", release_datetime_from="2026-01-01"
+    )
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_companion_shares_the_rules(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(url__regex=rf"{TEST_API_BASE}/companies/\d+/financials/").mock(
+        return_value=httpx.Response(200, json={})
+    )
+
+    with pytest.raises(mcp_module.ToolArgumentError):
+        await _tool(mcp_module, "companies_financials_retrieve_many")(ids=[1], statement_type="PL")
+
+    assert route.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_text_tool_rejection_reaches_analytics(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    from src import usage_analytics
+
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(f"{TEST_API_BASE}/filing-categories/").mock(
+        return_value=httpx.Response(200, json=OK_PAGE)
+    )
+
+    out = await _tool(mcp_module, "filing_categories_list")(page=0)
+
+    assert out.startswith("Invalid argument: 'page' must be at least 1")
+    assert route.call_count == 0
+    recorded = usage_analytics._tool_error.get()
+    assert recorded["error_type"] == "ToolArgumentError"
+    assert recorded["error_kind"] == "invalid_argument"
@@ -0,0 +1,186 @@
+"""Server-side peer statistics (`companies_peer_statistics`).
+
+Contract pinned here:
+
+  * Peers come from an explicit id list, or from `companies_list` filtered by
+    ISIC class (`sub_industry` upstream) — exactly one of the two.
+  * Financials are fanned out in one batch; statistics are grouped by reporting
+    currency and never mixed, each with its sample size and contributing ids.
+  * Without `fiscal_year`, every peer contributes its latest year with data.
+  * Peers lacking a value are listed under `missing`; failed peers under
+    `errors` — neither fails the call.
+"""
+from __future__ import annotations
+
+import httpx
+import pytest
+
+from .conftest import TEST_API_BASE, TEST_CLIENT_ID
+
+
+def _tool(mcp_module, name="companies_peer_statistics"):
+    tool = mcp_module.mcp._tool_manager._tools[name]
+    return getattr(tool, "fn", None) or getattr(tool, "function", None)
+
+
+def _auth_as(mcp_module, monkeypatch, fake_access_token) -> None:
+    at = fake_access_token(client_id=TEST_CLIENT_ID, token="real-access-token")
+    monkeypatch.setattr(mcp_module, "get_access_token", lambda: at)
+
+
+def _financials(company_id: int, currency: str, years: dict[int, dict[str, str]]) -> dict:
+    return {
+        "company_id": company_id,
+        "currency": {"code": currency},
+        "periods": [
+            {
+                "fiscal_year": year,
+                "fiscal_period": "FY",
+                "statements": [
+                    {
+                        "statement_type": "IS",
+                        "currency": {"code": currency},
+                        "line_items": [
+                            {"code": code, "value": value} for code, value in items.items()
+                        ],
+                    }
+                ],
+            }
+            for year, items in years.items()
+        ],
+    }
+
+
+def _mock_financials(respx_router, docs: dict[int, dict]) -> None:
+    for company_id, doc in docs.items():
+        respx_router.get(f"{TEST_API_BASE}/companies/{company_id}/financials/").mock(
+            return_value=httpx.Response(200, json=doc)
+        )
+
+
+def test_describe_matches_statistics_module(mcp_module) -> None:
+    out = mcp_module._describe([4.0, 1.0, 3.0, 2.0, 5.0])
+    assert out == {"n": 5, "median": 3.0, "p25": 2.0, "p75": 4.0, "mean": 3.0, "min": 1.0, "max": 5.0}
+    single = mcp_module._describe([7.0])
+    assert single["p25"] == single["median"] == single["p75"] == 7.0
+
+
+@pytest.mark.asyncio
+async def test_groups_by_currency_with_sample_sizes(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    _mock_financials(
+        respx_router,
+        {
+            1: _financials(1, "EUR", {2024: {"revenue": "100.00"}}),
+            2: _financials(2, "EUR", {2024: {"revenue": "300.00"}}),
+            3: _financials(3, "USD", {2024: {"revenue": "1000.00"}}),
+            4: _financials(4, "EUR", {2024: {"ebitda": "5.00"}}),
+        },
+    )
+
+    out = await _tool(mcp_module)(line_items="revenue", ids=[1, 2, 3, 4])
+
+    eur = out["statistics"]["revenue"]["EUR"]
+    assert (eur["n"], eur["median"], eur["mean"]) == (2, 200.0, 200.0)
+    assert eur["company_ids"] == [1, 2]
+    assert out["statistics"]["revenue"]["USD"]["n"] == 1
+    assert out["missing"]["revenue"] == [4]
+    assert out["peer_count"] == 4
+
+
+@pytest.mark.asyncio
+async def test_line_item_currency_wins_in_either_shape(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    as_object = _financials(1, "EUR", {2024: {"revenue": "100.00"}})
+    as_object["periods"][0]["statements"][0]["line_items"][0]["currency"] = {"code": "USD"}
+    as_code = _financials(2, "EUR", {2024: {"revenue": "300.00"}})
+    as_code["periods"][0]["statements"][0]["line_items"][0]["currency"] = "USD"
+    _mock_financials(respx_router, {1: as_object, 2: as_code})
+
+    out = await _tool(mcp_module)(line_items="revenue", ids=[1, 2])
+
+    assert list(out["statistics"]["revenue"]) == ["USD"]
+    assert out["statistics"]["revenue"]["USD"]["company_ids"] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_latest_year_per_peer_unless_fiscal_year_given(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    _mock_financials(
+        respx_router,
+        {
+            1: _financials(1, "EUR", {2023: {"revenue": "10"}, 2024: {"revenue": "20"}}),
+            2: _financials(2, "EUR", {2023: {"revenue": "30"}}),
+        },
+    )
+
+    latest = await _tool(mcp_module)(line_items="revenue", ids=[1, 2])
+    pinned = await _tool(mcp_module)(line_items="revenue", ids=[1, 2], fiscal_year=2023)
+
+    assert latest["statistics"]["revenue"]["EUR"]["fiscal_years"] == {"2024": 1, "2023": 1}
+    assert latest["statistics"]["revenue"]["EUR"]["median"] == 25.0
+    assert pinned["statistics"]["revenue"]["EUR"]["median"] == 20.0
+
+
+@pytest.mark.asyncio
+async def test_isic_class_resolves_peers_via_sub_industry(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    listing = respx_router.get(f"{TEST_API_BASE}/companies/").mock(
+        return_value=httpx.Response(200, json={"count": 2, "results": [{"id": 1}, {"id": 2}]})
+    )
+    _mock_financials(
+        respx_router,
+        {
+            1: _financials(1, "EUR", {2024: {"revenue": "1"}}),
+            2: _financials(2, "EUR", {2024: {"revenue": "3"}}),
+        },
+    )
+
+    out = await _tool(mcp_module)(line_items="revenue", isic_class="2610", countries="DE")
+
+    params = listing.calls.last.request.url.params
+    assert params["sub_industry"] == "2610"
+    assert params["countries"] == "DE"
+    assert out["statistics"]["revenue"]["EUR"]["median"] == 2.0
+
+
+@pytest.mark.asyncio
+async def test_failed_peer_is_reported_not_fatal(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    _mock_financials(respx_router, {1: _financials(1, "EUR", {2024: {"revenue": "1"}})})
+    respx_router.get(f"{TEST_API_BASE}/companies/2/financials/").mock(
+        return_value=httpx.Response(404)
+    )
+
+    out = await _tool(mcp_module)(line_items="revenue", ids=[1, 2])
+
+    assert out["statistics"]["revenue"]["EUR"]["n"] == 1
+    assert [e["id"] for e in out["errors"]] == [2]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"line_items": "revenue"},
+        {"line_items": "revenue", "ids": [1], "isic_class": "2610"},
+        {"line_items": " , ", "ids": [1]},
+        {"line_items": "revenue", "isic_class": "26"},
+    ],
+)
+async def test_bad_arguments_are_rejected(
+    mcp_module, monkeypatch, fake_access_token, kwargs
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    with pytest.raises(mcp_module.ToolInputError):
+        await _tool(mcp_module)(**kwargs)
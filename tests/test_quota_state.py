@@ -0,0 +1,191 @@
+"""Per-user short circuit for non-retryable 429s.
+
+Contract pinned here:
+
+  * After a `quota_exhausted` / `spend_cap_daily` / `spend_ceiling_monthly`
+    429, that user's next calls are answered locally with the same upsell copy,
+    with Retry-After counted down to the upstream reset — for structured, text
+    and streaming tools alike. Other users still go upstream.
+  * Burst 429s are never held: they clear inside a minute.
+  * The state is held for at most `_QUOTA_STATE_TTL`, then one call probes
+    upstream; a success clears it on this replica and in Redis.
+  * It is shared through Redis, so the next replica answers locally too.
+"""
+from __future__ import annotations
+
+import httpx
+import pytest
+
+from .conftest import TEST_API_BASE, TEST_CLIENT_ID
+from .test_filings_feed import _FakeRedis
+from .test_upstream_429 import BURST_BODY, DAILY_CAP_BODY, FREE_QUOTA_BODY, PAYG_URL
+
+URL = f"{TEST_API_BASE}/companies/"
+OK_PAGE = {"count": 0, "next": None, "previous": None, "results": []}
+
+
+def _tool(mcp_module, name="companies_list"):
+    tool = mcp_module.mcp._tool_manager._tools[name]
+    return getattr(tool, "fn", None) or getattr(tool, "function", None)
+
+
+def _auth_as(mcp_module, monkeypatch, fake_access_token, sub="test-sub-12345678") -> None:
+    at = fake_access_token(client_id=TEST_CLIENT_ID, token="real-access-token", sub=sub)
+    monkeypatch.setattr(mcp_module, "get_access_token", lambda: at)
+
+
+def _quota(body=FREE_QUOTA_BODY, retry_after="1209600") -> httpx.Response:
+    return httpx.Response(429, json=body, headers={"retry-after": retry_after})
+
+
+@pytest.mark.asyncio
+async def test_quota_429_is_answered_locally_for_that_user(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(URL).mock(return_value=_quota())
+
+    with pytest.raises(mcp_module.UpstreamHTTPError) as first:
+        await _tool(mcp_module)()
+    with pytest.raises(mcp_module.UpstreamHTTPError) as second:
+        await _tool(mcp_module)()
+    text = await _tool(mcp_module, "filing_types_list")()
+
+    assert route.call_count == 1
+    assert str(second.value) == str(first.value)
+    assert second.value.error_kind == "quota_exhausted"
+    assert PAYG_URL in str(second.value) and PAYG_URL in text
+    assert mcp_module._quota_state_stats() == {"entries": 1, "replays": 2}
+
+    _auth_as(mcp_module, monkeypatch, fake_access_token, sub="another-user")
+    with pytest.raises(mcp_module.UpstreamHTTPError):
+        await _tool(mcp_module)()
+    assert route.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_replay_counts_down_to_the_reset(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    respx_router.get(URL).mock(return_value=_quota(DAILY_CAP_BODY, retry_after="34200"))
+    with pytest.raises(mcp_module.UpstreamHTTPError):
+        await _tool(mcp_module)()
+
+    clock = mcp_module.time.time()
+    monkeypatch.setattr(mcp_module.time, "time", lambda: clock + 200)
+    mcp_module._current_sub.set("test-sub-12345678")
+    replay = await mcp_module._quota_replay("/companies/")
+
+    assert replay.status_code == 429
+    assert 33990 <= int(replay.headers["retry-after"]) <= 34000
+    assert mcp_module._classify_upstream_429(replay.text) == "spend_cap_daily"
+
+
+@pytest.mark.asyncio
+async def test_streamed_markdown_is_short_circuited(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(f"{TEST_API_BASE}/filings/9/markdown/").mock(return_value=_quota())
+
+    first = await _tool(mcp_module, "filings_markdown_retrieve")(filing_id=9)
+    second = await _tool(mcp_module, "filings_markdown_retrieve")(filing_id=9)
+
+    assert route.call_count == 1
+    assert first == second and PAYG_URL in second
+
+
+@pytest.mark.asyncio
+async def test_quota_429_on_a_retried_stream(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    monkeypatch.setattr(mcp_module, "_retry_sleep", lambda _s: _noop())
+    route = respx_router.get(f"{TEST_API_BASE}/filings/9/markdown/").mock(
+        side_effect=[httpx.Response(503), _quota()]
+    )
+
+    out = await _tool(mcp_module, "filings_markdown_retrieve")(filing_id=9)
+
+    assert route.call_count == 2
+    assert PAYG_URL in out
+    assert mcp_module._quota_state_stats()["entries"] == 1
+
+
+async def _noop() -> None:
+    return None
+
+
+@pytest.mark.asyncio
+async def test_burst_429_is_not_held(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(URL).mock(
+        return_value=httpx.Response(429, json=BURST_BODY, headers={"retry-after": "600"})
+    )
+
+    for _ in range(2):
+        with pytest.raises(mcp_module.UpstreamHTTPError):
+            await _tool(mcp_module)()
+
+    assert route.call_count == 2
+    assert mcp_module._quota_state_stats()["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_hold_is_capped_and_success_clears_it(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    redis = _FakeRedis()
+    monkeypatch.setattr(mcp_module, "_redis_client", redis, raising=False)
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(URL).mock(
+        side_effect=[_quota(), httpx.Response(200, json=OK_PAGE)]
+    )
+    with pytest.raises(mcp_module.UpstreamHTTPError):
+        await _tool(mcp_module)()
+    assert list(redis.data) == ["mcp-quota-state::test-sub-12345678"]
+
+    # The user buys credits; past the hold cap the next call probes upstream.
+    clock = mcp_module.time.time()
+    monkeypatch.setattr(mcp_module.time, "time", lambda: clock + mcp_module._QUOTA_STATE_TTL + 1)
+    await _tool(mcp_module)()
+
+    assert route.call_count == 2
+    assert await mcp_module._quota_states.get("test-sub-12345678") is None
+
+
+@pytest.mark.asyncio
+async def test_success_in_flight_clears_the_state_everywhere(mcp_module, monkeypatch) -> None:
+    redis = _FakeRedis()
+    monkeypatch.setattr(mcp_module, "_redis_client", redis, raising=False)
+    mcp_module._current_sub.set("test-sub-12345678")
+    await mcp_module._note_quota_state(_quota())
+    assert redis.data
+
+    await mcp_module._note_quota_state(httpx.Response(200, json=OK_PAGE))
+
+    assert redis.data == {}
+    assert await mcp_module._quota_replay("/companies/") is None
+
+
+@pytest.mark.asyncio
+async def test_state_reaches_another_replica_through_redis(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    redis = _FakeRedis()
+    monkeypatch.setattr(mcp_module, "_redis_client", redis, raising=False)
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(URL).mock(return_value=_quota())
+    with pytest.raises(mcp_module.UpstreamHTTPError):
+        await _tool(mcp_module)()
+
+    # A fresh replica: empty local tier, same Redis.
+    monkeypatch.setattr(mcp_module, "_quota_states", mcp_module._SharedTTLStore("quota-state", ttl=300))
+    with pytest.raises(mcp_module.UpstreamHTTPError) as info:
+        await _tool(mcp_module)()
+
+    assert route.call_count == 1
+    assert info.value.error_kind == "quota_exhausted"
@@ -0,0 +1,116 @@
+"""Result-size budget with continuation tokens on structured tools.
+
+Contract pinned here:
+
+  * A result over its tool's byte budget returns the leading rows plus a
+    `continuation`; every part fits the budget and at least one row is
+    always returned.
+  * A call with the token is served from the held remainder — no upstream
+    request — and the parts add up to the whole result, in order.
+  * Tokens belong to the user and the tool they were issued for; an unknown
+    one is an input error. Results within budget are returned untouched.
+"""
+from __future__ import annotations
+
+import json
+
+import httpx
+import pytest
+
+from .conftest import TEST_API_BASE, TEST_CLIENT_ID
+
+URL = f"{TEST_API_BASE}/filings/"
+
+
+def _tool(mcp_module, name="filings_list"):
+    tool = mcp_module.mcp._tool_manager._tools[name]
+    return getattr(tool, "fn", None) or getattr(tool, "function", None)
+
+
+def _auth_as(mcp_module, monkeypatch, fake_access_token, sub="test-sub-12345678") -> None:
+    at = fake_access_token(client_id=TEST_CLIENT_ID, token="real-access-token", sub=sub)
+    monkeypatch.setattr(mcp_module, "get_access_token", lambda: at)
+
+
+def _page(n: int) -> dict:
+    return {
+        "count": n,
+        "next": None,
+        "previous": None,
+        "results": [{"id": i, "title": f"Annual Report {i} " + "x" * 900} for i in range(n)],
+    }
+
+
+@pytest.mark.asyncio
+async def test_large_page_is_read_in_parts(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    monkeypatch.setattr(mcp_module, "_RESULT_MAX_BYTES", 10_000)
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(URL).mock(return_value=httpx.Response(200, json=_page(25)))
+
+    out = await _tool(mcp_module)()
+    parts = [out]
+    while "continuation" in parts[-1]:
+        parts.append(await _tool(mcp_module)(continuation=parts[-1]["continuation"]))
+
+    assert route.call_count == 1
+    assert len(parts) == 3
+    assert all(len(json.dumps(p, separators=(",", ":"))) <= 10_000 for p in parts)
+    assert [r["id"] for p in parts for r in p["results"]] == list(range(25))
+    assert mcp_module._continuation_stats() == {"entries": 2, "issued": 2, "resumed": 2}
+
+    # Idempotent: the same token returns the same part again.
+    again = await _tool(mcp_module)(continuation=out["continuation"])
+    assert again["results"] == parts[1]["results"]
+
+
+@pytest.mark.asyncio
+async def test_financials_split_on_periods_with_per_tool_budget(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    monkeypatch.setattr(mcp_module, "_RESULT_BUDGETS", {"companies_financials_retrieve": 1_000})
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    doc = {
+        "company_id": 7,
+        "periods": [{"fiscal_year": y, "statements": [{"notes": "n" * 600}]} for y in range(2020, 2023)],
+    }
+    respx_router.get(f"{TEST_API_BASE}/companies/7/financials/").mock(
+        return_value=httpx.Response(200, json=doc)
+    )
+
+    out = await _tool(mcp_module, "companies_financials_retrieve")(id=7)
+    rest = await _tool(mcp_module, "companies_financials_retrieve")(id=7, continuation=out["continuation"])
+
+    assert [p["fiscal_year"] for p in out["periods"]] == [2020]
+    assert [p["fiscal_year"] for p in rest["periods"]] == [2021]
+    assert rest["company_id"] == 7 and "continuation" in rest
+
+
+@pytest.mark.asyncio
+async def test_tokens_are_scoped_to_user_and_tool(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    monkeypatch.setattr(mcp_module, "_RESULT_MAX_BYTES", 5_000)
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    respx_router.get(URL).mock(return_value=httpx.Response(200, json=_page(10)))
+    token = (await _tool(mcp_module)())["continuation"]
+
+    with pytest.raises(mcp_module.ToolInputError):
+        await _tool(mcp_module, "companies_list")(continuation=token)
+    _auth_as(mcp_module, monkeypatch, fake_access_token, sub="another-user")
+    with pytest.raises(mcp_module.ToolInputError, match="expired continuation"):
+        await _tool(mcp_module)(continuation=token)
+
+
+@pytest.mark.asyncio
+async def test_small_results_are_untouched(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    respx_router.get(URL).mock(return_value=httpx.Response(200, json=_page(3)))
+
+    assert await _tool(mcp_module)() == _page(3)
+    assert mcp_module._continuation_stats()["issued"] == 0
+    schema = mcp_module.mcp._tool_manager._tools["filings_list"].output_schema
+    assert "continuation" in schema["properties"]
@@ -0,0 +1,145 @@
+"""Generated `*_retrieve_many` batch companions.
+
+Contract pinned here:
+
+  * Only the retrieves in `BATCH_RETRIEVE_TOOLS` get a `_many` companion; it
+    takes `ids` in place of the path id and keeps every query parameter.
+  * Authorization runs once per batch, not once per id.
+  * Ids are fetched concurrently under `_BATCH_CONCURRENCY`; `results` keeps
+    input order and a failed id comes back inline, never failing the batch.
+  * Empty and oversized batches are rejected before any upstream call.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+
+import httpx
+import pytest
+
+from .conftest import TEST_API_BASE, TEST_CLIENT_ID
+
+
+def _tool(mcp_module, name):
+    tool = mcp_module.mcp._tool_manager._tools[name]
+    return getattr(tool, "fn", None) or getattr(tool, "function", None)
+
+
+def _auth_as(mcp_module, monkeypatch, fake_access_token) -> dict:
+    at = fake_access_token(client_id=TEST_CLIENT_ID, token="real-access-token")
+    calls = {"n": 0}
+
+    def _get():
+        calls["n"] += 1
+        return at
+
+    monkeypatch.setattr(mcp_module, "get_access_token", _get)
+    return calls
+
+
+def test_companions_exist_for_chosen_retrieves_only(mcp_module) -> None:
+    import scripts.generate_mcp_tools as gen
+
+    tools = mcp_module.mcp._tool_manager._tools
+    for name in gen.BATCH_RETRIEVE_TOOLS:
+        assert f"{name}_many" in tools
+    assert "filings_retrieve_many" not in tools
+
+    params = inspect.signature(_tool(mcp_module, "companies_financials_retrieve_many")).parameters
+    assert list(params)[0] == "ids"
+    assert {"fiscal_year", "statement_type", "line_items"} <= set(params)
+    assert "id" not in params
+
+
+@pytest.mark.asyncio
+async def test_results_keep_order_with_errors_inline(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    auth_calls = _auth_as(mcp_module, monkeypatch, fake_access_token)
+    for company_id in (1, 3):
+        respx_router.get(f"{TEST_API_BASE}/companies/{company_id}/").mock(
+            return_value=httpx.Response(200, json={"id": company_id, "name": f"Co {company_id}"})
+        )
+    respx_router.get(f"{TEST_API_BASE}/companies/2/").mock(return_value=httpx.Response(404))
+
+    out = await _tool(mcp_module, "companies_retrieve_many")(ids=[3, 2, 1])
+
+    assert [r["id"] for r in out["results"]] == [3, 2, 1]
+    assert out["results"][0]["data"]["name"] == "Co 3"
+    assert out["results"][2]["data"]["name"] == "Co 1"
+    failed = out["results"][1]
+    assert "data" not in failed
+    assert "returned 404" in failed["error"]
+    assert auth_calls["n"] == 1
+
+
+@pytest.mark.asyncio
+async def test_query_params_apply_to_every_id_and_repeats_fetch_once(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(url__regex=rf"{TEST_API_BASE}/companies/\d+/financials/").mock(
+        return_value=httpx.Response(200, json={"statements": []})
+    )
+
+    out = await _tool(mcp_module, "companies_financials_retrieve_many")(
+        ids=[5, 6, 5], fiscal_year=2024
+    )
+
+    assert [r["id"] for r in out["results"]] == [5, 6, 5]
+    assert route.call_count == 2
+    assert all(c.request.url.params["fiscal_year"] == "2024" for c in route.calls)
+
+
+@pytest.mark.asyncio
+async def test_fan_out_is_bounded(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    monkeypatch.setattr(mcp_module, "_BATCH_CONCURRENCY", 3)
+    in_flight = {"now": 0, "max": 0}
+
+    async def _slow(request: httpx.Request) -> httpx.Response:
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.02)
+        in_flight["now"] -= 1
+        return httpx.Response(200, json={"id": 0})
+
+    respx_router.get(url__regex=rf"{TEST_API_BASE}/companies/\d+/").mock(side_effect=_slow)
+
+    out = await _tool(mcp_module, "companies_retrieve_many")(ids=list(range(1, 11)))
+
+    assert len(out["results"]) == 10
+    assert in_flight["max"] == 3
+
+
+@pytest.mark.asyncio
+async def test_transport_error_is_inline_without_url(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    respx_router.get(f"{TEST_API_BASE}/companies/1/").mock(
+        side_effect=httpx.ConnectError(f"refused {TEST_API_BASE}/companies/1/")
+    )
+
+    out = await _tool(mcp_module, "companies_retrieve_many")(ids=[1])
+
+    assert "ConnectError" in out["results"][0]["error"]
+    assert TEST_API_BASE not in out["results"][0]["error"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ids", [[], list(range(1, 52))])
+async def test_empty_or_oversized_batch_is_rejected(
+    mcp_module, monkeypatch, fake_access_token, respx_router, ids
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(url__regex=rf"{TEST_API_BASE}/companies/.*").mock(
+        return_value=httpx.Response(200, json={})
+    )
+
+    with pytest.raises(mcp_module.ToolInputError):
+        await _tool(mcp_module, "companies_retrieve_many")(ids=ids)
+
+    assert route.call_count == 0
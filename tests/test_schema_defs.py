@@ -0,0 +1,71 @@
+"""`$defs` de-duplication of generated output schemas.
+
+Contract pinned here:
+
+  * Object subtrees repeated within one schema move to its local `$defs`,
+    largest saving first; small ones stay inline; the root stays
+    `type: object` and a schema without repeats is emitted unchanged.
+  * Writing the references back out gives the fully inlined schema again,
+    so validation accepts and rejects the same documents.
+"""
+from __future__ import annotations
+
+import copy
+
+import jsonschema
+
+from scripts.audit_token_budget import _inline_local_defs
+
+SECTOR = {
+    "type": "object",
+    "properties": {
+        "code": {"type": "string", "description": "ISIC Section code."},
+        "name": {"type": "string", "description": "ISIC Section name."},
+    },
+}
+GROUP = {
+    "type": "object",
+    "properties": {
+        "code": {"type": "string", "description": "ISIC Division code."},
+        "sector": copy.deepcopy(SECTOR),
+    },
+}
+COMPANY = {
+    "type": "object",
+    "properties": {
+        "id": {"type": "integer"},
+        "sector": copy.deepcopy(SECTOR),
+        "industry_group": copy.deepcopy(GROUP),
+        "industry": {"type": "object", "properties": {"group": copy.deepcopy(GROUP)}},
+        "tiny": {"type": "object", "properties": {"a": {"type": "string"}}},
+        "tiny_again": {"type": "object", "properties": {"a": {"type": "string"}}},
+    },
+}
+
+
+def test_repeats_move_to_defs() -> None:
+    import scripts.generate_mcp_tools as gen
+
+    out = gen.dedupe_schema(COMPANY)
+
+    assert set(out["$defs"]) == {"industry_group", "sector"}
+    assert out["properties"]["industry"]["properties"]["group"] == {"$ref": "#/$defs/industry_group"}
+    assert out["$defs"]["industry_group"]["properties"]["sector"] == {"$ref": "#/$defs/sector"}
+    assert out["properties"]["tiny"] == COMPANY["properties"]["tiny"]
+    assert out["type"] == "object"
+    assert _inline_local_defs(out) == COMPANY
+    assert gen.dedupe_schema(SECTOR) == SECTOR
+
+
+def test_emitted_schema_validates_like_the_inlined_one(mcp_module) -> None:
+    schema = mcp_module.mcp._tool_manager._tools["companies_retrieve"].output_schema
+    inlined = _inline_local_defs(schema)
+    sector = {"code": "C", "name": "Manufacturing"}
+    good = {"id": 7, "sector": sector, "industry_group": {"code": "29", "name": "Motor vehicles", "sector": sector}}
+    bad = {"id": 7, "industry_group": {"code": "29", "sector": {"code": 3}}}
+
+    assert "$defs" in schema and schema["type"] == "object"
+    for candidate in (schema, inlined):
+        validator = jsonschema.validators.validator_for(candidate)(candidate)
+        assert validator.is_valid(good)
+        assert not validator.is_valid(bad)
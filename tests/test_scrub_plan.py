@@ -0,0 +1,86 @@
+"""Per-tool scrub plans compiled from the response schemas.
+
+Contract pinned here:
+
+  * The generator compiles each GET tool's response schema into a plan that
+    visits only the objects the schema declares; subtrees the schema leaves
+    untyped (financial statements) fall back to the full walk.
+  * On any payload the plan leaves the same document `_scrub_response` does —
+    hidden keys go from every visited object, declared or not.
+  * A tool without a plan gets the full walk.
+"""
+from __future__ import annotations
+
+import copy
+import json
+from pathlib import Path
+
+SNAPSHOT = Path(__file__).resolve().parent.parent / "scripts" / "openapi.snapshot.json"
+
+FILINGS_PAGE = {
+    "count": 2,
+    "next": None,
+    "previous": None,
+    "results": [
+        {
+            "id": i,
+            "title": "Annual Report",
+            "markdown_url": f"https://api.test.invalid/filings/{i}/markdown/",
+            "company": {"id": 7, "name": "Example AG", "markdown_url": "x"},
+            "filing_type": {"code": "AR", "category": {"name": "FR", "markdown_url": "x"}},
+            "tags": ["a", "b"],
+        }
+        for i in range(2)
+    ],
+}
+
+FINANCIALS = {
+    "company_id": 7,
+    "currency": {"code": "EUR"},
+    "periods": [
+        {
+            "fiscal_year": 2025,
+            "statements": [
+                {
+                    "statement_type": "BS",
+                    "extraction": {"model": "internal", "prompt_version": "v9", "notes": None},
+                    "line_items": [{"code": "assets", "value": "1.00", "markdown_url": "x"}],
+                }
+            ],
+        }
+    ],
+}
+
+
+def _plan_for(path: str) -> dict:
+    import scripts.generate_mcp_tools as gen
+
+    snapshot = json.loads(SNAPSHOT.read_text())
+    return gen.compile_scrub_plan(gen.extract_response_schema(snapshot["paths"][path]["get"], snapshot))
+
+
+def test_plans_follow_the_schema() -> None:
+    assert _plan_for("/filing-categories/") == {"keys": {"results": {}}}
+    assert _plan_for("/filings/") == {
+        "keys": {
+            "results": {"keys": {"company": {}, "filing_type": {"keys": {"category": {}}}}},
+            "history_window": {},
+        }
+    }
+    statements = _plan_for("/companies/{id}/financials/")["keys"]["periods"]["keys"]["statements"]
+    assert statements == {"walk": True}
+
+
+def test_plan_matches_the_full_walk(mcp_module) -> None:
+    for tool, doc in (("filings_list", FILINGS_PAGE), ("companies_financials_retrieve", FINANCIALS)):
+        expected = mcp_module._scrub_response(copy.deepcopy(doc))
+        assert mcp_module._scrub_for(tool, copy.deepcopy(doc)) == expected
+
+    row = mcp_module._scrub_for("filings_list", copy.deepcopy(FILINGS_PAGE))["results"][0]
+    assert "markdown_url" not in row and "markdown_url" not in row["company"]
+
+
+def test_tool_without_a_plan_gets_the_full_walk(mcp_module) -> None:
+    doc = {"deep": [{"deeper": {"markdown_url": "x", "keep": 1}}]}
+
+    assert mcp_module._scrub_for("no_such_tool", doc) == {"deep": [{"deeper": {"keep": 1}}]}
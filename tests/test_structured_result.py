@@ -0,0 +1,107 @@
+"""Structured results: serialized once, optionally without the text copy.
+
+Contract pinned here:
+
+  * Analytics measures a structured result by the JSON text block FastMCP
+    already wrote (compact, what goes on the wire), not by serializing it
+    again.
+  * With MCP_STRUCTURED_POINTER_HOSTS naming the host and a protocol version
+    that has structuredContent, the text block is a one-line pointer; the
+    structured content is unchanged.
+  * Without the header (an older client) or for text tools, nothing changes.
+"""
+from __future__ import annotations
+
+import json
+
+import httpx
+import pytest
+
+from .conftest import TEST_API_BASE, TEST_CLIENT_ID
+
+PAGE = {
+    "count": 2,
+    "next": None,
+    "previous": None,
+    "results": [{"id": i, "title": f"Rapport annuel {i} — Société"} for i in range(2)],
+}
+
+
+def _auth_as(mcp_module, monkeypatch, fake_access_token) -> None:
+    at = fake_access_token(client_id=TEST_CLIENT_ID, token="real-access-token")
+    monkeypatch.setattr(mcp_module, "get_access_token", lambda: at)
+
+
+def _protocol(mcp_module, monkeypatch, version: str | None) -> None:
+    headers = {"mcp-protocol-version": version} if version else {}
+    monkeypatch.setattr(mcp_module, "get_http_headers", lambda include_all=False: headers)
+
+
+async def _call(mcp_module, monkeypatch, name="filings_list"):
+    from fastmcp import Client
+
+    captured: list[dict] = []
+    monkeypatch.setattr(mcp_module._usage_emitter, "emit", lambda ev: captured.append(ev))
+    async with Client(mcp_module.mcp) as client:
+        result = await client.call_tool(name, {})
+    event = [e for e in captured if e["name"] == name and e["kind"] == "tool"][-1]
+    return result, event
+
+
+@pytest.mark.asyncio
+async def test_analytics_reuses_the_text_copy(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    respx_router.get(f"{TEST_API_BASE}/filings/").mock(return_value=httpx.Response(200, json=PAGE))
+
+    result, event = await _call(mcp_module, monkeypatch)
+
+    text = result.content[0].text
+    assert json.loads(text) == result.structured_content
+    assert event["response_bytes"] == len(text) < len(json.dumps(result.structured_content))
+
+
+@pytest.mark.asyncio
+async def test_pointer_replaces_the_copy_for_listed_hosts(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    respx_router.get(f"{TEST_API_BASE}/filings/").mock(return_value=httpx.Response(200, json=PAGE))
+    monkeypatch.setattr(mcp_module, "_STRUCTURED_POINTER_HOSTS", frozenset({"*"}))
+    _protocol(mcp_module, monkeypatch, "2025-11-25")
+
+    result, event = await _call(mcp_module, monkeypatch)
+
+    full = len(json.dumps(result.structured_content, separators=(",", ":"), ensure_ascii=False))
+    assert result.structured_content == PAGE
+    assert result.content[0].text == (
+        f"Result is in structuredContent (2 results; {full} chars of JSON)."
+    )
+    assert event["response_bytes"] == full
+
+
+@pytest.mark.asyncio
+async def test_older_clients_and_text_tools_keep_the_text(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    respx_router.get(f"{TEST_API_BASE}/filings/").mock(return_value=httpx.Response(200, json=PAGE))
+    respx_router.get(f"{TEST_API_BASE}/filing-types/").mock(return_value=httpx.Response(200, json=PAGE))
+    monkeypatch.setattr(mcp_module, "_STRUCTURED_POINTER_HOSTS", frozenset({"*"}))
+
+    _protocol(mcp_module, monkeypatch, None)
+    structured, _ = await _call(mcp_module, monkeypatch)
+    _protocol(mcp_module, monkeypatch, "2025-11-25")
+    text, _ = await _call(mcp_module, monkeypatch, "filing_types_list")
+
+    assert json.loads(structured.content[0].text) == PAGE
+    assert text.content[0].text.startswith("```json")
+
+
+def test_pointer_hosts_are_matched_by_client_name(mcp_module, monkeypatch) -> None:
+    _protocol(mcp_module, monkeypatch, "2025-06-18")
+    monkeypatch.setattr(mcp_module, "_STRUCTURED_POINTER_HOSTS", frozenset({"claude-ai"}))
+    for host, expected in (("Claude-AI", True), ("cursor", False)):
+        monkeypatch.setattr(mcp_module, "current_client_info", lambda _ctx, h=host: (h, "1.0"))
+        assert mcp_module._sends_pointer(object()) is expected
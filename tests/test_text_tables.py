@@ -0,0 +1,113 @@
+"""Compact table rendering for text list tools (`output_format="table"`).
+
+Contract pinned here:
+
+  * The generator derives columns from the response schema: scalar fields as
+    they are, nested objects flattened to their id / code / name.
+  * A `results` page renders as one pagination line plus a pipe table —
+    header once, one line per row — and is at least 2x smaller than the JSON.
+  * The default stays JSON; errors and non-page bodies render as before.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import httpx
+import pytest
+
+from .conftest import TEST_API_BASE, TEST_CLIENT_ID
+
+SNAPSHOT = Path(__file__).resolve().parent.parent / "scripts" / "openapi.snapshot.json"
+URL = f"{TEST_API_BASE}/filing-types/"
+
+
+def _tool(mcp_module):
+    tool = mcp_module.mcp._tool_manager._tools["filing_types_list"]
+    return getattr(tool, "fn", None) or getattr(tool, "function", None)
+
+
+def _auth_as(mcp_module, monkeypatch, fake_access_token) -> None:
+    at = fake_access_token(client_id=TEST_CLIENT_ID, token="real-access-token")
+    monkeypatch.setattr(mcp_module, "get_access_token", lambda: at)
+
+
+def _page(n: int) -> dict:
+    return {
+        "count": 120,
+        "next": f"{URL}?page=3",
+        "previous": URL,
+        "results": [
+            {
+                "id": i,
+                "code": f"T{i}",
+                "name": f"Type {i}",
+                "description": "Annual | audited\nreport",
+                "category": {"id": 1, "name": "Financial Reporting", "sort_order": 1},
+            }
+            for i in range(n)
+        ],
+    }
+
+
+def test_columns_come_from_the_response_schema() -> None:
+    import scripts.generate_mcp_tools as gen
+
+    snapshot = json.loads(SNAPSHOT.read_text())
+    operation = snapshot["paths"]["/filing-types/"]["get"]
+
+    assert gen.table_columns(gen.extract_response_schema(operation, snapshot)) == (
+        "id", "code", "name", "description", "category.id", "category.name",
+    )
+    retrieve = snapshot["paths"]["/filing-types/{id}/"]["get"]
+    assert gen.table_columns(gen.extract_response_schema(retrieve, snapshot)) == ()
+
+
+@pytest.mark.asyncio
+async def test_page_renders_as_a_table(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(URL).mock(return_value=httpx.Response(200, json=_page(2)))
+
+    out = await _tool(mcp_module)(page=2, output_format="table")
+
+    assert "output_format" not in route.calls.last.request.url.params
+    assert out.splitlines() == [
+        "count=120 rows=2 next_page=3 previous_page=1",
+        "| id | code | name | description | category.id | category.name |",
+        "|---|---|---|---|---|---|",
+        "| 0 | T0 | Type 0 | Annual \\| audited report | 1 | Financial Reporting |",
+        "| 1 | T1 | Type 1 | Annual \\| audited report | 1 | Financial Reporting |",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_table_is_much_smaller_than_json(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    respx_router.get(URL).mock(return_value=httpx.Response(200, json=_page(50)))
+
+    as_json = await _tool(mcp_module)()
+    as_table = await _tool(mcp_module)(output_format="table")
+
+    assert as_json.startswith("```json")
+    assert len(as_table) * 2 < len(as_json)
+
+
+@pytest.mark.asyncio
+async def test_errors_render_as_before(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    respx_router.get(URL).mock(return_value=httpx.Response(503))
+    monkeypatch.setattr(mcp_module, "_retry_sleep", lambda _s: _noop())
+
+    out = await _tool(mcp_module)(output_format="table")
+
+    assert out.startswith("Error 503")
+
+
+async def _noop() -> None:
+    return None
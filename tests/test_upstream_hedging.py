@@ -0,0 +1,127 @@
+"""Opt-in hedged GETs for idempotent upstream reads.
+
+Contract pinned here:
+
+  * Off by default: without MCP_HEDGE_REQUESTS=1 every attempt is one plain
+    `_api_client.get`, so nothing changes for deployments that don't opt in.
+  * When on, an attempt still outstanding after its endpoint family's rolling
+    p95 gets a duplicate on the separate hedge pool; the first success wins and
+    the straggler is cancelled.
+  * Hedges are bounded by a token bucket — at most `_HEDGE_BUDGET` hedges per
+    primary request — and an endpoint with too few samples never hedges.
+  * Streaming downloads are never hedged.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+
+import httpx
+import pytest
+
+from .conftest import TEST_API_BASE, TEST_CLIENT_ID
+
+OK_PAGE = {"count": 0, "results": []}
+
+
+def _structured_tool(mcp_module, name="companies_list"):
+    tool = mcp_module.mcp._tool_manager._tools[name]
+    return getattr(tool, "fn", None) or getattr(tool, "function", None)
+
+
+def _auth_as(mcp_module, monkeypatch, fake_access_token) -> None:
+    at = fake_access_token(client_id=TEST_CLIENT_ID, token="real-access-token")
+    monkeypatch.setattr(mcp_module, "get_access_token", lambda: at)
+
+
+def _arm_hedging(mcp_module, monkeypatch, *, p95: float, tokens: float) -> None:
+    """Enable hedging with a warm latency window and a pre-filled bucket."""
+    monkeypatch.setattr(mcp_module, "_HEDGE_ENABLED", True)
+    window = mcp_module._hedge_latency["/companies/"]
+    for _ in range(mcp_module._HEDGE_MIN_SAMPLES):
+        window.record(p95)
+    mcp_module._hedge_budget._tokens = tokens
+
+
+def _straggler_then_fast(calls: dict):
+    """First request stalls well past the p95; every later one answers at once."""
+
+    async def _side_effect(request: httpx.Request) -> httpx.Response:
+        calls["n"] += 1
+        if calls["n"] == 1:
+            await asyncio.sleep(5)
+        return httpx.Response(200, json=OK_PAGE)
+
+    return _side_effect
+
+
+def test_endpoint_family_is_the_path_template(mcp_module) -> None:
+    fam = mcp_module._endpoint_family
+    assert fam("/companies/123/financials/") == "/companies/{id}/financials/"
+    assert fam("/isins/US0378331005/") == "/isins/{code}/"
+    assert fam("/line-item-definitions/revenue/") == "/line-item-definitions/{code}/"
+    assert fam("/companies/merges/") == "/companies/merges/"
+    assert fam(f"{TEST_API_BASE}/companies/?page=2") == "/companies/"
+    assert fam("/no-such-endpoint/abc/") == "other"
+
+
+def test_hedging_is_off_by_default(mcp_module) -> None:
+    assert mcp_module._HEDGE_ENABLED is False
+
+
+def test_hedge_budget_caps_extra_load(mcp_module) -> None:
+    budget = mcp_module._RatioBudget(0.05)
+    spent = 0
+    for _ in range(200):
+        budget.earn()
+        spent += budget.spend()
+    assert spent == 10  # 5 % of 200 primaries
+
+
+def test_cold_window_has_no_p95(mcp_module) -> None:
+    window = mcp_module._LatencyWindow()
+    for _ in range(mcp_module._HEDGE_MIN_SAMPLES - 1):
+        window.record(0.1)
+    assert window.quantile(0.95) is None
+
+
+@pytest.mark.asyncio
+async def test_straggler_is_hedged_and_fast_answer_wins(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    _arm_hedging(mcp_module, monkeypatch, p95=0.01, tokens=1.0)
+    calls = {"n": 0}
+    route = respx_router.get(f"{TEST_API_BASE}/companies/").mock(
+        side_effect=_straggler_then_fast(calls)
+    )
+
+    out = await asyncio.wait_for(_structured_tool(mcp_module)(), timeout=2)
+
+    assert out == OK_PAGE
+    assert calls["n"] == 2
+    # Only the hedge completed — the straggler was cancelled mid-flight — and it
+    # carried the caller's credential, not an anonymous request.
+    assert route.call_count == 1
+    assert route.calls.last.request.headers["Authorization"] == "Bearer real-access-token"
+
+
+@pytest.mark.asyncio
+async def test_exhausted_budget_waits_for_primary(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    _arm_hedging(mcp_module, monkeypatch, p95=0.01, tokens=0.0)
+
+    async def _slowish(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.1)
+        return httpx.Response(200, json=OK_PAGE)
+
+    route = respx_router.get(f"{TEST_API_BASE}/companies/").mock(side_effect=_slowish)
+
+    assert await _structured_tool(mcp_module)() == OK_PAGE
+    assert route.call_count == 1
+
+
+def test_stream_get_is_never_hedged(mcp_module) -> None:
+    assert "_hedged_get" not in inspect.getsource(mcp_module._api_stream_get)
@@ -0,0 +1,98 @@
+"""Separate priority lanes for bulk markdown downloads and interactive GETs.
+
+Contract pinned here:
+
+  * The generator picks the lane per tool class: the markdown templates stream
+    on "bulk", the GET templates use "interactive".
+  * The bulk lane is its own client and pool — http2 and its limits repassed —
+    so downloads no longer hold the slots lookups need.
+  * Bulk requests are capped by a per-process semaphore; interactive requests
+    never wait on it; a call waiting for a bulk slot waits at most its deadline.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from .conftest import TEST_API_BASE
+
+MD_URL = f"{TEST_API_BASE}/filings/1/markdown/"
+
+
+def test_generator_assigns_lanes_per_tool_class() -> None:
+    import scripts.generate_mcp_tools as gen
+
+    assert 'lane="bulk"' in gen.MARKDOWN_TOOL_TEMPLATE
+    assert 'lane="bulk"' in gen.MARKDOWN_SEARCH_TOOL_BLOCK
+    assert 'lane="interactive"' in gen.GET_TOOL_TEMPLATE
+    assert 'lane="interactive"' in gen.STRUCTURED_GET_TOOL_TEMPLATE
+
+
+def test_bulk_lane_has_its_own_pool(mcp_module) -> None:
+    pool = mcp_module._api_bulk_transport._pool
+    assert pool._http2 is True
+    assert pool._max_connections == mcp_module._API_BULK_LIMITS.max_connections
+    assert mcp_module._LANE_CLIENTS["bulk"] is not mcp_module._LANE_CLIENTS["interactive"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_downloads_are_capped_by_semaphore(
+    mcp_module, monkeypatch, respx_router
+) -> None:
+    monkeypatch.setattr(mcp_module, "_bulk_semaphore", asyncio.Semaphore(1))
+    in_flight = {"now": 0, "max": 0}
+
+    async def _download(request: httpx.Request) -> httpx.Response:
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.05)
+        in_flight["now"] -= 1
+        return httpx.Response(200, text="# body")
+
+    respx_router.get(MD_URL).mock(side_effect=_download)
+
+    async def _fetch() -> bytes:
+        async with mcp_module._api_stream_get("/filings/1/markdown/") as response:
+            return await response.aread()
+
+    bodies = await asyncio.gather(*(_fetch() for _ in range(3)))
+
+    assert bodies == [b"# body"] * 3
+    assert in_flight["max"] == 1
+
+
+@pytest.mark.asyncio
+async def test_interactive_lane_ignores_bulk_saturation(
+    mcp_module, monkeypatch, respx_router
+) -> None:
+    saturated = asyncio.Semaphore(1)
+    await saturated.acquire()
+    monkeypatch.setattr(mcp_module, "_bulk_semaphore", saturated)
+    respx_router.get(f"{TEST_API_BASE}/companies/1/").mock(
+        return_value=httpx.Response(200, json={"id": 1})
+    )
+
+    response = await asyncio.wait_for(mcp_module._api_get("/companies/1/"), timeout=1)
+
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_bulk_slot_wait_is_bounded_by_deadline(
+    mcp_module, monkeypatch, respx_router
+) -> None:
+    saturated = asyncio.Semaphore(1)
+    await saturated.acquire()
+    monkeypatch.setattr(mcp_module, "_bulk_semaphore", saturated)
+    route = respx_router.get(MD_URL).mock(return_value=httpx.Response(200, text="x"))
+    mcp_module._call_deadline.set(time.monotonic() + 0.1)
+
+    with pytest.raises(mcp_module.UpstreamHTTPError) as info:
+        async with mcp_module._api_stream_get("/filings/1/markdown/"):
+            pass
+
+    assert info.value.error_kind == "deadline_exceeded"
+    assert route.call_count == 0
@@ -0,0 +1,89 @@
+"""Multi-connection HTTP/2 upstream pool with stream-count balancing.
+
+Contract pinned here:
+
+  * The upstream transport holds N member pools (one HTTP/2 connection each)
+    and places every new stream on the member with the fewest active streams,
+    breaking ties by flow-control headroom, then by position.
+  * A stream counts as active from dispatch until httpx closes its response —
+    for a streamed download that is when the caller leaves `stream(...)`, so a
+    long body keeps its member busy and later calls go elsewhere.
+  * Failed dispatches never leak an active stream.
+  * Per-connection stats are exposed on /health.
+"""
+from __future__ import annotations
+
+import httpx
+import pytest
+from starlette.testclient import TestClient
+
+from .conftest import TEST_API_BASE
+
+
+def _fresh(mcp_module, size: int = 3):
+    return mcp_module._BalancedHTTP2Transport(size, mcp_module._API_LIMITS)
+
+
+def test_limits_are_split_across_members(mcp_module) -> None:
+    transport = _fresh(mcp_module, 4)
+    assert [m._pool._max_connections for m in transport.members] == [25] * 4
+    assert all(m._pool._http2 for m in transport.members)
+
+
+def test_least_active_member_wins_then_headroom(mcp_module, monkeypatch) -> None:
+    transport = _fresh(mcp_module)
+    transport._active = [2, 1, 1]
+    headroom = {0: 10, 1: 100, 2: 5_000}
+    monkeypatch.setattr(transport, "_headroom", lambda i: headroom[i])
+
+    assert transport._pick() == 2  # fewest streams, most window among the tied
+
+    transport._active = [0, 1, 1]
+    assert transport._pick() == 0  # stream count dominates headroom
+
+
+@pytest.mark.asyncio
+async def test_open_stream_keeps_its_member_busy(mcp_module, respx_router) -> None:
+    respx_router.get(f"{TEST_API_BASE}/filings/1/markdown/").mock(
+        return_value=httpx.Response(200, text="# body")
+    )
+    respx_router.get(f"{TEST_API_BASE}/companies/1/").mock(
+        return_value=httpx.Response(200, json={"id": 1})
+    )
+    transport = mcp_module._api_transport
+    client = mcp_module._api_client
+
+    async with client.stream("GET", "/filings/1/markdown/") as streamed:
+        busy = transport._active.index(1)
+        await client.get("/companies/1/")  # completes and releases immediately
+        assert transport._active[busy] == 1
+        assert sum(transport._active) == 1
+        await streamed.aread()
+
+    assert transport._active == [0] * len(transport.members)
+    # The lookup went to a different member than the open download.
+    opened = transport._opened
+    assert sum(opened) == 2 and opened[busy] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_dispatch_releases_its_slot(mcp_module, respx_router) -> None:
+    respx_router.get(f"{TEST_API_BASE}/companies/").mock(
+        side_effect=httpx.ConnectError("refused")
+    )
+    with pytest.raises(httpx.ConnectError):
+        await mcp_module._api_client.get("/companies/")
+    assert sum(mcp_module._api_transport._active) == 0
+
+
+def test_health_exposes_per_connection_stats(mcp_module, respx_router) -> None:
+    respx_router.get(f"{TEST_API_BASE}/health/").mock(return_value=httpx.Response(200))
+    respx_router.head(f"{TEST_API_BASE}/health/").mock(return_value=httpx.Response(200))
+
+    with TestClient(mcp_module.app) as client:
+        stats = client.get("/health").json()["upstream_connections"]
+
+    assert [s["connection"] for s in stats] == list(range(len(mcp_module._api_transport.members)))
+    for entry in stats:
+        assert entry["active_streams"] == 0
+        assert {"streams_opened", "open", "inbound_window", "max_concurrent_streams"} <= set(entry)
@@ -0,0 +1,124 @@
+"""Upstream connection pre-warm and keepalive.
+
+Contract pinned here:
+
+  * Boot opens a connection on every warm target that lacks one, so the first
+    tool call after a scale-from-zero finds it ready; a pool the self-check
+    already warmed is not probed twice.
+  * MCP_UPSTREAM_WARM_CONNECTIONS caps the warm connections, primary pool
+    first, and 0 switches pre-warm and the keepalive loop off.
+  * A failed keepalive never raises — the loop must outlive any one round.
+  * /health reports the warm-connection count.
+
+respx patches the pool's request handler, so no real connection is ever opened
+under test; pool state is stubbed where a test needs a live connection.
+"""
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from starlette.testclient import TestClient
+
+from .conftest import TEST_API_BASE
+
+
+class _Conn:
+    def __init__(self, *, closed: bool = False, expired: bool = False) -> None:
+        self._closed, self._expired = closed, expired
+
+    def is_closed(self) -> bool:
+        return self._closed
+
+    def has_expired(self) -> bool:
+        return self._expired
+
+
+def _transport(*conns: _Conn):
+    return SimpleNamespace(_pool=SimpleNamespace(connections=list(conns)))
+
+
+def test_live_connections_skip_closed_and_expired(mcp_module) -> None:
+    t = _transport(_Conn(), _Conn(closed=True), _Conn(expired=True), _Conn())
+    assert mcp_module._live_connections(t) == 2
+
+
+def test_live_connections_sum_balanced_members(mcp_module) -> None:
+    balanced = SimpleNamespace(members=[_transport(_Conn()), _transport(_Conn(), _Conn())])
+    assert mcp_module._live_connections(balanced) == 3
+
+
+def test_warm_plan_is_capped_primary_first(mcp_module, monkeypatch) -> None:
+    width = len(mcp_module._api_transport.members)
+    monkeypatch.setattr(mcp_module, "_HEDGE_ENABLED", True)
+    monkeypatch.setattr(mcp_module, "_WARM_CONNECTIONS", 1)
+    assert mcp_module._warm_plan() == [(mcp_module._api_client, mcp_module._api_transport, 1)]
+
+    monkeypatch.setattr(mcp_module, "_WARM_CONNECTIONS", 100)
+    plan = mcp_module._warm_plan()
+    # Only as many connections as the pools hold: every primary member, then
+    # the bulk lane's one, then the hedge pool's one.
+    assert [client for client, _, _ in plan] == [
+        mcp_module._api_client,
+        mcp_module._api_bulk_client,
+        mcp_module._api_hedge_client,
+    ]
+    assert [count for _, _, count in plan] == [width, 1, 1]
+
+
+def test_warm_default_covers_interactive_and_bulk_lanes(mcp_module) -> None:
+    assert mcp_module._WARM_CONNECTIONS == len(mcp_module._api_transport.members) + 1
+
+
+@pytest.mark.asyncio
+async def test_prewarm_only_opens_missing_connections(
+    mcp_module, monkeypatch, respx_router
+) -> None:
+    width = len(mcp_module._api_transport.members)
+    # One primary connection is already warm (the self-check ran over it); the
+    # rest of the primary members and the bulk lane are cold.
+    monkeypatch.setattr(
+        mcp_module,
+        "_live_connections",
+        lambda t: 1 if t is mcp_module._api_transport else 0,
+    )
+    route = respx_router.head(f"{TEST_API_BASE}/health/").mock(
+        return_value=httpx.Response(200)
+    )
+
+    await mcp_module._prewarm_upstream()
+
+    assert route.call_count == (width - 1) + 1
+
+
+@pytest.mark.asyncio
+async def test_keepalive_failure_does_not_raise(mcp_module, respx_router) -> None:
+    respx_router.head(f"{TEST_API_BASE}/health/").mock(
+        side_effect=httpx.ConnectError("upstream down")
+    )
+    await mcp_module._warm_pool(mcp_module._api_client)
+
+
+def test_zero_warm_connections_skips_prewarm(mcp_module, monkeypatch, respx_router) -> None:
+    monkeypatch.setattr(mcp_module, "_WARM_CONNECTIONS", 0)
+    respx_router.get(f"{TEST_API_BASE}/health/").mock(return_value=httpx.Response(200))
+    route = respx_router.head(f"{TEST_API_BASE}/health/").mock(
+        return_value=httpx.Response(200)
+    )
+
+    with TestClient(mcp_module.app) as client:
+        assert client.get("/health").status_code == 200
+
+    assert route.call_count == 0
+
+
+def test_health_reports_warm_connection_count(mcp_module, monkeypatch, respx_router) -> None:
+    respx_router.get(f"{TEST_API_BASE}/health/").mock(return_value=httpx.Response(200))
+    respx_router.head(f"{TEST_API_BASE}/health/").mock(return_value=httpx.Response(200))
+    monkeypatch.setattr(mcp_module, "_warm_connection_count", lambda: 3)
+
+    with TestClient(mcp_module.app) as client:
+        body = client.get("/health").json()
+
+    assert body["upstream_warm_connections"] == 3
@@ -291,10 +291,12 @@ def test_transport_repasses_http2_and_limits(mcp_module) -> None:
     """httpx returns a caller-supplied transport verbatim and only uses its own
     http2/limits kwargs to build the DEFAULT one — so passing `transport=`
     without repeating them silently drops HTTP/2 and the explicit pool bounds."""
-    pool = mcp_module._api_transport._pool
-    assert pool._http2 is True
-    assert pool._max_connections == 100
-    assert pool._max_keepalive_connections == 20
+    pools = [member._pool for member in mcp_module._api_transport.members]
+    assert all(pool._http2 is True for pool in pools)
+    # The balanced transport splits _API_LIMITS across its member pools, so
+    # the process-wide bounds still hold.
+    assert sum(pool._max_connections for pool in pools) == 100
+    assert sum(pool._max_keepalive_connections for pool in pools) == 20
 
 
 def test_post_template_never_retries() -> None:
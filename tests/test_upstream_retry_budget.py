@@ -0,0 +1,154 @@
+"""Retry budget for transient upstream failures.
+
+Contract pinned here:
+
+  * Retries are drawn from a token bucket per endpoint family: each first
+    attempt earns `_RETRY_BUDGET_RATIO`, each retry spends one token, and the
+    bucket starts full at `_RETRY_BUDGET_BURST` so a quiet replica still
+    retries an isolated blip.
+  * Once a family's budget is spent, a retryable failure fails fast with the
+    same error text a failed retry would have produced — one request, not two.
+  * Families are the spec's path templates: `/companies/1/` and
+    `/companies/2/` share a bucket, `/filings/` does not, and free-text codes
+    or unknown paths never add buckets.
+  * Attempts, retries and denied retries are reported on /health.
+"""
+from __future__ import annotations
+
+import httpx
+import pytest
+from starlette.testclient import TestClient
+
+from .conftest import TEST_API_BASE, TEST_CLIENT_ID
+
+OK_PAGE = {"count": 0, "results": []}
+
+
+def _tool(mcp_module, name):
+    tool = mcp_module.mcp._tool_manager._tools[name]
+    return getattr(tool, "fn", None) or getattr(tool, "function", None)
+
+
+def _auth_as(mcp_module, monkeypatch, fake_access_token) -> None:
+    at = fake_access_token(client_id=TEST_CLIENT_ID, token="real-access-token")
+    monkeypatch.setattr(mcp_module, "get_access_token", lambda: at)
+
+
+def _drain(mcp_module, url: str) -> None:
+    mcp_module._retry_budget(url)._tokens = 0.0
+
+
+def test_budget_caps_retries_to_ratio_after_burst(mcp_module, monkeypatch) -> None:
+    monkeypatch.setattr(mcp_module, "_RETRY_BUDGET_RATIO", 0.1)
+    monkeypatch.setattr(mcp_module, "_RETRY_BUDGET_BURST", 3.0)
+    budget = mcp_module._RetryBudget("/companies/")
+
+    granted = 0
+    for _ in range(100):  # every request fails: a full brown-out
+        budget.first_attempt()
+        granted += budget.allow_retry("503")
+
+    # The starting burst, then one retry per ten first attempts.
+    assert 3 + 9 <= granted <= 3 + 10
+    assert budget.retries == granted
+    assert budget.denied == 100 - granted
+    assert budget.attempts == 100 + granted
+
+
+def test_families_share_by_id_pattern(mcp_module) -> None:
+    one = mcp_module._retry_budget("/companies/1/")
+    assert mcp_module._retry_budget("/companies/2/") is one
+    assert mcp_module._retry_budget("/filings/") is not one
+
+
+def test_buckets_are_bounded_by_the_spec_paths(mcp_module) -> None:
+    for code in ("revenue", "net_income", "not an isin"):
+        mcp_module._retry_budget(f"/line-item-definitions/{code}/")
+        mcp_module._retry_budget(f"/isins/{code}/")
+        mcp_module._retry_budget(f"/no-such-endpoint/{code}/")
+
+    assert sorted(mcp_module._retry_budgets) == [
+        "/isins/{code}/",
+        "/line-item-definitions/{code}/",
+        "other",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_spent_budget_fails_fast_on_5xx(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(f"{TEST_API_BASE}/companies/").mock(
+        side_effect=[httpx.Response(503), httpx.Response(200, json=OK_PAGE)]
+    )
+    _drain(mcp_module, "/companies/")
+
+    with pytest.raises(mcp_module.UpstreamHTTPError) as info:
+        await _tool(mcp_module, "companies_list")()
+
+    assert info.value.upstream_status == 503
+    assert route.call_count == 1
+    assert mcp_module._retry_budget("/companies/").denied == 1
+
+
+@pytest.mark.asyncio
+async def test_spent_budget_reraises_transport_error(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    route = respx_router.get(f"{TEST_API_BASE}/companies/").mock(
+        side_effect=[httpx.ConnectError("refused"), httpx.Response(200, json=OK_PAGE)]
+    )
+    _drain(mcp_module, "/companies/")
+
+    with pytest.raises(mcp_module.UpstreamHTTPError):
+        await _tool(mcp_module, "companies_list")()
+
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_denied_retry_keeps_the_existing_hint_text(
+    mcp_module, monkeypatch, fake_access_token, respx_router
+) -> None:
+    _auth_as(mcp_module, monkeypatch, fake_access_token)
+    respx_router.get(f"{TEST_API_BASE}/filing-types/").mock(
+        return_value=httpx.Response(503, text="down")
+    )
+    retried = await _tool(mcp_module, "filing_types_list")()
+
+    _drain(mcp_module, "/filing-types/")
+    failed_fast = await _tool(mcp_module, "filing_types_list")()
+
+    assert failed_fast == retried
+
+
+@pytest.mark.asyncio
+async def test_stream_retries_draw_on_the_same_budget(
+    mcp_module, respx_router
+) -> None:
+    route = respx_router.get(f"{TEST_API_BASE}/filings/1/markdown/").mock(
+        side_effect=[httpx.Response(503), httpx.Response(200, text="# body")]
+    )
+    _drain(mcp_module, "/filings/7/markdown/")
+
+    async with mcp_module._api_stream_get("/filings/1/markdown/") as response:
+        assert response.status_code == 503
+
+    assert route.call_count == 1
+
+
+def test_health_reports_retry_counters(mcp_module, respx_router) -> None:
+    respx_router.get(f"{TEST_API_BASE}/health/").mock(return_value=httpx.Response(200))
+    respx_router.head(f"{TEST_API_BASE}/health/").mock(return_value=httpx.Response(200))
+    budget = mcp_module._retry_budget("/companies/")
+    budget.first_attempt()
+    budget.allow_retry("503")
+
+    with TestClient(mcp_module.app) as client:
+        stats = client.get("/health").json()["upstream_retry_budget"]
+
+    assert stats["/companies/"]["attempts"] == 2
+    assert stats["/companies/"]["retries"] == 1
+    assert stats["/companies/"]["retries_denied"] == 0